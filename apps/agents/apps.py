@@ -0,0 +1,12 @@
+"""
+App configuration for the agents Django application.
+"""
+from django.apps import AppConfig
+
+
+class AgentsConfig(AppConfig):
+    """Configuration for the Agents application."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.agents'
+    verbose_name = 'Agentes'
@@ -0,0 +1,163 @@
+"""
+Agent gateway: the single entry point of LLM calls.
+
+Agents call ``AgentGateway(organization).complete(...)``. The gateway:
+
+1. reserves budget from the organization's request and token buckets
+   (see apps.agents.limits), waiting when the budget is short;
+2. streams the response through the provider's pooled client (see
+   apps.agents.providers), handing each fragment to a sink (see
+   apps.agents.sinks);
+3. retries connection errors, timeouts, 429/5xx answers and overloaded
+   streams with full-jitter exponential backoff, honouring Retry-After;
+4. returns the unused reserved tokens once the usage is known.
+
+Usage:
+    gateway = AgentGateway(problem.organization)
+    completion = gateway.complete(
+        [{'role': 'user', 'content': prompt}],
+        system=instructions,
+        sink=ExecutionLogSink(execution, prefix='[code_writer] '),
+    )
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from apps.agents.limits import BudgetExceeded, OrganizationLimiter
+from apps.agents.providers import Completion, get_provider
+from apps.agents.sinks import StreamSink
+
+
+__all__ = ('AgentGateway', 'BudgetExceeded', 'Completion', 'GatewayError', 'estimate_tokens')
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """
+    An LLM call failed.
+
+    Attributes:
+        retryable: Whether the call may succeed later (retries were exhausted)
+        attempts: Number of requests made
+    """
+
+    def __init__(self, message, retryable=False, attempts=1):
+        super().__init__(message)
+        self.retryable = retryable
+        self.attempts = attempts
+
+
+def estimate_tokens(system, messages):
+    """Rough prompt size in tokens (4 characters per token), used for budgeting."""
+    chars = len(system or '') + sum(len(str(message.get('content', ''))) for message in messages)
+    return chars // 4 + 1
+
+
+def backoff_delay(retry, retry_after=None):
+    """
+    Return the delay before a retry (full jitter).
+
+    Args:
+        retry: Retry number, starting at 0.
+        retry_after: Delay requested by the provider, used as a minimum.
+    """
+    ceiling = min(settings.AGENT_GATEWAY_RETRY_BACKOFF_MAX, settings.AGENT_GATEWAY_RETRY_BACKOFF * (2 ** retry))
+    delay = random.uniform(0, ceiling)
+    if retry_after:
+        delay = max(delay, min(retry_after, settings.AGENT_GATEWAY_RETRY_BACKOFF_MAX))
+    return delay
+
+
+class AgentGateway:
+    """
+    Budgeted, retried and streamed LLM calls on behalf of an organization.
+
+    Attributes:
+        organization: Organization whose budget is charged (None: unlimited)
+        provider: The Provider used for the calls
+        max_retries: Retries after the first request
+    """
+
+    def __init__(self, organization=None, provider=None, max_retries=None, max_budget_wait=None):
+        self.organization = organization
+        self.provider = get_provider(provider)
+        self.max_retries = max_retries if max_retries is not None else settings.AGENT_GATEWAY_MAX_RETRIES
+        self.limiter = OrganizationLimiter(organization, max_wait=max_budget_wait)
+
+    def complete(self, messages, system='', model=None, max_tokens=None, sink=None, **options):
+        """
+        Run a streamed completion.
+
+        Args:
+            messages: List of ``{'role': 'user'|'assistant', 'content': str}``.
+            system: System prompt.
+            model: Model name (defaults to the provider's model).
+            max_tokens: Maximum completion tokens (defaults to AGENT_GATEWAY_MAX_TOKENS).
+            sink: Optional StreamSink receiving the response as it is generated.
+            **options: Extra request parameters (e.g. temperature).
+
+        Returns:
+            Completion: The response and its usage.
+
+        Raises:
+            BudgetExceeded: If the organization's budget stayed short for
+                longer than AGENT_GATEWAY_MAX_BUDGET_WAIT.
+            GatewayError: If the call failed permanently or ran out of retries.
+        """
+        sink = sink or StreamSink()
+        model = model or self.provider.model
+        max_tokens = max_tokens or settings.AGENT_GATEWAY_MAX_TOKENS
+        reserved = estimate_tokens(system, messages) + max_tokens
+        self.limiter.reserve(reserved)
+
+        used = 0
+        try:
+            completion = self._stream(model, system, messages, max_tokens, sink, options)
+            used = completion.total_tokens
+        finally:
+            self.limiter.settle(reserved, used)
+
+        sink.close(completion)
+        return completion
+
+    def _stream(self, model, system, messages, max_tokens, sink, options):
+        streamed = False
+
+        def on_text(text):
+            nonlocal streamed
+            streamed = True
+            sink.write(text)
+
+        retry = 0
+        while True:
+            started = time.monotonic()
+            try:
+                completion = self.provider.stream(model, system, messages, max_tokens, on_text, **options)
+            except Exception as exc:
+                retryable = self.provider.is_retryable(exc)
+                if not retryable or retry >= self.max_retries:
+                    logger.warning(
+                        f'{self.provider.name} call failed after {retry + 1} attempt(s): {exc!r}'
+                    )
+                    raise GatewayError(str(exc), retryable=retryable, attempts=retry + 1) from exc
+
+                delay = backoff_delay(retry, self.provider.retry_after(exc))
+                logger.info(
+                    f'{self.provider.name} call failed after {time.monotonic() - started:.1f}s '
+                    f'({exc!r}), retrying in {delay:.1f}s'
+                )
+                if streamed:
+                    sink.reset()
+                    streamed = False
+                time.sleep(delay)
+                retry += 1
+                # Every attempt is a request against the budget
+                self.limiter.acquire_request()
+                continue
+
+            completion.attempts = retry + 1
+            return completion
@@ -0,0 +1,149 @@
+"""
+Per-organization budgets of LLM requests and tokens.
+
+Each organization has two token buckets in Redis, shared by every worker
+process: one for requests (refilled at ``llm_requests_per_minute``,
+bursting up to ``AGENT_GATEWAY_REQUEST_BURST``) and one for tokens
+(refilled at ``llm_tokens_per_minute``, bursting up to one minute of
+budget). A Lua script refills and takes from a bucket in a single round
+trip; when the bucket is short it takes nothing and returns how long to
+wait.
+
+Tokens are reserved before a call (estimated prompt plus ``max_tokens``)
+and the unused part is returned once the provider reports the usage.
+"""
+import time
+
+from django.conf import settings
+
+from apps.common.redis_client import get_redis
+
+
+# KEYS[1]: bucket hash; ARGV: capacity, refill rate (per second), cost, now.
+# Returns the seconds to wait (0 if the cost was taken) as a string, since
+# Lua numbers are truncated to integers in replies. A negative cost returns
+# tokens to the bucket.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if cost <= tokens then
+    tokens = math.min(capacity, tokens - cost)
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+_take_script = None
+
+
+def _take(key, capacity, rate, cost):
+    # EVALSHA of the registered script, falling back to EVAL once per server
+    global _take_script
+    if _take_script is None:
+        _take_script = get_redis().register_script(TAKE_SCRIPT)
+    return float(_take_script(keys=[key], args=[capacity, rate, cost, time.time()]))
+
+
+class BudgetExceeded(Exception):
+    """The organization's budget did not allow the call within the maximum wait."""
+
+
+class TokenBucket:
+    """
+    Token bucket stored in a Redis hash.
+
+    Attributes:
+        key: Redis key of the bucket
+        capacity: Maximum number of tokens (burst)
+        rate: Tokens added per second
+    """
+
+    def __init__(self, key, capacity, rate):
+        self.key = key
+        self.capacity = max(1, capacity)
+        self.rate = rate
+
+    def take(self, cost):
+        """
+        Take ``cost`` tokens if available.
+
+        Costs above the capacity are capped to it, so a large call waits
+        for a full bucket instead of waiting forever.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds to wait.
+        """
+        return _take(self.key, self.capacity, self.rate, min(cost, self.capacity))
+
+    def give_back(self, amount):
+        """Return unused tokens to the bucket (never above its capacity)."""
+        if amount > 0:
+            self.take(-amount)
+
+    def acquire(self, cost, max_wait):
+        """
+        Wait until ``cost`` tokens are taken.
+
+        Raises:
+            BudgetExceeded: If the tokens are not available within ``max_wait`` seconds.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.take(cost)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise BudgetExceeded(f'{self.key}: budget exhausted for the next {wait:.1f}s')
+            time.sleep(wait)
+
+
+class OrganizationLimiter:
+    """
+    Request and token budgets of one organization.
+
+    Without an organization (system calls) nothing is limited.
+    """
+
+    def __init__(self, organization=None, max_wait=None):
+        self.organization = organization
+        self.max_wait = max_wait if max_wait is not None else settings.AGENT_GATEWAY_MAX_BUDGET_WAIT
+        self.requests = self.tokens = None
+        if organization is None:
+            return
+
+        requests_per_minute = (
+            organization.llm_requests_per_minute or settings.AGENT_GATEWAY_REQUESTS_PER_MINUTE
+        )
+        tokens_per_minute = organization.llm_tokens_per_minute or settings.AGENT_GATEWAY_TOKENS_PER_MINUTE
+        prefix = f'agents:budget:{organization.pk}'
+        self.requests = TokenBucket(
+            f'{prefix}:requests', settings.AGENT_GATEWAY_REQUEST_BURST, requests_per_minute / 60
+        )
+        self.tokens = TokenBucket(f'{prefix}:tokens', tokens_per_minute, tokens_per_minute / 60)
+
+    def acquire_request(self):
+        """Wait for one request of budget."""
+        if self.requests is not None:
+            self.requests.acquire(1, self.max_wait)
+
+    def reserve(self, tokens):
+        """Wait for one request and ``tokens`` tokens of budget."""
+        self.acquire_request()
+        if self.tokens is not None:
+            self.tokens.acquire(tokens, self.max_wait)
+
+    def settle(self, reserved, used):
+        """Return the reserved tokens that were not used."""
+        if self.tokens is not None:
+            self.tokens.give_back(reserved - used)
@@ -0,0 +1,321 @@
+"""
+Management command para executar um servidor local que imita as APIs de LLM.
+
+Responde a POST /v1/messages (Anthropic) e POST /v1/chat/completions
+(OpenAI), com ou sem streaming, no formato de eventos de cada API. A
+resposta e enviada em fragmentos de --chunk-size caracteres a cada
+--chunk-delay segundos. O servidor usa HTTP/1.1 com keep-alive e mostra
+quantas conexoes atenderam quantas requisicoes, para conferir o reuso das
+conexoes do gateway.
+
+Para falhas: --fail-first N faz as N primeiras requisicoes responderem
+--fail-status (ex.: 529, 503, 429), ou, com --drop-stream, interromperem a
+conexao no meio do streaming.
+
+Para apontar o gateway para o servidor local:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+
+Usage:
+    python manage.py run_llm_stub
+    python manage.py run_llm_stub --port 8765 --chunk-delay 0.05
+    python manage.py run_llm_stub --fail-first 2 --fail-status 529
+    python manage.py run_llm_stub --fail-first 1 --drop-stream
+"""
+
+import itertools
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+DEFAULT_REPLY = (
+    'Resposta simulada pelo servidor local.\n'
+    'Cada fragmento chega separadamente, como no streaming das APIs reais.\n'
+    'Fim da resposta.'
+)
+
+
+def count_tokens(text):
+    """Approximate token count (4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class LLMStubHandler(BaseHTTPRequestHandler):
+    """Answers Anthropic Messages and OpenAI Chat Completions requests."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection_id = self.server.new_connection()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            payload = {}
+
+        if self.path.rstrip('/').endswith('/messages'):
+            api = 'anthropic'
+        elif self.path.rstrip('/').endswith('/chat/completions'):
+            api = 'openai'
+        else:
+            return self.send_json(404, {'error': {'type': 'not_found_error', 'message': self.path}})
+
+        number, failing = self.server.new_request()
+        stream = bool(payload.get('stream'))
+        self.server.report(
+            f'[{api}] requisicao {number} na conexao {self.connection_id} '
+            f'({"stream" if stream else "json"}, modelo {payload.get("model")})'
+            f'{" -> falha" if failing else ""}'
+        )
+
+        if not self.authorized(api):
+            return self.send_error_payload(api, 401, 'authentication_error', 'invalid api key')
+        if failing and not (stream and self.server.drop_stream):
+            return self.send_error_payload(
+                api, self.server.fail_status, 'overloaded_error', 'simulated failure'
+            )
+
+        reply = self.server.reply or self.default_reply(payload)
+        prompt_tokens = count_tokens(json.dumps(payload.get('messages', [])) + str(payload.get('system', '')))
+        if not stream:
+            return self.send_json(200, getattr(self, f'{api}_message')(payload, reply, prompt_tokens))
+        events = getattr(self, f'{api}_events')(payload, reply, prompt_tokens)
+        self.send_stream(events, drop=failing)
+
+    # Requests
+
+    def authorized(self, api):
+        expected = self.server.api_key
+        if not expected:
+            return True
+        if api == 'anthropic':
+            return self.headers.get('x-api-key') == expected
+        return self.headers.get('Authorization') == f'Bearer {expected}'
+
+    @staticmethod
+    def default_reply(payload):
+        messages = payload.get('messages') or [{}]
+        content = messages[-1].get('content', '')
+        if isinstance(content, list):
+            content = ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+        return f'{DEFAULT_REPLY}\nPedido: {str(content)[:200]}'
+
+    def chunks(self, text):
+        size = self.server.chunk_size
+        return [text[start:start + size] for start in range(0, len(text), size)]
+
+    # Anthropic
+
+    def anthropic_message(self, payload, reply, prompt_tokens):
+        return {
+            'id': f'msg_{uuid.uuid4().hex[:24]}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': payload.get('model', 'stub'),
+            'content': [{'type': 'text', 'text': reply}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': prompt_tokens, 'output_tokens': count_tokens(reply)},
+        }
+
+    def anthropic_events(self, payload, reply, prompt_tokens):
+        message = self.anthropic_message(payload, '', prompt_tokens)
+        message['content'] = []
+        message['stop_reason'] = None
+        message['usage']['output_tokens'] = 1
+        yield 'message_start', {'type': 'message_start', 'message': message}
+        yield 'content_block_start', {
+            'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''},
+        }
+        for chunk in self.chunks(reply):
+            yield 'content_block_delta', {
+                'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': chunk},
+            }
+        yield 'content_block_stop', {'type': 'content_block_stop', 'index': 0}
+        yield 'message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+            'usage': {'output_tokens': count_tokens(reply)},
+        }
+        yield 'message_stop', {'type': 'message_stop'}
+
+    # OpenAI
+
+    def openai_message(self, payload, reply, prompt_tokens):
+        return {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:24]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': count_tokens(reply),
+                'total_tokens': prompt_tokens + count_tokens(reply),
+            },
+        }
+
+    def openai_events(self, payload, reply, prompt_tokens):
+        base = {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:24]}',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': payload.get('model', 'stub'),
+        }
+
+        def chunk(delta, finish_reason=None):
+            return dict(base, choices=[{'index': 0, 'delta': delta, 'finish_reason': finish_reason}])
+
+        yield None, chunk({'role': 'assistant', 'content': ''})
+        for text in self.chunks(reply):
+            yield None, chunk({'content': text})
+        yield None, chunk({}, 'stop')
+        if (payload.get('stream_options') or {}).get('include_usage'):
+            yield None, dict(base, choices=[], usage={
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': count_tokens(reply),
+                'total_tokens': prompt_tokens + count_tokens(reply),
+            })
+        yield None, '[DONE]'
+
+    # Responses
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_payload(self, api, status, error_type, message):
+        if api == 'anthropic':
+            data = {'type': 'error', 'error': {'type': error_type, 'message': message}}
+        else:
+            data = {'error': {'type': error_type, 'message': message, 'code': None, 'param': None}}
+        headers = {'Retry-After': '0'} if status == 429 else None
+        self.send_json(status, data, headers)
+
+    def send_stream(self, events, drop=False):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        events = list(events)
+        for index, (event, data) in enumerate(events):
+            if drop and index >= len(events) // 2:
+                # Abort mid-stream without the terminating chunk
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return
+            lines = f'event: {event}\n' if event else ''
+            lines += f'data: {data if isinstance(data, str) else json.dumps(data)}\n\n'
+            encoded = lines.encode('utf-8')
+            self.wfile.write(f'{len(encoded):x}\r\n'.encode('ascii') + encoded + b'\r\n')
+            self.wfile.flush()
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LLMStubServer(ThreadingHTTPServer):
+    """
+    Stub server of the Anthropic and OpenAI APIs.
+
+    Attributes:
+        connections: Connections accepted so far
+        requests: Requests answered so far
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, reply='', chunk_size=8, chunk_delay=0.0, fail_first=0,
+                 fail_status=529, drop_stream=False, api_key='', output=None):
+        super().__init__(address, LLMStubHandler)
+        self.reply = reply
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.drop_stream = drop_stream
+        self.api_key = api_key
+        self.output = output
+        self.connections = 0
+        self.requests = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_connection(self):
+        with self._lock:
+            self.connections += 1
+            return self.connections
+
+    def new_request(self):
+        """Return the request number and whether it must fail."""
+        with self._lock:
+            self.requests += 1
+            return self.requests, self.requests <= self.fail_first
+
+    def report(self, line):
+        if self.output is not None:
+            self.output.write(line)
+
+
+class Command(BaseCommand):
+    help = 'Executa um servidor local que imita as APIs da Anthropic e da OpenAI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Endereco de escuta')
+        parser.add_argument('--port', type=int, default=8765, help='Porta do servidor')
+        parser.add_argument('--reply', default='', help='Texto das respostas (padrao: resposta simulada)')
+        parser.add_argument('--chunk-size', type=int, default=8, help='Caracteres por fragmento do streaming')
+        parser.add_argument('--chunk-delay', type=float, default=0.02, help='Segundos entre fragmentos')
+        parser.add_argument('--fail-first', type=int, default=0, help='Numero de requisicoes iniciais que falham')
+        parser.add_argument('--fail-status', type=int, default=529, help='Status HTTP das requisicoes que falham')
+        parser.add_argument(
+            '--drop-stream',
+            action='store_true',
+            help='As requisicoes com streaming que falham interrompem a conexao no meio da resposta',
+        )
+        parser.add_argument('--api-key', default='', help='Exige esta chave de API nas requisicoes')
+
+    def handle(self, *args, **options):
+        server = LLMStubServer(
+            (options['host'], options['port']),
+            reply=options['reply'],
+            chunk_size=options['chunk_size'],
+            chunk_delay=options['chunk_delay'],
+            fail_first=options['fail_first'],
+            fail_status=options['fail_status'],
+            drop_stream=options['drop_stream'],
+            api_key=options['api_key'],
+            output=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'APIs de LLM simuladas em http://{options["host"]}:{options["port"]}/ (Ctrl+C para sair)'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'{server.requests} requisicao(oes) em {server.connections} conexao(oes)')
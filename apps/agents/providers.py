@@ -0,0 +1,285 @@
+"""
+LLM providers of the agent gateway.
+
+A provider wraps the official SDK of an API. Providers are configured in
+``AGENT_GATEWAY_PROVIDERS`` (name -> backend path, API key, base URL,
+default model) and created once per process. Each keeps one long-lived
+SDK client over a pooled HTTP client, so a worker reuses its connections
+(and TLS sessions) across calls instead of opening one per request. The
+SDKs' own retries are disabled; the gateway retries with jitter and
+budget accounting.
+
+The SDKs are imported when the first client is created, so the rest of
+the project does not depend on them.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying (529: Anthropic API overloaded)
+RETRYABLE_STATUSES = (408, 409, 429, 500, 502, 503, 504, 529)
+
+# Error types sent inside a stream that already answered 200
+RETRYABLE_STREAM_ERRORS = ('overloaded_error', 'api_error', 'rate_limit_error', 'server_error')
+
+
+class Completion:
+    """
+    Result of a streamed completion.
+
+    Attributes:
+        provider: Provider name
+        model: Model that produced the text
+        text: Full response text
+        input_tokens: Prompt tokens reported by the provider
+        output_tokens: Completion tokens reported by the provider
+        stop_reason: Why generation stopped, as reported by the provider
+        attempts: Number of requests made (1 without retries)
+    """
+
+    def __init__(self, provider, model, text='', input_tokens=0, output_tokens=0, stop_reason=''):
+        self.provider = provider
+        self.model = model
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.stop_reason = stop_reason
+        self.attempts = 1
+
+    @property
+    def total_tokens(self):
+        return self.input_tokens + self.output_tokens
+
+    def usage(self):
+        """Return the usage as a JSON-serializable dict."""
+        return {
+            'provider': self.provider,
+            'model': self.model,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'stop_reason': self.stop_reason,
+            'attempts': self.attempts,
+        }
+
+    def __repr__(self):
+        return f'<Completion {self.provider}/{self.model}: {self.total_tokens} tokens>'
+
+
+class Provider:
+    """
+    Base class of LLM providers.
+
+    Attributes:
+        name: Provider name (key of AGENT_GATEWAY_PROVIDERS)
+        api_key: API key sent to the provider
+        base_url: Optional API root overriding the SDK default
+        model: Default model
+    """
+
+    def __init__(self, name, api_key='', base_url=None, model=''):
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The SDK client of this process, created on first use."""
+        with self._lock:
+            # Connections must not be shared with a forked parent
+            if self._client is None or self._pid != os.getpid():
+                self._client = self.create_client()
+                self._pid = os.getpid()
+            return self._client
+
+    def http_options(self):
+        """Return the options of the pooled HTTP client given to the SDK."""
+        import httpx
+
+        return {
+            'limits': httpx.Limits(
+                max_connections=settings.AGENT_GATEWAY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AGENT_GATEWAY_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.AGENT_GATEWAY_KEEPALIVE_EXPIRY,
+            ),
+            'timeout': httpx.Timeout(
+                settings.AGENT_GATEWAY_READ_TIMEOUT, connect=settings.AGENT_GATEWAY_CONNECT_TIMEOUT
+            ),
+        }
+
+    def create_client(self):
+        """Return a new SDK client."""
+        raise NotImplementedError
+
+    def stream(self, model, system, messages, max_tokens, on_text, **options):
+        """
+        Run a completion, calling ``on_text`` with each text fragment.
+
+        Args:
+            model: Model name.
+            system: System prompt ('' for none).
+            messages: List of ``{'role': 'user'|'assistant', 'content': str}``.
+            max_tokens: Maximum completion tokens.
+            on_text: Callable receiving each streamed text fragment.
+            **options: Extra request parameters (e.g. temperature).
+
+        Returns:
+            Completion: The full response and its usage.
+        """
+        raise NotImplementedError
+
+    def is_retryable(self, exc):
+        """Check whether a failed call may succeed if retried."""
+        import httpx
+
+        if isinstance(exc, httpx.TransportError):
+            return True
+        status = getattr(exc, 'status_code', None)
+        if status in RETRYABLE_STATUSES:
+            return True
+        body = getattr(exc, 'body', None)
+        if isinstance(body, dict):
+            error = body.get('error', body)
+            return isinstance(error, dict) and error.get('type') in RETRYABLE_STREAM_ERRORS
+        return False
+
+    def retry_after(self, exc):
+        """Return the delay requested by the provider (Retry-After), if any."""
+        response = getattr(exc, 'response', None)
+        value = response.headers.get('retry-after') if response is not None else None
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    def close(self):
+        """Close the pooled connections of this process."""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+
+
+class AnthropicProvider(Provider):
+    """Anthropic Messages API (streamed server-sent events)."""
+
+    def create_client(self):
+        import anthropic
+
+        return anthropic.Anthropic(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(**self.http_options()),
+        )
+
+    def is_retryable(self, exc):
+        import anthropic
+
+        return isinstance(exc, anthropic.APIConnectionError) or super().is_retryable(exc)
+
+    def stream(self, model, system, messages, max_tokens, on_text, **options):
+        params = dict(options, model=model, max_tokens=max_tokens, messages=messages)
+        if system:
+            params['system'] = system
+        with self.client.messages.stream(**params) as stream:
+            for text in stream.text_stream:
+                on_text(text)
+            message = stream.get_final_message()
+        return Completion(
+            self.name,
+            message.model,
+            text=''.join(block.text for block in message.content if block.type == 'text'),
+            input_tokens=message.usage.input_tokens,
+            output_tokens=message.usage.output_tokens,
+            stop_reason=message.stop_reason or '',
+        )
+
+
+class OpenAIProvider(Provider):
+    """OpenAI Chat Completions API (streamed, with usage in the last chunk)."""
+
+    def create_client(self):
+        import openai
+
+        return openai.OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(**self.http_options()),
+        )
+
+    def is_retryable(self, exc):
+        import openai
+
+        return isinstance(exc, openai.APIConnectionError) or super().is_retryable(exc)
+
+    def stream(self, model, system, messages, max_tokens, on_text, **options):
+        if system:
+            messages = [{'role': 'system', 'content': system}] + list(messages)
+        completion = Completion(self.name, model)
+        parts = []
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={'include_usage': True},
+            **options,
+        )
+        with stream:
+            for chunk in stream:
+                completion.model = chunk.model or completion.model
+                if chunk.usage is not None:
+                    completion.input_tokens = chunk.usage.prompt_tokens
+                    completion.output_tokens = chunk.usage.completion_tokens
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        on_text(choice.delta.content)
+                    if choice.finish_reason:
+                        completion.stop_reason = choice.finish_reason
+        completion.text = ''.join(parts)
+        return completion
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """
+    Return the provider configured under a name, shared by the process.
+
+    Args:
+        name: Key of AGENT_GATEWAY_PROVIDERS (defaults to
+            AGENT_GATEWAY_DEFAULT_PROVIDER).
+
+    Raises:
+        KeyError: If the provider is not configured.
+    """
+    name = name or settings.AGENT_GATEWAY_DEFAULT_PROVIDER
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            config = settings.AGENT_GATEWAY_PROVIDERS[name]
+            options = {key: value for key, value in config.items() if key != 'backend'}
+            provider = _providers[name] = import_string(config['backend'])(name, **options)
+        return provider
+
+
+def close_providers():
+    """Close the clients of every provider created by this process."""
+    with _providers_lock:
+        for provider in _providers.values():
+            provider.close()
+        _providers.clear()
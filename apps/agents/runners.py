@@ -0,0 +1,88 @@
+"""
+Agent callables plugged into the execution and workflow settings.
+
+- ``run_task`` performs a TaskExecution (``TASK_EXECUTION_RUNNER``),
+  streaming the code writer's response to the execution logs;
+- ``generate_prd`` runs the 'prd_generation' stage
+  (``PROBLEM_WORKFLOW_HANDLERS``), streaming the business analyst's
+  response into the problem chat and storing it as a new PRD version.
+
+Both call the LLM through the AgentGateway, charged to the problem's
+organization.
+
+Usage:
+    TASK_EXECUTION_RUNNER=apps.agents.runners.run_task
+    PROBLEM_WORKFLOW_PRD_HANDLER=apps.agents.runners.generate_prd
+"""
+from apps.agents.gateway import AgentGateway
+from apps.agents.sinks import ChatMessageSink, ExecutionLogSink
+
+
+CODE_WRITER_SYSTEM = (
+    'Voce e o agente Code Writer do Compozy. Implemente a tarefa descrita, '
+    'explicando as alteracoes feitas em cada arquivo.'
+)
+
+BUSINESS_ANALYST_SYSTEM = (
+    'Voce e o agente Business Analyst do Compozy. Escreva o PRD do problema '
+    'descrito em markdown, com objetivos, requisitos e criterios de aceitacao.'
+)
+
+
+def _join(*parts):
+    return '\n\n'.join(part for part in parts if part)
+
+
+def task_prompt(task):
+    """Return the prompt describing a task to the code writer."""
+    return _join(
+        f'# {task.title}',
+        task.description,
+        f'## Especificacao\n{task.spec}' if task.spec else '',
+    )
+
+
+def prd_prompt(problem):
+    """Return the prompt describing a problem to the business analyst."""
+    return _join(f'# {problem.title}', problem.description)
+
+
+def run_task(execution):
+    """
+    Perform a TaskExecution with the code writer agent.
+
+    Args:
+        execution: The running TaskExecution.
+
+    Returns:
+        str: The agent's response, stored as the execution output.
+    """
+    task = execution.task
+    completion = AgentGateway(task.problem.organization).complete(
+        [{'role': 'user', 'content': task_prompt(task)}],
+        system=CODE_WRITER_SYSTEM,
+        sink=ExecutionLogSink(execution, prefix='[code_writer] '),
+    )
+    return completion.text
+
+
+def generate_prd(problem, repository=None):
+    """
+    Generate the PRD of a problem with the business analyst agent.
+
+    Args:
+        problem: The Problem in 'prd_generation'.
+        repository: Unused (the stage runs once per problem).
+
+    Returns:
+        dict: The created PRD version and the LLM usage.
+    """
+    from apps.documents.models import PRDDocument
+
+    completion = AgentGateway(problem.organization).complete(
+        [{'role': 'user', 'content': prd_prompt(problem)}],
+        system=BUSINESS_ANALYST_SYSTEM,
+        sink=ChatMessageSink(problem, 'business_analyst', metadata={'stage': 'prd_generation'}),
+    )
+    document = PRDDocument.create_new_version(problem, completion.text, change_notes='Gerado pelo agente')
+    return {'prd_document_id': str(document.pk), 'version': document.version, 'usage': completion.usage()}
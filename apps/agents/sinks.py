@@ -0,0 +1,142 @@
+"""
+Destinations of streamed agent responses.
+
+The gateway hands every text fragment to a sink as it arrives, so
+viewers see the response while it is generated:
+
+- ExecutionLogSink writes complete lines to the TaskExecution logs
+  (buffered append-only chunks, pushed to live viewers on flush);
+- ChatMessageSink creates the agent's ChatMessage on the first fragment
+  and saves its growing content at most every
+  ``AGENT_GATEWAY_CHAT_FLUSH_INTERVAL`` seconds. Those intermediate saves
+  are plain UPDATEs; the final one goes through ``save()``, so post_save
+  receivers (e.g. the search index) see the complete response.
+
+When a call is retried after part of the response was streamed, the
+gateway calls ``reset()`` before the new attempt.
+"""
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class StreamSink:
+    """Base class of stream sinks; every method is optional."""
+
+    def write(self, text):
+        """Receive a streamed text fragment."""
+
+    def reset(self):
+        """Discard the partial response of a failed attempt."""
+
+    def close(self, completion):
+        """Receive the final Completion once the call succeeded."""
+
+
+class ExecutionLogSink(StreamSink):
+    """
+    Writes a streamed response to the logs of a TaskExecution.
+
+    Attributes:
+        execution: The TaskExecution receiving the lines
+        prefix: Text prepended to every line (e.g. the agent name)
+        max_line: Partial lines longer than this are written anyway
+    """
+
+    def __init__(self, execution, prefix='', max_line=4000):
+        self.execution = execution
+        self.prefix = prefix
+        self.max_line = max_line
+        self._partial = ''
+
+    def write(self, text):
+        self._partial += text
+        *lines, self._partial = self._partial.split('\n')
+        for line in lines:
+            self.execution.append_log(f'{self.prefix}{line}')
+        if len(self._partial) >= self.max_line:
+            self._write_partial()
+
+    def _write_partial(self):
+        if self._partial:
+            self.execution.append_log(f'{self.prefix}{self._partial}')
+            self._partial = ''
+
+    def reset(self):
+        # Complete lines of the failed attempt are already in the logs; the
+        # marker separates them from the retried response
+        self._partial = ''
+        self.execution.append_log(f'{self.prefix}--- resposta interrompida, nova tentativa ---')
+
+    def close(self, completion):
+        self._write_partial()
+        self.execution.append_log(
+            f'{self.prefix}[{completion.provider}/{completion.model}] '
+            f'{completion.input_tokens} tokens de entrada, {completion.output_tokens} de saida'
+        )
+
+
+class ChatMessageSink(StreamSink):
+    """
+    Streams a response into an agent ChatMessage of a problem.
+
+    Attributes:
+        problem: The Problem of the conversation
+        agent_name: One of ``ChatMessage.AGENT_NAME_CHOICES``
+        message_type: Type of the created message
+        message: The ChatMessage, once the first fragment arrived
+    """
+
+    def __init__(self, problem, agent_name, message_type='info', metadata=None, flush_interval=None):
+        self.problem = problem
+        self.agent_name = agent_name
+        self.message_type = message_type
+        self.metadata = dict(metadata or {})
+        self.flush_interval = (
+            flush_interval if flush_interval is not None else settings.AGENT_GATEWAY_CHAT_FLUSH_INTERVAL
+        )
+        self.message = None
+        self._parts = []
+        self._flushed_at = 0.0
+
+    def write(self, text):
+        self._parts.append(text)
+        if self.message is None:
+            self._create(text)
+        elif time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._save()
+
+    def _create(self, content):
+        from apps.chat.models import ChatMessage
+
+        self.message = ChatMessage.create_agent_message(
+            self.problem,
+            self.agent_name,
+            content,
+            message_type=self.message_type,
+            metadata=dict(self.metadata, streaming=True),
+        )
+        self._flushed_at = time.monotonic()
+
+    def _save(self):
+        from apps.chat.models import ChatMessage
+
+        self.message.content = ''.join(self._parts)
+        ChatMessage.objects.filter(pk=self.message.pk).update(
+            content=self.message.content, updated_at=timezone.now()
+        )
+        self._flushed_at = time.monotonic()
+
+    def reset(self):
+        self._parts = []
+        if self.message is not None:
+            self._save()
+
+    def close(self, completion):
+        if self.message is None:
+            self._create(completion.text)
+        self._parts = [completion.text]
+        self.message.content = completion.text
+        self.message.metadata = dict(self.metadata, usage=completion.usage())
+        self.message.save(update_fields=['content', 'metadata', 'updated_at'])
@@ -0,0 +1,363 @@
+import threading
+import uuid
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.agents.gateway import AgentGateway, BudgetExceeded, GatewayError
+from apps.agents.limits import TokenBucket
+from apps.agents.management.commands.run_llm_stub import LLMStubServer
+from apps.agents.providers import Completion, close_providers
+from apps.agents.runners import generate_prd, run_task
+from apps.agents.sinks import ChatMessageSink, ExecutionLogSink, StreamSink
+from apps.chat.models import ChatMessage
+from apps.documents.models import PRDDocument
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+from apps.search.models import SearchEntry
+from apps.tasks_app import logstore
+from apps.tasks_app.models import Task, TaskExecution
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+REPLY = 'Primeira linha da resposta.\nSegunda linha da resposta.\n'
+
+MESSAGES = [{'role': 'user', 'content': 'Escreva duas linhas.'}]
+
+
+def redis_available():
+    import redis
+
+    from apps.common.redis_client import get_redis
+
+    try:
+        return get_redis().ping()
+    except redis.RedisError:
+        return False
+
+
+class RecordingSink(StreamSink):
+    """Keeps what the gateway streamed since the last reset."""
+
+    def __init__(self):
+        self.text = ''
+        self.resets = 0
+        self.completion = None
+
+    def write(self, text):
+        self.text += text
+
+    def reset(self):
+        self.text = ''
+        self.resets += 1
+
+    def close(self, completion):
+        self.completion = completion
+
+
+class MemoryBuckets:
+    """In-process stand-in for the Redis token bucket script, with a frozen clock."""
+
+    def __init__(self):
+        self.tokens = {}
+
+    def __call__(self, key, capacity, rate, cost):
+        tokens = self.tokens.get(key, capacity)
+        if cost > tokens:
+            return (cost - tokens) / rate
+        self.tokens[key] = min(capacity, tokens - cost)
+        return 0.0
+
+
+class StubServerMixin:
+    """Runs an LLMStubServer on a free port and points the providers at it."""
+
+    def start_stub(self, **options):
+        self.server = LLMStubServer(('127.0.0.1', 0), reply=REPLY, chunk_size=5, **options)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.enterContext(self.settings(
+            AGENT_GATEWAY_PROVIDERS={
+                'anthropic': {
+                    'backend': 'apps.agents.providers.AnthropicProvider',
+                    'api_key': 'test-key',
+                    'base_url': base_url,
+                    'model': 'stub-model',
+                },
+                'openai': {
+                    'backend': 'apps.agents.providers.OpenAIProvider',
+                    'api_key': 'test-key',
+                    'base_url': f'{base_url}/v1',
+                    'model': 'stub-model',
+                },
+            },
+            AGENT_GATEWAY_RETRY_BACKOFF=0,
+        ))
+        close_providers()
+        self.addCleanup(close_providers)
+
+
+class GatewayRetryTests(StubServerMixin, SimpleTestCase):
+    """Streaming and retries against the local LLM stub."""
+
+    def complete(self, provider='anthropic', max_retries=3, **options):
+        self.start_stub(**options)
+        sink = RecordingSink()
+        gateway = AgentGateway(provider=provider, max_retries=max_retries)
+        return gateway.complete(MESSAGES, system='Seja breve.', max_tokens=100, sink=sink), sink
+
+    def test_streams_the_reply(self):
+        for provider in ('anthropic', 'openai'):
+            with self.subTest(provider=provider):
+                completion, sink = self.complete(provider)
+
+                self.assertEqual(completion.text, REPLY)
+                self.assertEqual(sink.text, REPLY)
+                self.assertIs(sink.completion, completion)
+                self.assertEqual(completion.attempts, 1)
+                self.assertGreater(completion.output_tokens, 0)
+
+    def test_connections_are_reused(self):
+        self.start_stub()
+        gateway = AgentGateway(provider='anthropic')
+
+        for _ in range(3):
+            gateway.complete(MESSAGES, max_tokens=100)
+
+        self.assertEqual((self.server.requests, self.server.connections), (3, 1))
+
+    def test_overloaded_answers_are_retried(self):
+        for provider in ('anthropic', 'openai'):
+            with self.subTest(provider=provider):
+                completion, sink = self.complete(provider, fail_first=2, fail_status=529)
+
+                self.assertEqual(completion.attempts, 3)
+                self.assertEqual(self.server.requests, 3)
+                self.assertEqual(sink.text, REPLY)
+
+    def test_throttled_answers_are_retried(self):
+        completion, _ = self.complete(fail_first=1, fail_status=429)
+
+        self.assertEqual(completion.attempts, 2)
+
+    def test_retries_are_bounded(self):
+        with self.assertRaises(GatewayError) as context:
+            self.complete(max_retries=1, fail_first=5, fail_status=503)
+
+        self.assertTrue(context.exception.retryable)
+        self.assertEqual(context.exception.attempts, 2)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_dropped_stream_resets_the_sink(self):
+        for provider in ('anthropic', 'openai'):
+            with self.subTest(provider=provider):
+                completion, sink = self.complete(provider, fail_first=1, drop_stream=True)
+
+                self.assertEqual(completion.attempts, 2)
+                self.assertEqual(sink.resets, 1)
+                self.assertEqual(sink.text, REPLY)
+
+    def test_authentication_errors_are_not_retried(self):
+        self.start_stub(api_key='other-key')
+
+        with self.assertRaises(GatewayError) as context:
+            AgentGateway(provider='anthropic').complete(MESSAGES, max_tokens=100)
+
+        self.assertFalse(context.exception.retryable)
+        self.assertEqual(context.exception.attempts, 1)
+        self.assertEqual(self.server.requests, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, AGENT_GATEWAY_REQUEST_BURST=2)
+class GatewayBudgetTests(StubServerMixin, TestCase):
+    """Request and token budgets charged by the gateway."""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(
+            name='Acme', slug='acme', llm_requests_per_minute=60, llm_tokens_per_minute=6000
+        )
+        self.buckets = MemoryBuckets()
+        self.enterContext(mock.patch('apps.agents.limits._take', self.buckets))
+        self.prefix = f'agents:budget:{self.organization.pk}'
+
+    def gateway(self, **options):
+        return AgentGateway(self.organization, provider='anthropic', max_budget_wait=0, **options)
+
+    def test_unused_tokens_are_given_back(self):
+        self.start_stub()
+
+        completion = self.gateway().complete(MESSAGES, max_tokens=1000)
+
+        self.assertEqual(self.buckets.tokens[f'{self.prefix}:tokens'], 6000 - completion.total_tokens)
+        self.assertEqual(self.buckets.tokens[f'{self.prefix}:requests'], 1)
+
+    def test_failed_call_gives_back_every_token(self):
+        self.start_stub(api_key='other-key')
+
+        with self.assertRaises(GatewayError):
+            self.gateway().complete(MESSAGES, max_tokens=1000)
+
+        self.assertEqual(self.buckets.tokens[f'{self.prefix}:tokens'], 6000)
+
+    def test_exhausted_budget_fails_before_any_request(self):
+        self.start_stub()
+        gateway = self.gateway()
+        gateway.complete(MESSAGES, max_tokens=100)
+        gateway.complete(MESSAGES, max_tokens=100)
+
+        with self.assertRaises(BudgetExceeded):
+            gateway.complete(MESSAGES, max_tokens=100)
+
+        self.assertEqual(self.server.requests, 2)
+
+    def test_every_retry_takes_a_request(self):
+        self.start_stub(fail_first=2, fail_status=529)
+
+        # The first attempt and one retry fit the burst of two requests
+        with self.assertRaises(BudgetExceeded):
+            self.gateway().complete(MESSAGES, max_tokens=100)
+
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.buckets.tokens[f'{self.prefix}:tokens'], 6000)
+
+    def test_system_calls_are_not_limited(self):
+        self.start_stub()
+
+        AgentGateway(provider='anthropic', max_budget_wait=0).complete(MESSAGES, max_tokens=100)
+
+        self.assertEqual(self.buckets.tokens, {})
+
+
+@skipUnless(redis_available(), 'Redis is not reachable')
+class TokenBucketTests(SimpleTestCase):
+    """The token bucket script against a real Redis server."""
+
+    def setUp(self):
+        from apps.common.redis_client import get_redis
+
+        self.key = f'agents:budget:test:{uuid.uuid4().hex}'
+        self.addCleanup(get_redis().delete, self.key)
+
+    def test_take_and_give_back(self):
+        bucket = TokenBucket(self.key, capacity=5, rate=1)
+
+        self.assertEqual(bucket.take(5), 0)
+        self.assertGreater(bucket.take(2), 1)
+
+        bucket.give_back(10)
+        self.assertEqual(bucket.take(5), 0)
+
+    def test_costs_are_capped_to_the_capacity(self):
+        bucket = TokenBucket(self.key, capacity=5, rate=1)
+
+        self.assertEqual(bucket.take(50), 0)
+        with self.assertRaises(BudgetExceeded):
+            bucket.acquire(1, max_wait=0)
+
+
+def create_problem():
+    organization = Organization.objects.create(name='Acme', slug='acme')
+    return Problem.objects.create(organization=organization, title='Problema', description='Descricao')
+
+
+class LogIsolationMixin:
+    """Isolates the process-wide log buffers and skips live publishing."""
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.dict(logstore._buffers, clear=True))
+        self.enterContext(mock.patch('apps.tasks_app.logstore._ensure_flusher'))
+        self.enterContext(mock.patch('apps.tasks_app.logstore._on_chunk_written'))
+
+    def log_messages(self, execution):
+        # Drop the '[timestamp] ' prefix of every line
+        return [line.split('] ', 1)[1] for line in execution.read_logs().splitlines()]
+
+
+@override_settings(CACHES=LOCMEM_CACHES, AGENT_GATEWAY_CHAT_FLUSH_INTERVAL=3600)
+class SinkTests(LogIsolationMixin, TestCase):
+    """Streamed responses reach the execution logs and the problem chat."""
+
+    def setUp(self):
+        super().setUp()
+        self.problem = create_problem()
+        self.completion = Completion('anthropic', 'stub-model', text=REPLY, input_tokens=10, output_tokens=20)
+
+    def test_execution_log_sink_writes_complete_lines(self):
+        task = Task.objects.create(problem=self.problem, title='Tarefa')
+        execution = TaskExecution.objects.create(task=task, status='running')
+        sink = ExecutionLogSink(execution, prefix='[agente] ')
+
+        for fragment in ('Primeira li', 'nha da resposta.\nSegunda', ' linha'):
+            sink.write(fragment)
+        sink.close(self.completion)
+
+        self.assertEqual(self.log_messages(execution), [
+            '[agente] Primeira linha da resposta.',
+            '[agente] Segunda linha',
+            '[agente] [anthropic/stub-model] 10 tokens de entrada, 20 de saida',
+        ])
+
+    def test_chat_message_grows_and_the_index_gets_the_full_response(self):
+        sink = ChatMessageSink(self.problem, 'business_analyst')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sink.write('Primeira ')
+            sink.write('linha')
+        self.assertEqual(SearchEntry.objects.get(object_id=sink.message.pk).body, 'Primeira ')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sink.close(self.completion)
+
+        message = ChatMessage.objects.get()
+        self.assertEqual(message.content, REPLY)
+        self.assertEqual(message.metadata['usage']['output_tokens'], 20)
+        self.assertEqual(SearchEntry.objects.get(object_id=message.pk).body, REPLY)
+
+    def test_reset_discards_the_partial_response(self):
+        sink = ChatMessageSink(self.problem, 'business_analyst', flush_interval=0)
+
+        sink.write('tentativa interrompida')
+        sink.reset()
+        sink.write('nova')
+
+        self.assertEqual(ChatMessage.objects.get().content, 'nova')
+
+    def test_response_without_fragments_still_creates_the_message(self):
+        ChatMessageSink(self.problem, 'business_analyst').close(self.completion)
+
+        self.assertEqual(ChatMessage.objects.get().content, REPLY)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RunnerTests(LogIsolationMixin, StubServerMixin, TestCase):
+    """The agent runners stream through the gateway into their sinks."""
+
+    def setUp(self):
+        super().setUp()
+        self.problem = create_problem()
+        self.enterContext(mock.patch('apps.agents.limits._take', MemoryBuckets()))
+        self.enterContext(mock.patch('apps.events.tasks.relay_outbox_events.delay'))
+        self.start_stub()
+
+    def test_run_task_logs_and_returns_the_response(self):
+        task = Task.objects.create(problem=self.problem, title='Tarefa', spec='Detalhes')
+        execution = TaskExecution.objects.create(task=task, status='running')
+
+        self.assertEqual(run_task(execution), REPLY)
+        self.assertIn('[code_writer] Segunda linha da resposta.', self.log_messages(execution))
+
+    def test_generate_prd_stores_a_version_and_the_chat_message(self):
+        with mock.patch('apps.documents.models.schedule_diff_precompute'):
+            result = generate_prd(self.problem)
+
+        document = PRDDocument.objects.get()
+        self.assertEqual((result['prd_document_id'], result['version']), (str(document.pk), 1))
+        self.assertEqual(document.content, REPLY)
+        message = ChatMessage.objects.get()
+        self.assertEqual((message.agent_name, message.content), ('business_analyst', REPLY))
+        self.assertEqual(message.metadata['stage'], 'prd_generation')
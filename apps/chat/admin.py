@@ -9,10 +9,11 @@ from django.contrib import admin
 from django.utils.html import format_html
 
 from apps.chat.models import ChatMessage
+from apps.search.admin import FullTextSearchAdminMixin
 
 
 @admin.register(ChatMessage)
-class ChatMessageAdmin(admin.ModelAdmin):
+class ChatMessageAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     """Admin configuration for ChatMessage model."""
 
     list_display = [
@@ -31,12 +32,13 @@ class ChatMessageAdmin(admin.ModelAdmin):
         'is_read',
         'created_at',
     ]
+    # content is searched through the full-text index
     search_fields = [
-        'content',
         'problem__title',
         'sender_user__username',
         'agent_name',
     ]
+    search_entity = 'chat_message'
     readonly_fields = [
         'id',
         'created_at',
@@ -0,0 +1,108 @@
+"""
+Shared admin helpers for the Compozy project.
+"""
+
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+class SummaryChangeList(ChangeList):
+    """ChangeList that loads rows through the ``summary()`` projection."""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.summary(*self.model_admin.summary_related)
+
+
+class SummaryChangeListAdminMixin:
+    """
+    Defer heavy columns on the changelist page only.
+
+    The change form still loads the full row. The model manager must
+    return a SummaryQuerySet (see apps.common.deferred).
+
+    Attributes:
+        summary_related: select_related paths whose heavy fields are also
+            deferred on the changelist
+    """
+
+    summary_related = ()
+
+    def get_changelist(self, request, **kwargs):
+        return SummaryChangeList
+
+
+def related_count(model, relation):
+    """
+    Return a correlated subquery counting the related rows of an object.
+
+    Unlike ``Count()`` over joins, several of these can be combined
+    without multiplying rows or adding a GROUP BY to the outer query.
+
+    Args:
+        model: The model of the outer queryset.
+        relation: Name of a reverse foreign key, forward many-to-many or
+            reverse many-to-many relation of ``model``.
+
+    Returns:
+        Expression: Integer count (0 when there are no related rows).
+    """
+    field = model._meta.get_field(relation)
+    if field.many_to_many:
+        if field.auto_created:
+            # Reverse many-to-many
+            through = field.through
+            column = field.field.m2m_reverse_field_name()
+        else:
+            through = field.remote_field.through
+            column = field.m2m_field_name()
+        related_model = through
+    elif field.one_to_many:
+        related_model = field.related_model
+        column = field.field.name
+    else:
+        raise ValueError(f'{model.__name__}.{relation} is not a to-many relation')
+
+    counts = related_model._base_manager.filter(
+        **{column: OuterRef('pk')}
+    ).order_by().values(column).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class AnnotatedCountsAdminMixin:
+    """
+    Annotate related row counts in ``get_queryset``.
+
+    Declare the counts once in ``count_annotations``; each annotation is
+    a correlated subquery, so changelists issue no per-row COUNT queries
+    and the columns can be sorted. Use ``annotated_count`` to declare a
+    plain sortable column for an annotation.
+
+    Attributes:
+        count_annotations: Mapping of annotation name to relation name
+    """
+
+    count_annotations = {}
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.annotate(**{
+            name: related_count(queryset.model, relation)
+            for name, relation in self.count_annotations.items()
+        })
+
+
+def annotated_count(annotation, description):
+    """
+    Return a sortable changelist column displaying a count annotation.
+
+    Args:
+        annotation: Name of the annotation (see AnnotatedCountsAdminMixin).
+        description: Column header.
+    """
+    def display(self, obj):
+        return getattr(obj, annotation)
+    display.short_description = description
+    display.admin_order_field = annotation
+    return display
@@ -0,0 +1,135 @@
+"""
+Deferred loading of heavy columns.
+
+Models list their large text and JSON columns in ``HEAVY_FIELDS``.
+``SummaryQuerySet.summary()`` returns a projection without them (and
+optionally without the heavy fields of select_related relations), for
+list views that only render titles and badges.
+
+Rows loaded through ``summary()`` share a LazyFetchTracker. When the
+same deferred field is fetched lazily for several rows of one queryset,
+which is an N+1 query in a loop, a warning with the calling line is
+logged once, so regressions show up in the logs.
+"""
+import logging
+import threading
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query import ModelIterable
+
+
+logger = logging.getLogger(__name__)
+
+# Frames from these paths are skipped when reporting the caller; the
+# models module overrides refresh_from_db in TimestampedModel
+_INTERNAL_PATHS = ('/django/', __file__, str(Path(__file__).with_name('models.py')))
+
+
+class LazyFetchTracker:
+    """
+    Counts lazy fetches of deferred fields for the rows of one queryset.
+
+    Attributes:
+        model: The model of the queryset
+        counts: Lazy fetches per field name
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, fields):
+        """Record a lazy fetch and warn when it repeats across rows."""
+        threshold = settings.DEFERRED_FIELD_WARNING_THRESHOLD
+        for field in fields:
+            with self._lock:
+                count = self.counts.get(field, 0) + 1
+                self.counts[field] = count
+            if count == threshold:
+                logger.warning(
+                    f'Deferred field {self.model.__name__}.{field} fetched lazily for '
+                    f'{count} rows of the same queryset at {_caller()}; '
+                    f'load it in the query instead of using summary()'
+                )
+
+
+def _caller():
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if not any(path in frame.filename for path in _INTERNAL_PATHS):
+            return f'{frame.filename}:{frame.lineno}'
+    return 'unknown'
+
+
+class SummaryModelIterable(ModelIterable):
+    """
+    Attaches shared LazyFetchTrackers to the rows it yields.
+
+    Instances loaded through select_related get one tracker per model.
+    """
+
+    def __iter__(self):
+        trackers = {}
+        for obj in super().__iter__():
+            _attach_tracker(obj, trackers)
+            yield obj
+
+
+def _attach_tracker(obj, trackers, depth=0):
+    model = type(obj)
+    if model not in trackers:
+        trackers[model] = LazyFetchTracker(model)
+    obj._lazy_fetch_tracker = trackers[model]
+    if depth < 5:
+        for related in obj._state.fields_cache.values():
+            if isinstance(related, models.Model):
+                _attach_tracker(related, trackers, depth + 1)
+
+
+class SummaryQuerySet(models.QuerySet):
+    """QuerySet with a ``summary()`` projection that defers heavy columns."""
+
+    def summary(self, *related):
+        """
+        Defer the heavy fields of the model and of related models.
+
+        Args:
+            *related: select_related paths (e.g. ``'task'``) whose heavy
+                fields are deferred as well.
+
+        Returns:
+            QuerySet: The projection, with lazy fetch tracking.
+        """
+        fields = list(heavy_fields(self.model))
+        for path in related:
+            model = self.model
+            for name in path.split('__'):
+                model = model._meta.get_field(name).related_model
+            fields.extend(f'{path}__{field}' for field in heavy_fields(model))
+
+        clone = self.defer(*fields)
+        clone._iterable_class = SummaryModelIterable
+        return clone
+
+
+def heavy_fields(model):
+    """Return the heavy fields declared by a model."""
+    return getattr(model, 'HEAVY_FIELDS', ())
+
+
+class DeferredFieldGuardMixin:
+    """
+    Model mixin reporting lazy fetches of deferred fields.
+
+    Django loads a deferred field through ``refresh_from_db(fields=...)``;
+    rows coming from ``summary()`` report those calls to their tracker.
+    """
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        tracker = self.__dict__.get('_lazy_fetch_tracker')
+        if tracker is not None and fields:
+            tracker.record(fields)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
@@ -0,0 +1,235 @@
+"""
+Management command para medir o tempo de espera em fila dos jobs criticos.
+
+Inicia workers Celery locais (perfis critical, interactive e code_writer)
+contra um Redis local e publica jobs de teste em duas fases:
+
+1. baseline: apenas jobs criticos, a uma taxa fixa;
+2. mixed: os mesmos jobs criticos, uma rajada de jobs longos de
+   code_writer e um fluxo continuo de jobs curtos interativos.
+
+Ao final mostra p50/p95/max da espera em fila por tipo de job e fase. Com
+o roteamento por filas o p95 dos jobs criticos deve ficar estavel entre
+as fases; --single-queue reproduz a configuracao anterior (uma unica fila,
+sem prioridades) para comparacao.
+
+Usage:
+    python manage.py benchmark_queue_wait
+    python manage.py benchmark_queue_wait --broker redis://localhost:6379/15
+    python manage.py benchmark_queue_wait --single-queue
+    python manage.py benchmark_queue_wait --long-jobs 80 --long-seconds 5 --phase-seconds 20
+"""
+
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.redis_client import get_redis
+from apps.common.routing import CRITICAL_QUEUE, agent_route, message_priority, worker_command
+
+
+PROFILES = ('critical', 'interactive', 'code_writer')
+SINGLE_QUEUE = 'default'
+
+
+def percentile(values, fraction):
+    """Return a percentile (nearest rank) of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Mede a espera em fila dos jobs criticos sob carga mista (requer Redis local)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--broker',
+            default='redis://localhost:6379/15',
+            help='Redis usado como broker e para os resultados do teste',
+        )
+        parser.add_argument('--phase-seconds', type=float, default=10.0, help='Duracao de cada fase')
+        parser.add_argument('--critical-rate', type=float, default=2.0, help='Jobs criticos por segundo')
+        parser.add_argument('--long-jobs', type=int, default=40, help='Jobs longos de code_writer na rajada')
+        parser.add_argument('--long-seconds', type=float, default=3.0, help='Duracao de cada job longo')
+        parser.add_argument('--short-rate', type=float, default=10.0, help='Jobs interativos por segundo')
+        parser.add_argument('--single-queue', action='store_true', help='Usa uma unica fila, sem prioridades')
+        parser.add_argument(
+            '--max-p95-ratio',
+            type=float,
+            default=2.0,
+            help='Razao maxima aceita entre o p95 critico das fases mixed e baseline',
+        )
+
+    def handle(self, *args, **options):
+        from config.celery import app
+
+        self.options = options
+        self.run_id = uuid.uuid4().hex[:8]
+        self.redis = get_redis(options['broker'])
+        try:
+            self.redis.ping()
+        except Exception as exc:
+            raise CommandError(f'Redis indisponivel em {options["broker"]}: {exc}')
+
+        # The app reads its configuration with the CELERY_ namespace
+        app.conf.update(CELERY_BROKER_URL=options['broker'])
+        self.app = app
+        workers = self._start_workers()
+        try:
+            self._wait_workers(len(workers))
+            results = {}
+            for phase in ('baseline', 'mixed'):
+                self.stdout.write(self.style.NOTICE(f'Fase {phase}...'))
+                results[phase] = self._run_phase(phase)
+        finally:
+            self._stop_workers(workers)
+            self._cleanup()
+
+        self._report(results)
+
+    # Workers
+
+    def _start_workers(self):
+        broker = self.options['broker']
+        env = dict(os.environ, CELERY_BROKER_URL=broker, CELERY_RESULT_BACKEND=broker)
+        if self.options['single_queue']:
+            concurrency = sum(settings.CELERY_WORKER_PROFILES[p]['concurrency'] for p in PROFILES)
+            commands = [[
+                'celery', '-A', 'config', 'worker', '-n', f'single-{self.run_id}@%h',
+                '-Q', SINGLE_QUEUE, '--concurrency', str(concurrency), '--prefetch-multiplier', '1',
+            ]]
+        else:
+            commands = [worker_command(profile, f'{profile}-{self.run_id}@%h') for profile in PROFILES]
+
+        workers = []
+        for command in commands:
+            command = [sys.executable, '-m'] + command + [
+                '--pool', 'threads', '-l', 'warning', '--without-gossip', '--without-mingle',
+            ]
+            workers.append(subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL))
+        return workers
+
+    def _wait_workers(self, count, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            replies = self.app.control.ping(timeout=1.0)
+            names = [name for reply in replies for name in reply if self.run_id in name]
+            if len(names) >= count:
+                return
+        raise CommandError('Os workers nao responderam a tempo')
+
+    def _stop_workers(self, workers):
+        for worker in workers:
+            worker.send_signal(signal.SIGTERM)
+        for worker in workers:
+            try:
+                worker.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+
+    def _cleanup(self):
+        queues = {SINGLE_QUEUE, CRITICAL_QUEUE, 'interactive', 'agent.code_writer'}
+        steps = settings.CELERY_BROKER_TRANSPORT_OPTIONS.get('priority_steps', [])
+        sep = settings.CELERY_BROKER_TRANSPORT_OPTIONS.get('sep', ':')
+        keys = [queue for queue in queues] + [f'{queue}{sep}{step}' for queue in queues for step in steps]
+        keys += list(self.redis.scan_iter(f'benchmark:{self.run_id}:*'))
+        self.redis.delete(*keys)
+
+    # Load
+
+    def _route(self, kind):
+        if self.options['single_queue']:
+            return {'queue': SINGLE_QUEUE}
+        if kind == 'critical':
+            return agent_route('code_writer', 'critical')
+        if kind == 'long':
+            return agent_route('code_writer', 'medium')
+        return {'queue': 'interactive', 'priority': message_priority('medium')}
+
+    def _send(self, phase, kind, duration):
+        from apps.common.tasks import queue_probe
+
+        key = f'benchmark:{self.run_id}:{phase}:{kind}'
+        queue_probe.apply_async(
+            args=[key, time.time(), duration, self.options['broker']],
+            **self._route(kind),
+        )
+        return key
+
+    def _run_phase(self, phase):
+        options = self.options
+        sent = {}
+        if phase == 'mixed':
+            for _ in range(options['long_jobs']):
+                self._send(phase, 'long', options['long_seconds'])
+            sent['long'] = options['long_jobs']
+
+        start = time.monotonic()
+        next_critical = next_short = start
+        while time.monotonic() - start < options['phase_seconds']:
+            now = time.monotonic()
+            if now >= next_critical:
+                self._send(phase, 'critical', 0)
+                sent['critical'] = sent.get('critical', 0) + 1
+                next_critical += 1 / options['critical_rate']
+            if phase == 'mixed' and now >= next_short:
+                self._send(phase, 'short', 0.05)
+                sent['short'] = sent.get('short', 0) + 1
+                next_short += 1 / options['short_rate']
+            time.sleep(0.005)
+
+        # Wait for every critical job of the phase to start
+        key = f'benchmark:{self.run_id}:{phase}:critical'
+        deadline = time.monotonic() + options['long_jobs'] * options['long_seconds'] + 60
+        while self.redis.llen(key) < sent['critical'] and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+        waits = {}
+        for kind in sent:
+            values = self.redis.lrange(f'benchmark:{self.run_id}:{phase}:{kind}', 0, -1)
+            waits[kind] = [float(value) for value in values]
+        return {'sent': sent, 'waits': waits}
+
+    # Report
+
+    def _report(self, results):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"fase":<10} {"job":<10} {"enviados":>8} {"iniciados":>9} '
+            f'{"p50 (s)":>9} {"p95 (s)":>9} {"max (s)":>9}'
+        )
+        for phase, result in results.items():
+            for kind, count in result['sent'].items():
+                waits = result['waits'].get(kind, [])
+                p50, p95 = percentile(waits, 0.5), percentile(waits, 0.95)
+                self.stdout.write(
+                    f'{phase:<10} {kind:<10} {count:>8} {len(waits):>9} '
+                    f'{self._fmt(p50):>9} {self._fmt(p95):>9} {self._fmt(max(waits) if waits else None):>9}'
+                )
+
+        baseline = percentile(results['baseline']['waits'].get('critical', []), 0.95)
+        mixed = percentile(results['mixed']['waits'].get('critical', []), 0.95)
+        if baseline is None or mixed is None:
+            raise CommandError('Nenhum job critico foi executado')
+        # Sub-10ms waits are noise; compare against a small floor
+        ratio = mixed / max(baseline, 0.01)
+        self.stdout.write('')
+        message = f'p95 critico: baseline {baseline:.3f}s, mixed {mixed:.3f}s (razao {ratio:.1f})'
+        if ratio <= self.options['max_p95_ratio']:
+            self.stdout.write(self.style.SUCCESS(f'{message} - estavel'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{message} - acima de {self.options["max_p95_ratio"]}'))
+
+    @staticmethod
+    def _fmt(value):
+        return '-' if value is None else f'{value:.3f}'
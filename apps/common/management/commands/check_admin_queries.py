@@ -0,0 +1,158 @@
+"""
+Management command para verificar o numero de queries das listagens do admin.
+
+Renderiza a listagem (changelist) de cada modelo registrado no admin com
+paginas de 1 linha e de N linhas e compara o numero de queries SQL. Uma
+listagem sem queries por linha executa o mesmo numero de queries nos dois
+casos; qualquer diferenca indica um N+1 (ex.: .count() por linha).
+
+Com --seed, dados temporarios sao criados antes da verificacao e
+descartados ao final (rollback).
+
+Usage:
+    python manage.py check_admin_queries
+    python manage.py check_admin_queries --seed 30
+    python manage.py check_admin_queries --model tasks_app.Task --page-size 50
+"""
+
+import uuid
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.chat.models import ChatMessage
+from apps.documents.models import PRDDocument, TechSpecDocument
+from apps.events.models import OutboxEvent, OutboxRelayState
+from apps.notifications.models import Notification, WebhookEndpoint
+from apps.organizations.models import Organization, OrganizationMember, Repository
+from apps.problems.models import Problem
+from apps.tasks_app.models import ArchivedTaskExecution, Task, TaskExecution
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Verifica que as listagens do admin executam um numero fixo de queries por pagina'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Cria N linhas temporarias por modelo antes da verificacao',
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            default=[],
+            help='Modelo a verificar (app_label.Model); pode ser repetido',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=25,
+            help='Tamanho da pagina comparada com a pagina de 1 linha',
+        )
+
+    def handle(self, *args, **options):
+        labels = {label.lower() for label in options['model']}
+        model_admins = [
+            model_admin for model, model_admin in admin.site._registry.items()
+            if not labels or model._meta.label_lower in labels
+        ]
+        if not model_admins:
+            raise CommandError('Nenhum modelo registrado no admin corresponde ao filtro')
+
+        with transaction.atomic():
+            if options['seed']:
+                self.stdout.write(self.style.NOTICE(f'Criando {options["seed"]} linha(s) temporaria(s)...'))
+                self._seed(options['seed'])
+            failures = [
+                model_admin.model._meta.label
+                for model_admin in sorted(model_admins, key=lambda item: item.model._meta.label)
+                if not self._check(model_admin, options['page_size'])
+            ]
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'Queries por linha detectadas em: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Todas as listagens executam um numero fixo de queries.'))
+
+    def _request(self):
+        request = RequestFactory().get('/')
+        request.user = User(username='check_admin_queries', is_active=True, is_staff=True, is_superuser=True)
+        return request
+
+    def _count_queries(self, model_admin, page_size):
+        model_admin.list_per_page = page_size
+        with CaptureQueriesContext(connection) as queries:
+            model_admin.changelist_view(self._request()).render()
+        return len(queries)
+
+    def _check(self, model_admin, page_size):
+        """Render the changelist with both page sizes and compare the query counts."""
+        label = model_admin.model._meta.label
+        rows = model_admin.get_queryset(self._request()).count()
+        if rows < 2:
+            self.stdout.write(f'  {label}: ignorado ({rows} linha(s); use --seed)')
+            return True
+
+        original_page_size = model_admin.list_per_page
+        try:
+            # Warm up per-process caches (content types, permissions...)
+            self._count_queries(model_admin, 1)
+            single = self._count_queries(model_admin, 1)
+            full = self._count_queries(model_admin, page_size)
+        finally:
+            model_admin.list_per_page = original_page_size
+
+        shown = min(rows, page_size)
+        if single == full:
+            self.stdout.write(f'  {label}: {full} queries (1 e {shown} linhas)')
+            return True
+        self.stdout.write(self.style.ERROR(
+            f'  {label}: {single} queries com 1 linha, {full} com {shown} linhas'
+        ))
+        return False
+
+    def _seed(self, count):
+        previous_task = None
+        for index in range(count):
+            suffix = uuid.uuid4().hex[:8]
+            user = User.objects.create_user(username=f'check-{suffix}', email=f'{suffix}@example.com')
+            organization = Organization.objects.create(name=f'Check {suffix}', slug=f'check-{suffix}')
+            OrganizationMember.objects.create(organization=organization, user=user, role='member')
+            Repository.objects.create(
+                organization=organization, name=f'repo-{suffix}', url=f'https://github.com/check/{suffix}'
+            )
+            problem = Problem.objects.create(
+                organization=organization, title=f'Problema {index}', description='Dados temporarios'
+            )
+            prd = PRDDocument.create_new_version(problem, f'# PRD {index}\n')
+            tech_spec = TechSpecDocument.create_new_version(problem, f'# Tech Spec {index}\n', prd_document=prd)
+            task = Task.objects.create(problem=problem, tech_spec=tech_spec, title=f'Tarefa {index}')
+            if previous_task is not None:
+                task.dependencies.add(previous_task)
+            previous_task = task
+            TaskExecution.objects.create(task=task)
+            ArchivedTaskExecution.objects.create(
+                id=uuid.uuid4(), task=task, organization=organization, task_title=task.title,
+                status='completed', execution_created_at=timezone.now(),
+                archive_path=f'check/{suffix}.jsonl.gz', row_index=0,
+            )
+            ChatMessage.objects.create(problem=problem, sender_type='user', sender_user=user, content='Mensagem')
+            Notification.objects.create(
+                recipient=user, organization=organization, problem=problem,
+                event_type='problem.status_changed', title='Notificacao',
+            )
+            WebhookEndpoint.objects.create(organization=organization, url=f'https://example.com/{suffix}')
+            OutboxEvent.objects.create(aggregate_type='task', aggregate_id=str(task.pk), event_type='task.created')
+            OutboxRelayState.objects.create(name=f'check-{suffix}')
+            Group.objects.create(name=f'check-{suffix}')
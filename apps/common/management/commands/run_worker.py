@@ -0,0 +1,63 @@
+"""
+Management command para iniciar um worker Celery de um perfil.
+
+Os perfis (CELERY_WORKER_PROFILES) definem as filas consumidas, a
+concorrencia, o prefetch e os limites de tempo de cada grupo de filas.
+Com --print, apenas mostra a linha de comando (util para Procfile,
+systemd ou docker-compose).
+
+Usage:
+    python manage.py run_worker interactive
+    python manage.py run_worker code_writer --loglevel warning
+    python manage.py run_worker --print-all
+"""
+
+import os
+import shlex
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.routing import worker_command
+
+
+class Command(BaseCommand):
+    help = 'Inicia um worker Celery com as filas e limites de um perfil'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'profile',
+            nargs='?',
+            help=f'Perfil do worker ({", ".join(settings.CELERY_WORKER_PROFILES)})',
+        )
+        parser.add_argument('--loglevel', default='info', help='Nivel de log do worker')
+        parser.add_argument(
+            '--print',
+            action='store_true',
+            dest='print_only',
+            help='Mostra a linha de comando em vez de iniciar o worker',
+        )
+        parser.add_argument(
+            '--print-all',
+            action='store_true',
+            help='Mostra a linha de comando de todos os perfis',
+        )
+
+    def handle(self, *args, **options):
+        if options['print_all']:
+            for profile in settings.CELERY_WORKER_PROFILES:
+                command = worker_command(profile) + ['-l', options['loglevel']]
+                self.stdout.write(f'{profile}: {shlex.join(command)}')
+            return
+
+        profile = options['profile']
+        if profile not in settings.CELERY_WORKER_PROFILES:
+            raise CommandError(
+                f'Perfil desconhecido: {profile!r} '
+                f'(disponiveis: {", ".join(settings.CELERY_WORKER_PROFILES)})'
+            )
+        command = worker_command(profile) + ['-l', options['loglevel']]
+        if options['print_only']:
+            self.stdout.write(shlex.join(command))
+            return
+        os.execvp(command[0], command)
@@ -7,12 +7,22 @@ This module contains abstract base models that are reused across all apps.
 from django.db import models
 from django.utils import timezone
 
+from apps.common.deferred import DeferredFieldGuardMixin
 
-class TimestampedModel(models.Model):
+
+class TimestampedModel(DeferredFieldGuardMixin, models.Model):
     """
     Abstract base model that provides self-updating created_at and updated_at fields.
 
     All models that need timestamp tracking should inherit from this class.
+    Lazy fetches of deferred fields on rows loaded through ``summary()``
+    are reported (see apps.common.deferred).
+
+    Field values are captured when an instance is loaded from the database,
+    so ``has_changed()`` and ``old_value()`` answer without a query. The
+    snapshot is refreshed after ``save()`` returns, so post_save handlers
+    still see the values from before the save. In-place mutations of JSON
+    values are not detected; assign a new value instead.
 
     Attributes:
         created_at: DateTime when the record was created (auto-set on creation)
@@ -47,3 +57,76 @@ class TimestampedModel(models.Model):
             self.created_at = timezone.now()
         self.updated_at = timezone.now()
         super().save(*args, **kwargs)
+        self._snapshot_loaded_values(kwargs.get('update_fields'))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Capture the loaded values for change tracking."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """Reload fields from the database and capture them as the original values."""
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_loaded_values(fields)
+
+    def _snapshot_loaded_values(self, fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        names = None if fields is None else set(fields)
+        for field in self._meta.concrete_fields:
+            if names is not None and field.name not in names and field.attname not in names:
+                continue
+            if field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+
+    def has_changed(self, field_name):
+        """
+        Check whether a field differs from its value in the database.
+
+        Args:
+            field_name: Name of a concrete field.
+
+        Returns:
+            bool: True for unsaved instances, and for deferred fields that
+                were assigned since the instance was loaded.
+        """
+        attname = self._meta.get_field(field_name).attname
+        loaded = self.__dict__.get('_loaded_values')
+        if self._state.adding or loaded is None:
+            return True
+        if attname not in loaded:
+            return attname in self.__dict__
+        return attname in self.__dict__ and self.__dict__[attname] != loaded[attname]
+
+    def old_value(self, field_name):
+        """
+        Return the value a field had in the database.
+
+        Args:
+            field_name: Name of a concrete field.
+
+        Returns:
+            The loaded value, or None for unsaved instances and fields
+            that were not loaded.
+        """
+        attname = self._meta.get_field(field_name).attname
+        if self._state.adding:
+            return None
+        return (self.__dict__.get('_loaded_values') or {}).get(attname)
+
+    def changed_fields(self):
+        """
+        Return the loaded fields whose values changed.
+
+        Returns:
+            dict: Field name to ``(old_value, new_value)``.
+        """
+        loaded = self.__dict__.get('_loaded_values') or {}
+        return {
+            field.name: (loaded[field.attname], self.__dict__[field.attname])
+            for field in self._meta.concrete_fields
+            if field.attname in loaded
+            and field.attname in self.__dict__
+            and self.__dict__[field.attname] != loaded[field.attname]
+        }
@@ -0,0 +1,54 @@
+"""
+Shared Redis clients for Compozy.
+
+Components that talk to Redis directly (pub/sub, sorted sets, locks) use
+these helpers instead of creating their own connections, so each process
+keeps one connection pool per URL.
+"""
+
+import threading
+
+from django.conf import settings
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis(url=None):
+    """
+    Return a process-wide synchronous Redis client.
+
+    Args:
+        url: Optional Redis URL (defaults to ``settings.REDIS_URL``).
+
+    Returns:
+        redis.Redis: A client backed by a shared connection pool.
+    """
+    import redis
+
+    url = url or settings.REDIS_URL
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = redis.Redis.from_url(url)
+        return client
+
+
+def get_async_redis(url=None):
+    """
+    Return a new asyncio Redis client.
+
+    Async clients are bound to the running event loop, so they are not
+    shared across loops; callers should keep the client for the lifetime
+    of their loop-bound component.
+
+    Args:
+        url: Optional Redis URL (defaults to ``settings.REDIS_URL``).
+
+    Returns:
+        redis.asyncio.Redis: A new async client.
+    """
+    import redis.asyncio
+
+    return redis.asyncio.Redis.from_url(url or settings.REDIS_URL)
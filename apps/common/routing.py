@@ -0,0 +1,107 @@
+"""
+Celery queue routing.
+
+Work is split across queues so long jobs cannot starve short ones:
+
+- ``agent.<agent_type>``: agent work (task executions, workflow stages),
+  one queue per ``TaskExecution.AGENT_TYPE_CHOICES`` entry;
+- ``critical``: agent work of critical priority, served by its own
+  workers so it never waits behind a burst of long jobs;
+- ``interactive``: short jobs someone is waiting for (scheduling,
+  notifications, event relay, workflow bookkeeping);
+- ``maintenance``: retention, archives and precomputations;
+- ``default``: everything else.
+
+Static routes by task name live in ``CELERY_TASK_ROUTES``; agent work is
+routed at publish time with ``agent_route()``, which also sets the broker
+message priority from the Problem/Task priority. Worker profiles per queue
+are declared in ``CELERY_WORKER_PROFILES`` (see the run_worker command).
+"""
+from django.conf import settings
+
+
+PRIORITY_ORDER = ('critical', 'high', 'medium', 'low')
+
+CRITICAL_QUEUE = 'critical'
+
+
+def effective_priority(*levels):
+    """
+    Return the most urgent of several priority levels.
+
+    Args:
+        *levels: Priority names (None and unknown values are ignored).
+
+    Returns:
+        str: The most urgent level, 'medium' if none is given.
+    """
+    known = [level for level in levels if level in PRIORITY_ORDER]
+    if not known:
+        return 'medium'
+    return min(known, key=PRIORITY_ORDER.index)
+
+
+def message_priority(level):
+    """
+    Return the broker message priority of a priority level.
+
+    With the Redis transport lower values are consumed first (see
+    ``CELERY_PRIORITY_LEVELS``).
+    """
+    levels = settings.CELERY_PRIORITY_LEVELS
+    return levels.get(level, levels['medium'])
+
+
+def agent_queue(agent_type):
+    """Return the queue of an agent type."""
+    return f'agent.{agent_type or "unknown"}'
+
+
+def agent_route(agent_type, *priorities):
+    """
+    Return the ``apply_async`` options of agent work.
+
+    Args:
+        agent_type: One of ``TaskExecution.AGENT_TYPE_CHOICES``.
+        *priorities: Priority levels of the work (e.g. task and problem);
+            the most urgent one applies.
+
+    Returns:
+        dict: ``queue`` and ``priority`` options.
+    """
+    level = effective_priority(*priorities)
+    queue = CRITICAL_QUEUE if level == 'critical' else agent_queue(agent_type)
+    return {'queue': queue, 'priority': message_priority(level)}
+
+
+def profile_queues(profile):
+    """Return the queues consumed by a worker profile."""
+    return list(settings.CELERY_WORKER_PROFILES[profile]['queues'])
+
+
+def worker_command(profile, hostname=None):
+    """
+    Return the ``celery worker`` command line of a worker profile.
+
+    Args:
+        profile: Key of ``CELERY_WORKER_PROFILES``.
+        hostname: Optional node name (defaults to ``<profile>@%h``).
+
+    Returns:
+        list: Command arguments.
+    """
+    config = settings.CELERY_WORKER_PROFILES[profile]
+    command = [
+        'celery', '-A', 'config', 'worker',
+        '-n', hostname or f'{profile}@%h',
+        '-Q', ','.join(config['queues']),
+        '--concurrency', str(config['concurrency']),
+        '--prefetch-multiplier', str(config['prefetch_multiplier']),
+        '--time-limit', str(config['time_limit']),
+        '--soft-time-limit', str(config['soft_time_limit']),
+    ]
+    if config.get('max_tasks_per_child'):
+        command += ['--max-tasks-per-child', str(config['max_tasks_per_child'])]
+    if config.get('pool'):
+        command += ['--pool', config['pool']]
+    return command
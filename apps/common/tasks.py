@@ -0,0 +1,26 @@
+"""
+Celery tasks shared by the whole project.
+"""
+import time
+
+from celery import shared_task
+
+from apps.common.redis_client import get_redis
+
+
+@shared_task(ignore_result=True)
+def queue_probe(key, sent_at, duration=0.0, redis_url=None):
+    """
+    Record how long the job waited in its queue, then simulate work.
+
+    Used by the benchmark_queue_wait command.
+
+    Args:
+        key: Redis list receiving the wait, in seconds.
+        sent_at: Publication time (``time.time()``).
+        duration: Seconds of simulated work.
+        redis_url: Redis holding the results (defaults to REDIS_URL).
+    """
+    get_redis(redis_url).rpush(key, time.time() - sent_at)
+    if duration:
+        time.sleep(duration)
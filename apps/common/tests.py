@@ -0,0 +1,247 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.signals import post_save
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.common import routing
+from apps.common.management.commands.benchmark_queue_wait import percentile
+from apps.common.management.commands.check_admin_queries import Command as CheckAdminQueries
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+from apps.tasks_app.models import Task, TaskExecution
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_problem(slug='acme'):
+    organization = Organization.objects.create(name=slug.title(), slug=slug)
+    return Problem.objects.create(organization=organization, title='Problema', description='Descricao')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEFERRED_FIELD_WARNING_THRESHOLD=2)
+class SummaryQuerySetTests(TestCase):
+    """summary() defers heavy columns and reports N+1 lazy fetches."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        self.tasks = [
+            Task.objects.create(problem=self.problem, title=f'Tarefa {index}', description=f'detalhes {index}')
+            for index in range(3)
+        ]
+
+    def test_heavy_fields_are_deferred(self):
+        task = Task.objects.summary().get(pk=self.tasks[0].pk)
+
+        self.assertEqual(task.get_deferred_fields(), set(Task.HEAVY_FIELDS))
+        with self.assertNumQueries(1):
+            self.assertEqual(task.description, 'detalhes 0')
+
+    def test_heavy_fields_of_related_models_are_deferred(self):
+        TaskExecution.objects.create(task=self.tasks[0], logs='saida longa')
+
+        execution = TaskExecution.objects.select_related('task').summary('task').get()
+
+        self.assertEqual(execution.get_deferred_fields(), set(TaskExecution.HEAVY_FIELDS))
+        self.assertEqual(execution.task.get_deferred_fields(), set(Task.HEAVY_FIELDS))
+
+    def test_repeated_lazy_fetches_warn_once_at_the_threshold(self):
+        with self.assertLogs('apps.common.deferred', 'WARNING') as logs:
+            descriptions = [task.description for task in Task.objects.summary()]
+
+        self.assertEqual(len(descriptions), 3)
+        [message] = logs.output
+        self.assertIn('Task.description fetched lazily for 2 rows', message)
+        self.assertIn('apps/common/tests.py', message)
+
+    def test_single_lazy_fetch_does_not_warn(self):
+        with self.assertNoLogs('apps.common.deferred', 'WARNING'):
+            for task in Task.objects.summary()[:1]:
+                task.description  # noqa: B018
+
+    def test_rows_of_a_plain_queryset_are_not_tracked(self):
+        with self.assertNoLogs('apps.common.deferred', 'WARNING'):
+            for task in Task.objects.defer('description'):
+                task.description  # noqa: B018
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AdminChangelistQueryTests(TestCase):
+    """Every admin changelist runs the same number of queries for 1 and N rows."""
+
+    ROWS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        CheckAdminQueries(stdout=StringIO())._seed(cls.ROWS)
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha')
+
+    def render(self, model_admin, page_size):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        model_admin.list_per_page = page_size
+        model_admin.changelist_view(request).render()
+
+    def test_changelists_have_no_per_row_queries(self):
+        for model, model_admin in admin.site._registry.items():
+            with self.subTest(model=model._meta.label):
+                self.enterContext(mock.patch.object(model_admin, 'list_per_page', model_admin.list_per_page))
+                self.assertGreaterEqual(model_admin.get_queryset(None).count(), self.ROWS)
+
+                # Warm up per-process caches (content types, permissions...)
+                self.render(model_admin, 1)
+                with CaptureQueriesContext(connection) as single:
+                    self.render(model_admin, 1)
+                with self.assertNumQueries(len(single)):
+                    self.render(model_admin, self.ROWS)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChangeTrackingTests(TestCase):
+    """has_changed() and old_value() compare against the loaded values without queries."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        Task.objects.create(problem=self.problem, title='Original', status='pending')
+        self.task = Task.objects.get()
+
+    def test_unsaved_instances_have_every_field_changed(self):
+        task = Task(problem=self.problem, title='Nova')
+
+        self.assertTrue(task.has_changed('title'))
+        self.assertIsNone(task.old_value('title'))
+
+    def test_assignments_are_compared_with_the_loaded_value(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(self.task.has_changed('title'))
+            self.task.title = 'Renomeada'
+            self.assertTrue(self.task.has_changed('title'))
+            self.assertEqual(self.task.old_value('title'), 'Original')
+            self.assertEqual(self.task.changed_fields(), {'title': ('Original', 'Renomeada')})
+
+            self.task.title = 'Original'
+            self.assertFalse(self.task.has_changed('title'))
+
+    def test_foreign_keys_accept_the_field_name(self):
+        self.task.problem = create_problem('other')
+
+        self.assertTrue(self.task.has_changed('problem'))
+        self.assertEqual(self.task.old_value('problem'), self.problem.pk)
+
+    def test_post_save_receivers_see_the_previous_values(self):
+        seen = []
+
+        def receiver(sender, instance, **kwargs):
+            seen.append((instance.has_changed('status'), instance.old_value('status')))
+
+        post_save.connect(receiver, sender=Task)
+        self.addCleanup(post_save.disconnect, receiver, sender=Task)
+
+        self.task.status = 'selected'
+        self.task.save()
+
+        self.assertEqual(seen, [(True, 'pending')])
+        self.assertFalse(self.task.has_changed('status'))
+        self.assertEqual(self.task.old_value('status'), 'selected')
+
+    def test_save_with_update_fields_keeps_other_fields_pending(self):
+        self.task.title = 'Renomeada'
+        self.task.status = 'selected'
+        self.task.save(update_fields=['status', 'updated_at'])
+
+        self.assertFalse(self.task.has_changed('status'))
+        self.assertTrue(self.task.has_changed('title'))
+        self.assertEqual(self.task.old_value('title'), 'Original')
+
+    def test_deferred_fields(self):
+        task = Task.objects.defer('description').get()
+
+        self.assertFalse(task.has_changed('description'))
+        self.assertIsNone(task.old_value('description'))
+
+        task.description = 'nova descricao'
+        self.assertTrue(task.has_changed('description'))
+
+    def test_lazily_loaded_fields_become_tracked(self):
+        task = Task.objects.defer('description').get()
+
+        self.assertEqual(task.description, '')
+        self.assertFalse(task.has_changed('description'))
+        self.assertEqual(task.old_value('description'), '')
+
+    def test_refresh_from_db_resets_the_snapshot(self):
+        self.task.title = 'Renomeada'
+        Task.objects.filter(pk=self.task.pk).update(title='Externa')
+
+        self.task.refresh_from_db()
+
+        self.assertFalse(self.task.has_changed('title'))
+        self.assertEqual(self.task.old_value('title'), 'Externa')
+
+
+class RoutingTests(SimpleTestCase):
+    """Queue and priority of Celery work."""
+
+    def test_most_urgent_priority_applies(self):
+        self.assertEqual(routing.effective_priority('low', 'high', None), 'high')
+        self.assertEqual(routing.effective_priority(None, 'urgente'), 'medium')
+        self.assertEqual(routing.effective_priority(), 'medium')
+
+    def test_agent_work_goes_to_its_agent_queue(self):
+        self.assertEqual(
+            routing.agent_route('code_writer', 'low', 'medium'),
+            {'queue': 'agent.code_writer', 'priority': settings.CELERY_PRIORITY_LEVELS['medium']},
+        )
+        self.assertEqual(routing.agent_route(None)['queue'], 'agent.unknown')
+
+    def test_critical_work_goes_to_the_critical_queue(self):
+        self.assertEqual(
+            routing.agent_route('test_runner', 'low', 'critical'),
+            {'queue': routing.CRITICAL_QUEUE, 'priority': settings.CELERY_PRIORITY_LEVELS['critical']},
+        )
+
+    def test_unknown_levels_get_the_medium_message_priority(self):
+        self.assertEqual(routing.message_priority('urgente'), settings.CELERY_PRIORITY_LEVELS['medium'])
+
+    def test_every_queue_is_consumed_by_a_worker_profile(self):
+        consumed = {queue for profile in settings.CELERY_WORKER_PROFILES for queue in routing.profile_queues(profile)}
+        queues = {route['queue'] for route in settings.CELERY_TASK_ROUTES.values()}
+        queues.update(routing.agent_queue(agent) for agent, _ in TaskExecution.AGENT_TYPE_CHOICES)
+        queues.update({routing.CRITICAL_QUEUE, 'interactive', 'maintenance', 'default'})
+
+        self.assertEqual(queues - consumed, set())
+
+    @override_settings(CELERY_WORKER_PROFILES={
+        'code_writer': {
+            'queues': ['agent.code_writer', 'agent.test_runner'],
+            'concurrency': 4,
+            'prefetch_multiplier': 1,
+            'time_limit': 600,
+            'soft_time_limit': 540,
+            'max_tasks_per_child': 50,
+        },
+    })
+    def test_worker_command(self):
+        command = routing.worker_command('code_writer')
+
+        self.assertEqual(command[:6], ['celery', '-A', 'config', 'worker', '-n', 'code_writer@%h'])
+        self.assertEqual(command[command.index('-Q') + 1], 'agent.code_writer,agent.test_runner')
+        self.assertEqual(command[command.index('--time-limit') + 1], '600')
+        self.assertEqual(command[-2:], ['--max-tasks-per-child', '50'])
+        self.assertNotIn('--pool', command)
+        self.assertEqual(routing.worker_command('code_writer', 'w1@host')[5], 'w1@host')
+
+    def test_percentile_uses_the_nearest_rank(self):
+        values = [4, 1, 3, 2]
+
+        self.assertEqual(percentile(values, 0.5), 2)
+        self.assertEqual(percentile(values, 0.75), 3)
+        self.assertEqual(percentile(values, 0.95), 4)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertIsNone(percentile([], 0.5))
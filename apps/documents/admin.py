@@ -1,10 +1,34 @@
 from django.contrib import admin
+from django.utils.html import format_html
+
+from apps.common.admin import SummaryChangeListAdminMixin
+from apps.search.admin import FullTextSearchAdminMixin
 
 from .models import PRDDocument, TechSpecDocument
 
 
+class DocumentStatsAdminMixin:
+    """Displays the stored statistics of a document version."""
+
+    def reading_time(self, obj):
+        """Estimated reading time from the stored statistics."""
+        return f"{obj.stats.get('reading_minutes', 0)} min"
+    reading_time.short_description = 'Leitura'
+
+    def outline_display(self, obj):
+        """Indented section outline from the stored statistics."""
+        outline = obj.stats.get('outline') or []
+        if not outline:
+            return '-'
+        lines = [f"{'  ' * (level - 1)}{title}" for level, title in outline]
+        return format_html('<pre>{}</pre>', '\n'.join(lines))
+    outline_display.short_description = 'Secoes'
+
+
 @admin.register(PRDDocument)
-class PRDDocumentAdmin(admin.ModelAdmin):
+class PRDDocumentAdmin(
+    SummaryChangeListAdminMixin, DocumentStatsAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin
+):
     """Admin configuration for PRDDocument model."""
 
     list_display = [
@@ -13,6 +37,7 @@ class PRDDocumentAdmin(admin.ModelAdmin):
         'status',
         'is_approved',
         'word_count',
+        'reading_time',
         'created_by',
         'created_at',
     ]
@@ -22,15 +47,18 @@ class PRDDocumentAdmin(admin.ModelAdmin):
         'created_at',
         'problem__organization',
     ]
+    # content and summary of the latest version are searched through
+    # the full-text index
     search_fields = [
         'problem__title',
-        'content',
-        'summary',
     ]
+    search_entity = 'prd'
     readonly_fields = [
         'id',
         'version',
         'word_count',
+        'outline_display',
+        'storage_mode',
         'created_at',
         'updated_at',
         'approved_at',
@@ -49,7 +77,7 @@ class PRDDocumentAdmin(admin.ModelAdmin):
             'fields': ('id', 'problem', 'version', 'parent_version')
         }),
         ('Conteudo', {
-            'fields': ('content', 'summary', 'word_count')
+            'fields': ('content', 'summary', 'word_count', 'outline_display', 'storage_mode')
         }),
         ('Status', {
             'fields': ('status', 'is_approved', 'change_notes')
@@ -66,7 +94,9 @@ class PRDDocumentAdmin(admin.ModelAdmin):
 
 
 @admin.register(TechSpecDocument)
-class TechSpecDocumentAdmin(admin.ModelAdmin):
+class TechSpecDocumentAdmin(
+    SummaryChangeListAdminMixin, DocumentStatsAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin
+):
     """Admin configuration for TechSpecDocument model."""
 
     list_display = [
@@ -77,6 +107,7 @@ class TechSpecDocumentAdmin(admin.ModelAdmin):
         'estimated_complexity',
         'estimated_tasks',
         'word_count',
+        'reading_time',
         'created_by',
         'created_at',
     ]
@@ -87,16 +118,18 @@ class TechSpecDocumentAdmin(admin.ModelAdmin):
         'created_at',
         'problem__organization',
     ]
+    # content, summary and architecture_overview of the latest version
+    # are searched through the full-text index
     search_fields = [
         'problem__title',
-        'content',
-        'summary',
-        'architecture_overview',
     ]
+    search_entity = 'tech_spec'
     readonly_fields = [
         'id',
         'version',
         'word_count',
+        'outline_display',
+        'storage_mode',
         'created_at',
         'updated_at',
         'approved_at',
@@ -116,7 +149,7 @@ class TechSpecDocumentAdmin(admin.ModelAdmin):
             'fields': ('id', 'problem', 'prd_document', 'version', 'parent_version')
         }),
         ('Conteudo', {
-            'fields': ('content', 'summary', 'architecture_overview', 'word_count')
+            'fields': ('content', 'summary', 'architecture_overview', 'word_count', 'outline_display', 'storage_mode')
         }),
         ('Estimativas', {
             'fields': ('estimated_complexity', 'estimated_tasks', 'technologies')
@@ -0,0 +1,422 @@
+"""
+Line diff engine for PRD and Tech Spec versions.
+
+Both document models compare versions through LineDiff. It replaces the
+previous ``difflib`` implementation, whose character-level
+``SequenceMatcher`` was quadratic on large documents. The engine works
+as follows:
+
+- Lines are interned to integers, so each comparison is one integer check.
+- A common prefix and suffix are stripped first.
+- The remaining region is aligned with a patience diff on lines that
+  appear exactly once on both sides.
+- Gaps without unique anchors go to a linear-space Myers bisection.
+- Opcodes are produced by generators, so unified diff hunks stream
+  without building the whole diff in memory.
+
+The work is bounded by ``DOCUMENT_DIFF_TIMEOUT`` (seconds) and
+``DOCUMENT_DIFF_MAX_LINES``. When a budget is exhausted, the regions not
+yet aligned are reported as a single replacement. The diff stays correct
+but becomes coarser, and ``approximate`` is set on the result.
+"""
+import logging
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class LineDiff:
+    """
+    Lazy line-level diff between two texts.
+
+    Opcodes use the ``difflib`` format, ``(tag, i1, i2, j1, j2)`` with tags
+    'equal', 'replace', 'delete' and 'insert'. They are computed on first
+    iteration and kept as integer tuples, so later passes (statistics,
+    another rendering) do not recompute the alignment.
+
+    Attributes:
+        old_lines: Lines of the old text (with line endings)
+        new_lines: Lines of the new text (with line endings)
+        timeout: Time budget in seconds (None for unlimited)
+        max_lines: Above this total number of lines only the common
+            prefix and suffix are aligned
+        approximate: True if a budget forced a coarse alignment
+    """
+
+    def __init__(self, old_text, new_text, timeout=None, max_lines=None):
+        self.old_lines = (old_text or '').splitlines(keepends=True)
+        self.new_lines = (new_text or '').splitlines(keepends=True)
+        self.timeout = settings.DOCUMENT_DIFF_TIMEOUT if timeout is None else timeout
+        self.max_lines = settings.DOCUMENT_DIFF_MAX_LINES if max_lines is None else max_lines
+        self.approximate = False
+        self._opcodes = None
+        self._deadline = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def iter_opcodes(self):
+        """
+        Yield the opcodes transforming the old lines into the new lines.
+
+        Yields:
+            tuple: ``(tag, i1, i2, j1, j2)`` in document order.
+        """
+        if self._opcodes is not None:
+            yield from self._opcodes
+            return
+
+        opcodes = []
+        for opcode in _merge_opcodes(self._compute()):
+            opcodes.append(opcode)
+            yield opcode
+        self._opcodes = opcodes
+
+    def iter_unified_diff(self, fromfile='', tofile='', n=3):
+        """
+        Yield the diff in unified format, one line at a time.
+
+        Lines keep their original line endings, and headers carry none,
+        matching ``difflib.unified_diff(..., lineterm='')``.
+
+        Args:
+            fromfile: Label of the old text.
+            tofile: Label of the new text.
+            n: Number of context lines around each change.
+
+        Yields:
+            str: Unified diff lines.
+        """
+        started = False
+        for group in group_opcodes(self.iter_opcodes(), n):
+            if not started:
+                started = True
+                yield f'--- {fromfile}'
+                yield f'+++ {tofile}'
+
+            first, last = group[0], group[-1]
+            old_range = _format_range(first[1], last[2])
+            new_range = _format_range(first[3], last[4])
+            yield f'@@ -{old_range} +{new_range} @@'
+
+            for tag, i1, i2, j1, j2 in group:
+                if tag == 'equal':
+                    for line in self.old_lines[i1:i2]:
+                        yield ' ' + line
+                    continue
+                if tag in ('replace', 'delete'):
+                    for line in self.old_lines[i1:i2]:
+                        yield '-' + line
+                if tag in ('replace', 'insert'):
+                    for line in self.new_lines[j1:j2]:
+                        yield '+' + line
+
+    def stats(self):
+        """
+        Return addition, deletion and similarity statistics.
+
+        The similarity is the share of characters that sit on matching
+        lines, i.e. ``2 * matched / (len(old) + len(new))`` as a percentage.
+
+        Returns:
+            dict: ``additions``, ``deletions``, ``similarity_ratio`` and
+                ``approximate``.
+        """
+        additions = deletions = matched = 0
+        for tag, i1, i2, j1, j2 in self.iter_opcodes():
+            if tag == 'equal':
+                matched += sum(len(line) for line in self.old_lines[i1:i2])
+                continue
+            deletions += i2 - i1
+            additions += j2 - j1
+
+        total = (
+            sum(len(line) for line in self.old_lines)
+            + sum(len(line) for line in self.new_lines)
+        )
+        similarity = 100.0 if not total else round(2 * matched / total * 100, 2)
+        return {
+            'additions': additions,
+            'deletions': deletions,
+            'similarity_ratio': similarity,
+            'approximate': self.approximate,
+        }
+
+    # ------------------------------------------------------------------
+    # Alignment
+    # ------------------------------------------------------------------
+
+    def _compute(self):
+        interned = {}
+        old = [interned.setdefault(line, len(interned)) for line in self.old_lines]
+        new = [interned.setdefault(line, len(interned)) for line in self.new_lines]
+        self._deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        coarse = len(old) + len(new) > self.max_lines
+        yield from self._diff(old, 0, len(old), new, 0, len(new), coarse=coarse)
+
+        if self.approximate:
+            logger.info(
+                f'Document diff budget exhausted ({len(old)} vs {len(new)} lines), '
+                f'falling back to a coarse alignment'
+            )
+
+    def _out_of_budget(self):
+        return self._deadline is not None and time.monotonic() > self._deadline
+
+    def _diff(self, a, alo, ahi, b, blo, bhi, coarse=False):
+        """Yield raw 'equal', 'delete' and 'insert' opcodes for a region."""
+        # Common prefix
+        start_a, start_b = alo, blo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start_a:
+            yield ('equal', start_a, alo, start_b, blo)
+
+        # Common suffix, emitted after the middle
+        end_a, end_b = ahi, bhi
+        while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+
+        if alo == ahi:
+            if blo < bhi:
+                yield ('insert', alo, alo, blo, bhi)
+        elif blo == bhi:
+            yield ('delete', alo, ahi, blo, blo)
+        elif coarse or self._out_of_budget():
+            self.approximate = True
+            yield ('delete', alo, ahi, blo, blo)
+            yield ('insert', ahi, ahi, blo, bhi)
+        else:
+            anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+            if anchors:
+                i, j = alo, blo
+                for anchor_a, anchor_b in anchors:
+                    yield from self._diff(a, i, anchor_a, b, j, anchor_b)
+                    yield ('equal', anchor_a, anchor_a + 1, anchor_b, anchor_b + 1)
+                    i, j = anchor_a + 1, anchor_b + 1
+                yield from self._diff(a, i, ahi, b, j, bhi)
+            else:
+                yield from self._bisect(a, alo, ahi, b, blo, bhi)
+
+        if ahi < end_a:
+            yield ('equal', ahi, end_a, bhi, end_b)
+
+    def _bisect(self, a, alo, ahi, b, blo, bhi):
+        """
+        Split a region on the middle snake of its Myers edit path.
+
+        Runs the forward and reverse searches together in O(N + M) space
+        and recurses on both halves. Falls back to a replacement when the
+        time budget runs out.
+        """
+        n, m = ahi - alo, bhi - blo
+        max_d = (n + m + 1) // 2
+        offset = max_d
+        size = 2 * max_d + 2
+        forward = [-1] * size
+        reverse = [-1] * size
+        forward[offset + 1] = 0
+        reverse[offset + 1] = 0
+        delta = n - m
+        front = delta % 2 != 0
+        k1_start = k1_end = k2_start = k2_end = 0
+
+        for d in range(max_d):
+            if self._out_of_budget():
+                self.approximate = True
+                break
+
+            for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+                k1_offset = offset + k1
+                if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                    x1 = forward[k1_offset + 1]
+                else:
+                    x1 = forward[k1_offset - 1] + 1
+                y1 = x1 - k1
+                while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                    x1 += 1
+                    y1 += 1
+                forward[k1_offset] = x1
+                if x1 > n:
+                    k1_end += 2
+                elif y1 > m:
+                    k1_start += 2
+                elif front:
+                    k2_offset = offset + delta - k1
+                    if (
+                        0 <= k2_offset < size
+                        and reverse[k2_offset] != -1
+                        and x1 >= n - reverse[k2_offset]
+                    ):
+                        yield from self._split(a, alo, ahi, b, blo, bhi, x1, y1)
+                        return
+
+            for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+                k2_offset = offset + k2
+                if k2 == -d or (k2 != d and reverse[k2_offset - 1] < reverse[k2_offset + 1]):
+                    x2 = reverse[k2_offset + 1]
+                else:
+                    x2 = reverse[k2_offset - 1] + 1
+                y2 = x2 - k2
+                while x2 < n and y2 < m and a[ahi - x2 - 1] == b[bhi - y2 - 1]:
+                    x2 += 1
+                    y2 += 1
+                reverse[k2_offset] = x2
+                if x2 > n:
+                    k2_end += 2
+                elif y2 > m:
+                    k2_start += 2
+                elif not front:
+                    k1_offset = offset + delta - k2
+                    if 0 <= k1_offset < size and forward[k1_offset] != -1:
+                        x1 = forward[k1_offset]
+                        y1 = offset + x1 - k1_offset
+                        if x1 >= n - x2:
+                            yield from self._split(a, alo, ahi, b, blo, bhi, x1, y1)
+                            return
+
+        # Out of budget or nothing in common
+        yield ('delete', alo, ahi, blo, blo)
+        yield ('insert', ahi, ahi, blo, bhi)
+
+    def _split(self, a, alo, ahi, b, blo, bhi, x, y):
+        yield from self._diff(a, alo, alo + x, b, blo, blo + y)
+        yield from self._diff(a, alo + x, ahi, b, blo + y, bhi)
+
+
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    """
+    Return the patience anchors of a region.
+
+    Anchors are lines that occur exactly once on each side. Of those, the
+    longest subsequence in the same order on both sides is kept.
+
+    Returns:
+        list: ``(i, j)`` index pairs in increasing order.
+    """
+    counts = {}
+    for i in range(alo, ahi):
+        entry = counts.get(a[i])
+        counts[a[i]] = [i, None, 1] if entry is None else [entry[0], None, entry[2] + 1]
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is None or entry[2] != 1:
+            continue
+        # A second match in b marks the line as not unique
+        entry[1] = j if entry[1] is None else -1
+
+    pairs = sorted(
+        (entry[0], entry[1]) for entry in counts.values()
+        if entry[2] == 1 and entry[1] is not None and entry[1] >= 0
+    )
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence on j (patience sorting)
+    tails = []
+    tail_indexes = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position:
+            previous[index] = tail_indexes[position - 1]
+        if position == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[position] = j
+            tail_indexes[position] = index
+
+    anchors = []
+    index = tail_indexes[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _merge_opcodes(raw):
+    """Merge adjacent raw opcodes and pair deletions with insertions."""
+    pending = None
+    for tag, i1, i2, j1, j2 in raw:
+        if i1 == i2 and j1 == j2:
+            continue
+        if pending is None:
+            pending = [tag, i1, i2, j1, j2]
+            continue
+
+        pending_tag = pending[0]
+        if tag == 'equal' and pending_tag == 'equal':
+            pending[2], pending[4] = i2, j2
+        elif tag != 'equal' and pending_tag != 'equal':
+            pending[2], pending[4] = i2, j2
+            if pending_tag != tag:
+                pending[0] = 'replace'
+        else:
+            yield tuple(pending)
+            pending = [tag, i1, i2, j1, j2]
+
+    if pending is not None:
+        yield tuple(pending)
+
+
+def group_opcodes(opcodes, n=3):
+    """
+    Group an opcode stream into hunks with ``n`` lines of context.
+
+    Streaming equivalent of ``difflib.SequenceMatcher.get_grouped_opcodes``:
+    only the current hunk is kept in memory.
+
+    Args:
+        opcodes: Iterable of ``(tag, i1, i2, j1, j2)`` tuples.
+        n: Number of context lines.
+
+    Yields:
+        list: Opcodes of one hunk.
+    """
+    group = []
+    leading = None
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            if not group:
+                leading = ('equal', max(i1, i2 - n), i2, max(j1, j2 - n), j2)
+            elif i2 - i1 > 2 * n:
+                group.append(('equal', i1, i1 + n, j1, j1 + n))
+                yield group
+                group = []
+                leading = ('equal', i2 - n, i2, j2 - n, j2)
+            else:
+                group.append((tag, i1, i2, j1, j2))
+            continue
+
+        if not group and leading is not None:
+            group.append(leading)
+            leading = None
+        group.append((tag, i1, i2, j1, j2))
+
+    if group:
+        tag, i1, i2, j1, j2 = group[-1]
+        if tag == 'equal':
+            group[-1] = ('equal', i1, min(i2, i1 + n), j1, min(j2, j1 + n))
+        yield group
+
+
+def _format_range(start, stop):
+    """Format a hunk range in unified diff notation."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
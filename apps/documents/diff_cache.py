@@ -0,0 +1,203 @@
+"""
+Cache of document version comparisons.
+
+Document versions do not change once created, so a diff is fully
+determined by the contents of its two versions. Results are keyed by
+the content hashes of both sides and stored in two tiers:
+
+1. The default Django cache (Redis), for fast reads.
+2. The DocumentDiffCache table, which survives cache flushes and Redis
+   outages. Its rows are evicted least-recently-used first.
+
+Diffs against the parent version are precomputed by a Celery task as
+soon as a new version is committed.
+"""
+import logging
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.documents.diff import LineDiff
+
+
+logger = logging.getLogger(__name__)
+
+
+def diff_cache_key(from_hash, to_hash):
+    """Return the cache key of a diff between two content hashes."""
+    return f'documents:diff:{from_hash}:{to_hash}'
+
+
+def _content_hash(document):
+    from apps.documents.models import compute_content_hash
+
+    return document.content_hash or compute_content_hash(document.content)
+
+
+def compute_diff_result(old_content, new_content):
+    """
+    Compute the cacheable part of a comparison.
+
+    The unified diff headers carry version labels, which vary for equal
+    contents, so only the hunks are stored.
+
+    Args:
+        old_content: Content of the old version.
+        new_content: Content of the new version.
+
+    Returns:
+        dict: ``hunks`` (unified diff lines without the headers) plus the
+            statistics of LineDiff.stats.
+    """
+    diff = LineDiff(old_content, new_content)
+    # Skip the '---' / '+++' headers
+    hunks = list(islice(diff.iter_unified_diff(), 2, None))
+    return {'hunks': hunks, **diff.stats()}
+
+
+def get_cached_diff(from_hash, to_hash):
+    """
+    Look up a diff in the cache, then in the database.
+
+    Args:
+        from_hash: Content hash of the old version.
+        to_hash: Content hash of the new version.
+
+    Returns:
+        dict or None: The stored result, or None on a miss.
+    """
+    key = diff_cache_key(from_hash, to_hash)
+    try:
+        result = cache.get(key)
+    except Exception as exc:
+        logger.warning(f'Diff cache unavailable, using database: {exc}')
+        result = None
+    if result is not None:
+        return result
+
+    from apps.documents.models import DocumentDiffCache
+
+    entry = DocumentDiffCache.objects.filter(
+        from_hash=from_hash, to_hash=to_hash
+    ).only('pk', 'result', 'last_used_at').first()
+    if entry is None:
+        return None
+
+    now = timezone.now()
+    touch_before = now - timedelta(seconds=settings.DOCUMENT_DIFF_CACHE_TOUCH_INTERVAL)
+    if entry.last_used_at < touch_before:
+        DocumentDiffCache.objects.filter(pk=entry.pk).update(last_used_at=now)
+    _cache_set(key, entry.result)
+    return entry.result
+
+
+def store_diff(from_hash, to_hash, result):
+    """
+    Store a computed diff in both cache tiers.
+
+    Args:
+        from_hash: Content hash of the old version.
+        to_hash: Content hash of the new version.
+        result: The value returned by compute_diff_result.
+    """
+    from apps.documents.models import DocumentDiffCache
+
+    _cache_set(diff_cache_key(from_hash, to_hash), result)
+
+    size = sum(len(line) for line in result['hunks'])
+    try:
+        with transaction.atomic():
+            DocumentDiffCache.objects.update_or_create(
+                from_hash=from_hash,
+                to_hash=to_hash,
+                defaults={'result': result, 'size': size, 'last_used_at': timezone.now()},
+            )
+    except IntegrityError:
+        # Stored concurrently by another worker
+        return
+    evict_diff_cache()
+
+
+def _cache_set(key, result):
+    try:
+        cache.set(key, result, settings.DOCUMENT_DIFF_CACHE_TIMEOUT)
+    except Exception as exc:
+        logger.warning(f'Failed to write diff cache key {key}: {exc}')
+
+
+def evict_diff_cache(max_entries=None):
+    """
+    Remove the least recently used database entries above the limit.
+
+    Args:
+        max_entries: Entries to keep (defaults to DOCUMENT_DIFF_CACHE_MAX_ENTRIES).
+
+    Returns:
+        int: Number of entries removed.
+    """
+    from apps.documents.models import DocumentDiffCache
+
+    max_entries = max_entries or settings.DOCUMENT_DIFF_CACHE_MAX_ENTRIES
+    threshold = DocumentDiffCache.objects.order_by('-last_used_at').values_list(
+        'last_used_at', flat=True
+    )[max_entries:max_entries + 1].first()
+    if threshold is None:
+        return 0
+
+    deleted, _ = DocumentDiffCache.objects.filter(last_used_at__lte=threshold).delete()
+    logger.info(f'Evicted {deleted} document diff cache entries')
+    return deleted
+
+
+def get_document_diff(document, other_version):
+    """
+    Compare two document versions, using the diff cache.
+
+    Args:
+        document: The newer document version.
+        other_version: The version to compare against.
+
+    Returns:
+        dict: ``diff_lines`` in unified format, ``additions``,
+            ``deletions``, ``similarity_ratio``, ``approximate``,
+            ``from_version`` and ``to_version``.
+    """
+    from_hash = _content_hash(other_version)
+    to_hash = _content_hash(document)
+
+    result = get_cached_diff(from_hash, to_hash)
+    if result is None:
+        result = compute_diff_result(other_version.content, document.content)
+        store_diff(from_hash, to_hash, result)
+
+    diff_lines = []
+    if result['hunks']:
+        diff_lines = [f'--- v{other_version.version}', f'+++ v{document.version}'] + result['hunks']
+
+    return {
+        'diff_lines': diff_lines,
+        'additions': result['additions'],
+        'deletions': result['deletions'],
+        'similarity_ratio': result['similarity_ratio'],
+        'approximate': result['approximate'],
+        'from_version': other_version.version,
+        'to_version': document.version,
+    }
+
+
+def schedule_diff_precompute(document):
+    """
+    Precompute the diff of a new version against its parent after commit.
+
+    Args:
+        document: A PRDDocument or TechSpecDocument with a parent version.
+    """
+    from apps.documents.tasks import precompute_document_diff
+
+    label = document._meta.label
+    document_id = str(document.pk)
+    transaction.on_commit(lambda: precompute_document_diff.delay(label, document_id))
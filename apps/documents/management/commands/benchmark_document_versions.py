@@ -0,0 +1,139 @@
+"""
+Management command para testar a alocacao concorrente de versoes.
+
+Dispara varias threads criando versoes de documentos para o mesmo
+problema e verifica que nenhuma insercao falha e que as versoes ficam
+contiguas (1..N, sem repeticoes).
+
+Usage:
+    python manage.py benchmark_document_versions
+    python manage.py benchmark_document_versions --threads 32 --versions 50
+    python manage.py benchmark_document_versions --problem <uuid> --keep
+"""
+
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.documents.models import PRDDocument, TechSpecDocument
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+
+
+class Command(BaseCommand):
+    help = 'Cria versoes de documentos em paralelo e verifica a alocacao de versoes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Numero de threads concorrentes',
+        )
+        parser.add_argument(
+            '--versions',
+            type=int,
+            default=20,
+            help='Versoes criadas por thread',
+        )
+        parser.add_argument(
+            '--model',
+            choices=['prd', 'tech_spec'],
+            default='prd',
+            help='Tipo de documento',
+        )
+        parser.add_argument(
+            '--problem',
+            type=str,
+            help='ID de um problema existente (por padrao um problema temporario e criado)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Mantem os documentos criados',
+        )
+
+    def handle(self, *args, **options):
+        model = PRDDocument if options['model'] == 'prd' else TechSpecDocument
+        threads_count = options['threads']
+        per_thread = options['versions']
+
+        organization = None
+        if options['problem']:
+            try:
+                problem = Problem.objects.get(pk=options['problem'])
+            except (Problem.DoesNotExist, ValueError):
+                raise CommandError(f'Problema {options["problem"]} nao encontrado')
+        else:
+            suffix = uuid.uuid4().hex[:8]
+            organization = Organization.objects.create(
+                name=f'Benchmark {suffix}', slug=f'benchmark-{suffix}'
+            )
+            problem = Problem.objects.create(
+                organization=organization,
+                title='Benchmark de versoes',
+                description='Problema temporario criado pelo benchmark',
+            )
+
+        existing = set(model.objects.filter(problem=problem).values_list('pk', flat=True))
+        failures = []
+        durations = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads_count)
+
+        def worker(index):
+            barrier.wait()
+            try:
+                for number in range(per_thread):
+                    started = time.perf_counter()
+                    try:
+                        model.create_new_version(problem, f'# Thread {index}\n\nVersao {number}\n')
+                    except Exception as exc:
+                        with lock:
+                            failures.append(f'{type(exc).__name__}: {exc}')
+                    else:
+                        with lock:
+                            durations.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        self.stdout.write(
+            f'{threads_count} threads x {per_thread} versoes ({model._meta.verbose_name}, '
+            f'banco {connection.vendor})...'
+        )
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        created = model.objects.filter(problem=problem).exclude(pk__in=existing)
+        versions = sorted(created.values_list('version', flat=True))
+        expected = threads_count * per_thread
+        contiguous = versions == list(range(versions[0], versions[0] + len(versions))) if versions else False
+        durations.sort()
+
+        self.stdout.write(f'Versoes criadas: {len(versions)} de {expected}')
+        self.stdout.write(f'Insercoes com falha: {len(failures)}')
+        self.stdout.write(f'Tempo total: {elapsed:.2f}s ({len(versions) / elapsed:.0f} versoes/s)')
+        if durations:
+            p50 = durations[len(durations) // 2] * 1000
+            p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+            self.stdout.write(f'Latencia por versao: p50 {p50:.1f}ms, p99 {p99:.1f}ms')
+        for failure in failures[:5]:
+            self.stdout.write(self.style.ERROR(f'  {failure}'))
+
+        if not options['keep']:
+            if organization is not None:
+                organization.delete()
+            else:
+                created.delete()
+
+        if failures or len(versions) != expected or not contiguous:
+            raise CommandError('Alocacao de versoes inconsistente')
+        self.stdout.write(self.style.SUCCESS('OK: nenhuma falha e versoes contiguas.'))
@@ -0,0 +1,56 @@
+"""
+Management command para compactar versoes de documentos em deltas.
+
+Converte versoes antigas de PRDs e especificacoes tecnicas para o
+armazenamento em delta (ou de volta para completo com --materialize).
+
+Usage:
+    python manage.py compact_documents
+    python manage.py compact_documents --materialize  # Volta tudo para completo
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.documents.models import PRDDocument, TechSpecDocument
+from apps.documents.storage import STORAGE_DELTA, STORAGE_FULL, compact_version, materialize_version
+
+
+class Command(BaseCommand):
+    help = 'Compacta versoes antigas de documentos em deltas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--materialize',
+            action='store_true',
+            help='Armazena novamente todas as versoes em formato completo',
+        )
+
+    def handle(self, *args, **options):
+        for model in (PRDDocument, TechSpecDocument):
+            if options['materialize']:
+                count = self._materialize(model)
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {count} versoes restauradas')
+            else:
+                count = self._compact(model)
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {count} versoes compactadas')
+        self.stdout.write(self.style.SUCCESS('Concluido.'))
+
+    def _compact(self, model):
+        """Compacta as versoes em ordem crescente, para que cada pai ja esteja resolvido."""
+        count = 0
+        versions = model.objects.filter(
+            storage_mode=STORAGE_FULL, parent_version__isnull=False
+        ).order_by('problem_id', 'version')
+        for document in versions.iterator(chunk_size=100):
+            if compact_version(document):
+                count += 1
+        return count
+
+    def _materialize(self, model):
+        """Restaura as versoes em ordem decrescente, mantendo as cadeias validas."""
+        count = 0
+        versions = model.objects.filter(storage_mode=STORAGE_DELTA).order_by('problem_id', '-version')
+        for document in versions.iterator(chunk_size=100):
+            materialize_version(document)
+            count += 1
+        return count
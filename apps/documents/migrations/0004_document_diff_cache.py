@@ -0,0 +1,123 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:39
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_hashes(apps, schema_editor):
+    for model_name in ("PRDDocument", "TechSpecDocument"):
+        model = apps.get_model("documents", model_name)
+        for document in model.objects.only("pk", "content").iterator(chunk_size=500):
+            model.objects.filter(pk=document.pk).update(
+                content_hash=hashlib.sha256(document.content.encode("utf-8")).hexdigest()
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0003_techspecdocument"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prddocument",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="SHA-256 do conteudo, usado como chave do cache de diffs",
+                max_length=64,
+                verbose_name="hash do conteudo",
+            ),
+        ),
+        migrations.AddField(
+            model_name="techspecdocument",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="SHA-256 do conteudo, usado como chave do cache de diffs",
+                max_length=64,
+                verbose_name="hash do conteudo",
+            ),
+        ),
+        migrations.CreateModel(
+            name="DocumentDiffCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "from_hash",
+                    models.CharField(
+                        help_text="Hash do conteudo da versao anterior",
+                        max_length=64,
+                        verbose_name="hash de origem",
+                    ),
+                ),
+                (
+                    "to_hash",
+                    models.CharField(
+                        help_text="Hash do conteudo da versao nova",
+                        max_length=64,
+                        verbose_name="hash de destino",
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Linhas do diff e estatisticas calculadas",
+                        verbose_name="resultado",
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Tamanho aproximado do resultado em caracteres",
+                        verbose_name="tamanho",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Data e hora do calculo do diff",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        help_text="Ultima leitura do diff, usada na remocao LRU",
+                        verbose_name="ultimo uso em",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cache de Diff",
+                "verbose_name_plural": "Cache de Diffs",
+                "db_table": "documents_diff_cache",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("from_hash", "to_hash"), name="unique_diff_cache_hashes"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+import apps.documents.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0004_document_diff_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prddocument",
+            name="delta",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                help_text="Operacoes para reconstruir o conteudo a partir da versao anterior",
+                null=True,
+                verbose_name="delta",
+            ),
+        ),
+        migrations.AddField(
+            model_name="prddocument",
+            name="delta_depth",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                editable=False,
+                help_text="Numero de deltas desde o ultimo snapshot completo",
+                verbose_name="profundidade do delta",
+            ),
+        ),
+        migrations.AddField(
+            model_name="prddocument",
+            name="storage_mode",
+            field=models.CharField(
+                choices=[("full", "Completo"), ("delta", "Delta")],
+                default="full",
+                editable=False,
+                help_text="Completo ou delta em relacao a versao anterior",
+                max_length=10,
+                verbose_name="modo de armazenamento",
+            ),
+        ),
+        migrations.AddField(
+            model_name="techspecdocument",
+            name="delta",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                help_text="Operacoes para reconstruir o conteudo a partir da versao anterior",
+                null=True,
+                verbose_name="delta",
+            ),
+        ),
+        migrations.AddField(
+            model_name="techspecdocument",
+            name="delta_depth",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                editable=False,
+                help_text="Numero de deltas desde o ultimo snapshot completo",
+                verbose_name="profundidade do delta",
+            ),
+        ),
+        migrations.AddField(
+            model_name="techspecdocument",
+            name="storage_mode",
+            field=models.CharField(
+                choices=[("full", "Completo"), ("delta", "Delta")],
+                default="full",
+                editable=False,
+                help_text="Completo ou delta em relacao a versao anterior",
+                max_length=10,
+                verbose_name="modo de armazenamento",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="prddocument",
+            name="content",
+            field=apps.documents.storage.DeltaContentField(
+                help_text="Conteudo do PRD em formato Markdown", verbose_name="conteudo"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="techspecdocument",
+            name="content",
+            field=apps.documents.storage.DeltaContentField(
+                help_text="Conteudo da especificacao tecnica em formato Markdown",
+                verbose_name="conteudo",
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0005_document_delta_storage"),
+        ("problems", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentVersionCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "document_type",
+                    models.CharField(
+                        help_text="Nome do modelo do documento",
+                        max_length=30,
+                        verbose_name="tipo de documento",
+                    ),
+                ),
+                (
+                    "last_version",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Ultimo numero de versao alocado",
+                        verbose_name="ultima versao",
+                    ),
+                ),
+                (
+                    "last_document_id",
+                    models.UUIDField(
+                        blank=True,
+                        help_text="ID da versao mais recente da cadeia",
+                        null=True,
+                        verbose_name="ultimo documento",
+                    ),
+                ),
+                (
+                    "problem",
+                    models.ForeignKey(
+                        help_text="Problema ao qual a cadeia de versoes pertence",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="document_version_counters",
+                        to="problems.problem",
+                        verbose_name="problema",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Contador de Versoes",
+                "verbose_name_plural": "Contadores de Versoes",
+                "db_table": "documents_version_counter",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("problem", "document_type"),
+                        name="unique_version_counter_per_problem",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:50
+
+from django.db import migrations, models
+
+from apps.documents.stats import compute_document_stats
+
+
+def backfill_document_stats(apps, schema_editor):
+    for model_name in ("PRDDocument", "TechSpecDocument"):
+        model = apps.get_model("documents", model_name)
+        for document in model.objects.iterator(chunk_size=200):
+            # Delta rows are rebuilt by the DeltaContentField descriptor
+            stats = compute_document_stats(document.content)
+            model.objects.filter(pk=document.pk).update(
+                stats=stats, word_count=stats["words"]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0006_document_version_counter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prddocument",
+            name="stats",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Palavras, titulos, sumario de secoes e tempo de leitura",
+                verbose_name="estatisticas",
+            ),
+        ),
+        migrations.AddField(
+            model_name="techspecdocument",
+            name="stats",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Palavras, titulos, sumario de secoes e tempo de leitura",
+                verbose_name="estatisticas",
+            ),
+        ),
+        migrations.RunPython(backfill_document_stats, migrations.RunPython.noop),
+    ]
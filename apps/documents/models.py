@@ -4,18 +4,37 @@ Documents models for PRD and Tech Spec storage.
 This module contains models for storing and versioning documents
 generated by the AI agents during the problem-solving workflow.
 """
+import hashlib
 import uuid
-import difflib
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
+from apps.common.deferred import SummaryQuerySet
 from apps.common.models import TimestampedModel
+from apps.documents.diff import LineDiff
+from apps.documents.diff_cache import get_document_diff, schedule_diff_precompute
+from apps.documents.storage import (
+    STORAGE_FULL,
+    STORAGE_MODE_CHOICES,
+    DeltaContentField,
+    prepare_save,
+    saved_content_hash,
+    schedule_compaction,
+)
+from apps.documents.stats import update_document_stats
+from apps.documents.versioning import create_document_version
+from apps.events.outbox import save_with_event
 from apps.problems.models import Problem
 
 User = get_user_model()
 
 
+def compute_content_hash(content):
+    """Return the SHA-256 hex digest of a document content."""
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
 class PRDDocument(TimestampedModel):
     """
     Product Requirements Document (PRD) model with versioning support.
@@ -40,6 +59,12 @@ class PRDDocument(TimestampedModel):
         change_notes: Notes describing changes from previous version
     """
 
+    # Large columns deferred by summary() projections
+    HEAVY_FIELDS = ('content', 'delta')
+
+    # Aggregate name of domain events (see apps.events.outbox)
+    OUTBOX_AGGREGATE = 'prd'
+
     # Status choices for the document
     STATUS_CHOICES = [
         ('draft', 'Rascunho'),
@@ -66,7 +91,7 @@ class PRDDocument(TimestampedModel):
         default=1,
         help_text='Numero da versao do documento'
     )
-    content = models.TextField(
+    content = DeltaContentField(
         'conteudo',
         help_text='Conteudo do PRD em formato Markdown'
     )
@@ -133,6 +158,45 @@ class PRDDocument(TimestampedModel):
         default=0,
         help_text='Numero de palavras no documento'
     )
+    stats = models.JSONField(
+        'estatisticas',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Palavras, titulos, sumario de secoes e tempo de leitura'
+    )
+    content_hash = models.CharField(
+        'hash do conteudo',
+        max_length=64,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        help_text='SHA-256 do conteudo, usado como chave do cache de diffs'
+    )
+    storage_mode = models.CharField(
+        'modo de armazenamento',
+        max_length=10,
+        choices=STORAGE_MODE_CHOICES,
+        default=STORAGE_FULL,
+        editable=False,
+        help_text='Completo ou delta em relacao a versao anterior'
+    )
+    delta = models.JSONField(
+        'delta',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Operacoes para reconstruir o conteudo a partir da versao anterior'
+    )
+    delta_depth = models.PositiveSmallIntegerField(
+        'profundidade do delta',
+        default=0,
+        editable=False,
+        help_text='Numero de deltas desde o ultimo snapshot completo'
+    )
+
+    objects = SummaryQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Documento PRD'
@@ -163,9 +227,13 @@ class PRDDocument(TimestampedModel):
         })
 
     def save(self, *args, **kwargs):
-        """Override save to auto-calculate word count."""
-        if self.content:
-            self.word_count = len(self.content.split())
+        """Override save to keep storage, content hash and statistics in sync."""
+        update_fields = kwargs.get('update_fields')
+        content_hash = saved_content_hash(self, update_fields)
+        update_fields = prepare_save(self, update_fields, content_hash)
+        update_fields = update_document_stats(self, update_fields, content_hash)
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
 
     def compare_versions(self, other_version):
@@ -173,7 +241,8 @@ class PRDDocument(TimestampedModel):
         Compare this PRD version with another version.
 
         Generates a unified diff between the two versions showing
-        additions, deletions, and changes.
+        additions, deletions, and changes. Use ``iter_diff`` to stream
+        the diff of large documents instead.
 
         Args:
             other_version: Another PRDDocument instance to compare with.
@@ -184,6 +253,7 @@ class PRDDocument(TimestampedModel):
                 - additions: Number of lines added
                 - deletions: Number of lines removed
                 - similarity_ratio: Percentage of similarity (0-100)
+                - approximate: Whether the diff budget forced a coarse diff
 
         Raises:
             ValueError: If other_version is not a PRDDocument instance
@@ -195,35 +265,25 @@ class PRDDocument(TimestampedModel):
         if other_version.problem_id != self.problem_id:
             raise ValueError("Cannot compare PRDs from different problems")
 
-        # Split content into lines for comparison
-        self_lines = self.content.splitlines(keepends=True)
-        other_lines = other_version.content.splitlines(keepends=True)
+        return get_document_diff(self, other_version)
 
-        # Generate unified diff
-        diff = list(difflib.unified_diff(
-            other_lines,
-            self_lines,
+    def iter_diff(self, other_version, context=3):
+        """
+        Stream the unified diff against another PRD version.
+
+        Args:
+            other_version: Another PRDDocument instance to compare with.
+            context: Number of context lines around each change.
+
+        Yields:
+            str: Unified diff lines, computed lazily.
+        """
+        diff = LineDiff(other_version.content, self.content)
+        yield from diff.iter_unified_diff(
             fromfile=f'v{other_version.version}',
             tofile=f'v{self.version}',
-            lineterm=''
-        ))
-
-        # Count additions and deletions
-        additions = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
-        deletions = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
-
-        # Calculate similarity ratio
-        matcher = difflib.SequenceMatcher(None, self.content, other_version.content)
-        similarity_ratio = round(matcher.ratio() * 100, 2)
-
-        return {
-            'diff_lines': diff,
-            'additions': additions,
-            'deletions': deletions,
-            'similarity_ratio': similarity_ratio,
-            'from_version': other_version.version,
-            'to_version': self.version,
-        }
+            n=context,
+        )
 
     def get_diff_from_parent(self):
         """
@@ -248,7 +308,10 @@ class PRDDocument(TimestampedModel):
         self.status = 'approved'
         self.approved_at = timezone.now()
         self.approved_by = user
-        self.save(update_fields=['is_approved', 'status', 'approved_at', 'approved_by', 'updated_at'])
+        save_with_event(
+            self, ['is_approved', 'status', 'approved_at', 'approved_by', 'updated_at'],
+            'approved', {'version': self.version, 'approved_by_id': user.pk if user else None},
+        )
 
     def request_revision(self, notes=''):
         """
@@ -280,8 +343,11 @@ class PRDDocument(TimestampedModel):
         """
         Create a new version of the PRD for a problem.
 
-        Automatically increments the version number and links to
-        the previous version if one exists.
+        Allocates the next version number atomically (safe under
+        concurrent writers) and links to the previous version if one
+        exists. The diff against the previous
+        version is precomputed and, with delta storage enabled, the
+        previous version is compacted in the background.
 
         Args:
             problem: The Problem instance.
@@ -292,24 +358,18 @@ class PRDDocument(TimestampedModel):
         Returns:
             PRDDocument: The newly created PRD document.
         """
-        # Get the latest version for this problem
-        latest = cls.objects.filter(problem=problem).order_by('-version').first()
-
-        new_version = 1
-        parent = None
-        if latest:
-            new_version = latest.version + 1
-            parent = latest
-
-        return cls.objects.create(
-            problem=problem,
-            version=new_version,
+        document, parent_id = create_document_version(
+            cls,
+            problem,
             content=content,
             created_by=created_by,
-            parent_version=parent,
             change_notes=change_notes,
             status='pending_review'
         )
+        if parent_id:
+            schedule_diff_precompute(document)
+            schedule_compaction(cls, parent_id)
+        return document
 
     @classmethod
     def get_latest_for_problem(cls, problem):
@@ -368,6 +428,12 @@ class TechSpecDocument(TimestampedModel):
         change_notes: Notes describing changes from previous version
     """
 
+    # Large columns deferred by summary() projections
+    HEAVY_FIELDS = ('content', 'architecture_overview', 'delta')
+
+    # Aggregate name of domain events (see apps.events.outbox)
+    OUTBOX_AGGREGATE = 'tech_spec'
+
     # Status choices for the document
     STATUS_CHOICES = [
         ('draft', 'Rascunho'),
@@ -411,7 +477,7 @@ class TechSpecDocument(TimestampedModel):
         default=1,
         help_text='Numero da versao do documento'
     )
-    content = models.TextField(
+    content = DeltaContentField(
         'conteudo',
         help_text='Conteudo da especificacao tecnica em formato Markdown'
     )
@@ -502,6 +568,45 @@ class TechSpecDocument(TimestampedModel):
         default=0,
         help_text='Numero de palavras no documento'
     )
+    stats = models.JSONField(
+        'estatisticas',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Palavras, titulos, sumario de secoes e tempo de leitura'
+    )
+    content_hash = models.CharField(
+        'hash do conteudo',
+        max_length=64,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        help_text='SHA-256 do conteudo, usado como chave do cache de diffs'
+    )
+    storage_mode = models.CharField(
+        'modo de armazenamento',
+        max_length=10,
+        choices=STORAGE_MODE_CHOICES,
+        default=STORAGE_FULL,
+        editable=False,
+        help_text='Completo ou delta em relacao a versao anterior'
+    )
+    delta = models.JSONField(
+        'delta',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Operacoes para reconstruir o conteudo a partir da versao anterior'
+    )
+    delta_depth = models.PositiveSmallIntegerField(
+        'profundidade do delta',
+        default=0,
+        editable=False,
+        help_text='Numero de deltas desde o ultimo snapshot completo'
+    )
+
+    objects = SummaryQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Especificacao Tecnica'
@@ -533,9 +638,13 @@ class TechSpecDocument(TimestampedModel):
         })
 
     def save(self, *args, **kwargs):
-        """Override save to auto-calculate word count."""
-        if self.content:
-            self.word_count = len(self.content.split())
+        """Override save to keep storage, content hash and statistics in sync."""
+        update_fields = kwargs.get('update_fields')
+        content_hash = saved_content_hash(self, update_fields)
+        update_fields = prepare_save(self, update_fields, content_hash)
+        update_fields = update_document_stats(self, update_fields, content_hash)
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
 
     def compare_versions(self, other_version):
@@ -543,7 +652,8 @@ class TechSpecDocument(TimestampedModel):
         Compare this Tech Spec version with another version.
 
         Generates a unified diff between the two versions showing
-        additions, deletions, and changes.
+        additions, deletions, and changes. Use ``iter_diff`` to stream
+        the diff of large documents instead.
 
         Args:
             other_version: Another TechSpecDocument instance to compare with.
@@ -554,6 +664,7 @@ class TechSpecDocument(TimestampedModel):
                 - additions: Number of lines added
                 - deletions: Number of lines removed
                 - similarity_ratio: Percentage of similarity (0-100)
+                - approximate: Whether the diff budget forced a coarse diff
 
         Raises:
             ValueError: If other_version is not a TechSpecDocument instance
@@ -565,35 +676,25 @@ class TechSpecDocument(TimestampedModel):
         if other_version.problem_id != self.problem_id:
             raise ValueError("Cannot compare Tech Specs from different problems")
 
-        # Split content into lines for comparison
-        self_lines = self.content.splitlines(keepends=True)
-        other_lines = other_version.content.splitlines(keepends=True)
+        return get_document_diff(self, other_version)
 
-        # Generate unified diff
-        diff = list(difflib.unified_diff(
-            other_lines,
-            self_lines,
+    def iter_diff(self, other_version, context=3):
+        """
+        Stream the unified diff against another Tech Spec version.
+
+        Args:
+            other_version: Another TechSpecDocument instance to compare with.
+            context: Number of context lines around each change.
+
+        Yields:
+            str: Unified diff lines, computed lazily.
+        """
+        diff = LineDiff(other_version.content, self.content)
+        yield from diff.iter_unified_diff(
             fromfile=f'v{other_version.version}',
             tofile=f'v{self.version}',
-            lineterm=''
-        ))
-
-        # Count additions and deletions
-        additions = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
-        deletions = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
-
-        # Calculate similarity ratio
-        matcher = difflib.SequenceMatcher(None, self.content, other_version.content)
-        similarity_ratio = round(matcher.ratio() * 100, 2)
-
-        return {
-            'diff_lines': diff,
-            'additions': additions,
-            'deletions': deletions,
-            'similarity_ratio': similarity_ratio,
-            'from_version': other_version.version,
-            'to_version': self.version,
-        }
+            n=context,
+        )
 
     def get_diff_from_parent(self):
         """
@@ -618,7 +719,10 @@ class TechSpecDocument(TimestampedModel):
         self.status = 'approved'
         self.approved_at = timezone.now()
         self.approved_by = user
-        self.save(update_fields=['is_approved', 'status', 'approved_at', 'approved_by', 'updated_at'])
+        save_with_event(
+            self, ['is_approved', 'status', 'approved_at', 'approved_by', 'updated_at'],
+            'approved', {'version': self.version, 'approved_by_id': user.pk if user else None},
+        )
 
     def request_revision(self, notes=''):
         """
@@ -649,8 +753,11 @@ class TechSpecDocument(TimestampedModel):
         """
         Create a new version of the Tech Spec for a problem.
 
-        Automatically increments the version number and links to
-        the previous version if one exists.
+        Allocates the next version number atomically (safe under
+        concurrent writers) and links to the previous version if one
+        exists. The diff against the previous
+        version is precomputed and, with delta storage enabled, the
+        previous version is compacted in the background.
 
         Args:
             problem: The Problem instance.
@@ -662,25 +769,19 @@ class TechSpecDocument(TimestampedModel):
         Returns:
             TechSpecDocument: The newly created Tech Spec document.
         """
-        # Get the latest version for this problem
-        latest = cls.objects.filter(problem=problem).order_by('-version').first()
-
-        new_version = 1
-        parent = None
-        if latest:
-            new_version = latest.version + 1
-            parent = latest
-
-        return cls.objects.create(
-            problem=problem,
+        document, parent_id = create_document_version(
+            cls,
+            problem,
             prd_document=prd_document,
-            version=new_version,
             content=content,
             created_by=created_by,
-            parent_version=parent,
             change_notes=change_notes,
             status='pending_review'
         )
+        if parent_id:
+            schedule_diff_precompute(document)
+            schedule_compaction(cls, parent_id)
+        return document
 
     @classmethod
     def get_latest_for_problem(cls, problem):
@@ -710,3 +811,120 @@ class TechSpecDocument(TimestampedModel):
             problem=problem,
             is_approved=True
         ).order_by('-version').first()
+
+
+class DocumentDiffCache(models.Model):
+    """
+    Database fallback of the document diff cache.
+
+    Keyed by the content hashes of both versions, so a comparison is
+    computed once however many versions share the same contents. Rows are
+    evicted least-recently-used first once DOCUMENT_DIFF_CACHE_MAX_ENTRIES
+    is exceeded.
+
+    Attributes:
+        from_hash: Content hash of the old version
+        to_hash: Content hash of the new version
+        result: Diff body lines and statistics
+        size: Approximate size of the result, in characters
+        created_at: When the diff was computed
+        last_used_at: Last time the diff was read (LRU order)
+    """
+
+    from_hash = models.CharField(
+        'hash de origem',
+        max_length=64,
+        help_text='Hash do conteudo da versao anterior'
+    )
+    to_hash = models.CharField(
+        'hash de destino',
+        max_length=64,
+        help_text='Hash do conteudo da versao nova'
+    )
+    result = models.JSONField(
+        'resultado',
+        default=dict,
+        help_text='Linhas do diff e estatisticas calculadas'
+    )
+    size = models.PositiveIntegerField(
+        'tamanho',
+        default=0,
+        help_text='Tamanho aproximado do resultado em caracteres'
+    )
+    created_at = models.DateTimeField(
+        'criado em',
+        auto_now_add=True,
+        help_text='Data e hora do calculo do diff'
+    )
+    last_used_at = models.DateTimeField(
+        'ultimo uso em',
+        db_index=True,
+        help_text='Ultima leitura do diff, usada na remocao LRU'
+    )
+
+    class Meta:
+        verbose_name = 'Cache de Diff'
+        verbose_name_plural = 'Cache de Diffs'
+        db_table = 'documents_diff_cache'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['from_hash', 'to_hash'],
+                name='unique_diff_cache_hashes'
+            )
+        ]
+
+    def __str__(self):
+        return f'Diff {self.from_hash[:8]}..{self.to_hash[:8]}'
+
+
+class DocumentVersionCounter(models.Model):
+    """
+    Per-problem version counter of a document chain.
+
+    Incremented atomically by apps.documents.versioning when a new
+    version is created; the row lock serializes concurrent writers.
+
+    Attributes:
+        problem: The problem the chain belongs to
+        document_type: Model name of the document ('prddocument', 'techspecdocument')
+        last_version: Last allocated version number
+        last_document_id: Primary key of the latest version
+    """
+
+    problem = models.ForeignKey(
+        Problem,
+        on_delete=models.CASCADE,
+        related_name='document_version_counters',
+        verbose_name='problema',
+        help_text='Problema ao qual a cadeia de versoes pertence'
+    )
+    document_type = models.CharField(
+        'tipo de documento',
+        max_length=30,
+        help_text='Nome do modelo do documento'
+    )
+    last_version = models.PositiveIntegerField(
+        'ultima versao',
+        default=0,
+        help_text='Ultimo numero de versao alocado'
+    )
+    last_document_id = models.UUIDField(
+        'ultimo documento',
+        null=True,
+        blank=True,
+        help_text='ID da versao mais recente da cadeia'
+    )
+
+    class Meta:
+        verbose_name = 'Contador de Versoes'
+        verbose_name_plural = 'Contadores de Versoes'
+        db_table = 'documents_version_counter'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['problem', 'document_type'],
+                name='unique_version_counter_per_problem'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.document_type} v{self.last_version} - {self.problem_id}'
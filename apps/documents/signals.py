@@ -0,0 +1,22 @@
+"""
+Signal handlers for the documents app.
+"""
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from apps.documents.models import PRDDocument, TechSpecDocument
+from apps.documents.storage import materialize_children
+from apps.documents.versioning import release_document
+
+
+@receiver(pre_delete, sender=PRDDocument)
+@receiver(pre_delete, sender=TechSpecDocument)
+def document_pre_delete(sender, instance, **kwargs):
+    """
+    Detach a version from its chain before it is deleted.
+
+    Delta children are stored in full, since their deltas are relative
+    to the deleted content, and the version counter stops pointing at it.
+    """
+    materialize_children(instance)
+    release_document(instance)
@@ -0,0 +1,107 @@
+"""
+Statistics of document versions.
+
+Word count, headings, section outline and reading time are computed in
+a single streaming pass over the Markdown content (no intermediate list
+of words or lines) and stored in the compact ``stats`` JSON column, so
+list views can show them without loading ``content``.
+
+Statistics are only recomputed when the content actually changes: saves
+restricted to other fields (``approve()``, ``reject()``...) or with the
+content deferred skip them entirely, and full saves compare the content
+hash first. The hash is computed once per save (see
+``apps.documents.storage.saved_content_hash``).
+"""
+import math
+import re
+
+from django.conf import settings
+
+
+WORD_RE = re.compile(r'\S+')
+
+# ATX headings and code fences; headings inside fenced blocks are ignored
+BLOCK_RE = re.compile(
+    r'^[ ]{0,3}(?:(?P<fence>```|~~~)|(?P<level>#{1,6})[ \t]+(?P<title>.*?)[ \t#]*)$',
+    re.MULTILINE,
+)
+
+MAX_HEADING_LENGTH = 120
+
+
+def count_words(text):
+    """
+    Count whitespace-separated words without building a list.
+
+    Matches ``len(text.split())``.
+    """
+    return sum(1 for _ in WORD_RE.finditer(text or ''))
+
+
+def compute_document_stats(content):
+    """
+    Compute the statistics of a document content.
+
+    Args:
+        content: Markdown content.
+
+    Returns:
+        dict: ``words``, ``headings`` (total count), ``outline`` (list of
+            ``[level, title]``, capped at DOCUMENT_OUTLINE_MAX_ITEMS) and
+            ``reading_minutes``.
+    """
+    content = content or ''
+    words = count_words(content)
+
+    outline = []
+    headings = 0
+    fence = None
+    for match in BLOCK_RE.finditer(content):
+        marker = match.group('fence')
+        if marker:
+            if fence is None:
+                fence = marker
+            elif fence == marker:
+                fence = None
+            continue
+        if fence is not None or not match.group('title'):
+            continue
+        headings += 1
+        if len(outline) < settings.DOCUMENT_OUTLINE_MAX_ITEMS:
+            outline.append([len(match.group('level')), match.group('title')[:MAX_HEADING_LENGTH]])
+
+    return {
+        'words': words,
+        'headings': headings,
+        'outline': outline,
+        'reading_minutes': math.ceil(words / settings.DOCUMENT_READING_WORDS_PER_MINUTE),
+    }
+
+
+def update_document_stats(document, update_fields, content_hash):
+    """
+    Refresh the content hash and statistics of a document being saved.
+
+    Called from the document ``save()`` after prepare_save.
+
+    Args:
+        document: The PRDDocument or TechSpecDocument being saved.
+        update_fields: The ``update_fields`` passed to ``save()``.
+        content_hash: The value of saved_content_hash (None when the
+            content is not saved).
+
+    Returns:
+        The ``update_fields`` to use.
+    """
+    if content_hash is None:
+        return update_fields
+    if not document._state.adding and content_hash == document.content_hash and document.stats:
+        return update_fields
+
+    stats = compute_document_stats(document.content)
+    document.content_hash = content_hash
+    document.stats = stats
+    document.word_count = stats['words']
+    if update_fields is not None:
+        update_fields = list(update_fields) + ['content_hash', 'stats', 'word_count']
+    return update_fields
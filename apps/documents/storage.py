@@ -0,0 +1,397 @@
+"""
+Delta-compressed storage for document version chains.
+
+When ``DOCUMENT_DELTA_STORAGE`` is enabled, a version stops being stored
+in full once a newer version is created. It is rewritten as a forward
+delta against its ``parent_version``. Every
+``DOCUMENT_DELTA_SNAPSHOT_INTERVAL`` versions a full snapshot is kept,
+so reconstructing any version walks at most that many rows.
+
+- The latest version of a problem is always stored in full, so reading it
+  costs nothing extra.
+- Compacted rows keep an empty ``content`` column. The DeltaContentField
+  descriptor rebuilds the text on first access, so ``document.content``
+  stays transparent. Queries that bypass model instances
+  (``values()``, ``content__icontains``) only see full rows.
+- Reconstructed texts are kept in a process-wide LRU cache keyed by
+  content hash. Versions are immutable, so entries never go stale.
+
+A delta is a JSON list of operations applied to the parent's lines:
+``['=', n]`` copies n lines, ``['-', n]`` skips n lines and
+``['+', text]`` inserts text.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.query_utils import DeferredAttribute
+
+from apps.documents.diff import LineDiff
+
+
+logger = logging.getLogger(__name__)
+
+STORAGE_FULL = 'full'
+STORAGE_DELTA = 'delta'
+
+STORAGE_MODE_CHOICES = [
+    (STORAGE_FULL, 'Completo'),
+    (STORAGE_DELTA, 'Delta'),
+]
+
+
+class ReconstructedTextCache:
+    """
+    Thread-safe LRU cache of reconstructed document texts.
+
+    Attributes:
+        maxsize: Maximum number of texts kept
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached text (marking it as recently used) or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a text, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+_text_cache = None
+
+
+def get_text_cache():
+    """Return the reconstructed text cache of the current process."""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = ReconstructedTextCache(settings.DOCUMENT_DELTA_CACHE_SIZE)
+    return _text_cache
+
+
+class DeltaContentDescriptor(DeferredAttribute):
+    """
+    Rebuilds the content of delta-stored versions on first access.
+
+    Defines ``__set__`` so it is a data descriptor and takes precedence
+    over the value Django stores in the instance ``__dict__``.
+    """
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if instance is None or value:
+            return value
+        if instance.storage_mode == STORAGE_DELTA:
+            value = reconstruct_content(instance)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class DeltaContentField(models.TextField):
+    """
+    TextField whose value may be stored as a delta against the parent.
+
+    Behaves like a TextField in the database; only attribute access on
+    model instances is changed (see DeltaContentDescriptor).
+    """
+
+    descriptor_class = DeltaContentDescriptor
+
+
+def make_delta(base_text, text):
+    """
+    Encode ``text`` as a delta against ``base_text``.
+
+    Args:
+        base_text: Content of the parent version.
+        text: Content of the version to encode.
+
+    Returns:
+        list: Delta operations (see module docstring).
+    """
+    diff = LineDiff(base_text, text, timeout=0, max_lines=float('inf'))
+    delta = []
+    for tag, i1, i2, j1, j2 in diff.iter_opcodes():
+        if tag == 'equal':
+            delta.append(['=', i2 - i1])
+            continue
+        if i2 > i1:
+            delta.append(['-', i2 - i1])
+        if j2 > j1:
+            delta.append(['+', ''.join(diff.new_lines[j1:j2])])
+    return delta
+
+
+def apply_delta(base_text, delta):
+    """
+    Rebuild a text from its parent and a delta.
+
+    Args:
+        base_text: Content of the parent version.
+        delta: Operations returned by make_delta.
+
+    Returns:
+        str: The rebuilt text.
+
+    Raises:
+        ValueError: If the delta does not match the parent.
+    """
+    lines = base_text.splitlines(keepends=True)
+    position = 0
+    parts = []
+    for op, value in delta:
+        if op == '=':
+            if position + value > len(lines):
+                raise ValueError('Delta does not match the parent version')
+            parts.extend(lines[position:position + value])
+            position += value
+        elif op == '-':
+            position += value
+        elif op == '+':
+            parts.append(value)
+        else:
+            raise ValueError(f'Unknown delta operation: {op}')
+    if position != len(lines):
+        raise ValueError('Delta does not match the parent version')
+    return ''.join(parts)
+
+
+def _load_fields():
+    return ('pk', 'parent_version_id', 'storage_mode', 'delta', 'content', 'content_hash')
+
+
+def reconstruct_content(document):
+    """
+    Return the full content of a document version.
+
+    Walks ``parent_version`` up to the nearest full row or cached text,
+    then applies the deltas forward. Every rebuilt text on the way is
+    cached.
+
+    Args:
+        document: A PRDDocument or TechSpecDocument instance.
+
+    Returns:
+        str: The content of the version.
+
+    Raises:
+        ValueError: If the chain is broken or the result does not match
+            the stored content hash.
+    """
+    from apps.documents.models import compute_content_hash
+
+    text_cache = get_text_cache()
+    cached = text_cache.get(document.content_hash)
+    if cached is not None:
+        return cached
+
+    model = type(document)
+    chain = []
+    if 'delta' in document.__dict__ and 'parent_version_id' in document.__dict__:
+        current = document
+    else:
+        current = model.objects.only(*_load_fields()).get(pk=document.pk)
+    base_text = None
+    while True:
+        if current.storage_mode != STORAGE_DELTA:
+            base_text = current.__dict__['content']
+            break
+        cached = text_cache.get(current.content_hash)
+        if cached is not None:
+            base_text = cached
+            break
+        chain.append(current)
+        if current.parent_version_id is None:
+            raise ValueError(f'Delta chain of {model.__name__} {document.pk} is broken')
+        current = model.objects.only(*_load_fields()).get(pk=current.parent_version_id)
+
+    text = base_text
+    for version in reversed(chain):
+        text = apply_delta(text, version.delta)
+        if compute_content_hash(text) != version.content_hash:
+            raise ValueError(f'Content hash mismatch rebuilding {model.__name__} {version.pk}')
+        text_cache.put(version.content_hash, text)
+    return text
+
+
+def compact_version(document):
+    """
+    Store a non-latest version as a delta against its parent.
+
+    The version stays full when it is a snapshot point of the chain,
+    when it has no parent, or when the delta would not save at least
+    ``1 - DOCUMENT_DELTA_MAX_RATIO`` of the space.
+
+    Args:
+        document: A PRDDocument or TechSpecDocument instance.
+
+    Returns:
+        bool: True if the version was compacted.
+    """
+    if document.storage_mode == STORAGE_DELTA or document.parent_version_id is None:
+        return False
+    if not document.child_versions.exists():
+        # Never compact the latest version
+        return False
+
+    model = type(document)
+    parent = model.objects.only(
+        *_load_fields(), 'delta_depth'
+    ).get(pk=document.parent_version_id)
+    depth = parent.delta_depth + 1 if parent.storage_mode == STORAGE_DELTA else 1
+    if depth >= settings.DOCUMENT_DELTA_SNAPSHOT_INTERVAL:
+        return False
+
+    content = document.content
+    delta = make_delta(parent.content, content)
+    if len(json.dumps(delta)) > len(content) * settings.DOCUMENT_DELTA_MAX_RATIO:
+        return False
+
+    with transaction.atomic():
+        updated = model.objects.filter(
+            pk=document.pk, storage_mode=STORAGE_FULL, content_hash=document.content_hash
+        ).update(content='', delta=delta, storage_mode=STORAGE_DELTA, delta_depth=depth)
+    if updated:
+        get_text_cache().put(document.content_hash, content)
+        logger.debug(f'Compacted {model.__name__} {document.pk} (depth {depth})')
+    return bool(updated)
+
+
+def materialize_version(document):
+    """
+    Store a delta version in full again.
+
+    Args:
+        document: A PRDDocument or TechSpecDocument instance.
+    """
+    if document.storage_mode != STORAGE_DELTA:
+        return
+    content = reconstruct_content(document)
+    type(document).objects.filter(pk=document.pk).update(
+        content=content, delta=None, storage_mode=STORAGE_FULL, delta_depth=0
+    )
+    document.__dict__['content'] = content
+    document.storage_mode = STORAGE_FULL
+    document.delta = None
+    document.delta_depth = 0
+
+
+def materialize_children(document):
+    """
+    Store in full every delta child of a version.
+
+    Called before a version is deleted or its content changes, since
+    the deltas of its children are relative to its current content.
+    """
+    for child in document.child_versions.filter(storage_mode=STORAGE_DELTA):
+        materialize_version(child)
+
+
+def saved_content_hash(document, update_fields):
+    """
+    Return the hash of the content a save will write.
+
+    Computed once per save and shared by prepare_save and
+    update_document_stats.
+
+    Args:
+        document: The document being saved.
+        update_fields: The ``update_fields`` passed to ``save()``.
+
+    Returns:
+        str or None: The hash, or None when the content is not saved
+            (excluded from ``update_fields`` or deferred).
+    """
+    from apps.documents.models import compute_content_hash
+
+    if update_fields is not None and 'content' not in update_fields:
+        return None
+    if 'content' in document.get_deferred_fields():
+        # Not loaded, so not saved either
+        return None
+    return compute_content_hash(document.content)
+
+
+def prepare_save(document, update_fields, content_hash):
+    """
+    Keep the storage of a version consistent on save.
+
+    Called from the document ``save()`` before update_document_stats.
+
+    - A delta version whose content is unchanged keeps its empty column.
+    - A delta version whose content was edited is stored in full.
+    - If the content of a version changes, its delta children are stored
+      in full first.
+
+    Args:
+        document: The document being saved.
+        update_fields: The ``update_fields`` passed to ``save()``.
+        content_hash: The value of saved_content_hash.
+
+    Returns:
+        The ``update_fields`` to use.
+    """
+    if document._state.adding or content_hash is None:
+        return update_fields
+
+    if content_hash == document.content_hash:
+        if document.storage_mode == STORAGE_DELTA:
+            fields = update_fields or [
+                field.name for field in document._meta.concrete_fields
+                if not field.primary_key
+            ]
+            return [name for name in fields if name != 'content']
+        return update_fields
+
+    materialize_children(document)
+    if document.storage_mode == STORAGE_DELTA:
+        document.storage_mode = STORAGE_FULL
+        document.delta = None
+        document.delta_depth = 0
+        if update_fields is not None:
+            update_fields = list(update_fields) + ['storage_mode', 'delta', 'delta_depth']
+    return update_fields
+
+
+def schedule_compaction(model, document_id):
+    """
+    Compact a version in the background once the transaction commits.
+
+    Does nothing unless DOCUMENT_DELTA_STORAGE is enabled.
+
+    Args:
+        model: PRDDocument or TechSpecDocument.
+        document_id: Primary key of the version that just stopped being
+            the latest.
+    """
+    if not settings.DOCUMENT_DELTA_STORAGE:
+        return
+
+    from apps.documents.tasks import compact_document_version
+
+    label = model._meta.label
+    document_id = str(document_id)
+    transaction.on_commit(lambda: compact_document_version.delay(label, document_id))
@@ -0,0 +1,52 @@
+"""
+Celery tasks for the documents app.
+"""
+import logging
+
+from celery import shared_task
+from django.apps import apps
+
+from apps.documents.diff_cache import get_document_diff
+from apps.documents.storage import compact_version
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def precompute_document_diff(model_label, document_id):
+    """
+    Compute and cache the diff between a document version and its parent.
+
+    Args:
+        model_label: Model label, e.g. 'documents.PRDDocument'.
+        document_id: Primary key of the document version.
+    """
+    model = apps.get_model(model_label)
+    try:
+        document = model.objects.select_related('parent_version').get(pk=document_id)
+    except model.DoesNotExist:
+        logger.warning(f'{model_label} {document_id} not found, skipping diff precompute')
+        return
+
+    if document.parent_version is None:
+        return
+    get_document_diff(document, document.parent_version)
+
+
+@shared_task(ignore_result=True)
+def compact_document_version(model_label, document_id):
+    """
+    Store a document version as a delta against its parent.
+
+    Args:
+        model_label: Model label, e.g. 'documents.PRDDocument'.
+        document_id: Primary key of the document version.
+    """
+    model = apps.get_model(model_label)
+    try:
+        document = model.objects.get(pk=document_id)
+    except model.DoesNotExist:
+        logger.warning(f'{model_label} {document_id} not found, skipping compaction')
+        return
+    compact_version(document)
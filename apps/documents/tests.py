@@ -1,3 +1,450 @@
-from django.test import TestCase
+import difflib
+import random
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.documents import diff_cache
+from apps.documents.diff import LineDiff
+from apps.documents.models import (
+    DocumentDiffCache,
+    DocumentVersionCounter,
+    PRDDocument,
+    compute_content_hash,
+)
+from apps.documents.storage import (
+    STORAGE_DELTA,
+    STORAGE_FULL,
+    apply_delta,
+    compact_version,
+    get_text_cache,
+    make_delta,
+)
+from apps.documents.tasks import precompute_document_diff
+from apps.documents.versioning import allocate_version
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_problem(slug='acme'):
+    organization = Organization.objects.create(name=slug.title(), slug=slug)
+    return Problem.objects.create(organization=organization, title='Problema', description='Descricao')
+
+
+def random_text(rng, lines, vocabulary=8):
+    # A small vocabulary produces repeated lines, which exercises the
+    # Myers fallback as well as the unique-line anchors
+    return ''.join(f'linha {rng.randrange(vocabulary)}\n' for _ in range(lines))
+
+
+def mutate(rng, text, edits=5):
+    lines = text.splitlines(keepends=True)
+    for _ in range(edits):
+        position = rng.randrange(len(lines) + 1)
+        action = rng.choice(('insert', 'delete', 'replace'))
+        if action == 'insert' or not lines or position == len(lines):
+            lines.insert(position, f'nova {rng.randrange(1000)}\n')
+        elif action == 'delete':
+            del lines[position]
+        else:
+            lines[position] = f'alterada {rng.randrange(1000)}\n'
+    return ''.join(lines)
+
+
+class LineDiffTests(SimpleTestCase):
+    """The opcodes must always rebuild the new text from the old one."""
+
+    def rebuild(self, diff):
+        lines = []
+        expected_i = expected_j = 0
+        for tag, i1, i2, j1, j2 in diff.iter_opcodes():
+            # Opcodes are contiguous and cover both texts
+            self.assertEqual((i1, j1), (expected_i, expected_j))
+            if tag == 'equal':
+                self.assertEqual(diff.old_lines[i1:i2], diff.new_lines[j1:j2])
+                lines.extend(diff.old_lines[i1:i2])
+            else:
+                lines.extend(diff.new_lines[j1:j2])
+            expected_i, expected_j = i2, j2
+        self.assertEqual((expected_i, expected_j), (len(diff.old_lines), len(diff.new_lines)))
+        return ''.join(lines)
+
+    def test_random_round_trips(self):
+        rng = random.Random(1234)
+        for _ in range(200):
+            old = random_text(rng, rng.randrange(0, 60))
+            new = mutate(rng, old, edits=rng.randrange(0, 8)) if rng.random() < 0.8 else random_text(rng, 30)
+
+            diff = LineDiff(old, new, timeout=0, max_lines=float('inf'))
+
+            self.assertEqual(self.rebuild(diff), new)
+            self.assertFalse(diff.approximate)
+
+    def test_stats_match_difflib_on_unique_lines(self):
+        old = ''.join(f'linha {index}\n' for index in range(50))
+        new = old.replace('linha 10\n', 'linha dez\n').replace('linha 40\n', '')
+
+        stats = LineDiff(old, new, timeout=0).stats()
+
+        matcher = difflib.SequenceMatcher(None, old.splitlines(True), new.splitlines(True))
+        deletions = sum(i2 - i1 for tag, i1, i2, _, _ in matcher.get_opcodes() if tag != 'equal')
+        additions = sum(j2 - j1 for tag, _, _, j1, j2 in matcher.get_opcodes() if tag != 'equal')
+        self.assertEqual((stats['additions'], stats['deletions']), (additions, deletions))
+        self.assertFalse(stats['approximate'])
+
+    def test_unified_diff_matches_difflib(self):
+        old = ''.join(f'linha {index}\n' for index in range(30))
+        new = old.replace('linha 5\n', 'linha cinco\n').replace('linha 20\n', 'linha 20\nextra\n')
+
+        ours = list(LineDiff(old, new, timeout=0).iter_unified_diff('v1', 'v2'))
+
+        expected = list(difflib.unified_diff(
+            old.splitlines(True), new.splitlines(True), 'v1', 'v2', lineterm=''
+        ))
+        self.assertEqual(ours, expected)
+
+    def test_line_budget_gives_coarse_but_correct_diff(self):
+        rng = random.Random(99)
+        old = random_text(rng, 40)
+        new = mutate(rng, old, edits=6)
+
+        diff = LineDiff(old, new, timeout=0, max_lines=10)
+
+        self.assertEqual(self.rebuild(diff), new)
+        self.assertTrue(diff.approximate)
+        self.assertTrue(diff.stats()['approximate'])
+
+    def test_opcodes_are_reused(self):
+        diff = LineDiff('a\nb\n', 'a\nc\n', timeout=0)
+
+        first = list(diff.iter_opcodes())
+
+        with mock.patch.object(LineDiff, '_compute', side_effect=AssertionError):
+            self.assertEqual(list(diff.iter_opcodes()), first)
+
+
+class DeltaTests(SimpleTestCase):
+    """Delta encoding of document versions."""
+
+    def test_random_round_trips(self):
+        rng = random.Random(4321)
+        for _ in range(100):
+            base = random_text(rng, rng.randrange(0, 50))
+            text = mutate(rng, base, edits=rng.randrange(0, 6))
+            if rng.random() < 0.2:
+                # Missing final newline
+                text = text.rstrip('\n')
+
+            self.assertEqual(apply_delta(base, make_delta(base, text)), text)
+
+    def test_wrong_parent_is_rejected(self):
+        delta = make_delta('a\nb\nc\n', 'a\nc\n')
+
+        with self.assertRaises(ValueError):
+            apply_delta('a\n', delta)
+        with self.assertRaises(ValueError):
+            apply_delta('a\nb\nc\nd\n', delta)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DiffCacheTests(TestCase):
+    """Version comparisons are cached by content hash in two tiers."""
+
+    def setUp(self):
+        cache.clear()
+        self.problem = create_problem()
+        self.old = PRDDocument.objects.create(problem=self.problem, version=1, content='a\nb\nc\n')
+        self.new = PRDDocument.objects.create(problem=self.problem, version=2, content='a\nB\nc\nd\n')
+        self.compute = self.enterContext(
+            mock.patch('apps.documents.diff_cache.compute_diff_result', wraps=diff_cache.compute_diff_result)
+        )
+
+    def test_compare_is_computed_once(self):
+        first = self.new.compare_versions(self.old)
+        second = self.new.compare_versions(self.old)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual(first['diff_lines'][:2], ['--- v1', '+++ v2'])
+        self.assertEqual((first['additions'], first['deletions']), (2, 1))
+        self.assertEqual(DocumentDiffCache.objects.count(), 1)
+
+    def test_equal_contents_share_the_entry(self):
+        other_problem = create_problem('other')
+        old = PRDDocument.objects.create(problem=other_problem, version=7, content=self.old.content)
+        new = PRDDocument.objects.create(problem=other_problem, version=8, content=self.new.content)
+        self.new.compare_versions(self.old)
+
+        result = new.compare_versions(old)
+
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual(result['diff_lines'][:2], ['--- v7', '+++ v8'])
+
+    def test_database_tier_survives_a_cache_flush(self):
+        expected = self.new.compare_versions(self.old)
+        cache.clear()
+
+        self.assertEqual(self.new.compare_versions(self.old), expected)
+        self.assertEqual(self.compute.call_count, 1)
+        key = diff_cache.diff_cache_key(self.old.content_hash, self.new.content_hash)
+        self.assertIsNotNone(cache.get(key))
+
+    def test_cache_errors_fall_back_to_the_database(self):
+        expected = self.new.compare_versions(self.old)
+
+        with mock.patch.object(cache, 'get', side_effect=ConnectionError('redis fora')):
+            self.assertEqual(self.new.compare_versions(self.old), expected)
+
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_eviction_keeps_the_most_recently_used(self):
+        for index in range(4):
+            diff_cache.store_diff(f'de{index}', f'para{index}', {'hunks': [], 'additions': 0})
+            DocumentDiffCache.objects.filter(from_hash=f'de{index}').update(
+                last_used_at=timezone.now() - timedelta(hours=10 - index)
+            )
+
+        self.assertEqual(diff_cache.evict_diff_cache(max_entries=2), 2)
+
+        self.assertEqual(
+            sorted(DocumentDiffCache.objects.values_list('from_hash', flat=True)), ['de2', 'de3']
+        )
+
+    def test_new_version_precomputes_the_parent_diff(self):
+        with (
+            mock.patch('apps.documents.tasks.precompute_document_diff.delay') as delay,
+            mock.patch('apps.documents.models.schedule_compaction'),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            document = PRDDocument.create_new_version(self.problem, 'a\nb\nnovo\n')
+
+        delay.assert_called_once_with('documents.PRDDocument', str(document.pk))
+        precompute_document_diff(*delay.call_args.args)
+
+        self.assertTrue(DocumentDiffCache.objects.filter(
+            from_hash=self.new.content_hash, to_hash=document.content_hash
+        ).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DOCUMENT_DELTA_SNAPSHOT_INTERVAL=3)
+class DeltaStorageTests(TestCase):
+    """Older versions are stored as deltas and rebuilt transparently."""
+
+    def setUp(self):
+        get_text_cache().clear()
+        self.addCleanup(get_text_cache().clear)
+        self.problem = create_problem()
+        lines = [f'linha {index}\n' for index in range(40)]
+        self.versions = []
+        parent = None
+        for version in range(1, 5):
+            lines[version] = f'versao {version}\n'
+            parent = PRDDocument.objects.create(
+                problem=self.problem, version=version, content=''.join(lines), parent_version=parent
+            )
+            self.versions.append(parent)
+
+    def load(self, document):
+        get_text_cache().clear()
+        return PRDDocument.objects.get(pk=document.pk)
+
+    def stored(self, document):
+        return PRDDocument.objects.filter(pk=document.pk).values_list('storage_mode', 'content').get()
+
+    def test_compacted_version_is_rebuilt_on_access(self):
+        _, second, third, _ = self.versions
+
+        self.assertTrue(compact_version(second))
+        self.assertTrue(compact_version(third))
+
+        self.assertEqual(self.stored(third), (STORAGE_DELTA, ''))
+        self.assertEqual(self.load(third).content, third.content)
+        self.assertEqual(self.load(second).content, second.content)
+        self.assertEqual(self.load(third).delta_depth, 2)
+
+    def test_first_latest_and_snapshot_versions_stay_full(self):
+        first, second, third, latest = self.versions
+
+        self.assertFalse(compact_version(first))
+        self.assertFalse(compact_version(latest))
+        with self.settings(DOCUMENT_DELTA_SNAPSHOT_INTERVAL=2):
+            self.assertTrue(compact_version(second))
+            self.assertFalse(compact_version(self.load(third)))
+
+        self.assertEqual(self.stored(third)[0], STORAGE_FULL)
+
+    def test_editing_a_version_materializes_its_delta_children(self):
+        _, second, third, _ = self.versions
+        compact_version(third)
+        second = self.load(second)
+
+        second.content = 'reescrita\n'
+        second.save()
+
+        self.assertEqual(self.stored(third), (STORAGE_FULL, third.content))
+
+    def test_editing_a_delta_version_stores_it_in_full(self):
+        _, second, _, _ = self.versions
+        compact_version(second)
+        second = self.load(second)
+
+        second.content = 'editada\n'
+        second.save(update_fields=['content', 'updated_at'])
+
+        self.assertEqual(self.stored(second), (STORAGE_FULL, 'editada\n'))
+        self.assertIsNone(self.load(second).delta)
+
+    def test_saving_an_unchanged_delta_version_keeps_the_delta(self):
+        _, second, _, _ = self.versions
+        compact_version(second)
+        second = self.load(second)
+        self.assertEqual(second.content, self.versions[1].content)
+
+        second.change_notes = 'notas'
+        second.save()
+
+        self.assertEqual(self.stored(second), (STORAGE_DELTA, ''))
+
+    @override_settings(DOCUMENT_DELTA_STORAGE=True)
+    def test_new_version_schedules_the_parent_compaction(self):
+        with (
+            mock.patch('apps.documents.tasks.compact_document_version.delay') as delay,
+            mock.patch('apps.documents.models.schedule_diff_precompute'),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            PRDDocument.create_new_version(self.problem, 'nova\n')
+
+        delay.assert_called_once_with('documents.PRDDocument', str(self.versions[-1].pk))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VersionAllocationTests(TestCase):
+    """Version numbers of document chains."""
+
+    def setUp(self):
+        self.problem = create_problem()
+
+    def test_versions_are_sequential_and_chained(self):
+        first = PRDDocument.create_new_version(self.problem, '# v1\n')
+        second = PRDDocument.create_new_version(self.problem, '# v2\n')
+        third = PRDDocument.create_new_version(self.problem, '# v3\n')
+
+        self.assertEqual([first.version, second.version, third.version], [1, 2, 3])
+        self.assertIsNone(first.parent_version_id)
+        self.assertEqual(second.parent_version_id, first.pk)
+        self.assertEqual(third.parent_version_id, second.pk)
+        counter = DocumentVersionCounter.objects.get(problem=self.problem, document_type='prddocument')
+        self.assertEqual((counter.last_version, counter.last_document_id), (3, third.pk))
+
+    def test_counter_is_initialized_from_existing_documents(self):
+        legacy = PRDDocument.objects.create(problem=self.problem, version=4, content='# v4\n')
+
+        document = PRDDocument.create_new_version(self.problem, '# v5\n')
+
+        self.assertEqual(document.version, 5)
+        self.assertEqual(document.parent_version_id, legacy.pk)
+
+    def test_counter_created_concurrently(self):
+        concurrent_document_id = uuid.uuid4()
+        update = QuerySet.update
+        calls = []
+
+        def update_before_other_writer(queryset, **values):
+            calls.append(queryset.model)
+            if len(calls) > 1:
+                return update(queryset, **values)
+            # Our UPDATE finds no counter, then another writer creates it
+            # (having taken versions 1 to 3) before our INSERT runs
+            DocumentVersionCounter.objects.create(
+                problem_id=self.problem.pk,
+                document_type='prddocument',
+                last_version=3,
+                last_document_id=concurrent_document_id,
+            )
+            return 0
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_before_other_writer):
+            version, parent_id = allocate_version(PRDDocument, self.problem.pk)
+
+        # The INSERT hit the unique constraint and the retry incremented
+        self.assertEqual(calls, [DocumentVersionCounter, DocumentVersionCounter])
+        self.assertEqual((version, parent_id), (4, concurrent_document_id))
+        self.assertEqual(DocumentVersionCounter.objects.get(problem=self.problem).last_version, 4)
+
+    def test_counter_left_behind_is_repaired(self):
+        PRDDocument.create_new_version(self.problem, '# v1\n')
+        # Inserted without the counter, e.g. from the admin or a fixture
+        second = PRDDocument.objects.create(problem=self.problem, version=2, content='# v2\n')
+
+        with self.assertLogs('apps.documents.versioning', 'WARNING'):
+            document = PRDDocument.create_new_version(self.problem, '# v3\n')
+
+        self.assertEqual((document.version, document.parent_version_id), (3, second.pk))
+        counter = DocumentVersionCounter.objects.get(problem=self.problem)
+        self.assertEqual((counter.last_version, counter.last_document_id), (3, document.pk))
+        self.assertEqual(PRDDocument.create_new_version(self.problem, '# v4\n').version, 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DocumentStatsTests(TestCase):
+    """Hash and statistics are refreshed only when the content is saved."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        self.document = PRDDocument.objects.create(
+            problem=self.problem, version=1, content='# Titulo\n\num dois tres\n'
+        )
+        self.hash = self.enterContext(
+            mock.patch('apps.documents.models.compute_content_hash', wraps=compute_content_hash)
+        )
+
+    def test_new_document_gets_hash_and_stats(self):
+        self.assertEqual(self.document.content_hash, compute_content_hash(self.document.content))
+        self.assertEqual(self.document.word_count, 5)
+        self.assertEqual(self.document.stats['outline'], [[1, 'Titulo']])
+
+    def test_content_change_is_hashed_once(self):
+        self.document.content = '# Novo\n\n## Secao\n'
+
+        self.document.save()
+
+        self.assertEqual(self.hash.call_count, 1)
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.stats['headings'], 2)
+        self.assertEqual(self.document.content_hash, compute_content_hash('# Novo\n\n## Secao\n'))
+
+    def test_saves_without_content_skip_the_hash(self):
+        self.document.approve(None)
+
+        self.hash.assert_not_called()
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.status, 'approved')
+
+    def test_full_save_with_deferred_content_does_not_load_it(self):
+        document = PRDDocument.objects.defer('content').get(pk=self.document.pk)
+        document.change_notes = 'notas'
+
+        with self.assertNumQueries(1):
+            document.save()
+
+        self.hash.assert_not_called()
+        document = PRDDocument.objects.get(pk=self.document.pk)
+        self.assertEqual(document.stats, self.document.stats)
+        self.assertEqual(document.content, self.document.content)
+
+    def test_unchanged_content_keeps_stats(self):
+        document = PRDDocument.objects.get(pk=self.document.pk)
+
+        with mock.patch('apps.documents.stats.compute_document_stats') as compute_stats:
+            document.save()
+
+        self.assertEqual(self.hash.call_count, 1)
+        compute_stats.assert_not_called()
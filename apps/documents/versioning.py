@@ -0,0 +1,192 @@
+"""
+Version allocation for document chains.
+
+``create_new_version`` used to read the latest version and insert
+``version + 1``, which collides on the unique (problem, version)
+constraint when two agents write concurrently. Versions are now taken
+from a DocumentVersionCounter row per problem and document model:
+
+- On PostgreSQL a single ``INSERT ... ON CONFLICT DO UPDATE ...
+  RETURNING`` increments (or creates) the counter and returns both the
+  new version and the current latest document in one round trip.
+- Other backends run an ``UPDATE`` followed by a ``SELECT``, creating the
+  counter on first use.
+
+In both cases the counter row stays locked until the transaction that
+inserts the document commits, so concurrent writers are serialized per
+problem and never collide. A counter is initialized from the existing
+documents of the problem, so no backfill is needed.
+
+Documents inserted without the counter (admin, fixtures, ``bulk_create``)
+can leave it behind. When the allocated version already exists, the
+counter is realigned with the latest document and the insert retried.
+"""
+import logging
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+
+logger = logging.getLogger(__name__)
+
+
+def _document_type(model):
+    return model._meta.model_name
+
+
+def allocate_version(model, problem_id):
+    """
+    Reserve the next version number of a document chain.
+
+    Must run inside the transaction that inserts the document (see
+    create_document_version).
+
+    Args:
+        model: PRDDocument or TechSpecDocument.
+        problem_id: Primary key of the Problem.
+
+    Returns:
+        tuple: ``(version, parent_id)``. ``parent_id`` is the primary key of
+            the current latest version, or None.
+    """
+    if connection.vendor == 'postgresql':
+        return _allocate_postgresql(model, problem_id)
+    return _allocate_generic(model, problem_id)
+
+
+def _allocate_postgresql(model, problem_id):
+    from apps.documents.models import DocumentVersionCounter
+
+    counter_table = connection.ops.quote_name(DocumentVersionCounter._meta.db_table)
+    document_table = connection.ops.quote_name(model._meta.db_table)
+    sql = f"""
+        INSERT INTO {counter_table} (problem_id, document_type, last_version, last_document_id)
+        VALUES (
+            %s, %s,
+            COALESCE((SELECT MAX(version) FROM {document_table} WHERE problem_id = %s), 0) + 1,
+            (SELECT id FROM {document_table} WHERE problem_id = %s ORDER BY version DESC LIMIT 1)
+        )
+        ON CONFLICT (problem_id, document_type)
+        DO UPDATE SET last_version = {counter_table}.last_version + 1
+        RETURNING last_version, last_document_id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [problem_id, _document_type(model), problem_id, problem_id])
+        return cursor.fetchone()
+
+
+def _latest_version(model, problem_id):
+    latest = model.objects.filter(problem_id=problem_id).order_by('-version').values_list(
+        'version', 'pk'
+    ).first()
+    return (latest[0] + 1, latest[1]) if latest else (1, None)
+
+
+def _allocate_generic(model, problem_id):
+    from apps.documents.models import DocumentVersionCounter
+
+    counters = DocumentVersionCounter.objects.filter(
+        problem_id=problem_id, document_type=_document_type(model)
+    )
+    for attempt in range(2):
+        # The UPDATE takes the row (or database) write lock before reading
+        if counters.update(last_version=F('last_version') + 1):
+            return counters.values_list('last_version', 'last_document_id').get()
+
+        version, parent_id = _latest_version(model, problem_id)
+        try:
+            with transaction.atomic():
+                DocumentVersionCounter.objects.create(
+                    problem_id=problem_id,
+                    document_type=_document_type(model),
+                    last_version=version,
+                    last_document_id=parent_id,
+                )
+        except IntegrityError:
+            # Created concurrently; increment the new row instead
+            if attempt:
+                raise
+            continue
+        return version, parent_id
+
+
+def repair_counter(model, problem_id):
+    """
+    Realign a counter with the latest document of its chain.
+
+    Must run in the transaction holding the counter lock (after
+    allocate_version).
+
+    Args:
+        model: PRDDocument or TechSpecDocument.
+        problem_id: Primary key of the Problem.
+
+    Returns:
+        tuple: ``(version, parent_id)`` reserved from the realigned counter.
+    """
+    from apps.documents.models import DocumentVersionCounter
+
+    version, parent_id = _latest_version(model, problem_id)
+    DocumentVersionCounter.objects.filter(
+        problem_id=problem_id, document_type=_document_type(model)
+    ).update(last_version=version, last_document_id=parent_id)
+    return version, parent_id
+
+
+def create_document_version(model, problem, **fields):
+    """
+    Insert a new version of a document chain.
+
+    Args:
+        model: PRDDocument or TechSpecDocument.
+        problem: The Problem instance.
+        **fields: Field values of the new document.
+
+    Returns:
+        tuple: ``(document, parent_id)``.
+    """
+    from apps.documents.models import DocumentVersionCounter
+
+    with transaction.atomic():
+        version, parent_id = allocate_version(model, problem.pk)
+        try:
+            with transaction.atomic():
+                document = model.objects.create(
+                    problem=problem,
+                    version=version,
+                    parent_version_id=parent_id,
+                    **fields
+                )
+        except IntegrityError:
+            # Versions were inserted without the counter; realign and retry
+            logger.warning(
+                f'{model.__name__} version {version} of problem {problem.pk} already '
+                f'exists, repairing the version counter'
+            )
+            version, parent_id = repair_counter(model, problem.pk)
+            document = model.objects.create(
+                problem=problem,
+                version=version,
+                parent_version_id=parent_id,
+                **fields
+            )
+        DocumentVersionCounter.objects.filter(
+            problem_id=problem.pk, document_type=_document_type(model)
+        ).update(last_document_id=document.pk)
+    return document, parent_id
+
+
+def release_document(document):
+    """
+    Point the counter of a chain away from a version being deleted.
+
+    Args:
+        document: The PRDDocument or TechSpecDocument being deleted.
+    """
+    from apps.documents.models import DocumentVersionCounter
+
+    DocumentVersionCounter.objects.filter(
+        problem_id=document.problem_id,
+        document_type=_document_type(type(document)),
+        last_document_id=document.pk,
+    ).update(last_document_id=document.parent_version_id)
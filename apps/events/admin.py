@@ -0,0 +1,61 @@
+"""
+Admin configuration for the Events app.
+
+The outbox is read-only in the admin: rows are written by model
+transitions and consumed by the relay.
+"""
+
+from django.contrib import admin
+
+from apps.events.models import OutboxEvent, OutboxRelayState
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """Admin configuration for OutboxEvent model."""
+
+    list_display = [
+        'id',
+        'event_type',
+        'aggregate_type',
+        'aggregate_id',
+        'created_at',
+        'published_at',
+    ]
+    list_filter = [
+        'aggregate_type',
+        'event_type',
+        ('published_at', admin.EmptyFieldListFilter),
+    ]
+    search_fields = [
+        'aggregate_id',
+        'event_type',
+    ]
+    ordering = ['-id']
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxRelayState)
+class OutboxRelayStateAdmin(admin.ModelAdmin):
+    """Admin configuration for OutboxRelayState model."""
+
+    list_display = [
+        'name',
+        'high_water_mark',
+        'last_published_at',
+        'last_batch_size',
+        'last_lag_seconds',
+        'published_total',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,104 @@
+"""
+Consumption of published domain events.
+
+With the CeleryPublisher, receivers of ``domain_event`` run in a Celery
+worker, in id order within each batch. With the RedisStreamPublisher,
+processes read the stream through EventStreamConsumer, which blocks on
+XREADGROUP and reacts as soon as the relay publishes.
+
+Delivery is at-least-once: handlers must tolerate an event id seen twice.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.dispatch import Signal
+
+
+logger = logging.getLogger(__name__)
+
+# Sent for every event published through the CeleryPublisher, with the
+# argument ``event`` (dict: id, type, aggregate_type, aggregate_id,
+# payload, created_at)
+domain_event = Signal()
+
+
+class EventStreamConsumer:
+    """
+    Reads the outbox stream as a member of a Redis consumer group.
+
+    Each group receives every event once; consumers of the same group
+    share the work. Events are acknowledged after the handler returns, so
+    a crashed consumer's events are re-read on restart.
+
+    Attributes:
+        group: Consumer group name
+        consumer: Name of this consumer within the group
+        handler: Callable receiving each event dict
+    """
+
+    def __init__(self, group, consumer, handler, client=None, stream=None):
+        self.group = group
+        self.consumer = consumer
+        self.handler = handler
+        self.stream = stream or settings.OUTBOX_STREAM
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from apps.common.redis_client import get_redis
+
+            self._client = get_redis()
+        return self._client
+
+    def ensure_group(self):
+        """Create the consumer group (reading new events) if missing."""
+        import redis
+
+        try:
+            self.client.xgroup_create(self.stream, self.group, id='$', mkstream=True)
+        except redis.ResponseError as exc:
+            if 'BUSYGROUP' not in str(exc):
+                raise
+
+    def poll(self, count=100, block_ms=5000):
+        """
+        Handle the next events, first re-reading unacknowledged ones.
+
+        Args:
+            count: Maximum events read.
+            block_ms: How long to wait for new events.
+
+        Returns:
+            int: Number of events handled.
+        """
+        handled = self._consume('0', count, None)
+        if handled:
+            return handled
+        return self._consume('>', count, block_ms)
+
+    def _consume(self, start, count, block_ms):
+        response = self.client.xreadgroup(
+            self.group, self.consumer, {self.stream: start}, count=count, block=block_ms
+        )
+        handled = 0
+        for _, messages in response or ():
+            for message_id, fields in messages:
+                self.handler(decode_message(fields))
+                self.client.xack(self.stream, self.group, message_id)
+                handled += 1
+        return handled
+
+
+def decode_message(fields):
+    """Convert the fields of a stream message back into an event dict."""
+    event = {
+        (key.decode() if isinstance(key, bytes) else key): (
+            value.decode() if isinstance(value, bytes) else value
+        )
+        for key, value in fields.items()
+    }
+    event['id'] = int(event['id'])
+    event['payload'] = json.loads(event['payload'])
+    return event
@@ -0,0 +1,76 @@
+"""
+Management command para publicar os eventos do outbox.
+
+Sem opcoes, publica os eventos pendentes e termina. Com --follow, continua
+publicando a cada --interval segundos (relay dedicado, alternativa ao
+Celery). Com --stats, apenas mostra as metricas de atraso.
+
+Usage:
+    python manage.py relay_outbox
+    python manage.py relay_outbox --follow --interval 0.2
+    python manage.py relay_outbox --stats
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.events.publishers import get_publisher
+from apps.events.relay import outbox_stats, relay_pending
+
+
+class Command(BaseCommand):
+    help = 'Publica os eventos pendentes do outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Continua publicando ate ser interrompido',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Intervalo entre verificacoes com --follow, em segundos',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Eventos por lote (padrao: OUTBOX_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Mostra as metricas do outbox sem publicar',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        publisher = get_publisher()
+        try:
+            while True:
+                published = relay_pending(publisher, batch_size=options['batch_size'])
+                if published:
+                    self.stdout.write(f'{published} evento(s) publicado(s)')
+                if not options['follow']:
+                    break
+                if not published:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self._print_stats()
+
+    def _print_stats(self):
+        stats = outbox_stats()
+        age = stats['oldest_pending_age']
+        self.stdout.write(f'Pendentes: {stats["pending"]}')
+        self.stdout.write(f'Mais antigo pendente: {f"{age:.1f}s" if age is not None else "-"}')
+        self.stdout.write(f'Ultimo evento publicado (high-water mark): {stats["high_water_mark"]}')
+        self.stdout.write(f'Ultima publicacao: {stats["last_published_at"] or "-"}')
+        self.stdout.write(f'Atraso do ultimo lote: {stats["last_lag_seconds"]:.3f}s')
+        self.stdout.write(f'Total publicado: {stats["published_total"]}')
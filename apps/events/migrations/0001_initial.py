@@ -0,0 +1,150 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxRelayState",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Nome do relay",
+                        max_length=50,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="nome",
+                    ),
+                ),
+                (
+                    "high_water_mark",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Maior ID de evento publicado",
+                        verbose_name="ultimo evento publicado",
+                    ),
+                ),
+                (
+                    "last_published_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data e hora da ultima publicacao",
+                        null=True,
+                        verbose_name="ultima publicacao em",
+                    ),
+                ),
+                (
+                    "last_batch_size",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Numero de eventos do ultimo lote publicado",
+                        verbose_name="tamanho do ultimo lote",
+                    ),
+                ),
+                (
+                    "last_lag_seconds",
+                    models.FloatField(
+                        default=0,
+                        help_text="Idade do evento mais antigo do ultimo lote ao ser publicado",
+                        verbose_name="atraso do ultimo lote (s)",
+                    ),
+                ),
+                (
+                    "published_total",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Numero de eventos publicados",
+                        verbose_name="total publicado",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Estado do relay",
+                "verbose_name_plural": "Estados do relay",
+                "db_table": "events_relay_state",
+            },
+        ),
+        migrations.CreateModel(
+            name="OutboxEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "aggregate_type",
+                    models.CharField(
+                        help_text="Tipo do objeto que originou o evento",
+                        max_length=50,
+                        verbose_name="tipo de agregado",
+                    ),
+                ),
+                (
+                    "aggregate_id",
+                    models.CharField(
+                        help_text="Chave primaria do objeto que originou o evento",
+                        max_length=64,
+                        verbose_name="ID do agregado",
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        help_text="Identificador do evento",
+                        max_length=100,
+                        verbose_name="tipo de evento",
+                    ),
+                ),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Dados do evento",
+                        verbose_name="dados",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Data e hora em que o evento foi registrado",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "published_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data e hora em que o evento foi publicado",
+                        null=True,
+                        verbose_name="publicado em",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento (outbox)",
+                "verbose_name_plural": "Eventos (outbox)",
+                "db_table": "events_outbox",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("published_at__isnull", True)),
+                        fields=["id"],
+                        name="events_outbox_pending_idx",
+                    ),
+                    models.Index(
+                        fields=["aggregate_type", "aggregate_id"],
+                        name="events_outb_aggrega_92e7d1_idx",
+                    ),
+                    models.Index(
+                        fields=["published_at"], name="events_outb_publish_dc92c1_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
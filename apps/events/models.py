@@ -0,0 +1,148 @@
+"""
+Event models for Compozy.
+
+Domain events are written to the OutboxEvent table in the same transaction
+as the state change that produced them. The relay publishes unpublished
+rows in id order and records its progress in OutboxRelayState.
+"""
+
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """
+    Domain event waiting to be (or already) published.
+
+    Events of one aggregate are written after the aggregate row is updated,
+    so their ids follow the order in which the transitions committed.
+
+    Attributes:
+        id: Monotonic primary key (publication order)
+        aggregate_type: Kind of aggregate (e.g. 'problem', 'task')
+        aggregate_id: Primary key of the aggregate
+        event_type: Event identifier (e.g. 'task.status_changed')
+        payload: Event data
+        created_at: When the event was recorded
+        published_at: When the relay published the event
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    aggregate_type = models.CharField(
+        'tipo de agregado',
+        max_length=50,
+        help_text='Tipo do objeto que originou o evento'
+    )
+    aggregate_id = models.CharField(
+        'ID do agregado',
+        max_length=64,
+        help_text='Chave primaria do objeto que originou o evento'
+    )
+    event_type = models.CharField(
+        'tipo de evento',
+        max_length=100,
+        help_text='Identificador do evento'
+    )
+    payload = models.JSONField(
+        'dados',
+        default=dict,
+        blank=True,
+        help_text='Dados do evento'
+    )
+    created_at = models.DateTimeField(
+        'criado em',
+        auto_now_add=True,
+        help_text='Data e hora em que o evento foi registrado'
+    )
+    published_at = models.DateTimeField(
+        'publicado em',
+        null=True,
+        blank=True,
+        help_text='Data e hora em que o evento foi publicado'
+    )
+
+    class Meta:
+        verbose_name = 'Evento (outbox)'
+        verbose_name_plural = 'Eventos (outbox)'
+        ordering = ['id']
+        db_table = 'events_outbox'
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(published_at__isnull=True),
+                name='events_outbox_pending_idx',
+            ),
+            models.Index(fields=['aggregate_type', 'aggregate_id']),
+            models.Index(fields=['published_at']),
+        ]
+
+    def __str__(self):
+        return f'#{self.id} {self.event_type} ({self.aggregate_type}:{self.aggregate_id})'
+
+    def to_message(self):
+        """Return the event as a JSON-serializable dict."""
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'aggregate_type': self.aggregate_type,
+            'aggregate_id': self.aggregate_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+class OutboxRelayState(models.Model):
+    """
+    Progress of the outbox relay.
+
+    The row is locked while a batch is published, so a single relay
+    publishes at a time and events leave in id order.
+
+    Attributes:
+        name: Relay name
+        high_water_mark: Highest published event id
+        last_published_at: When the last batch was published
+        last_batch_size: Events in the last batch
+        last_lag_seconds: Age of the oldest event of the last batch when published
+        published_total: Events published since the row was created
+    """
+
+    name = models.CharField(
+        'nome',
+        max_length=50,
+        primary_key=True,
+        help_text='Nome do relay'
+    )
+    high_water_mark = models.BigIntegerField(
+        'ultimo evento publicado',
+        default=0,
+        help_text='Maior ID de evento publicado'
+    )
+    last_published_at = models.DateTimeField(
+        'ultima publicacao em',
+        null=True,
+        blank=True,
+        help_text='Data e hora da ultima publicacao'
+    )
+    last_batch_size = models.PositiveIntegerField(
+        'tamanho do ultimo lote',
+        default=0,
+        help_text='Numero de eventos do ultimo lote publicado'
+    )
+    last_lag_seconds = models.FloatField(
+        'atraso do ultimo lote (s)',
+        default=0,
+        help_text='Idade do evento mais antigo do ultimo lote ao ser publicado'
+    )
+    published_total = models.BigIntegerField(
+        'total publicado',
+        default=0,
+        help_text='Numero de eventos publicados'
+    )
+
+    class Meta:
+        verbose_name = 'Estado do relay'
+        verbose_name_plural = 'Estados do relay'
+        db_table = 'events_relay_state'
+
+    def __str__(self):
+        return f'{self.name} (#{self.high_water_mark})'
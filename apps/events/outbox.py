@@ -0,0 +1,154 @@
+"""
+Recording of domain events.
+
+``save_transition()`` and ``save_with_event()`` save a model and write its
+OutboxEvent in one transaction, so an event exists if and only if the
+state change committed. After commit the relay is woken up (at most one
+pending wake-up at a time); the periodic relay run is only a safety net.
+
+Models name their aggregate in ``OUTBOX_AGGREGATE`` (defaults to the model
+name). Event payloads carry the routing ids the model has among
+``organization_id``, ``problem_id`` and ``task_id``.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+ROUTING_FIELDS = ('organization_id', 'problem_id', 'task_id')
+
+RELAY_WAKE_KEY = 'events:relay:wake'
+
+
+def aggregate_type(model):
+    """Return the aggregate name of a model."""
+    return getattr(model, 'OUTBOX_AGGREGATE', model._meta.model_name)
+
+
+def routing_fields(model):
+    """Return the routing id attributes available on a model."""
+    attnames = {field.attname for field in model._meta.concrete_fields}
+    return [name for name in ROUTING_FIELDS if name in attnames]
+
+
+def _routing(instance):
+    return {
+        name: str(getattr(instance, name)) if getattr(instance, name) is not None else None
+        for name in routing_fields(type(instance))
+    }
+
+
+def record_event(instance, name, data=None):
+    """
+    Write an event of an aggregate to the outbox.
+
+    Must be called inside the transaction that changes the aggregate.
+
+    Args:
+        instance: The aggregate (a saved model instance).
+        name: Event name, prefixed with the aggregate type (e.g.
+            'approved' -> 'prd.approved').
+        data: Optional event data.
+
+    Returns:
+        OutboxEvent: The recorded event.
+    """
+    from apps.events.models import OutboxEvent
+
+    kind = aggregate_type(type(instance))
+    event = OutboxEvent.objects.create(
+        aggregate_type=kind,
+        aggregate_id=str(instance.pk),
+        event_type=f'{kind}.{name}',
+        payload={**_routing(instance), **(data or {})},
+    )
+    transaction.on_commit(wake_relay)
+    return event
+
+
+def save_with_event(instance, update_fields, name, data=None):
+    """
+    Save an instance and record an event atomically.
+
+    Args:
+        instance: The aggregate.
+        update_fields: Fields passed to ``save()``.
+        name: Event name (see record_event).
+        data: Optional event data.
+    """
+    with transaction.atomic():
+        instance.save(update_fields=update_fields)
+        record_event(instance, name, data)
+
+
+def save_transition(instance, update_fields, **data):
+    """
+    Save a status change and record a ``<aggregate>.status_changed`` event.
+
+    Args:
+        instance: The aggregate, with its new status assigned.
+        update_fields: Fields passed to ``save()``.
+        **data: Additional event data.
+    """
+    previous = instance.old_value('status')
+    save_with_event(instance, update_fields, 'status_changed', {
+        'from': previous,
+        'to': instance.status,
+        **data,
+    })
+
+
+def record_bulk_transition(result):
+    """
+    Record the status changes of a bulk transition.
+
+    Called inside the transaction of ``apply_bulk_transition``.
+
+    Args:
+        result: TransitionResult of the transition.
+    """
+    from apps.events.models import OutboxEvent
+
+    if not result.updated:
+        return
+    model = result.model
+    kind = aggregate_type(model)
+    fields = routing_fields(model)
+    routes = {
+        row['pk']: row
+        for row in model.objects.filter(pk__in=result.updated).values('pk', *fields)
+    }
+    events = []
+    for pk in result.updated:
+        row = routes.get(pk, {})
+        payload = {name: str(row[name]) if row.get(name) is not None else None for name in fields}
+        payload.update({
+            'from': result.previous[pk],
+            'to': result.fields['status'],
+            'transition': result.transition,
+        })
+        events.append(OutboxEvent(
+            aggregate_type=kind,
+            aggregate_id=str(pk),
+            event_type=f'{kind}.status_changed',
+            payload=payload,
+        ))
+    OutboxEvent.objects.bulk_create(events)
+    transaction.on_commit(wake_relay)
+
+
+def wake_relay():
+    """Schedule a relay run unless one is already pending."""
+    from apps.events.tasks import relay_outbox_events
+
+    if not cache.add(RELAY_WAKE_KEY, 1, 30):
+        return
+    try:
+        relay_outbox_events.delay()
+    except Exception:
+        # The events are safe in the outbox; the periodic run picks them up
+        cache.delete(RELAY_WAKE_KEY)
+        logger.warning('Could not enqueue the outbox relay', exc_info=True)
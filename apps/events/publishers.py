@@ -0,0 +1,58 @@
+"""
+Publishers used by the outbox relay.
+
+A publisher receives a batch of OutboxEvents in id order and must raise
+if any of them could not be published; the relay then leaves the whole
+batch unpublished and retries it (at-least-once delivery, consumers
+deduplicate on the event id).
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class RedisStreamPublisher:
+    """
+    Appends events to a Redis stream (``OUTBOX_STREAM``).
+
+    Consumers read the stream with consumer groups (see
+    apps.events.consumers.EventStreamConsumer).
+    """
+
+    def __init__(self, client=None):
+        self.client = client
+
+    def publish(self, events):
+        from apps.common.redis_client import get_redis
+
+        client = self.client or get_redis()
+        pipeline = client.pipeline(transaction=False)
+        for event in events:
+            message = event.to_message()
+            message['payload'] = json.dumps(message['payload'], cls=DjangoJSONEncoder)
+            pipeline.xadd(
+                settings.OUTBOX_STREAM,
+                {key: str(value) for key, value in message.items()},
+                maxlen=settings.OUTBOX_STREAM_MAXLEN,
+                approximate=True,
+            )
+        pipeline.execute()
+
+
+class CeleryPublisher:
+    """
+    Sends each batch to a Celery task that dispatches the ``domain_event``
+    signal in order.
+    """
+
+    def publish(self, events):
+        from apps.events.tasks import dispatch_domain_events
+
+        dispatch_domain_events.delay([event.to_message() for event in events])
+
+
+def get_publisher():
+    """Return an instance of the publisher configured in ``OUTBOX_PUBLISHER``."""
+    return import_string(settings.OUTBOX_PUBLISHER)()
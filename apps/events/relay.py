@@ -0,0 +1,119 @@
+"""
+Outbox relay.
+
+Each batch is published while the relay state row is locked: the oldest
+unpublished events are read in id order, handed to the publisher, marked
+as published and the high-water mark advanced, all in one transaction. If
+publishing or the commit fails, the batch stays unpublished and is sent
+again by the next run.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.events.models import OutboxEvent, OutboxRelayState
+from apps.events.publishers import get_publisher
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELAY = 'default'
+
+
+def relay_batch(publisher=None, batch_size=None, name=DEFAULT_RELAY):
+    """
+    Publish the oldest batch of unpublished events.
+
+    Args:
+        publisher: Publisher instance (defaults to ``OUTBOX_PUBLISHER``).
+        batch_size: Maximum events (defaults to ``OUTBOX_BATCH_SIZE``).
+        name: Relay name.
+
+    Returns:
+        int: Number of events published.
+    """
+    publisher = publisher or get_publisher()
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+
+    with transaction.atomic():
+        OutboxRelayState.objects.get_or_create(name=name)
+        state = OutboxRelayState.objects.select_for_update().get(name=name)
+        events = list(
+            OutboxEvent.objects.filter(published_at__isnull=True).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        publisher.publish(events)
+
+        now = timezone.now()
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(published_at=now)
+        state.high_water_mark = max(state.high_water_mark, events[-1].pk)
+        state.last_published_at = now
+        state.last_batch_size = len(events)
+        state.last_lag_seconds = (now - events[0].created_at).total_seconds()
+        state.published_total += len(events)
+        state.save()
+
+    if state.last_lag_seconds > settings.OUTBOX_LAG_WARNING_SECONDS:
+        logger.warning(
+            f'Outbox relay {name} is lagging: published events {state.last_lag_seconds:.1f}s old'
+        )
+    return len(events)
+
+
+def relay_pending(publisher=None, batch_size=None, max_batches=None, name=DEFAULT_RELAY):
+    """
+    Publish batches until the outbox is empty or ``max_batches`` is reached.
+
+    Returns:
+        int: Number of events published.
+    """
+    publisher = publisher or get_publisher()
+    max_batches = max_batches or settings.OUTBOX_RELAY_MAX_BATCHES
+    total = 0
+    for _ in range(max_batches):
+        published = relay_batch(publisher, batch_size, name)
+        total += published
+        if not published:
+            break
+    return total
+
+
+def outbox_stats(name=DEFAULT_RELAY):
+    """
+    Return the lag metrics of the outbox.
+
+    Returns:
+        dict: ``pending`` (unpublished events), ``oldest_pending_age``
+        (seconds, or None), ``high_water_mark``, ``last_published_at``,
+        ``last_batch_size``, ``last_lag_seconds`` and ``published_total``.
+    """
+    pending = OutboxEvent.objects.filter(published_at__isnull=True)
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    state = OutboxRelayState.objects.filter(name=name).first() or OutboxRelayState(name=name)
+    return {
+        'pending': pending.count(),
+        'oldest_pending_age': (timezone.now() - oldest).total_seconds() if oldest else None,
+        'high_water_mark': state.high_water_mark,
+        'last_published_at': state.last_published_at,
+        'last_batch_size': state.last_batch_size,
+        'last_lag_seconds': state.last_lag_seconds,
+        'published_total': state.published_total,
+    }
+
+
+def purge_published(older_than_hours=None):
+    """
+    Delete published events older than ``OUTBOX_RETENTION_HOURS``.
+
+    Returns:
+        int: Number of events deleted.
+    """
+    hours = older_than_hours or settings.OUTBOX_RETENTION_HOURS
+    cutoff = timezone.now() - timezone.timedelta(hours=hours)
+    deleted, _ = OutboxEvent.objects.filter(published_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,53 @@
+"""
+Celery tasks for the events app.
+"""
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+
+from apps.events.consumers import domain_event
+from apps.events.outbox import RELAY_WAKE_KEY
+from apps.events.relay import purge_published, relay_pending
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def relay_outbox_events():
+    """
+    Publish the pending outbox events.
+
+    Woken up after each commit that records events; also scheduled
+    periodically by CELERY_BEAT_SCHEDULE as a safety net.
+    """
+    # Clear the wake-up flag first so events committed during this run
+    # schedule another run instead of waiting for the periodic one
+    cache.delete(RELAY_WAKE_KEY)
+    published = relay_pending()
+    if published:
+        logger.debug(f'Outbox relay published {published} event(s)')
+
+
+@shared_task(ignore_result=True)
+def dispatch_domain_events(events):
+    """
+    Send the ``domain_event`` signal for a batch published by CeleryPublisher.
+
+    Args:
+        events: Event dicts, in id order.
+    """
+    for event in events:
+        domain_event.send(sender=None, event=event)
+
+
+@shared_task
+def purge_published_outbox_events():
+    """
+    Delete published events older than the retention window.
+
+    Returns:
+        int: Number of events deleted.
+    """
+    return purge_published()
@@ -0,0 +1,154 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.events.consumers import decode_message
+from apps.events.models import OutboxEvent, OutboxRelayState
+from apps.events.outbox import RELAY_WAKE_KEY, record_event, wake_relay
+from apps.events.relay import outbox_stats, relay_batch, relay_pending
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+from apps.tasks_app.models import Task
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class RecordingPublisher:
+    """Keeps the ids of every published batch."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def publish(self, events):
+        self.batches.append([event.pk for event in events])
+        if self.fail:
+            raise ConnectionError('broker unavailable')
+
+
+def create_events(count):
+    return [
+        OutboxEvent.objects.create(
+            aggregate_type='task',
+            aggregate_id=str(index),
+            event_type='task.status_changed',
+            payload={'to': 'completed'},
+        ).pk
+        for index in range(count)
+    ]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RelayTests(TestCase):
+    """Ordering and at-least-once delivery of the outbox relay."""
+
+    def test_batches_follow_id_order(self):
+        ids = create_events(5)
+        publisher = RecordingPublisher()
+
+        self.assertEqual(relay_batch(publisher, batch_size=2), 2)
+        self.assertEqual(relay_batch(publisher, batch_size=2), 2)
+        self.assertEqual(relay_batch(publisher, batch_size=2), 1)
+
+        self.assertEqual(publisher.batches, [ids[0:2], ids[2:4], ids[4:5]])
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
+        state = OutboxRelayState.objects.get(name='default')
+        self.assertEqual((state.high_water_mark, state.published_total), (ids[-1], 5))
+
+    def test_published_events_are_not_sent_again(self):
+        create_events(3)
+        publisher = RecordingPublisher()
+
+        self.assertEqual(relay_pending(publisher, batch_size=10), 3)
+        self.assertEqual(relay_batch(publisher), 0)
+        self.assertEqual(relay_pending(publisher), 0)
+
+        self.assertEqual(len(publisher.batches), 1)
+        self.assertEqual(outbox_stats()['pending'], 0)
+
+    def test_failed_batch_is_sent_again(self):
+        ids = create_events(3)
+
+        with self.assertRaises(ConnectionError):
+            relay_batch(RecordingPublisher(fail=True), batch_size=10)
+
+        self.assertEqual(OutboxEvent.objects.filter(published_at__isnull=True).count(), 3)
+        self.assertEqual(outbox_stats()['published_total'], 0)
+
+        publisher = RecordingPublisher()
+        self.assertEqual(relay_batch(publisher, batch_size=10), 3)
+        self.assertEqual(publisher.batches, [ids])
+
+    def test_relays_keep_their_own_state(self):
+        create_events(2)
+
+        relay_batch(RecordingPublisher(), name='audit')
+
+        self.assertEqual(outbox_stats('audit')['published_total'], 2)
+        self.assertEqual(outbox_stats()['published_total'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RecordEventTests(TestCase):
+    """Events are written with the aggregate and wake the relay once."""
+
+    def test_relay_is_woken_once_after_commit(self):
+        organization = Organization.objects.create(name='Acme', slug='acme')
+
+        with (
+            mock.patch('apps.events.tasks.relay_outbox_events.delay') as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            first = record_event(organization, 'updated', {'field': 'name'})
+            second = record_event(organization, 'updated', {'field': 'slug'})
+            delay.assert_not_called()
+
+        delay.assert_called_once_with()
+        self.assertLess(first.pk, second.pk)
+        self.assertEqual(first.event_type, 'organization.updated')
+        self.assertEqual(first.payload['field'], 'name')
+
+    def test_save_transition_records_the_status_change_with_routing_ids(self):
+        organization = Organization.objects.create(name='Acme', slug='acme')
+        problem = Problem.objects.create(organization=organization, title='Problema', description='Descricao')
+        task = Task.objects.create(problem=problem, title='Tarefa', status='failed')
+        OutboxEvent.objects.all().delete()
+
+        with mock.patch('apps.events.tasks.relay_outbox_events.delay'):
+            task.reset()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.aggregate_id, event.event_type), (str(task.pk), 'task.status_changed'))
+        self.assertEqual(event.payload['problem_id'], str(problem.pk))
+        self.assertEqual((event.payload['from'], event.payload['to']), ('failed', 'pending'))
+
+    def test_failed_wake_up_is_released_for_the_next_one(self):
+        cache.delete(RELAY_WAKE_KEY)
+
+        with (
+            mock.patch('apps.events.tasks.relay_outbox_events.delay', side_effect=ConnectionError) as delay,
+            self.assertLogs('apps.events.outbox', 'WARNING'),
+        ):
+            wake_relay()
+            wake_relay()
+
+        self.assertEqual(delay.call_count, 2)
+        self.assertIsNone(cache.get(RELAY_WAKE_KEY))
+
+
+class DecodeMessageTests(SimpleTestCase):
+    """Stream messages are converted back into event dicts."""
+
+    def test_bytes_fields_are_decoded(self):
+        fields = {
+            b'id': b'42',
+            b'type': b'task.status_changed',
+            b'payload': json.dumps({'to': 'completed'}).encode(),
+        }
+
+        event = decode_message(fields)
+
+        self.assertEqual(event, {'id': 42, 'type': 'task.status_changed', 'payload': {'to': 'completed'}})
@@ -0,0 +1,123 @@
+"""
+Admin configuration for the Notifications app.
+
+This module registers the Notification and WebhookEndpoint models with
+Django admin and configures their display and editing options.
+"""
+
+from django.contrib import admin
+
+from apps.notifications.models import Notification, WebhookEndpoint
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """Admin configuration for Notification model."""
+
+    list_display = [
+        'id_short',
+        'title',
+        'recipient',
+        'organization',
+        'event_type',
+        'is_read',
+        'created_at',
+    ]
+    list_filter = [
+        'event_type',
+        'read_at',
+        'created_at',
+    ]
+    search_fields = [
+        'title',
+        'recipient__username',
+        'organization__name',
+    ]
+    readonly_fields = [
+        'id',
+        'data',
+        'created_at',
+        'updated_at',
+    ]
+    list_select_related = ['recipient', 'organization']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+    list_per_page = 50
+
+    fieldsets = (
+        ('Informacoes Basicas', {
+            'fields': ('id', 'recipient', 'organization', 'problem', 'event_type')
+        }),
+        ('Conteudo', {
+            'fields': ('title', 'message', 'read_at')
+        }),
+        ('Dados', {
+            'fields': ('data',),
+            'classes': ('collapse',)
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def id_short(self, obj):
+        """Display shortened UUID."""
+        return str(obj.id)[:8]
+    id_short.short_description = 'ID'
+
+    def is_read(self, obj):
+        """Display whether the notification was read."""
+        return obj.read_at is not None
+    is_read.short_description = 'Lida'
+    is_read.boolean = True
+    is_read.admin_order_field = 'read_at'
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    """Admin configuration for WebhookEndpoint model."""
+
+    list_display = [
+        'url',
+        'organization',
+        'is_active',
+        'last_success_at',
+        'has_error',
+    ]
+    list_filter = [
+        'is_active',
+        'created_at',
+    ]
+    search_fields = [
+        'url',
+        'organization__name',
+    ]
+    readonly_fields = [
+        'id',
+        'last_success_at',
+        'last_error',
+        'created_at',
+        'updated_at',
+    ]
+    list_select_related = ['organization']
+    ordering = ['-created_at']
+
+    fieldsets = (
+        ('Informacoes Basicas', {
+            'fields': ('id', 'organization', 'url', 'secret', 'is_active')
+        }),
+        ('Entregas', {
+            'fields': ('last_success_at', 'last_error')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def has_error(self, obj):
+        """Display whether the last delivery failed."""
+        return bool(obj.last_error)
+    has_error.short_description = 'Com erro'
+    has_error.boolean = True
@@ -0,0 +1,12 @@
+"""
+App configuration for the notifications Django application.
+"""
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    """Configuration for the Notifications application."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.notifications'
+    verbose_name = 'Notificacoes'
@@ -0,0 +1,209 @@
+"""
+Delivery channels of the notification subsystem.
+
+A channel delivers the coalesced events of one recipient. Channels are
+configured in ``NOTIFICATION_CHANNELS`` (name -> backend path, rate
+limit) and each one declares the kind of recipient it serves: users
+(in-app, email) or organization webhooks.
+
+Channels raise DeliveryError on failure; retryable errors are retried
+with exponential backoff by the delivery task.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import smtplib
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+RECIPIENT_USER = 'user'
+RECIPIENT_WEBHOOK = 'webhook'
+
+
+class DeliveryError(Exception):
+    """
+    A channel failed to deliver notifications.
+
+    Attributes:
+        retryable: Whether the delivery may succeed if retried
+    """
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class NotificationChannel:
+    """
+    Base class of delivery channels.
+
+    Attributes:
+        name: Channel name (key of NOTIFICATION_CHANNELS)
+        recipient_kind: RECIPIENT_USER or RECIPIENT_WEBHOOK
+    """
+
+    recipient_kind = RECIPIENT_USER
+
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+
+    def get_recipient(self, recipient_id):
+        """Return the recipient object, or None if it no longer exists."""
+        from django.contrib.auth import get_user_model
+
+        return get_user_model().objects.filter(pk=recipient_id, is_active=True).first()
+
+    def send(self, recipient, events):
+        """
+        Deliver events to a recipient.
+
+        Args:
+            recipient: User or WebhookEndpoint.
+            events: List of event dicts, oldest first.
+
+        Raises:
+            DeliveryError: If the delivery failed.
+        """
+        raise NotImplementedError
+
+
+def summarize(events):
+    """
+    Return the title and text of a batch of events.
+
+    Args:
+        events: List of event dicts, oldest first.
+
+    Returns:
+        tuple: ``(title, text)``.
+    """
+    if len(events) == 1:
+        event = events[0]
+        return f'{event["problem_title"]}: {event["message"]}', event['message']
+    title = f'{len(events)} atualizacoes de problemas'
+    lines = [f'- {event["problem_title"]}: {event["message"]}' for event in events]
+    return title, '\n'.join(lines)
+
+
+class InAppChannel(NotificationChannel):
+    """Stores one Notification row per event."""
+
+    def send(self, recipient, events):
+        from apps.notifications.models import Notification
+
+        Notification.objects.bulk_create([
+            Notification(
+                recipient=recipient,
+                organization_id=event['organization_id'],
+                problem_id=event.get('problem_id'),
+                event_type=event['type'],
+                title=event['problem_title'][:255],
+                message=event['message'],
+                data=event,
+            )
+            for event in events
+        ])
+
+
+class EmailChannel(NotificationChannel):
+    """Sends one email per batch through the configured EMAIL_BACKEND."""
+
+    def get_recipient(self, recipient_id):
+        user = super().get_recipient(recipient_id)
+        return user if user is not None and user.email else None
+
+    def send(self, recipient, events):
+        title, text = summarize(events)
+        try:
+            send_mail(
+                subject=f'[Compozy] {title}',
+                message=text,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[recipient.email],
+            )
+        except smtplib.SMTPRecipientsRefused as exc:
+            raise DeliveryError(f'Recipient refused: {exc}', retryable=False)
+        except (smtplib.SMTPException, OSError) as exc:
+            raise DeliveryError(f'SMTP error: {exc}')
+
+
+class WebhookChannel(NotificationChannel):
+    """POSTs the batch as JSON to an organization webhook."""
+
+    recipient_kind = RECIPIENT_WEBHOOK
+
+    def get_recipient(self, recipient_id):
+        from apps.notifications.models import WebhookEndpoint
+
+        return WebhookEndpoint.objects.filter(pk=recipient_id, is_active=True).first()
+
+    def send(self, recipient, events):
+        body = json.dumps({'events': events}, cls=DjangoJSONEncoder).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'User-Agent': 'Compozy-Webhooks'}
+        if recipient.secret:
+            signature = hmac.new(recipient.secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            headers['X-Compozy-Signature'] = f'sha256={signature}'
+
+        request = urllib.request.Request(recipient.url, data=body, headers=headers, method='POST')
+        timeout = self.options.get('timeout', settings.NOTIFICATION_WEBHOOK_TIMEOUT)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as exc:
+            # Client errors other than throttling will not fix themselves
+            retryable = exc.code >= 500 or exc.code == 429
+            self._record(recipient, error=f'HTTP {exc.code}')
+            raise DeliveryError(f'Webhook returned HTTP {exc.code}', retryable=retryable)
+        except (urllib.error.URLError, TimeoutError, OSError) as exc:
+            self._record(recipient, error=str(exc))
+            raise DeliveryError(f'Webhook unreachable: {exc}')
+        self._record(recipient)
+
+    def _record(self, recipient, error=''):
+        from apps.notifications.models import WebhookEndpoint
+
+        values = {'last_error': error[:1000]}
+        if not error:
+            values['last_success_at'] = timezone.now()
+        WebhookEndpoint.objects.filter(pk=recipient.pk).update(**values)
+
+
+_channels = None
+
+
+def get_channels():
+    """
+    Return the configured channels.
+
+    Returns:
+        dict: Channel name to NotificationChannel instance.
+    """
+    global _channels
+    if _channels is None:
+        channels = {}
+        for name, config in settings.NOTIFICATION_CHANNELS.items():
+            options = {key: value for key, value in config.items() if key not in ('backend', 'rate_limit')}
+            channels[name] = import_string(config['backend'])(name, **options)
+        _channels = channels
+    return _channels
+
+
+def get_channel(name):
+    """
+    Return a configured channel.
+
+    Raises:
+        KeyError: If the channel is not configured.
+    """
+    return get_channels()[name]
@@ -0,0 +1,224 @@
+"""
+Dispatch of notification events.
+
+Events are enqueued to Celery once the transaction that produced them
+commits. The fan-out job stores one PendingNotification per recipient and
+schedules a flush of that recipient after ``NOTIFICATION_COALESCE_SECONDS``;
+a cache lock ensures a single flush is scheduled per window, so a burst
+of status changes reaches each recipient as one delivery per channel.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notifications.channels import RECIPIENT_USER, RECIPIENT_WEBHOOK
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_PROBLEM_STATUS_CHANGED = 'problem.status_changed'
+EVENT_TASKS_TRANSITIONED = 'tasks.bulk_transitioned'
+
+
+def recipient_key(kind, pk):
+    """Return the key identifying a recipient ('user:<id>' or 'webhook:<id>')."""
+    return f'{kind}:{pk}'
+
+
+def parse_recipient_key(key):
+    """
+    Split a recipient key.
+
+    Returns:
+        tuple: ``(kind, id)``.
+    """
+    kind, _, pk = key.partition(':')
+    return kind, pk
+
+
+def notify_problem_status(problem, old_status, new_status, message):
+    """
+    Enqueue a status-change notification once the transaction commits.
+
+    Args:
+        problem: The Problem whose status changed.
+        old_status: Status before the change.
+        new_status: Status after the change.
+        message: Human readable description of the change.
+    """
+    from apps.notifications.tasks import fan_out_notification_event
+
+    event = {
+        'type': EVENT_PROBLEM_STATUS_CHANGED,
+        'organization_id': str(problem.organization_id),
+        'problem_id': str(problem.pk),
+        'problem_title': problem.title,
+        'old_status': old_status,
+        'new_status': new_status,
+        'message': message,
+        'created_by_id': problem.created_by_id,
+        'occurred_at': timezone.now().isoformat(),
+    }
+    transaction.on_commit(lambda: fan_out_notification_event.delay(event))
+
+
+def notify_tasks_transitioned(problem, transition, task_ids, new_status, message, actor=None):
+    """
+    Enqueue a bulk task transition notification once the transaction commits.
+
+    Args:
+        problem: The Problem of the transitioned tasks.
+        transition: Name of the transition (see Task.TRANSITIONS).
+        task_ids: Primary keys of the transitioned tasks.
+        new_status: Status of the tasks after the transition.
+        message: Human readable description of the change.
+        actor: User who applied the transition, if any.
+    """
+    from apps.notifications.tasks import fan_out_notification_event
+
+    event = {
+        'type': EVENT_TASKS_TRANSITIONED,
+        'organization_id': str(problem.organization_id),
+        'problem_id': str(problem.pk),
+        'problem_title': problem.title,
+        'transition': transition,
+        'task_ids': [str(pk) for pk in task_ids],
+        'new_status': new_status,
+        'message': message,
+        'created_by_id': problem.created_by_id,
+        'actor_id': getattr(actor, 'pk', None),
+        'occurred_at': timezone.now().isoformat(),
+    }
+    transaction.on_commit(lambda: fan_out_notification_event.delay(event))
+
+
+def get_recipient_keys(event):
+    """
+    Return the recipients of an event.
+
+    Users are the problem creator and the organization admins; webhooks
+    are the active endpoints of the organization.
+
+    Args:
+        event: Event dict.
+
+    Returns:
+        list: Recipient keys.
+    """
+    from apps.notifications.models import WebhookEndpoint
+    from apps.organizations.models import OrganizationMember
+
+    user_ids = set(
+        OrganizationMember.objects.filter(
+            organization_id=event['organization_id'], role='admin', user__is_active=True
+        ).values_list('user_id', flat=True)
+    )
+    if event.get('created_by_id'):
+        user_ids.add(event['created_by_id'])
+
+    webhook_ids = WebhookEndpoint.objects.filter(
+        organization_id=event['organization_id'], is_active=True
+    ).values_list('pk', flat=True)
+
+    keys = [recipient_key(RECIPIENT_USER, pk) for pk in sorted(user_ids)]
+    keys.extend(recipient_key(RECIPIENT_WEBHOOK, pk) for pk in webhook_ids)
+    return keys
+
+
+def queue_event(event):
+    """
+    Store an event for each of its recipients and schedule their flush.
+
+    Args:
+        event: Event dict.
+
+    Returns:
+        int: Number of recipients.
+    """
+    from apps.notifications.models import PendingNotification
+
+    keys = get_recipient_keys(event)
+    PendingNotification.objects.bulk_create(
+        [PendingNotification(recipient_key=key, event=event) for key in keys]
+    )
+    for key in keys:
+        schedule_flush(key)
+    return len(keys)
+
+
+def _flush_lock_key(key):
+    return f'notifications:flush:{key}'
+
+
+def schedule_flush(key):
+    """
+    Schedule the flush of a recipient unless one is already scheduled.
+
+    Args:
+        key: Recipient key.
+    """
+    from apps.notifications.tasks import flush_notifications
+
+    delay = settings.NOTIFICATION_COALESCE_SECONDS
+    # The lock outlives the countdown so a late worker still finds it
+    if cache.add(_flush_lock_key(key), 1, delay + 60):
+        transaction.on_commit(lambda: flush_notifications.apply_async((key,), countdown=delay))
+
+
+def take_pending(key):
+    """
+    Remove and return the pending events of a recipient.
+
+    The flush lock is released first, so events queued from now on
+    schedule a new flush instead of being lost.
+
+    Args:
+        key: Recipient key.
+
+    Returns:
+        list: Event dicts, oldest first.
+    """
+    from apps.notifications.models import PendingNotification
+
+    cache.delete(_flush_lock_key(key))
+    with transaction.atomic():
+        rows = list(
+            PendingNotification.objects.filter(recipient_key=key).select_for_update().values_list(
+                'pk', 'event'
+            )
+        )
+        PendingNotification.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+    return [event for _, event in rows]
+
+
+def acquire_rate(channel_name):
+    """
+    Take a slot of a channel's rate limit (fixed one-minute windows).
+
+    Args:
+        channel_name: Key of NOTIFICATION_CHANNELS.
+
+    Returns:
+        int: 0 if the delivery may proceed, otherwise seconds until the
+        next window.
+    """
+    limit = settings.NOTIFICATION_CHANNELS[channel_name].get('rate_limit')
+    if not limit:
+        return 0
+    now = time.time()
+    window = int(now // 60)
+    key = f'notifications:rate:{channel_name}:{window}'
+    cache.add(key, 0, 120)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, 120)
+        count = 1
+    if count <= limit:
+        return 0
+    return int((window + 1) * 60 - now) + 1
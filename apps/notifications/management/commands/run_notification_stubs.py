@@ -0,0 +1,149 @@
+"""
+Management command para executar servidores locais de teste das notificacoes.
+
+Inicia um servidor SMTP minimo e um servidor HTTP que recebe webhooks,
+verifica a assinatura X-Compozy-Signature e imprime cada entrega. Com
+--webhook-status o servidor HTTP responde com o status indicado, para
+exercitar as novas tentativas (5xx) e as falhas permanentes (4xx).
+
+Para enviar emails ao servidor SMTP local:
+    EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend
+    EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=False
+
+Usage:
+    python manage.py run_notification_stubs
+    python manage.py run_notification_stubs --smtp-port 1025 --http-port 8025 --secret segredo
+    python manage.py run_notification_stubs --webhook-status 503
+"""
+
+import hashlib
+import hmac
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: accepts every message and reports it."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        self.reply('220 compozy-stub ESMTP')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 compozy-stub')
+            elif verb == 'MAIL':
+                sender, recipients = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data.rstrip(b'\r\n') == b'.':
+                        break
+                    lines.append(data.decode('utf-8', 'replace').rstrip('\r\n'))
+                self.server.report(sender, recipients, lines)
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, command):
+        super().__init__(address, SMTPStubHandler)
+        self.command = command
+
+    def report(self, sender, recipients, lines):
+        subject = next((line[9:] for line in lines if line.lower().startswith('subject: ')), '')
+        self.command.stdout.write(
+            f'[smtp] de {sender} para {", ".join(recipients)}: {subject} ({len(lines)} linha(s))'
+        )
+
+
+class WebhookStubHandler(BaseHTTPRequestHandler):
+    """Receives webhook POSTs and verifies their signature."""
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        signature = self.headers.get('X-Compozy-Signature', '')
+        if server.secret:
+            expected = 'sha256=' + hmac.new(server.secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            valid = 'valida' if hmac.compare_digest(signature, expected) else 'INVALIDA'
+        else:
+            valid = 'nao verificada'
+        try:
+            events = json.loads(body).get('events', [])
+        except ValueError:
+            events = []
+        server.command.stdout.write(
+            f'[webhook] {self.path}: {len(events)} evento(s), assinatura {valid}, '
+            f'resposta {server.status}'
+        )
+        for event in events:
+            server.command.stdout.write(f'    {event.get("type")}: {event.get("message")}')
+        self.send_response(server.status)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Executa servidores SMTP e webhook locais para testar as notificacoes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Endereco de escuta')
+        parser.add_argument('--smtp-port', type=int, default=1025, help='Porta do servidor SMTP')
+        parser.add_argument('--http-port', type=int, default=8025, help='Porta do servidor de webhooks')
+        parser.add_argument('--secret', default='', help='Segredo usado para verificar as assinaturas')
+        parser.add_argument(
+            '--webhook-status',
+            type=int,
+            default=200,
+            help='Status HTTP devolvido aos webhooks (ex.: 503 para testar novas tentativas)',
+        )
+
+    def handle(self, *args, **options):
+        smtp = SMTPStubServer((options['host'], options['smtp_port']), self)
+        http = ThreadingHTTPServer((options['host'], options['http_port']), WebhookStubHandler)
+        http.command = self
+        http.secret = options['secret']
+        http.status = options['webhook_status']
+
+        threading.Thread(target=smtp.serve_forever, daemon=True).start()
+        self.stdout.write(self.style.SUCCESS(
+            f'SMTP em {options["host"]}:{options["smtp_port"]}, '
+            f'webhooks em http://{options["host"]}:{options["http_port"]}/ (Ctrl+C para sair)'
+        ))
+        try:
+            http.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            smtp.shutdown()
+            smtp.server_close()
+            http.server_close()
@@ -0,0 +1,286 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:59
+
+import apps.common.deferred
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("organizations", "0002_organization_execution_retention_days"),
+        ("problems", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "recipient_key",
+                    models.CharField(
+                        help_text="Chave do destinatario ('user:<id>' ou 'webhook:<id>')",
+                        max_length=100,
+                        verbose_name="destinatario",
+                    ),
+                ),
+                (
+                    "event",
+                    models.JSONField(
+                        help_text="Dados do evento", verbose_name="evento"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Data e hora em que o evento entrou na fila",
+                        verbose_name="criado em",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Notificacao pendente",
+                "verbose_name_plural": "Notificacoes pendentes",
+                "db_table": "notifications_pending",
+                "ordering": ["created_at", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["recipient_key", "created_at"],
+                        name="notificatio_recipie_c6ed05_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="WebhookEndpoint",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="Data e hora de criacao do registro",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        help_text="Data e hora da ultima atualizacao do registro",
+                        verbose_name="atualizado em",
+                    ),
+                ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "url",
+                    models.URLField(
+                        help_text="URL que recebe os eventos (POST JSON)",
+                        max_length=500,
+                        verbose_name="URL",
+                    ),
+                ),
+                (
+                    "secret",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Segredo usado para assinar o corpo (HMAC-SHA256)",
+                        max_length=255,
+                        verbose_name="segredo",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Indica se os eventos sao enviados para este endpoint",
+                        verbose_name="ativo",
+                    ),
+                ),
+                (
+                    "last_success_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data e hora da ultima entrega bem-sucedida",
+                        null=True,
+                        verbose_name="ultimo sucesso em",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Erro da ultima entrega que falhou",
+                        verbose_name="ultimo erro",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        help_text="Organizacao cujos eventos sao enviados",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="webhook_endpoints",
+                        to="organizations.organization",
+                        verbose_name="organizacao",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Webhook",
+                "verbose_name_plural": "Webhooks",
+                "db_table": "notifications_webhook_endpoint",
+                "ordering": ["-created_at"],
+            },
+            bases=(apps.common.deferred.DeferredFieldGuardMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name="Notification",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="Data e hora de criacao do registro",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        help_text="Data e hora da ultima atualizacao do registro",
+                        verbose_name="atualizado em",
+                    ),
+                ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        help_text="Identificador do evento",
+                        max_length=50,
+                        verbose_name="tipo de evento",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(
+                        help_text="Titulo curto da notificacao",
+                        max_length=255,
+                        verbose_name="titulo",
+                    ),
+                ),
+                (
+                    "message",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Texto da notificacao",
+                        verbose_name="mensagem",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Dados do evento",
+                        verbose_name="dados",
+                    ),
+                ),
+                (
+                    "read_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data e hora em que a notificacao foi lida",
+                        null=True,
+                        verbose_name="lida em",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        help_text="Organizacao do evento",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notifications",
+                        to="organizations.organization",
+                        verbose_name="organizacao",
+                    ),
+                ),
+                (
+                    "problem",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Problema ao qual o evento se refere",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notifications",
+                        to="problems.problem",
+                        verbose_name="problema",
+                    ),
+                ),
+                (
+                    "recipient",
+                    models.ForeignKey(
+                        help_text="Usuario que recebe a notificacao",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notifications",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="destinatario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Notificacao",
+                "verbose_name_plural": "Notificacoes",
+                "db_table": "notifications_notification",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["recipient", "read_at"],
+                        name="notificatio_recipie_564b1f_idx",
+                    ),
+                    models.Index(
+                        fields=["recipient", "created_at"],
+                        name="notificatio_recipie_f39341_idx",
+                    ),
+                ],
+            },
+            bases=(apps.common.deferred.DeferredFieldGuardMixin, models.Model),
+        ),
+    ]
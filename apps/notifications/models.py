@@ -0,0 +1,218 @@
+"""
+Notification models for Compozy.
+
+Status-change events are queued as PendingNotification rows per
+recipient, coalesced, and delivered through the configured channels:
+in-app (Notification rows), email and organization webhooks
+(WebhookEndpoint).
+"""
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.common.models import TimestampedModel
+
+
+class Notification(TimestampedModel):
+    """
+    In-app notification shown to a user.
+
+    Attributes:
+        id: UUID primary key
+        recipient: User who receives the notification
+        organization: Organization the event belongs to
+        problem: Problem the event refers to (if any)
+        event_type: Event identifier (e.g. 'problem.status_changed')
+        title: Short title
+        message: Notification text
+        data: Event payload
+        read_at: When the user read the notification
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='destinatario',
+        help_text='Usuario que recebe a notificacao'
+    )
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='organizacao',
+        help_text='Organizacao do evento'
+    )
+    problem = models.ForeignKey(
+        'problems.Problem',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications',
+        verbose_name='problema',
+        help_text='Problema ao qual o evento se refere'
+    )
+    event_type = models.CharField(
+        'tipo de evento',
+        max_length=50,
+        help_text='Identificador do evento'
+    )
+    title = models.CharField(
+        'titulo',
+        max_length=255,
+        help_text='Titulo curto da notificacao'
+    )
+    message = models.TextField(
+        'mensagem',
+        blank=True,
+        default='',
+        help_text='Texto da notificacao'
+    )
+    data = models.JSONField(
+        'dados',
+        default=dict,
+        blank=True,
+        help_text='Dados do evento'
+    )
+    read_at = models.DateTimeField(
+        'lida em',
+        null=True,
+        blank=True,
+        help_text='Data e hora em que a notificacao foi lida'
+    )
+
+    class Meta:
+        verbose_name = 'Notificacao'
+        verbose_name_plural = 'Notificacoes'
+        ordering = ['-created_at']
+        db_table = 'notifications_notification'
+        indexes = [
+            models.Index(fields=['recipient', 'read_at']),
+            models.Index(fields=['recipient', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient} - {self.title}'
+
+    def mark_read(self):
+        """Mark the notification as read."""
+        if self.read_at is None:
+            self.read_at = timezone.now()
+            self.save(update_fields=['read_at', 'updated_at'])
+
+
+class WebhookEndpoint(TimestampedModel):
+    """
+    Organization webhook receiving notification events.
+
+    Payloads are signed with HMAC-SHA256 of the body using ``secret``
+    (header ``X-Compozy-Signature``).
+
+    Attributes:
+        id: UUID primary key
+        organization: Organization whose events are delivered
+        url: Endpoint URL
+        secret: Signing secret
+        is_active: Whether events are delivered to this endpoint
+        last_success_at: Last successful delivery
+        last_error: Error of the last failed delivery
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='webhook_endpoints',
+        verbose_name='organizacao',
+        help_text='Organizacao cujos eventos sao enviados'
+    )
+    url = models.URLField(
+        'URL',
+        max_length=500,
+        help_text='URL que recebe os eventos (POST JSON)'
+    )
+    secret = models.CharField(
+        'segredo',
+        max_length=255,
+        blank=True,
+        default='',
+        help_text='Segredo usado para assinar o corpo (HMAC-SHA256)'
+    )
+    is_active = models.BooleanField(
+        'ativo',
+        default=True,
+        help_text='Indica se os eventos sao enviados para este endpoint'
+    )
+    last_success_at = models.DateTimeField(
+        'ultimo sucesso em',
+        null=True,
+        blank=True,
+        help_text='Data e hora da ultima entrega bem-sucedida'
+    )
+    last_error = models.TextField(
+        'ultimo erro',
+        blank=True,
+        default='',
+        help_text='Erro da ultima entrega que falhou'
+    )
+
+    class Meta:
+        verbose_name = 'Webhook'
+        verbose_name_plural = 'Webhooks'
+        ordering = ['-created_at']
+        db_table = 'notifications_webhook_endpoint'
+
+    def __str__(self):
+        return f'{self.organization} - {self.url}'
+
+
+class PendingNotification(models.Model):
+    """
+    Event waiting to be delivered to a recipient.
+
+    Rows are created when an event is fanned out and deleted by the
+    flush job, which delivers every pending event of a recipient at once.
+
+    Attributes:
+        recipient_key: 'user:<id>' or 'webhook:<id>'
+        event: Event payload
+        created_at: When the event was queued
+    """
+
+    recipient_key = models.CharField(
+        'destinatario',
+        max_length=100,
+        help_text="Chave do destinatario ('user:<id>' ou 'webhook:<id>')"
+    )
+    event = models.JSONField(
+        'evento',
+        help_text='Dados do evento'
+    )
+    created_at = models.DateTimeField(
+        'criado em',
+        auto_now_add=True,
+        help_text='Data e hora em que o evento entrou na fila'
+    )
+
+    class Meta:
+        verbose_name = 'Notificacao pendente'
+        verbose_name_plural = 'Notificacoes pendentes'
+        ordering = ['created_at', 'id']
+        db_table = 'notifications_pending'
+        indexes = [
+            models.Index(fields=['recipient_key', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient_key} - {self.event.get("type", "")}'
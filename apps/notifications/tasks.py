@@ -0,0 +1,97 @@
+"""
+Celery tasks of the notification subsystem.
+
+fan_out_notification_event -> flush_notifications (per recipient, after
+the coalescing window) -> deliver_notification (per recipient and channel,
+retried with exponential backoff and throttled per channel).
+"""
+import logging
+import random
+
+from celery import shared_task
+from django.conf import settings
+
+from apps.notifications.channels import DeliveryError, get_channel, get_channels
+from apps.notifications.dispatch import acquire_rate, parse_recipient_key, queue_event, take_pending
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def fan_out_notification_event(event):
+    """
+    Queue an event for each of its recipients.
+
+    Args:
+        event: Event dict (see dispatch.notify_problem_status and
+            dispatch.notify_tasks_transitioned).
+    """
+    count = queue_event(event)
+    logger.debug(f'Notification event {event["type"]} queued for {count} recipient(s)')
+
+
+@shared_task(ignore_result=True)
+def flush_notifications(key):
+    """
+    Deliver the pending events of a recipient through its channels.
+
+    Args:
+        key: Recipient key.
+    """
+    events = take_pending(key)
+    if not events:
+        return
+    kind, _ = parse_recipient_key(key)
+    for name, channel in get_channels().items():
+        if channel.recipient_kind == kind:
+            deliver_notification.delay(name, key, events)
+
+
+def retry_countdown(retries):
+    """Return the exponential backoff delay (with jitter) for a retry."""
+    countdown = settings.NOTIFICATION_RETRY_BACKOFF * (2 ** retries)
+    countdown = min(countdown, settings.NOTIFICATION_RETRY_BACKOFF_MAX)
+    return int(countdown * random.uniform(0.8, 1.2))
+
+
+@shared_task(bind=True, acks_late=True, ignore_result=True)
+def deliver_notification(self, channel_name, key, events):
+    """
+    Deliver a batch of events to one recipient through one channel.
+
+    Args:
+        channel_name: Key of NOTIFICATION_CHANNELS.
+        key: Recipient key.
+        events: Event dicts, oldest first.
+    """
+    channel = get_channel(channel_name)
+    _, pk = parse_recipient_key(key)
+    recipient = channel.get_recipient(pk)
+    if recipient is None:
+        logger.info(f'Notification recipient {key} unavailable for {channel_name}, dropping')
+        return
+
+    wait = acquire_rate(channel_name)
+    if wait:
+        # Throttling is not a failure: re-queue without using a retry
+        logger.debug(f'Channel {channel_name} rate limited, delivery to {key} deferred {wait}s')
+        deliver_notification.apply_async((channel_name, key, events), countdown=wait)
+        return
+
+    try:
+        channel.send(recipient, events)
+    except DeliveryError as exc:
+        if not exc.retryable or self.request.retries >= settings.NOTIFICATION_MAX_RETRIES:
+            logger.error(
+                f'Notification delivery to {key} via {channel_name} failed permanently: {exc}'
+            )
+            return
+        countdown = retry_countdown(self.request.retries)
+        logger.warning(
+            f'Notification delivery to {key} via {channel_name} failed ({exc}), '
+            f'retrying in {countdown}s'
+        )
+        raise self.retry(exc=exc, countdown=countdown, max_retries=settings.NOTIFICATION_MAX_RETRIES)
+
+    logger.info(f'Delivered {len(events)} notification(s) to {key} via {channel_name}')
@@ -0,0 +1,255 @@
+import io
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from apps.notifications.channels import DeliveryError, InAppChannel, WebhookChannel, summarize
+from apps.notifications.dispatch import acquire_rate, queue_event, take_pending
+from apps.notifications.management.commands.run_notification_stubs import WebhookStubHandler
+from apps.notifications.models import Notification, PendingNotification, WebhookEndpoint
+from apps.notifications.tasks import deliver_notification
+from apps.organizations.models import Organization
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_event(organization, new_status, created_by_id=None):
+    return {
+        'type': 'problem.status_changed',
+        'organization_id': str(organization.pk),
+        'problem_id': None,
+        'problem_title': 'Problema',
+        'new_status': new_status,
+        'message': f'Status alterado para {new_status}',
+        'created_by_id': created_by_id,
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES, NOTIFICATION_COALESCE_SECONDS=30)
+class CoalescingTests(TestCase):
+    """A burst of events reaches each recipient as one flush."""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Acme', slug='acme')
+        self.webhook = WebhookEndpoint.objects.create(
+            organization=self.organization, url='http://127.0.0.1:9/hook'
+        )
+        WebhookEndpoint.objects.create(
+            organization=self.organization, url='http://127.0.0.1:9/off', is_active=False
+        )
+        self.key = f'webhook:{self.webhook.pk}'
+
+    def queue(self, *statuses):
+        with (
+            mock.patch('apps.notifications.tasks.flush_notifications.apply_async') as apply_async,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            for status in statuses:
+                queue_event(make_event(self.organization, status, created_by_id=7))
+        return apply_async
+
+    def test_burst_schedules_one_flush_per_recipient(self):
+        apply_async = self.queue('planning', 'in_progress', 'completed')
+
+        scheduled = sorted(call.args[0][0] for call in apply_async.call_args_list)
+        self.assertEqual(scheduled, sorted(['user:7', self.key]))
+        for call in apply_async.call_args_list:
+            self.assertEqual(call.kwargs['countdown'], 30)
+
+    def test_take_pending_returns_events_oldest_first(self):
+        self.queue('planning', 'in_progress', 'completed')
+
+        events = take_pending(self.key)
+
+        self.assertEqual([event['new_status'] for event in events], ['planning', 'in_progress', 'completed'])
+        self.assertEqual(take_pending(self.key), [])
+        self.assertFalse(PendingNotification.objects.filter(recipient_key=self.key).exists())
+        self.assertEqual(PendingNotification.objects.filter(recipient_key='user:7').count(), 3)
+
+    def test_events_after_take_schedule_a_new_flush(self):
+        self.queue('planning')
+        take_pending(self.key)
+
+        apply_async = self.queue('completed')
+
+        scheduled = [call.args[0][0] for call in apply_async.call_args_list]
+        # The user was not flushed, so its flush is still pending
+        self.assertEqual(scheduled, [self.key])
+        self.assertEqual([event['new_status'] for event in take_pending(self.key)], ['completed'])
+
+    @override_settings(NOTIFICATION_CHANNELS={'webhook': {'backend': '', 'rate_limit': 2}})
+    def test_rate_limit_defers_after_the_limit(self):
+        self.assertEqual(acquire_rate('webhook'), 0)
+        self.assertEqual(acquire_rate('webhook'), 0)
+        self.assertGreater(acquire_rate('webhook'), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WebhookChannelTests(TestCase):
+    """Webhook deliveries against the local stub server."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookStubHandler)
+        self.server.daemon_threads = True
+        self.server.command = SimpleNamespace(stdout=io.StringIO())
+        self.server.secret = 'segredo'
+        self.server.status = 200
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        organization = Organization.objects.create(name='Acme', slug='acme')
+        self.endpoint = WebhookEndpoint.objects.create(
+            organization=organization,
+            url=f'http://127.0.0.1:{self.server.server_address[1]}/hook',
+            secret='segredo',
+        )
+        self.channel = WebhookChannel('webhook', timeout=5)
+        self.events = [make_event(organization, 'planning'), make_event(organization, 'completed')]
+
+    @property
+    def output(self):
+        return self.server.command.stdout.getvalue()
+
+    def test_signed_delivery(self):
+        self.channel.send(self.endpoint, self.events)
+
+        self.assertIn('2 evento(s), assinatura valida', self.output)
+        self.endpoint.refresh_from_db()
+        self.assertIsNotNone(self.endpoint.last_success_at)
+        self.assertEqual(self.endpoint.last_error, '')
+
+    def test_wrong_secret_is_detected_by_the_receiver(self):
+        self.server.secret = 'outro'
+
+        self.channel.send(self.endpoint, self.events)
+
+        self.assertIn('assinatura INVALIDA', self.output)
+
+    def test_server_error_is_retryable(self):
+        self.server.status = 503
+
+        with self.assertRaises(DeliveryError) as context:
+            self.channel.send(self.endpoint, self.events)
+
+        self.assertTrue(context.exception.retryable)
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.last_error, 'HTTP 503')
+        self.assertIsNone(self.endpoint.last_success_at)
+
+    def test_client_error_is_permanent(self):
+        self.server.status = 400
+
+        with self.assertRaises(DeliveryError) as context:
+            self.channel.send(self.endpoint, self.events)
+
+        self.assertFalse(context.exception.retryable)
+
+    def test_throttling_is_retryable(self):
+        self.server.status = 429
+
+        with self.assertRaises(DeliveryError) as context:
+            self.channel.send(self.endpoint, self.events)
+
+        self.assertTrue(context.exception.retryable)
+
+    def test_unreachable_endpoint_is_retryable(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(DeliveryError) as context:
+            self.channel.send(self.endpoint, self.events)
+
+        self.assertTrue(context.exception.retryable)
+        self.endpoint.refresh_from_db()
+        self.assertNotEqual(self.endpoint.last_error, '')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, NOTIFICATION_MAX_RETRIES=2)
+class DeliveryTaskTests(TestCase):
+    """deliver_notification drops, defers and gives up according to the channel."""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Acme', slug='acme')
+        self.user = get_user_model().objects.create_user('destinatario')
+        self.key = f'user:{self.user.pk}'
+        self.events = [make_event(self.organization, 'completed')]
+        self.channel = mock.Mock(spec=InAppChannel('in_app'))
+        self.channel.get_recipient.return_value = self.user
+        self.enterContext(mock.patch('apps.notifications.tasks.get_channel', return_value=self.channel))
+
+    def deliver(self):
+        return deliver_notification.apply(args=['in_app', self.key, self.events])
+
+    def test_delivers_to_the_recipient(self):
+        self.deliver()
+
+        self.channel.send.assert_called_once_with(self.user, self.events)
+
+    def test_missing_recipient_is_dropped(self):
+        self.channel.get_recipient.return_value = None
+
+        self.deliver()
+
+        self.channel.send.assert_not_called()
+
+    def test_rate_limited_delivery_is_requeued(self):
+        with (
+            mock.patch('apps.notifications.tasks.acquire_rate', return_value=12),
+            mock.patch.object(deliver_notification, 'apply_async') as apply_async,
+        ):
+            self.deliver()
+
+        self.channel.send.assert_not_called()
+        apply_async.assert_called_once_with(('in_app', self.key, self.events), countdown=12)
+
+    def test_permanent_failure_is_not_retried(self):
+        self.channel.send.side_effect = DeliveryError('recusado', retryable=False)
+
+        with self.assertLogs('apps.notifications.tasks', 'ERROR'):
+            result = self.deliver()
+
+        self.assertEqual(result.state, 'SUCCESS')
+        self.assertEqual(self.channel.send.call_count, 1)
+
+    def test_retryable_failure_is_retried_up_to_the_limit(self):
+        self.channel.send.side_effect = DeliveryError('indisponivel')
+
+        with self.assertLogs('apps.notifications.tasks', 'WARNING') as logs:
+            self.deliver()
+
+        self.assertEqual(self.channel.send.call_count, 3)
+        self.assertIn('failed permanently', logs.output[-1])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class InAppChannelTests(TestCase):
+    """In-app deliveries store one Notification per event."""
+
+    def test_stores_each_event(self):
+        organization = Organization.objects.create(name='Acme', slug='acme')
+        user = get_user_model().objects.create_user('destinatario')
+        events = [make_event(organization, 'planning'), make_event(organization, 'completed')]
+
+        InAppChannel('in_app').send(user, events)
+
+        notifications = Notification.objects.filter(recipient=user).order_by('message')
+        self.assertEqual(
+            [notification.message for notification in notifications],
+            ['Status alterado para completed', 'Status alterado para planning'],
+        )
+        self.assertEqual(notifications[0].event_type, 'problem.status_changed')
+
+    def test_summary_of_a_batch(self):
+        organization = Organization.objects.create(name='Acme', slug='acme')
+
+        title, text = summarize([make_event(organization, 'planning'), make_event(organization, 'completed')])
+
+        self.assertEqual(title, '2 atualizacoes de problemas')
+        self.assertEqual(text.splitlines()[1], '- Problema: Status alterado para completed')
@@ -3,6 +3,8 @@ Django admin configuration for organizations app.
 """
 
 from django.contrib import admin
+
+from apps.common.admin import AnnotatedCountsAdminMixin, annotated_count
 from .models import Organization, OrganizationMember, Repository
 
 
@@ -23,7 +25,7 @@ class RepositoryInline(admin.TabularInline):
 
 
 @admin.register(Organization)
-class OrganizationAdmin(admin.ModelAdmin):
+class OrganizationAdmin(AnnotatedCountsAdminMixin, admin.ModelAdmin):
     """Admin configuration for Organization model."""
 
     list_display = ['name', 'slug', 'is_active', 'member_count', 'repository_count', 'created_at']
@@ -32,13 +34,20 @@ class OrganizationAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['id', 'created_at', 'updated_at']
     inlines = [OrganizationMemberInline, RepositoryInline]
+    count_annotations = {
+        'member_count': 'members',
+        'repository_count': 'repositories',
+    }
 
     fieldsets = (
         (None, {
             'fields': ('id', 'name', 'slug', 'description')
         }),
         ('Configuracoes', {
-            'fields': ('logo_url', 'is_active')
+            'fields': ('logo_url', 'is_active', 'execution_retention_days')
+        }),
+        ('Limites de LLM', {
+            'fields': ('llm_requests_per_minute', 'llm_tokens_per_minute')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -46,15 +55,8 @@ class OrganizationAdmin(admin.ModelAdmin):
         }),
     )
 
-    def member_count(self, obj):
-        """Return the number of members in the organization."""
-        return obj.members.count()
-    member_count.short_description = 'Membros'
-
-    def repository_count(self, obj):
-        """Return the number of repositories in the organization."""
-        return obj.repositories.count()
-    repository_count.short_description = 'Repositorios'
+    member_count = annotated_count('member_count', 'Membros')
+    repository_count = annotated_count('repository_count', 'Repositorios')
 
 
 @admin.register(OrganizationMember)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organization",
+            name="execution_retention_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Dias de retencao das execucoes de tarefas (vazio usa o padrao do sistema)",
+                null=True,
+                verbose_name="retencao de execucoes (dias)",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0002_organization_execution_retention_days"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organization",
+            name="llm_requests_per_minute",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Limite de requisicoes aos provedores de LLM (vazio usa o padrao do sistema)",
+                null=True,
+                verbose_name="requisicoes LLM por minuto",
+            ),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="llm_tokens_per_minute",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Limite de tokens consumidos nos provedores de LLM (vazio usa o padrao do sistema)",
+                null=True,
+                verbose_name="tokens LLM por minuto",
+            ),
+        ),
+    ]
@@ -26,6 +26,9 @@ class Organization(TimestampedModel):
         description: Optional description
         logo_url: Optional URL to organization logo
         is_active: Whether the organization is active
+        execution_retention_days: Retention window for finished task executions
+        llm_requests_per_minute: Budget of LLM requests (see apps.agents.limits)
+        llm_tokens_per_minute: Budget of LLM tokens (see apps.agents.limits)
     """
 
     id = models.UUIDField(
@@ -61,6 +64,24 @@ class Organization(TimestampedModel):
         default=True,
         help_text='Se a organizacao esta ativa'
     )
+    execution_retention_days = models.PositiveIntegerField(
+        'retencao de execucoes (dias)',
+        null=True,
+        blank=True,
+        help_text='Dias de retencao das execucoes de tarefas (vazio usa o padrao do sistema)'
+    )
+    llm_requests_per_minute = models.PositiveIntegerField(
+        'requisicoes LLM por minuto',
+        null=True,
+        blank=True,
+        help_text='Limite de requisicoes aos provedores de LLM (vazio usa o padrao do sistema)'
+    )
+    llm_tokens_per_minute = models.PositiveIntegerField(
+        'tokens LLM por minuto',
+        null=True,
+        blank=True,
+        help_text='Limite de tokens consumidos nos provedores de LLM (vazio usa o padrao do sistema)'
+    )
 
     class Meta:
         verbose_name = 'Organizacao'
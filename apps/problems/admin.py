@@ -8,7 +8,20 @@ and configures its display and editing options.
 from django.contrib import admin
 from django.utils.html import format_html
 
-from apps.problems.models import Problem
+from apps.problems.models import Problem, ProblemStageResult
+
+
+class ProblemStageResultInline(admin.TabularInline):
+    """Read-only list of the completed workflow stage parts."""
+
+    model = ProblemStageResult
+    fields = ['stage', 'part', 'workflow_id', 'completed_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Problem)
@@ -43,6 +56,7 @@ class ProblemAdmin(admin.ModelAdmin):
         'workflow_id',
     ]
     filter_horizontal = ['repositories']
+    inlines = [ProblemStageResultInline]
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
 
@@ -0,0 +1,54 @@
+"""
+Management command para retomar workflows de problemas.
+
+Sem opcoes, retoma as etapas automatizadas sem progresso ha mais de
+PROBLEM_WORKFLOW_STALL_SECONDS (por padrao, o maior time_limit dos workers
+que executam as etapas mais PROBLEM_WORKFLOW_STALL_MARGIN), por exemplo
+apos a queda de um worker. Com --problem, retoma a etapa atual do problema
+indicado imediatamente. Apenas as partes da etapa que ainda nao foram
+concluidas sao executadas.
+
+Usage:
+    python manage.py resume_workflows
+    python manage.py resume_workflows --problem <uuid>
+    python manage.py resume_workflows --stall-seconds 600
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.problems.models import Problem
+from apps.problems.workflow import is_automated, resume_stalled, start_stage
+
+
+class Command(BaseCommand):
+    help = 'Retoma as etapas automatizadas interrompidas do workflow de problemas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--problem',
+            action='append',
+            default=[],
+            help='ID do problema a retomar (pode ser repetido)',
+        )
+        parser.add_argument(
+            '--stall-seconds',
+            type=int,
+            default=None,
+            help='Tempo sem progresso para considerar uma etapa parada',
+        )
+
+    def handle(self, *args, **options):
+        if not options['problem']:
+            resumed = resume_stalled(options['stall_seconds'])
+            self.stdout.write(self.style.SUCCESS(f'{resumed} workflow(s) retomado(s).'))
+            return
+
+        for problem_id in options['problem']:
+            problem = Problem.objects.filter(pk=problem_id).first()
+            if problem is None:
+                raise CommandError(f'Problema {problem_id} nao encontrado')
+            if not is_automated(problem.status):
+                self.stdout.write(f'  {problem.title}: status {problem.status} nao e automatizado')
+                continue
+            workflow_id = start_stage(problem, resume=True)
+            self.stdout.write(f'  {problem.title}: etapa {problem.status} retomada ({workflow_id})')
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("problems", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProblemStageResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "stage",
+                    models.CharField(
+                        choices=[
+                            ("draft", "Rascunho"),
+                            ("analyzing", "Analisando"),
+                            ("prd_generation", "Gerando PRD"),
+                            ("prd_review", "Revisao de PRD"),
+                            ("spec_generation", "Gerando Especificacao"),
+                            ("spec_review", "Revisao de Especificacao"),
+                            ("task_creation", "Criando Tarefas"),
+                            ("task_selection", "Selecao de Tarefas"),
+                            ("executing", "Executando"),
+                            ("testing", "Testando"),
+                            ("completed", "Concluido"),
+                            ("failed", "Falhou"),
+                            ("cancelled", "Cancelado"),
+                        ],
+                        help_text="Status automatizado que produziu o resultado",
+                        max_length=20,
+                        verbose_name="etapa",
+                    ),
+                ),
+                (
+                    "part",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="ID do repositorio nas etapas por repositorio",
+                        max_length=64,
+                        verbose_name="parte",
+                    ),
+                ),
+                (
+                    "workflow_id",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="ID do workflow Celery que produziu o resultado",
+                        max_length=255,
+                        verbose_name="ID do workflow",
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Valor retornado pela etapa",
+                        verbose_name="resultado",
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Data e hora de conclusao da parte",
+                        verbose_name="concluido em",
+                    ),
+                ),
+                (
+                    "problem",
+                    models.ForeignKey(
+                        help_text="Problema ao qual o resultado pertence",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stage_results",
+                        to="problems.problem",
+                        verbose_name="problema",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resultado de etapa",
+                "verbose_name_plural": "Resultados de etapas",
+                "db_table": "problems_stage_result",
+                "ordering": ["completed_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("problem", "stage", "part"),
+                        name="problems_stage_result_unique_part",
+                    )
+                ],
+            },
+        ),
+    ]
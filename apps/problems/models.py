@@ -15,6 +15,7 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from apps.common.models import TimestampedModel
+from apps.events.outbox import save_transition
 from apps.organizations.models import Organization, Repository
 
 
@@ -39,7 +40,7 @@ class Problem(TimestampedModel):
         status: Current workflow status
         priority: Priority level (low, medium, high, critical)
         repositories: Repositories involved in solving this problem
-        workflow_id: Optional ID linking to Celery workflow
+        workflow_id: ID of the Celery canvas running the current stage
         error_message: Error message if status is 'failed'
     """
 
@@ -60,6 +61,17 @@ class Problem(TimestampedModel):
         ('cancelled', 'Cancelado'),
     ]
 
+    # Automated statuses driven by apps.problems.workflow: the status
+    # reached when the stage completes, the agent type whose queue runs it
+    # and whether the stage runs once per repository of the problem (in
+    # parallel)
+    WORKFLOW_STAGES = {
+        'analyzing': {'next': 'prd_generation', 'agent': 'business_analyst', 'per_repository': True},
+        'prd_generation': {'next': 'prd_review', 'agent': 'business_analyst'},
+        'spec_generation': {'next': 'spec_review', 'agent': 'tech_architect'},
+        'task_creation': {'next': 'task_selection', 'agent': 'task_planner'},
+    }
+
     # Priority choices
     PRIORITY_CHOICES = [
         ('low', 'Baixa'),
@@ -211,7 +223,9 @@ class Problem(TimestampedModel):
         elif new_status != 'failed':
             self.error_message = ''
 
-        self.save(update_fields=['status', 'error_message', 'updated_at'])
+        save_transition(
+            self, ['status', 'error_message', 'updated_at'], error_message=self.error_message
+        )
 
         logger.info(
             f"Problem '{self.title}' (id={self.pk}) transitioned from "
@@ -282,3 +296,76 @@ class Problem(TimestampedModel):
             'cancelled': 0,
         }
         return progress_map.get(self.status, 0)
+
+
+class ProblemStageResult(models.Model):
+    """
+    Completed part of an automated workflow stage.
+
+    A stage has one part, or one part per repository when it fans out.
+    Results are kept while the problem stays in the stage, so a resumed
+    stage only runs the parts that did not complete; they are cleared
+    when the stage is entered again.
+
+    Attributes:
+        problem: The problem
+        stage: Status of the stage
+        part: Repository id for per-repository stages, '' otherwise
+        workflow_id: Canvas that produced the result
+        result: Value returned by the stage handler
+        completed_at: When the part completed
+    """
+
+    problem = models.ForeignKey(
+        Problem,
+        on_delete=models.CASCADE,
+        related_name='stage_results',
+        verbose_name='problema',
+        help_text='Problema ao qual o resultado pertence'
+    )
+    stage = models.CharField(
+        'etapa',
+        max_length=20,
+        choices=Problem.STATUS_CHOICES,
+        help_text='Status automatizado que produziu o resultado'
+    )
+    part = models.CharField(
+        'parte',
+        max_length=64,
+        blank=True,
+        default='',
+        help_text='ID do repositorio nas etapas por repositorio'
+    )
+    workflow_id = models.CharField(
+        'ID do workflow',
+        max_length=255,
+        blank=True,
+        default='',
+        help_text='ID do workflow Celery que produziu o resultado'
+    )
+    result = models.JSONField(
+        'resultado',
+        default=dict,
+        blank=True,
+        help_text='Valor retornado pela etapa'
+    )
+    completed_at = models.DateTimeField(
+        'concluido em',
+        auto_now_add=True,
+        help_text='Data e hora de conclusao da parte'
+    )
+
+    class Meta:
+        verbose_name = 'Resultado de etapa'
+        verbose_name_plural = 'Resultados de etapas'
+        ordering = ['completed_at']
+        db_table = 'problems_stage_result'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['problem', 'stage', 'part'],
+                name='problems_stage_result_unique_part',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.problem_id} - {self.stage} {self.part}'.strip()
@@ -2,43 +2,25 @@
 Signal handlers for the Problems app.
 
 This module contains Django signal handlers that respond to model events,
-particularly for logging status changes on Problem instances.
+particularly for logging status changes on Problem instances and starting
+the automated workflow stages. The previous status comes from the change
+tracking of TimestampedModel, so no query is needed to detect a transition.
 """
 
 import logging
 
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from apps.notifications.dispatch import notify_problem_status
 from apps.problems.models import Problem
+from apps.problems.workflow import is_automated, start_stage
 
 
 logger = logging.getLogger(__name__)
 
 
-@receiver(pre_save, sender=Problem)
-def problem_pre_save(sender, instance, **kwargs):
-    """
-    Signal handler that runs before a Problem is saved.
-
-    Captures the old status for comparison in post_save signal.
-    Stores the old status in a temporary attribute on the instance.
-
-    Args:
-        sender: The model class (Problem)
-        instance: The Problem instance being saved
-        **kwargs: Additional keyword arguments from the signal
-    """
-    if instance.pk:
-        try:
-            old_instance = Problem.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-        except Problem.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
-
-
 @receiver(post_save, sender=Problem)
 def problem_post_save(sender, instance, created, **kwargs):
     """
@@ -61,8 +43,8 @@ def problem_post_save(sender, instance, created, **kwargs):
             f"Problem '{instance.title}' initial status: {instance.status}"
         )
     else:
-        old_status = getattr(instance, '_old_status', None)
-        if old_status and old_status != instance.status:
+        old_status = instance.old_value('status')
+        if old_status and instance.has_changed('status'):
             logger.info(
                 f"Problem '{instance.title}' (id={instance.pk}) "
                 f"status changed: '{old_status}' -> '{instance.status}'"
@@ -91,8 +73,9 @@ def problem_status_notification(sender, instance, created, **kwargs):
     """
     Signal handler for sending notifications on status changes.
 
-    This handler can be extended to send email notifications,
-    webhook calls, or other notification mechanisms.
+    Notable transitions are handed to the notification dispatcher, which
+    delivers them asynchronously (in-app, email and webhooks) after the
+    transaction commits.
 
     Args:
         sender: The model class (Problem)
@@ -104,8 +87,8 @@ def problem_status_notification(sender, instance, created, **kwargs):
     if created:
         return
 
-    old_status = getattr(instance, '_old_status', None)
-    if old_status and old_status != instance.status:
+    old_status = instance.old_value('status')
+    if instance.has_changed('status') and old_status:
         # Status transitions that might need notifications
         notification_statuses = {
             'prd_review': 'PRD pronto para revisao',
@@ -120,8 +103,21 @@ def problem_status_notification(sender, instance, created, **kwargs):
             logger.debug(
                 f"Notification triggered for Problem '{instance.title}': {message}"
             )
-            # TODO: Implement actual notification sending
-            # Examples:
-            # - Send email to instance.created_by
-            # - Send webhook to external service
-            # - Create in-app notification
+            notify_problem_status(instance, old_status, instance.status, message)
+
+
+@receiver(post_save, sender=Problem)
+def problem_workflow_stage(sender, instance, created, **kwargs):
+    """
+    Start the workflow canvas when a Problem enters an automated status.
+
+    Args:
+        sender: The model class (Problem)
+        instance: The Problem instance that was saved
+        created: Boolean indicating if this is a new instance
+        **kwargs: Additional keyword arguments from the signal
+    """
+    if not instance.has_changed('status') and not created:
+        return
+    if is_automated(instance.status):
+        transaction.on_commit(lambda: start_stage(instance))
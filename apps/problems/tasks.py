@@ -0,0 +1,65 @@
+"""
+Celery tasks of the Problem workflow (see apps.problems.workflow).
+"""
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from apps.problems import workflow
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True)
+def run_workflow_stage_part(self, problem_id, stage, workflow_id, part):
+    """
+    Run one part of an automated stage.
+
+    Failures are retried with exponential backoff; after the last retry
+    the problem is marked as failed.
+
+    Args:
+        problem_id: Primary key of the Problem.
+        stage: Status of the stage.
+        workflow_id: Canvas id the part belongs to.
+        part: Repository id, or '' for single-part stages.
+    """
+    try:
+        workflow.run_stage_part(problem_id, stage, workflow_id, part)
+    except Exception as exc:
+        if self.request.retries < settings.PROBLEM_WORKFLOW_MAX_RETRIES:
+            countdown = settings.PROBLEM_WORKFLOW_RETRY_BACKOFF * (2 ** self.request.retries)
+            logger.warning(
+                f"Problem {problem_id} stage '{stage}' part {part or '-'} failed ({exc}), "
+                f'retrying in {countdown}s'
+            )
+            raise self.retry(exc=exc, countdown=countdown, max_retries=settings.PROBLEM_WORKFLOW_MAX_RETRIES)
+        logger.exception(f"Problem {problem_id} stage '{stage}' part {part or '-'} failed")
+        workflow.fail_stage(problem_id, stage, workflow_id, exc)
+
+
+@shared_task(acks_late=True)
+def complete_workflow_stage(problem_id, stage, workflow_id):
+    """
+    Advance the problem after the parts of its stage completed.
+
+    Args:
+        problem_id: Primary key of the Problem.
+        stage: Status of the stage.
+        workflow_id: Canvas id (this task's id).
+    """
+    return workflow.complete_stage(problem_id, stage, workflow_id)
+
+
+@shared_task(ignore_result=True)
+def resume_stalled_workflows():
+    """
+    Resume automated stages that stopped progressing (e.g. worker crash).
+
+    Scheduled periodically by CELERY_BEAT_SCHEDULE.
+    """
+    resumed = workflow.resume_stalled()
+    if resumed:
+        logger.info(f'Resumed {resumed} stalled problem workflow(s)')
@@ -1,3 +1,201 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from celery import chord
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.organizations.models import Organization, Repository
+from apps.problems import workflow
+from apps.problems.models import Problem, ProblemStageResult
+from apps.problems.tasks import run_workflow_stage_part
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+HANDLER = 'apps.problems.tests.echo_handler'
+
+HANDLERS = {'analyzing': HANDLER, 'prd_generation': HANDLER, 'spec_generation': '', 'task_creation': ''}
+
+
+def echo_handler(problem, repository):
+    return {'repository': repository.name if repository else None}
+
+
+def failing_handler(problem, repository):
+    raise RuntimeError('agente indisponivel')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROBLEM_WORKFLOW_HANDLERS=HANDLERS)
+class WorkflowTests(TestCase):
+    """Stages run their parts once and advance the problem when all completed."""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Acme', slug='acme')
+        self.problem = Problem.objects.create(
+            organization=self.organization, title='Problema', description='Descricao', status='analyzing'
+        )
+        self.repositories = [
+            Repository.objects.create(organization=self.organization, name=name, url=f'https://github.com/acme/{name}')
+            for name in ('api', 'web')
+        ]
+        self.problem.repositories.set(self.repositories)
+        self.parts = sorted(str(repository.pk) for repository in self.repositories)
+        self.enterContext(mock.patch('apps.events.tasks.relay_outbox_events.delay'))
+
+    def start(self, problem=None, resume=False):
+        with (
+            mock.patch('apps.problems.workflow.build_stage_canvas') as build,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            workflow_id = workflow.start_stage(problem or self.problem, resume=resume)
+        return workflow_id, build
+
+    def test_only_stages_with_a_handler_are_automated(self):
+        self.assertTrue(workflow.is_automated('analyzing'))
+        self.assertFalse(workflow.is_automated('spec_generation'))
+        self.assertFalse(workflow.is_automated('prd_review'))
+
+    def test_per_repository_stages_have_one_part_per_repository(self):
+        self.assertEqual(workflow.stage_parts(self.problem, 'analyzing'), self.parts)
+        self.assertEqual(workflow.stage_parts(self.problem, 'prd_generation'), [''])
+
+        self.problem.repositories.clear()
+        self.assertEqual(workflow.stage_parts(self.problem, 'analyzing'), [''])
+
+    def test_start_stores_the_workflow_and_applies_the_canvas_after_commit(self):
+        workflow_id, build = self.start()
+
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.workflow_id, workflow_id)
+        build.assert_called_once_with(str(self.problem.pk), 'analyzing', workflow_id, self.parts, 'medium')
+        build.return_value.apply_async.assert_called_once_with()
+
+    def test_statuses_without_a_handler_are_not_started(self):
+        Problem.objects.filter(pk=self.problem.pk).update(status='prd_review')
+        self.problem.refresh_from_db()
+
+        workflow_id, build = self.start()
+
+        self.assertIsNone(workflow_id)
+        build.assert_not_called()
+
+    def test_canvas_fans_out_to_the_agent_queue(self):
+        canvas = workflow.build_stage_canvas('problem', 'analyzing', 'wf', self.parts, 'high')
+
+        self.assertIsInstance(canvas, chord)
+        self.assertEqual([part.options['queue'] for part in canvas.tasks], ['agent.business_analyst'] * 2)
+        self.assertEqual(canvas.body.options['task_id'], 'wf')
+
+        single = workflow.build_stage_canvas('problem', 'prd_generation', 'wf', [''], 'critical')
+        self.assertEqual(
+            [task.name for task in single.tasks],
+            ['apps.problems.tasks.run_workflow_stage_part', 'apps.problems.tasks.complete_workflow_stage'],
+        )
+        self.assertEqual(single.tasks[0].options['queue'], 'critical')
+
+    def test_parts_run_once_and_the_last_one_advances_the_problem(self):
+        workflow_id, _ = self.start()
+
+        self.assertTrue(workflow.run_stage_part(self.problem.pk, 'analyzing', workflow_id, self.parts[0]))
+        self.assertFalse(workflow.complete_stage(self.problem.pk, 'analyzing', workflow_id))
+
+        for part in self.parts:
+            workflow.run_stage_part(self.problem.pk, 'analyzing', workflow_id, part)
+        with mock.patch('apps.problems.signals.start_stage'):
+            self.assertTrue(workflow.complete_stage(self.problem.pk, 'analyzing', workflow_id))
+
+        self.assertEqual(ProblemStageResult.objects.filter(problem=self.problem).count(), 2)
+        self.assertEqual(
+            workflow.stage_results(self.problem, 'analyzing')[self.parts[0]],
+            {'repository': Repository.objects.get(pk=self.parts[0]).name},
+        )
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.status, 'prd_generation')
+
+    def test_superseded_workflow_does_nothing(self):
+        old_workflow, _ = self.start()
+        self.start()
+
+        self.assertFalse(workflow.run_stage_part(self.problem.pk, 'analyzing', old_workflow, self.parts[0]))
+        self.assertFalse(workflow.complete_stage(self.problem.pk, 'analyzing', old_workflow))
+        self.assertFalse(ProblemStageResult.objects.exists())
+
+    def test_resume_runs_only_the_missing_parts(self):
+        workflow_id, _ = self.start()
+        workflow.run_stage_part(self.problem.pk, 'analyzing', workflow_id, self.parts[0])
+
+        resumed_id, build = self.start(resume=True)
+
+        self.assertEqual(build.call_args.args[3], self.parts[1:])
+        self.assertEqual(ProblemStageResult.objects.count(), 1)
+        self.assertNotEqual(resumed_id, workflow_id)
+
+    def test_restart_drops_the_previous_results(self):
+        workflow_id, _ = self.start()
+        workflow.run_stage_part(self.problem.pk, 'analyzing', workflow_id, self.parts[0])
+
+        self.start()
+
+        self.assertFalse(ProblemStageResult.objects.exists())
+
+    @override_settings(
+        PROBLEM_WORKFLOW_HANDLERS={**HANDLERS, 'analyzing': 'apps.problems.tests.failing_handler'},
+        PROBLEM_WORKFLOW_MAX_RETRIES=1,
+    )
+    def test_part_failing_after_its_retries_fails_the_problem(self):
+        workflow_id, _ = self.start()
+
+        with self.assertLogs('apps.problems.tasks', 'WARNING'):
+            run_workflow_stage_part.apply(args=[str(self.problem.pk), 'analyzing', workflow_id, self.parts[0]])
+
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.status, 'failed')
+        self.assertIn('agente indisponivel', self.problem.error_message)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROBLEM_WORKFLOW_HANDLERS=HANDLERS)
+class StalledWorkflowTests(TestCase):
+    """Stages without progress for the stall window are resumed."""
+
+    def setUp(self):
+        organization = Organization.objects.create(name='Acme', slug='acme')
+        self.problem = Problem.objects.create(
+            organization=organization, title='Problema', description='Descricao', status='prd_generation'
+        )
+        self.old = timezone.now() - timedelta(hours=1)
+        Problem.objects.filter(pk=self.problem.pk).update(updated_at=self.old)
+
+    @override_settings(PROBLEM_WORKFLOW_STALL_SECONDS=None, PROBLEM_WORKFLOW_STALL_MARGIN=60)
+    def test_window_exceeds_the_longest_time_limit_of_the_stage_workers(self):
+        # Critical stage parts run on workers with a two hour limit
+        self.assertEqual(workflow.stall_window(), 2 * 60 * 60 + 60)
+
+    @override_settings(PROBLEM_WORKFLOW_STALL_SECONDS=600)
+    def test_configured_window_wins(self):
+        self.assertEqual(workflow.stall_window(), 600)
+
+    def test_problem_without_progress_is_stalled(self):
+        self.assertEqual(workflow.stalled_problems(stall_seconds=600), [self.problem])
+        self.assertEqual(workflow.stalled_problems(stall_seconds=2 * 60 * 60), [])
+
+    def test_recent_part_counts_as_progress(self):
+        ProblemStageResult.objects.create(problem=self.problem, stage='prd_generation', part='', workflow_id='wf')
+
+        self.assertEqual(workflow.stalled_problems(stall_seconds=600), [])
+
+    def test_manual_stages_are_never_stalled(self):
+        Problem.objects.filter(pk=self.problem.pk).update(status='prd_review', updated_at=self.old)
+
+        self.assertEqual(workflow.stalled_problems(stall_seconds=600), [])
+
+    def test_resume_stalled_restarts_the_stage(self):
+        with (
+            mock.patch('apps.problems.workflow.build_stage_canvas'),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.assertEqual(workflow.resume_stalled(stall_seconds=600), 1)
+
+        self.problem.refresh_from_db()
+        self.assertNotEqual(self.problem.workflow_id, '')
+        self.assertEqual(workflow.stalled_problems(stall_seconds=600), [])
@@ -0,0 +1,280 @@
+"""
+Workflow engine of the Problem status pipeline.
+
+Each automated status in ``Problem.WORKFLOW_STAGES`` with a handler in
+``PROBLEM_WORKFLOW_HANDLERS`` runs as a Celery canvas when the problem
+enters it: a chain of one part, or a chord with one part per repository
+for stages that fan out. The canvas id is stored in ``workflow_id``; its
+final task advances the problem with ``transition_to`` to the next status,
+which starts the next automated stage. Statuses without a handler
+(reviews, selection) wait for a person.
+
+Every completed part is stored as a ProblemStageResult. The current
+status is the last completed stage, so resuming a stalled problem re-runs
+only the parts of its current stage that have no result. Parts and the
+final task check ``workflow_id`` first, so a superseded canvas does
+nothing.
+"""
+import logging
+import uuid
+
+from celery import chain, chord
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.common.routing import CRITICAL_QUEUE, agent_queue, agent_route
+from apps.problems.models import Problem, ProblemStageResult
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_stage_handler(stage):
+    """
+    Return the handler configured for an automated status.
+
+    Handlers are called as ``handler(problem, repository)`` (repository is
+    None unless the stage runs per repository) and return a
+    JSON-serializable result.
+
+    Returns:
+        callable or None: None if the stage is not automated.
+    """
+    path = settings.PROBLEM_WORKFLOW_HANDLERS.get(stage)
+    return import_string(path) if path else None
+
+
+def is_automated(stage):
+    """Check whether a status is run by the workflow engine."""
+    return stage in Problem.WORKFLOW_STAGES and bool(settings.PROBLEM_WORKFLOW_HANDLERS.get(stage))
+
+
+def stage_parts(problem, stage):
+    """Return the part keys of a stage ('' for a single part)."""
+    if Problem.WORKFLOW_STAGES[stage].get('per_repository'):
+        parts = [str(pk) for pk in problem.repositories.order_by('pk').values_list('pk', flat=True)]
+        if parts:
+            return parts
+    return ['']
+
+
+def stage_results(problem, stage):
+    """
+    Return the stored results of a stage.
+
+    Returns:
+        dict: Part key to result.
+    """
+    return dict(
+        ProblemStageResult.objects.filter(problem=problem, stage=stage).values_list('part', 'result')
+    )
+
+
+def build_stage_canvas(problem_id, stage, workflow_id, parts, priority='medium'):
+    """
+    Return the canvas running the given parts of a stage.
+
+    Parts are published to the queue of the stage's agent type with the
+    problem's priority. The final task has id ``workflow_id``, so the
+    canvas result id is the stored workflow id.
+    """
+    from apps.problems.tasks import complete_workflow_stage, run_workflow_stage_part
+
+    route = agent_route(Problem.WORKFLOW_STAGES[stage].get('agent'), priority)
+    header = [
+        run_workflow_stage_part.si(problem_id, stage, workflow_id, part).set(**route)
+        for part in parts
+    ]
+    body = complete_workflow_stage.si(problem_id, stage, workflow_id).set(task_id=workflow_id)
+    if len(header) > 1:
+        return chord(header, body)
+    return chain(*header, body)
+
+
+def start_stage(problem, resume=False):
+    """
+    Start the canvas of the problem's current status.
+
+    Args:
+        problem: Problem in an automated status.
+        resume: Keep the results of completed parts and run only the
+            missing ones (otherwise the stage starts from scratch).
+
+    Returns:
+        str or None: The workflow id, or None if the status is not automated.
+    """
+    stage = problem.status
+    if not is_automated(stage):
+        return None
+
+    problem_id = str(problem.pk)
+    parts = stage_parts(problem, stage)
+    if resume:
+        done = set(stage_results(problem, stage))
+        parts = [part for part in parts if part not in done]
+    workflow_id = str(uuid.uuid4())
+
+    with transaction.atomic():
+        if not resume:
+            ProblemStageResult.objects.filter(problem=problem, stage=stage).delete()
+        started = Problem.objects.filter(pk=problem.pk, status=stage).update(
+            workflow_id=workflow_id, updated_at=timezone.now()
+        )
+        if not started:
+            return None
+        problem.workflow_id = workflow_id
+        canvas = build_stage_canvas(problem_id, stage, workflow_id, parts, problem.priority)
+        transaction.on_commit(canvas.apply_async)
+
+    logger.info(
+        f"Problem '{problem.title}' (id={problem_id}) stage '{stage}' "
+        f"{'resumed' if resume else 'started'}: {len(parts)} part(s), workflow {workflow_id}"
+    )
+    return workflow_id
+
+
+def _current(problem_id, stage, workflow_id, lock=False):
+    queryset = Problem.objects.filter(pk=problem_id)
+    if lock:
+        queryset = queryset.select_for_update()
+    problem = queryset.first()
+    if problem is None or problem.status != stage or problem.workflow_id != workflow_id:
+        logger.info(f'Workflow {workflow_id} of problem {problem_id} was superseded, skipping')
+        return None
+    return problem
+
+
+def run_stage_part(problem_id, stage, workflow_id, part):
+    """
+    Run one part of a stage unless it already completed.
+
+    Returns:
+        bool: False if the workflow was superseded.
+
+    Raises:
+        Exception: Whatever the handler raises (retried by the task).
+    """
+    from apps.organizations.models import Repository
+
+    problem = _current(problem_id, stage, workflow_id)
+    if problem is None:
+        return False
+    if ProblemStageResult.objects.filter(problem=problem, stage=stage, part=part).exists():
+        return True
+
+    repository = Repository.objects.get(pk=part) if part else None
+    result = get_stage_handler(stage)(problem, repository)
+    ProblemStageResult.objects.get_or_create(
+        problem=problem,
+        stage=stage,
+        part=part,
+        defaults={'workflow_id': workflow_id, 'result': result if result is not None else {}},
+    )
+    return True
+
+
+def complete_stage(problem_id, stage, workflow_id):
+    """
+    Advance the problem once every part of its stage has a result.
+
+    Returns:
+        bool: True if the problem was advanced.
+    """
+    with transaction.atomic():
+        problem = _current(problem_id, stage, workflow_id, lock=True)
+        if problem is None:
+            return False
+        missing = set(stage_parts(problem, stage)) - set(stage_results(problem, stage))
+        if missing:
+            logger.warning(
+                f"Problem {problem_id} stage '{stage}' has {len(missing)} incomplete part(s); "
+                f'waiting for resume'
+            )
+            return False
+        problem.transition_to(Problem.WORKFLOW_STAGES[stage]['next'])
+    return True
+
+
+def fail_stage(problem_id, stage, workflow_id, error):
+    """Mark the problem as failed after a part exhausted its retries."""
+    with transaction.atomic():
+        problem = _current(problem_id, stage, workflow_id, lock=True)
+        if problem is not None:
+            problem.mark_failed(f"Etapa '{stage}' falhou: {error}")
+
+
+def stage_part_queues():
+    """Return the queues stage parts can be published to."""
+    queues = {agent_queue(config.get('agent')) for config in Problem.WORKFLOW_STAGES.values()}
+    queues.add(CRITICAL_QUEUE)
+    return queues
+
+
+def stall_window():
+    """
+    Return the seconds without progress after which a stage is stalled.
+
+    ``PROBLEM_WORKFLOW_STALL_SECONDS`` if set; otherwise the longest hard
+    time limit of the workers consuming the stage part queues (see
+    ``CELERY_WORKER_PROFILES``; queues without a profile use
+    ``CELERY_TASK_TIME_LIMIT``) plus ``PROBLEM_WORKFLOW_STALL_MARGIN``.
+    """
+    if settings.PROBLEM_WORKFLOW_STALL_SECONDS:
+        return settings.PROBLEM_WORKFLOW_STALL_SECONDS
+
+    profiles = settings.CELERY_WORKER_PROFILES.values()
+    longest = 0
+    for queue in stage_part_queues():
+        limits = [profile['time_limit'] for profile in profiles if queue in profile['queues']]
+        longest = max(longest, max(limits, default=settings.CELERY_TASK_TIME_LIMIT))
+    return longest + settings.PROBLEM_WORKFLOW_STALL_MARGIN
+
+
+def stalled_problems(stall_seconds=None):
+    """
+    Return problems whose automated stage shows no progress.
+
+    A stage is stalled when neither the problem nor any part of its stage
+    changed for ``stall_window()`` seconds (longer than the time limit of
+    the workers running the parts, so running parts are not considered
+    stalled).
+
+    Returns:
+        list: Problem instances.
+    """
+    stall_seconds = stall_seconds or stall_window()
+    cutoff = timezone.now() - timezone.timedelta(seconds=stall_seconds)
+    stages = [stage for stage in Problem.WORKFLOW_STAGES if is_automated(stage)]
+    candidates = list(Problem.objects.filter(status__in=stages, updated_at__lt=cutoff))
+    if not candidates:
+        return []
+
+    last_progress = {
+        (problem_id, stage): completed_at
+        for problem_id, stage, completed_at in ProblemStageResult.objects.filter(
+            problem__in=candidates
+        ).values('problem_id', 'stage').annotate(last=Max('completed_at')).values_list(
+            'problem_id', 'stage', 'last'
+        )
+    }
+    return [
+        problem for problem in candidates
+        if (last_progress.get((problem.pk, problem.status)) or problem.updated_at) < cutoff
+    ]
+
+
+def resume_stalled(stall_seconds=None):
+    """
+    Resume the stalled automated stages.
+
+    Returns:
+        int: Number of stages resumed.
+    """
+    resumed = 0
+    for problem in stalled_problems(stall_seconds):
+        if start_stage(problem, resume=True):
+            resumed += 1
+    return resumed
@@ -0,0 +1,31 @@
+"""
+Admin integration of the search index.
+
+FullTextSearchAdminMixin lets a ModelAdmin search heavy text columns
+through the full-text index instead of ``ILIKE '%term%'`` scans: only
+the light columns stay in ``search_fields``, and objects whose indexed
+text matches the term are added to the results.
+"""
+from apps.search.query import matching_object_ids
+
+
+class FullTextSearchAdminMixin:
+    """
+    ModelAdmin mixin combining ``search_fields`` with the search index.
+
+    Attributes:
+        search_entity: Entity name of the model in the search index
+    """
+
+    search_entity = None
+
+    def get_search_results(self, request, queryset, search_term):
+        """Add objects matched by the full-text index to the results."""
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term or not self.search_entity:
+            return results, may_have_duplicates
+
+        indexed = queryset.filter(pk__in=matching_object_ids(self.search_entity, search_term))
+        if not self.get_search_fields(request):
+            return indexed, may_have_duplicates
+        return results | indexed, may_have_duplicates
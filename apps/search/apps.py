@@ -0,0 +1,22 @@
+"""
+App configuration for the search Django application.
+"""
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    """Configuration for the Search application."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.search'
+    verbose_name = 'Busca'
+
+    def ready(self):
+        """
+        Run code when the app is ready.
+
+        Connects the incremental indexing signals of every indexed model.
+        """
+        from apps.search.signals import connect_signals
+
+        connect_signals()
@@ -0,0 +1,190 @@
+"""
+Incremental maintenance of the search index.
+
+On PostgreSQL the weighted ``tsvector`` of an entry is written together
+with its title and body, in the same INSERT or UPDATE statement. Other
+databases get a pure-Python inverted index instead: every entry is
+tokenized into SearchToken postings.
+"""
+import logging
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import connection, transaction
+from django.db.models import TextField, Value
+
+from apps.search.models import SearchEntry, SearchToken
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Occurrences in the title weigh as much as this many in the body
+TITLE_WEIGHT = 4
+
+MAX_TOKEN_LENGTH = 64
+
+
+def uses_postgres_search():
+    """Return True if the database supports native full-text search."""
+    return connection.vendor == 'postgresql'
+
+
+def normalize(text):
+    """Lowercase a text and strip its accents."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """
+    Split a text into normalized tokens.
+
+    Args:
+        text: Any text.
+
+    Yields:
+        str: Tokens of 2 to MAX_TOKEN_LENGTH characters.
+    """
+    for match in TOKEN_RE.finditer(normalize(text or '')):
+        token = match.group()
+        if 2 <= len(token) <= MAX_TOKEN_LENGTH:
+            yield token
+
+
+def search_vector(title, body):
+    """
+    Return the weighted tsvector expression of a title and body.
+
+    The texts are passed as values, not column references, so the
+    expression can be used in INSERT and UPDATE statements alike.
+    """
+    config = settings.SEARCH_TEXT_CONFIG
+    return (
+        SearchVector(Value(title, output_field=TextField()), weight='A', config=config)
+        + SearchVector(Value(body, output_field=TextField()), weight='B', config=config)
+    )
+
+
+def index_object(source, instance):
+    """
+    Create, update or drop the entry of an object.
+
+    Args:
+        source: The SearchSource of the object's model.
+        instance: The model instance.
+    """
+    data = source.build(instance)
+    if data is None:
+        remove_objects(source.entity, [instance.pk])
+        return
+
+    title = data['title'][:255]
+    body = data['body'][:settings.SEARCH_MAX_BODY_CHARS]
+    values = {
+        'title': title,
+        'body': body,
+        'organization_id': data['organization_id'],
+        'problem_id': data['problem_id'],
+    }
+    postgres = uses_postgres_search()
+    if postgres:
+        values['search_vector'] = search_vector(title, body)
+
+    with transaction.atomic():
+        entries = SearchEntry.objects.filter(entity=source.entity, object_id=instance.pk)
+        if not entries.update(**values):
+            entries = SearchEntry.objects.filter(
+                pk=SearchEntry.objects.create(
+                    entity=source.entity, object_id=instance.pk, **values
+                ).pk
+            )
+        if not postgres:
+            entry_id = entries.values_list('pk', flat=True).get()
+            write_tokens(entry_id, title, body)
+
+        superseded = source.superseded(instance)
+        if superseded:
+            remove_objects(source.entity, superseded)
+
+
+def write_tokens(entry_id, title, body):
+    """
+    Replace the inverted index postings of an entry.
+
+    Args:
+        entry_id: Primary key of the SearchEntry.
+        title: Indexed title.
+        body: Indexed body.
+    """
+    counts = Counter(tokenize(body))
+    for token in tokenize(title):
+        counts[token] += TITLE_WEIGHT
+
+    SearchToken.objects.filter(entry_id=entry_id).delete()
+    SearchToken.objects.bulk_create(
+        [
+            SearchToken(entry_id=entry_id, token=token, frequency=frequency)
+            for token, frequency in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def remove_objects(entity, object_ids):
+    """
+    Drop the entries of objects.
+
+    Args:
+        entity: Entity name.
+        object_ids: Primary keys of the objects.
+    """
+    SearchEntry.objects.filter(entity=entity, object_id__in=object_ids).delete()
+
+
+def safe_index_object(source, instance):
+    """Index an object, logging failures instead of raising them."""
+    try:
+        index_object(source, instance)
+    except Exception:
+        logger.exception(f'Failed to index {source.entity} {instance.pk}')
+
+
+def safe_remove_object(source, instance, object_id):
+    """
+    Drop the entry of a deleted object and index its replacement.
+
+    Args:
+        source: The SearchSource of the object's model.
+        instance: The deleted instance.
+        object_id: Primary key the instance had before the delete.
+    """
+    try:
+        remove_objects(source.entity, [object_id])
+        replacement = source.replacement(instance, object_id)
+        if replacement is not None:
+            index_object(source, replacement)
+    except Exception:
+        logger.exception(f'Failed to remove {source.entity} {object_id} from the index')
+
+
+def rebuild_index(source, batch_size=500):
+    """
+    Reindex every object of a source.
+
+    Args:
+        source: The SearchSource to rebuild.
+        batch_size: Objects loaded per query.
+
+    Returns:
+        int: Number of objects processed.
+    """
+    count = 0
+    for instance in source.get_queryset().order_by('pk').iterator(chunk_size=batch_size):
+        index_object(source, instance)
+        count += 1
+    return count
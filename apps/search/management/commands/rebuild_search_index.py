@@ -0,0 +1,46 @@
+"""
+Management command para reconstruir o indice de busca.
+
+Reindexa PRDs, especificacoes tecnicas, tarefas e mensagens de chat.
+Util apos a instalacao do app de busca ou apos importacoes em massa
+feitas sem sinais.
+
+Usage:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --entity task --entity prd
+    python manage.py rebuild_search_index --clear  # Remove as entradas antes
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.search.indexing import rebuild_index
+from apps.search.models import SearchEntry
+from apps.search.sources import SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Reconstroi o indice de busca textual'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entity',
+            action='append',
+            choices=[source.entity for source in SOURCES],
+            help='Entidade a reindexar (pode ser repetido; padrao: todas)',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Remove as entradas existentes antes de reindexar',
+        )
+
+    def handle(self, *args, **options):
+        entities = options['entity'] or [source.entity for source in SOURCES]
+        for source in SOURCES:
+            if source.entity not in entities:
+                continue
+            if options['clear']:
+                SearchEntry.objects.filter(entity=source.entity).delete()
+            count = rebuild_index(source)
+            self.stdout.write(f'{source.entity}: {count} objetos processados')
+        self.stdout.write(self.style.SUCCESS('Indice de busca atualizado.'))
@@ -0,0 +1,199 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:47
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("organizations", "0002_organization_execution_retention_days"),
+        ("problems", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="Data e hora de criacao do registro",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        help_text="Data e hora da ultima atualizacao do registro",
+                        verbose_name="atualizado em",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[
+                            ("prd", "PRD"),
+                            ("tech_spec", "Especificacao Tecnica"),
+                            ("task", "Tarefa"),
+                            ("chat_message", "Mensagem de Chat"),
+                        ],
+                        help_text="Tipo do objeto indexado",
+                        max_length=20,
+                        verbose_name="entidade",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.UUIDField(
+                        help_text="Chave primaria do objeto indexado",
+                        verbose_name="ID do objeto",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(
+                        help_text="Titulo exibido nos resultados",
+                        max_length=255,
+                        verbose_name="titulo",
+                    ),
+                ),
+                (
+                    "body",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Texto indexado, usado tambem nos trechos destacados",
+                        verbose_name="texto",
+                    ),
+                ),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False,
+                        help_text="tsvector do titulo e do texto (somente PostgreSQL)",
+                        null=True,
+                        verbose_name="vetor de busca",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        help_text="Organizacao dona do objeto indexado",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_entries",
+                        to="organizations.organization",
+                        verbose_name="organizacao",
+                    ),
+                ),
+                (
+                    "problem",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Problema ao qual o objeto pertence",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_entries",
+                        to="problems.problem",
+                        verbose_name="problema",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entrada de Busca",
+                "verbose_name_plural": "Entradas de Busca",
+                "db_table": "search_entry",
+            },
+        ),
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(
+                        help_text="Termo normalizado",
+                        max_length=64,
+                        verbose_name="termo",
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.PositiveIntegerField(
+                        default=1,
+                        help_text="Numero ponderado de ocorrencias do termo",
+                        verbose_name="frequencia",
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        help_text="Entrada de busca que contem o termo",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tokens",
+                        to="search.searchentry",
+                        verbose_name="entrada",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Termo de Busca",
+                "verbose_name_plural": "Termos de Busca",
+                "db_table": "search_token",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="searchentry",
+            index=models.Index(
+                fields=["organization", "entity"], name="search_entr_organiz_2dfed8_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchentry",
+            index=models.Index(
+                fields=["problem", "entity"], name="search_entr_problem_8d6c3f_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="searchentry",
+            constraint=models.UniqueConstraint(
+                fields=("entity", "object_id"), name="unique_search_entry_per_object"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchtoken",
+            index=models.Index(
+                fields=["token", "entry"], name="search_toke_token_6aab99_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="searchtoken",
+            constraint=models.UniqueConstraint(
+                fields=("entry", "token"), name="unique_search_token_per_entry"
+            ),
+        ),
+    ]
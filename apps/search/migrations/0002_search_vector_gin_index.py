@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS search_entry_vector_gin "
+        "ON search_entry USING GIN (search_vector)"
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS search_entry_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
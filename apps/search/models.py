@@ -0,0 +1,143 @@
+"""
+Search models for Compozy.
+
+This module contains the unified full-text index over PRDs, tech specs,
+tasks and chat messages. Each indexed object has one SearchEntry row; on
+PostgreSQL its ``search_vector`` column is backed by a GIN index, and on
+other databases SearchToken rows hold a simple inverted index.
+"""
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+from apps.common.models import TimestampedModel
+
+
+class SearchEntry(TimestampedModel):
+    """
+    Searchable snapshot of an indexed object.
+
+    Attributes:
+        organization: Organization that owns the object (search scope)
+        problem: Problem the object belongs to
+        entity: Kind of object ('prd', 'tech_spec', 'task', 'chat_message')
+        object_id: Primary key of the indexed object
+        title: Title shown in results (weight A)
+        body: Indexed text (weight B), also used for snippets
+        search_vector: PostgreSQL tsvector of title and body
+    """
+
+    ENTITY_CHOICES = [
+        ('prd', 'PRD'),
+        ('tech_spec', 'Especificacao Tecnica'),
+        ('task', 'Tarefa'),
+        ('chat_message', 'Mensagem de Chat'),
+    ]
+
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='search_entries',
+        verbose_name='organizacao',
+        help_text='Organizacao dona do objeto indexado'
+    )
+    problem = models.ForeignKey(
+        'problems.Problem',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_entries',
+        verbose_name='problema',
+        help_text='Problema ao qual o objeto pertence'
+    )
+    entity = models.CharField(
+        'entidade',
+        max_length=20,
+        choices=ENTITY_CHOICES,
+        help_text='Tipo do objeto indexado'
+    )
+    object_id = models.UUIDField(
+        'ID do objeto',
+        help_text='Chave primaria do objeto indexado'
+    )
+    title = models.CharField(
+        'titulo',
+        max_length=255,
+        help_text='Titulo exibido nos resultados'
+    )
+    body = models.TextField(
+        'texto',
+        blank=True,
+        default='',
+        help_text='Texto indexado, usado tambem nos trechos destacados'
+    )
+    search_vector = SearchVectorField(
+        'vetor de busca',
+        null=True,
+        editable=False,
+        help_text='tsvector do titulo e do texto (somente PostgreSQL)'
+    )
+
+    class Meta:
+        verbose_name = 'Entrada de Busca'
+        verbose_name_plural = 'Entradas de Busca'
+        db_table = 'search_entry'
+        indexes = [
+            models.Index(fields=['organization', 'entity']),
+            models.Index(fields=['problem', 'entity']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['entity', 'object_id'],
+                name='unique_search_entry_per_object'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.get_entity_display()}: {self.title}'
+
+
+class SearchToken(models.Model):
+    """
+    Posting of the inverted index used when PostgreSQL is not available.
+
+    Attributes:
+        entry: The SearchEntry containing the token
+        token: Normalized token (lowercase, without accents)
+        frequency: Weighted number of occurrences (title counts more)
+    """
+
+    entry = models.ForeignKey(
+        SearchEntry,
+        on_delete=models.CASCADE,
+        related_name='tokens',
+        verbose_name='entrada',
+        help_text='Entrada de busca que contem o termo'
+    )
+    token = models.CharField(
+        'termo',
+        max_length=64,
+        help_text='Termo normalizado'
+    )
+    frequency = models.PositiveIntegerField(
+        'frequencia',
+        default=1,
+        help_text='Numero ponderado de ocorrencias do termo'
+    )
+
+    class Meta:
+        verbose_name = 'Termo de Busca'
+        verbose_name_plural = 'Termos de Busca'
+        db_table = 'search_token'
+        indexes = [
+            models.Index(fields=['token', 'entry']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['entry', 'token'],
+                name='unique_search_token_per_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.token} ({self.frequency})'
@@ -0,0 +1,217 @@
+"""
+Search queries over the unified index.
+
+On PostgreSQL, queries use ``websearch_to_tsquery`` against the GIN
+indexed ``search_vector``, ranked with ``ts_rank`` and highlighted with
+``ts_headline``. Elsewhere the SearchToken inverted index is used:
+entries must contain every query term and are ranked by weighted term
+frequency.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import Count, F, Sum
+from django.urls import NoReverseMatch, reverse
+from django.utils.html import escape
+
+from apps.search.indexing import normalize, tokenize, uses_postgres_search
+from apps.search.models import SearchEntry, SearchToken
+from apps.search.sources import get_source
+
+
+# Query terms beyond this are ignored by the fallback index
+MAX_QUERY_TERMS = 10
+
+# Markers placed by ts_headline, replaced after HTML escaping
+_START, _STOP = '\x02', '\x03'
+
+SNIPPET_WORDS_BEFORE = 12
+SNIPPET_WORDS_AFTER = 24
+
+
+def search(organization, query, entities=None, limit=20, offset=0):
+    """
+    Search the objects of an organization.
+
+    Args:
+        organization: The Organization whose objects are searched.
+        query: User query (web search syntax on PostgreSQL).
+        entities: Optional list of entity names to restrict the search.
+        limit: Maximum number of results.
+        offset: Number of results to skip.
+
+    Returns:
+        list: Result dicts with ``entity``, ``object_id``, ``problem_id``,
+            ``title``, ``snippet`` (HTML with ``<mark>`` highlights),
+            ``rank`` and ``url``.
+    """
+    entries = SearchEntry.objects.filter(organization=organization)
+    if entities:
+        entries = entries.filter(entity__in=entities)
+
+    if uses_postgres_search():
+        rows = _search_postgres(entries, query, limit, offset)
+    else:
+        rows = _search_tokens(entries, query, limit, offset)
+
+    return [
+        {
+            'entity': row['entity'],
+            'object_id': str(row['object_id']),
+            'problem_id': str(row['problem_id']) if row['problem_id'] else None,
+            'title': row['title'],
+            'snippet': row['snippet'],
+            'rank': round(float(row['rank']), 4),
+            'url': _object_url(row['entity'], row['object_id']),
+        }
+        for row in rows
+    ]
+
+
+def _search_postgres(entries, query, limit, offset):
+    config = settings.SEARCH_TEXT_CONFIG
+    search_query = SearchQuery(query, config=config, search_type='websearch')
+    page = list(
+        entries.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-updated_at').values_list('pk', 'rank')[offset:offset + limit]
+    )
+    if not page:
+        return []
+
+    # Headlines are computed for the page only
+    ranks = dict(page)
+    rows = SearchEntry.objects.filter(pk__in=ranks).annotate(
+        headline=SearchHeadline(
+            'body',
+            search_query,
+            config=config,
+            start_sel=_START,
+            stop_sel=_STOP,
+            max_words=35,
+            min_words=15,
+            max_fragments=2,
+            fragment_delimiter=' ... ',
+        )
+    ).values('pk', 'entity', 'object_id', 'problem_id', 'title', 'headline')
+
+    by_pk = {}
+    for row in rows:
+        row['snippet'] = _mark(escape(row.pop('headline') or ''))
+        row['rank'] = ranks[row['pk']]
+        by_pk[row['pk']] = row
+    return [by_pk[pk] for pk, _ in page if pk in by_pk]
+
+
+def _search_tokens(entries, query, limit, offset):
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+
+    page = list(
+        SearchToken.objects.filter(
+            token__in=terms, entry__in=entries
+        ).values('entry_id').annotate(
+            matched=Count('id'), rank=Sum('frequency')
+        ).filter(matched=len(terms)).order_by('-rank', 'entry_id').values_list(
+            'entry_id', 'rank'
+        )[offset:offset + limit]
+    )
+    if not page:
+        return []
+
+    rows = {
+        row['pk']: row
+        for row in SearchEntry.objects.filter(pk__in=[pk for pk, _ in page]).values(
+            'pk', 'entity', 'object_id', 'problem_id', 'title', 'body'
+        )
+    }
+    results = []
+    for pk, rank in page:
+        row = rows.get(pk)
+        if row is None:
+            continue
+        row['snippet'] = highlight(row.pop('body'), terms)
+        row['rank'] = rank
+        results.append(row)
+    return results
+
+
+def _mark(text):
+    return text.replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def highlight(text, terms):
+    """
+    Return an HTML snippet of a text around the first matching term.
+
+    Args:
+        text: The indexed body.
+        terms: Normalized query terms.
+
+    Returns:
+        str: Escaped snippet with matching words wrapped in ``<mark>``.
+    """
+    terms = set(terms)
+    words = []
+    first_match = None
+    for match in re.finditer(r'\w+', text):
+        words.append(match)
+        if first_match is None and normalize(match.group()) in terms:
+            first_match = len(words) - 1
+        if first_match is not None and len(words) > first_match + SNIPPET_WORDS_AFTER:
+            break
+    if not words:
+        return ''
+
+    start_word = max((first_match or 0) - SNIPPET_WORDS_BEFORE, 0)
+    end_word = min(len(words), (first_match or 0) + SNIPPET_WORDS_AFTER)
+    start = words[start_word].start()
+    end = words[end_word - 1].end()
+
+    parts = []
+    position = start
+    for match in words[start_word:end_word]:
+        parts.append(escape(text[position:match.start()]))
+        word = escape(match.group())
+        parts.append(f'<mark>{word}</mark>' if normalize(match.group()) in terms else word)
+        position = match.end()
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '... ' + snippet
+    if end < len(text.rstrip()):
+        snippet += ' ...'
+    return snippet
+
+
+def matching_object_ids(entity, query):
+    """
+    Return a queryset of primary keys of objects matching a query.
+
+    Suitable as a subquery (``pk__in=``), e.g. in the admin.
+
+    Args:
+        entity: Entity name.
+        query: User query.
+    """
+    entries = SearchEntry.objects.filter(entity=entity)
+    if uses_postgres_search():
+        search_query = SearchQuery(query, config=settings.SEARCH_TEXT_CONFIG, search_type='websearch')
+        return entries.filter(search_vector=search_query).values('object_id')
+
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return entries.none().values('object_id')
+    return SearchToken.objects.filter(
+        token__in=terms, entry__entity=entity
+    ).values('entry__object_id').annotate(
+        matched=Count('id')
+    ).filter(matched=len(terms)).values('entry__object_id')
+
+
+def _object_url(entity, object_id):
+    try:
+        return reverse(get_source(entity).admin_url_name(), args=[object_id])
+    except (KeyError, NoReverseMatch):
+        return None
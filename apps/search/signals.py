@@ -0,0 +1,67 @@
+"""
+Signal handlers keeping the search index up to date.
+
+Indexing runs after the surrounding transaction commits and never
+raises, so a search failure cannot break a save.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from apps.search.indexing import safe_index_object, safe_remove_object
+from apps.search.sources import SOURCES
+from apps.tasks_app.transitions import bulk_transition_applied
+
+
+def object_saved(source, sender, instance, raw=False, update_fields=None, **kwargs):
+    """Reindex an object after commit, unless no indexed field changed."""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(source.fields):
+        return
+    transaction.on_commit(partial(safe_index_object, source, instance))
+
+
+def object_deleted(source, sender, instance, **kwargs):
+    """Drop the entry of a deleted object after commit."""
+    # delete() clears instance.pk before the callback runs
+    transaction.on_commit(partial(safe_remove_object, source, instance, instance.pk))
+
+
+def objects_transitioned(source, sender, result, **kwargs):
+    """Reindex the rows of a bulk transition after commit, if it wrote an indexed field."""
+    if not result.updated or not set(result.fields) & set(source.fields):
+        return
+    transaction.on_commit(partial(_index_transitioned, source, result.updated))
+
+
+def _index_transitioned(source, object_ids):
+    queryset = source.get_queryset().filter(pk__in=object_ids)
+    for instance in queryset:
+        safe_index_object(source, instance)
+
+
+def connect_signals():
+    """Connect the indexing handlers of every search source."""
+    for source in SOURCES:
+        model = source.get_model()
+        post_save.connect(
+            partial(object_saved, source),
+            sender=model,
+            weak=False,
+            dispatch_uid=f'search_index_{source.entity}',
+        )
+        post_delete.connect(
+            partial(object_deleted, source),
+            sender=model,
+            weak=False,
+            dispatch_uid=f'search_remove_{source.entity}',
+        )
+        # Bulk transitions update rows without sending post_save
+        bulk_transition_applied.connect(
+            partial(objects_transitioned, source),
+            sender=model,
+            weak=False,
+            dispatch_uid=f'search_transition_{source.entity}',
+        )
@@ -0,0 +1,163 @@
+"""
+Indexed models of the search subsystem.
+
+Each SearchSource describes how an object of one model becomes a
+SearchEntry: its title, its body text, and the organization and
+problem that scope it.
+"""
+from django.apps import apps
+
+
+class SearchSource:
+    """
+    Base description of an indexed model.
+
+    Attributes:
+        entity: Entity name stored in SearchEntry.entity
+        model_label: Label of the indexed model ('app_label.ModelName')
+        fields: Model fields whose changes require reindexing
+        select_related: Relations loaded when rebuilding the index
+    """
+
+    entity = None
+    model_label = None
+    fields = ()
+    select_related = ('problem',)
+
+    def get_model(self):
+        """Return the indexed model class."""
+        return apps.get_model(self.model_label)
+
+    def get_queryset(self):
+        """Return every object to index (used by full rebuilds)."""
+        return self.get_model().objects.select_related(*self.select_related)
+
+    def build(self, instance):
+        """
+        Return the indexed values of an object.
+
+        Args:
+            instance: The model instance.
+
+        Returns:
+            dict or None: ``title``, ``body``, ``organization_id`` and
+                ``problem_id``, or None if the object must not be indexed.
+        """
+        raise NotImplementedError
+
+    def superseded(self, instance):
+        """Return primary keys of other objects whose entries must be dropped."""
+        return []
+
+    def replacement(self, instance, object_id):
+        """Return an object to index after ``instance`` (``object_id``) is deleted, if any."""
+
+    def admin_url_name(self):
+        """Return the admin change view name of the indexed model."""
+        meta = self.get_model()._meta
+        return f'admin:{meta.app_label}_{meta.model_name}_change'
+
+
+def _join(*parts):
+    return '\n\n'.join(part for part in parts if part)
+
+
+class TaskSource(SearchSource):
+    """Indexes task titles, descriptions and specs."""
+
+    entity = 'task'
+    model_label = 'tasks_app.Task'
+    fields = ('title', 'description', 'spec', 'problem', 'problem_id')
+
+    def build(self, instance):
+        problem = instance.problem
+        return {
+            'title': instance.title,
+            'body': _join(instance.description, instance.spec),
+            'organization_id': problem.organization_id,
+            'problem_id': problem.pk,
+        }
+
+
+class ChatMessageSource(SearchSource):
+    """Indexes chat message contents."""
+
+    entity = 'chat_message'
+    model_label = 'chat.ChatMessage'
+    fields = ('content',)
+
+    def build(self, instance):
+        problem = instance.problem
+        return {
+            'title': f'Chat - {problem.title}',
+            'body': instance.content,
+            'organization_id': problem.organization_id,
+            'problem_id': problem.pk,
+        }
+
+
+class DocumentSource(SearchSource):
+    """
+    Indexes the latest version of each document chain.
+
+    Older versions are dropped from the index when a newer version is
+    created, so results always point to the current document.
+    """
+
+    label = None
+    body_fields = ('content', 'summary')
+    fields = ('content', 'summary', 'version')
+
+    def build(self, instance):
+        model = type(instance)
+        if model.objects.filter(problem_id=instance.problem_id, version__gt=instance.version).exists():
+            return None
+        problem = instance.problem
+        return {
+            'title': f'{self.label} v{instance.version} - {problem.title}',
+            'body': _join(*(getattr(instance, field) for field in self.body_fields)),
+            'organization_id': problem.organization_id,
+            'problem_id': problem.pk,
+        }
+
+    def superseded(self, instance):
+        return list(
+            type(instance).objects.filter(problem_id=instance.problem_id).exclude(
+                pk=instance.pk
+            ).values_list('pk', flat=True)
+        )
+
+    def replacement(self, instance, object_id):
+        return type(instance).objects.filter(
+            problem_id=instance.problem_id
+        ).exclude(pk=object_id).order_by('-version').first()
+
+
+class PRDSource(DocumentSource):
+    entity = 'prd'
+    model_label = 'documents.PRDDocument'
+    label = 'PRD'
+
+
+class TechSpecSource(DocumentSource):
+    entity = 'tech_spec'
+    model_label = 'documents.TechSpecDocument'
+    label = 'Tech Spec'
+    body_fields = ('content', 'summary', 'architecture_overview')
+    fields = ('content', 'summary', 'architecture_overview', 'version')
+
+
+SOURCES = [PRDSource(), TechSpecSource(), TaskSource(), ChatMessageSource()]
+
+
+def get_source(entity):
+    """
+    Return the source of an entity.
+
+    Raises:
+        KeyError: If the entity is not indexed.
+    """
+    for source in SOURCES:
+        if source.entity == entity:
+            return source
+    raise KeyError(entity)
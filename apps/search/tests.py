@@ -0,0 +1,177 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from apps.chat.models import ChatMessage
+from apps.documents.models import PRDDocument
+from apps.organizations.models import Organization, OrganizationMember
+from apps.problems.models import Problem
+from apps.search.models import SearchEntry
+from apps.search.query import matching_object_ids, search
+from apps.tasks_app.models import Task
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_problem(slug='acme'):
+    organization = Organization.objects.create(name=slug.title(), slug=slug)
+    return Problem.objects.create(organization=organization, title='Problema', description='Descricao')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchIndexTests(TestCase):
+    """The index follows saves and deletes of the indexed models."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        self.organization = self.problem.organization
+
+    def create_task(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Task.objects.create(problem=self.problem, **fields)
+
+    def test_task_is_found_by_description_after_commit(self):
+        task = self.create_task(title='Cache', description='Invalidar o cache de sessoes expiradas')
+
+        [result] = search(self.organization, 'sessoes expiradas')
+
+        self.assertEqual((result['entity'], result['object_id']), ('task', str(task.pk)))
+        self.assertIn('<mark>sessoes</mark>', result['snippet'])
+        self.assertEqual(search(self.organization, 'sessoes inexistente'), [])
+
+    def test_results_are_scoped_to_the_organization(self):
+        self.create_task(title='Migracao', description='banco')
+        other = create_problem('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(problem=other, title='Migracao', description='banco')
+
+        self.assertEqual(len(search(self.organization, 'migracao')), 1)
+        self.assertEqual(len(search(other.organization, 'migracao')), 1)
+
+    def test_saves_without_indexed_fields_do_not_reindex(self):
+        task = self.create_task(title='Original')
+
+        task.status = 'selected'
+        with self.captureOnCommitCallbacks() as callbacks:
+            task.save(update_fields=['status', 'updated_at'])
+        self.assertEqual(callbacks, [])
+
+        task.title = 'Renomeada'
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save(update_fields=['title', 'updated_at'])
+        self.assertEqual(SearchEntry.objects.get(object_id=task.pk).title, 'Renomeada')
+
+    def test_bulk_transitions_reindex_when_they_write_indexed_fields(self):
+        task = self.create_task(title='Original')
+        self.enterContext(mock.patch('apps.events.tasks.relay_outbox_events.delay'))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Task.objects.filter(pk=task.pk).bulk_transition('select')
+        self.assertEqual(len(callbacks), 1)  # outbox relay only
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=task.pk).bulk_transition('skip', title='Descartada')
+        self.assertEqual(SearchEntry.objects.get(object_id=task.pk).title, 'Descartada')
+
+    def test_deleted_task_leaves_the_index(self):
+        task = self.create_task(title='Temporaria')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+
+        self.assertFalse(SearchEntry.objects.exists())
+
+    def test_only_the_latest_document_version_is_indexed(self):
+        with (
+            mock.patch('apps.documents.models.schedule_diff_precompute'),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            first = PRDDocument.create_new_version(self.problem, 'requisitos iniciais')
+        with (
+            mock.patch('apps.documents.models.schedule_diff_precompute'),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            second = PRDDocument.create_new_version(self.problem, 'requisitos revisados')
+
+        [result] = search(self.organization, 'requisitos')
+        self.assertEqual(result['object_id'], str(second.pk))
+        self.assertEqual(result['title'], 'PRD v2 - Problema')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+
+        [result] = search(self.organization, 'requisitos')
+        self.assertEqual(result['object_id'], str(first.pk))
+
+    def test_chat_messages_are_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            message = ChatMessage.create_agent_message(self.problem, 'agente', 'deploy concluido')
+
+        [result] = search(self.organization, 'deploy', entities=['chat_message'])
+
+        self.assertEqual(result['object_id'], str(message.pk))
+
+    def test_rebuild_command_indexes_existing_objects(self):
+        Task.objects.create(problem=self.problem, title='Legada', description='sem indice')
+        self.assertEqual(search(self.organization, 'legada'), [])
+
+        call_command('rebuild_search_index', '--entity', 'task', '--clear', stdout=StringIO())
+
+        self.assertEqual(len(search(self.organization, 'legada')), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchViewTests(TestCase):
+    """Organization-scoped search endpoint."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(problem=self.problem, title='Autenticacao', description='login social')
+        self.user = get_user_model().objects.create_user('membro', password='senha')
+        self.url = reverse('search:search', args=[self.problem.organization.slug])
+
+    def test_members_get_results(self):
+        OrganizationMember.objects.create(organization=self.problem.organization, user=self.user)
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.url, {'q': 'login', 'type': 'task,desconhecido', 'limit': 1000})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['title'] for result in response.json()['results']], ['Autenticacao'])
+        self.assertEqual(response.json()['limit'], 100)
+
+    def test_non_members_are_rejected(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(self.url, {'q': 'login'}).status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TaskAdminSearchTests(TestCase):
+    """The task changelist finds description and spec matches through the index."""
+
+    def setUp(self):
+        problem = create_problem()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.by_spec = Task.objects.create(problem=problem, title='Primeira', spec='usar fila redis')
+            self.by_title = Task.objects.create(problem=problem, title='Fila de emails')
+            Task.objects.create(problem=problem, title='Outra', description='nada')
+        self.admin = site._registry[Task]
+        self.request = RequestFactory().get('/')
+
+    def test_matches_indexed_text_and_search_fields(self):
+        results, _ = self.admin.get_search_results(self.request, Task.objects.all(), 'fila')
+
+        self.assertEqual(set(results), {self.by_spec, self.by_title})
+
+    def test_matching_object_ids_requires_every_term(self):
+        ids = Task.objects.filter(pk__in=matching_object_ids('task', 'fila redis'))
+
+        self.assertEqual(list(ids), [self.by_spec])
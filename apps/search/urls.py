@@ -0,0 +1,12 @@
+"""
+URL configuration for the Search app.
+"""
+from django.urls import path
+
+from apps.search import views
+
+app_name = 'search'
+
+urlpatterns = [
+    path('<slug:org_slug>/', views.search_view, name='search'),
+]
@@ -0,0 +1,57 @@
+"""
+Views for the Search app.
+"""
+from django.conf import settings
+from django.http import HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from apps.organizations.models import Organization
+from apps.search.query import search
+from apps.search.sources import SOURCES
+
+
+def _int_param(request, name, default, minimum, maximum):
+    try:
+        value = int(request.GET.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return min(max(value, minimum), maximum)
+
+
+def search_view(request, org_slug):
+    """
+    Search PRDs, tech specs, tasks and chat messages of an organization.
+
+    Query parameters:
+        q: Search terms.
+        type: Optional comma-separated entities (prd, tech_spec, task, chat_message).
+        limit: Number of results (default SEARCH_RESULTS_PER_PAGE).
+        offset: Number of results to skip.
+    """
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden('Autenticacao necessaria.')
+
+    organization = get_object_or_404(Organization, slug=org_slug, is_active=True)
+    if not request.user.is_staff and not organization.is_member(request.user):
+        return HttpResponseForbidden('Acesso restrito aos membros da organizacao.')
+
+    query = request.GET.get('q', '').strip()
+    known = {source.entity for source in SOURCES}
+    entities = [
+        entity for entity in request.GET.get('type', '').split(',') if entity in known
+    ]
+    limit = _int_param(
+        request, 'limit', settings.SEARCH_RESULTS_PER_PAGE, 1, settings.SEARCH_MAX_RESULTS
+    )
+    offset = _int_param(request, 'offset', 0, 0, 10000)
+
+    results = []
+    if query:
+        results = search(organization, query, entities=entities, limit=limit, offset=offset)
+
+    return JsonResponse({
+        'query': query,
+        'limit': limit,
+        'offset': offset,
+        'results': results,
+    })
@@ -5,14 +5,20 @@ This module registers the Task model with Django admin
 and configures its display and editing options.
 """
 
+import json
+
 from django.contrib import admin
 from django.utils.html import format_html
 
-from apps.tasks_app.models import Task, TaskExecution
+from apps.common.admin import AnnotatedCountsAdminMixin, SummaryChangeListAdminMixin
+from apps.search.admin import FullTextSearchAdminMixin
+from apps.tasks_app.models import ArchivedTaskExecution, Task, TaskExecution
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(
+    AnnotatedCountsAdminMixin, SummaryChangeListAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin
+):
     """Admin configuration for Task model."""
 
     list_display = [
@@ -32,13 +38,18 @@ class TaskAdmin(admin.ModelAdmin):
         'problem__organization',
         'created_at',
     ]
+    # description and spec are not scanned with ILIKE: FullTextSearchAdminMixin
+    # adds the tasks whose indexed text (TaskSource: title, description and
+    # spec) matches the term. Tasks saved before the search app was installed
+    # need `manage.py rebuild_search_index --entity task` to be found.
     search_fields = [
         'title',
-        'description',
-        'spec',
         'problem__title',
         'problem__organization__name',
     ]
+    search_entity = 'task'
+    summary_related = ['tech_spec']
+    count_annotations = {'dependencies_count': 'dependencies'}
     readonly_fields = [
         'id',
         'created_at',
@@ -129,7 +140,7 @@ class TaskAdmin(admin.ModelAdmin):
 
     def dependencies_count(self, obj):
         """Display count of dependencies."""
-        count = obj.dependencies.count()
+        count = obj.dependencies_count
         if count == 0:
             return '-'
         return format_html(
@@ -138,6 +149,7 @@ class TaskAdmin(admin.ModelAdmin):
             count
         )
     dependencies_count.short_description = 'Deps'
+    dependencies_count.admin_order_field = 'dependencies_count'
 
     def duration_display(self, obj):
         """Display duration in human-readable format."""
@@ -154,35 +166,40 @@ class TaskAdmin(admin.ModelAdmin):
     duration_display.short_description = 'Duracao'
 
     def get_queryset(self, request):
-        """Optimize queryset with select_related and prefetch_related."""
+        """Optimize queryset with select_related."""
         return super().get_queryset(request).select_related(
             'problem', 'problem__organization', 'tech_spec'
-        ).prefetch_related('dependencies')
+        )
 
     actions = ['mark_as_selected', 'mark_as_pending', 'reset_tasks']
 
     @admin.action(description='Marcar como selecionado')
     def mark_as_selected(self, request, queryset):
         """Mark selected tasks as 'selected'."""
-        updated = queryset.filter(status='pending').update(status='selected')
-        self.message_user(request, f'{updated} tarefa(s) marcada(s) como selecionada(s).')
+        result = queryset.bulk_transition('select', actor=request.user)
+        self._report_transition(request, result, 'marcada(s) como selecionada(s)')
 
     @admin.action(description='Marcar como pendente')
     def mark_as_pending(self, request, queryset):
         """Mark selected tasks as 'pending'."""
-        updated = queryset.exclude(
-            status__in=['in_progress', 'testing']
-        ).update(status='pending')
-        self.message_user(request, f'{updated} tarefa(s) marcada(s) como pendente(s).')
+        result = queryset.bulk_transition('mark_pending', actor=request.user)
+        self._report_transition(request, result, 'marcada(s) como pendente(s)')
 
     @admin.action(description='Resetar tarefas')
     def reset_tasks(self, request, queryset):
-        """Reset selected tasks to initial state."""
-        count = 0
-        for task in queryset:
-            task.reset()
-            count += 1
-        self.message_user(request, f'{count} tarefa(s) resetada(s).')
+        """
+        Reset selected tasks to initial state.
+
+        Tasks in progress or testing are skipped (see Task.TRANSITIONS).
+        """
+        result = queryset.bulk_transition('reset', actor=request.user)
+        self._report_transition(request, result, 'resetada(s)')
+
+    def _report_transition(self, request, result, done):
+        message = f'{len(result.updated)} tarefa(s) {done}.'
+        if result.skipped:
+            message += f' {len(result.skipped)} ignorada(s) pelo status atual.'
+        self.message_user(request, message)
 
 
 class StatusFilter(admin.SimpleListFilter):
@@ -252,7 +269,7 @@ class ExecutionOutcomeFilter(admin.SimpleListFilter):
 
 
 @admin.register(TaskExecution)
-class TaskExecutionAdmin(admin.ModelAdmin):
+class TaskExecutionAdmin(SummaryChangeListAdminMixin, admin.ModelAdmin):
     """Admin configuration for TaskExecution model."""
 
     list_display = [
@@ -288,11 +305,13 @@ class TaskExecutionAdmin(admin.ModelAdmin):
         'completed_at',
         'duration_display',
         'attempt_number',
+        'logs_display',
     ]
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
     list_per_page = 25
     raw_id_fields = ['task']
+    summary_related = ['task']
 
     fieldsets = (
         ('Informacoes Basicas', {
@@ -306,7 +325,7 @@ class TaskExecutionAdmin(admin.ModelAdmin):
             'fields': ('started_at', 'completed_at', 'duration_display')
         }),
         ('Logs e Saida', {
-            'fields': ('logs', 'output'),
+            'fields': ('logs_display', 'output'),
             'classes': ('collapse',)
         }),
         ('Erros', {
@@ -397,6 +416,17 @@ class TaskExecutionAdmin(admin.ModelAdmin):
         return f'{secs}s'
     duration_display.short_description = 'Duracao'
 
+    def logs_display(self, obj):
+        """Display the assembled execution logs."""
+        logs = obj.read_logs() if obj.pk else ''
+        if not logs:
+            return '-'
+        return format_html(
+            '<pre style="max-height: 480px; overflow: auto; white-space: pre-wrap;">{}</pre>',
+            logs
+        )
+    logs_display.short_description = 'Logs'
+
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
         return super().get_queryset(request).select_related(
@@ -408,23 +438,130 @@ class TaskExecutionAdmin(admin.ModelAdmin):
     @admin.action(description='Cancelar execucoes')
     def cancel_executions(self, request, queryset):
         """Cancel selected executions."""
-        count = 0
-        for execution in queryset.filter(status__in=['pending', 'running']):
-            try:
-                execution.cancel()
-                count += 1
-            except Exception:
-                pass
-        self.message_user(request, f'{count} execucao(oes) cancelada(s).')
+        result = queryset.bulk_transition('cancel', actor=request.user)
+        self._report_transition(request, result, 'cancelada(s)')
 
     @admin.action(description='Marcar como falha')
     def mark_as_failed(self, request, queryset):
         """Mark selected executions as failed."""
-        count = 0
-        for execution in queryset.exclude(status__in=['completed', 'failed', 'cancelled', 'timeout']):
+        result = queryset.bulk_transition(
+            'fail', actor=request.user, error_message='Marcado como falha pelo admin'
+        )
+        self._report_transition(request, result, 'marcada(s) como falha')
+
+    def _report_transition(self, request, result, done):
+        message = f'{len(result.updated)} execucao(oes) {done}.'
+        if result.skipped:
+            message += f' {len(result.skipped)} ignorada(s) pelo status atual.'
+        self.message_user(request, message)
+
+
+@admin.register(ArchivedTaskExecution)
+class ArchivedTaskExecutionAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for ArchivedTaskExecution model.
+
+    Logs, output and metrics are read back from the archive file only on
+    the change page.
+    """
+
+    list_display = [
+        'task_title',
+        'organization',
+        'status',
+        'agent_type',
+        'attempt_number',
+        'execution_created_at',
+        'created_at',
+    ]
+    list_filter = [
+        'status',
+        'agent_type',
+        'organization',
+        'execution_created_at',
+    ]
+    search_fields = [
+        'task_title',
+        'id',
+    ]
+    date_hierarchy = 'execution_created_at'
+    ordering = ['-execution_created_at']
+    list_per_page = 25
+    list_select_related = ['organization']
+
+    fieldsets = (
+        ('Informacoes Basicas', {
+            'fields': (
+                'id', 'task', 'task_title', 'organization',
+                'attempt_number', 'status', 'agent_type'
+            )
+        }),
+        ('Tempo de Execucao', {
+            'fields': ('started_at', 'completed_at', 'execution_created_at')
+        }),
+        ('Conteudo Arquivado', {
+            'fields': (
+                'archived_logs', 'archived_output',
+                'archived_error_message', 'archived_metrics'
+            )
+        }),
+        ('Arquivo', {
+            'fields': ('archive_path', 'row_index', 'created_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def get_readonly_fields(self, request, obj=None):
+        """Archived executions are read-only."""
+        return [
+            field.name for field in self.model._meta.fields
+        ] + ['archived_logs', 'archived_output', 'archived_error_message', 'archived_metrics']
+
+    def has_add_permission(self, request):
+        """Archived executions are only created by the archive job."""
+        return False
+
+    def _rehydrated(self, obj):
+        """Rehydrate the execution once per request."""
+        if not hasattr(obj, '_rehydrated'):
             try:
-                execution.fail('Marcado como falha pelo admin')
-                count += 1
-            except Exception:
-                pass
-        self.message_user(request, f'{count} execucao(oes) marcada(s) como falha.')
+                obj._rehydrated = obj.rehydrate()
+            except (OSError, ValueError) as exc:
+                obj._rehydrated = None
+                obj._rehydrate_error = str(exc)
+        return obj._rehydrated
+
+    def _archived_text(self, obj, field):
+        execution = self._rehydrated(obj)
+        if execution is None:
+            return f'Arquivo indisponivel: {getattr(obj, "_rehydrate_error", "")}'
+        value = getattr(execution, field)
+        if not value:
+            return '-'
+        return format_html(
+            '<pre style="max-height: 480px; overflow: auto; white-space: pre-wrap;">{}</pre>',
+            value
+        )
+
+    def archived_logs(self, obj):
+        """Display the archived logs."""
+        return self._archived_text(obj, 'logs')
+    archived_logs.short_description = 'Logs'
+
+    def archived_output(self, obj):
+        """Display the archived output."""
+        return self._archived_text(obj, 'output')
+    archived_output.short_description = 'Saida'
+
+    def archived_error_message(self, obj):
+        """Display the archived error message."""
+        return self._archived_text(obj, 'error_message')
+    archived_error_message.short_description = 'Mensagem de erro'
+
+    def archived_metrics(self, obj):
+        """Display the archived metrics."""
+        execution = self._rehydrated(obj)
+        if execution is None or not execution.metrics:
+            return '-'
+        return format_html('<pre>{}</pre>', json.dumps(execution.metrics, indent=2))
+    archived_metrics.short_description = 'Metricas'
@@ -17,4 +17,4 @@ class TasksAppConfig(AppConfig):
 
         This is used to import signals and other startup code.
         """
-        pass  # Signals can be imported here when needed
+        import apps.tasks_app.signals  # noqa: F401
@@ -0,0 +1,311 @@
+"""
+Cold archive of terminal task executions.
+
+Terminal executions older than TASK_EXECUTION_ARCHIVE_AFTER_DAYS are moved
+out of the hot ``tasks_execution`` table into gzip-compressed, column
+oriented JSON files partitioned by organization and month::
+
+    <TASK_EXECUTION_ARCHIVE_DIR>/organization=<id>/month=<YYYY-MM>/part-<ts>-<id>.json.gz
+
+Each file holds one batch, stored as one list per column, which
+compresses far better than row-oriented JSON for repetitive values such
+as status and agent type. An ArchivedTaskExecution stub row keeps the
+lookup data and the file position; ``read_archived_execution`` rehydrates
+the full execution on demand.
+
+Files are staged under a hidden name while the transaction that deletes
+the rows is open, and renamed to their final name once it commits. A batch
+whose transaction rolls back removes its staged files; staged files left by
+a crash are overwritten when the batch runs again, since their name is
+derived from the first execution of the batch. A stub whose file was
+committed but never renamed (crash right after the commit) promotes the
+staged file on first read.
+
+Batching, resumability and locking are inherited from the retention job.
+"""
+import gzip
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.tasks_app.models import (
+    ArchivedTaskExecution,
+    TaskExecution,
+    TaskExecutionLogChunk,
+)
+from apps.tasks_app.retention import ExecutionRetentionJob, delete_executions
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = 'compozy.task_executions.v1'
+
+COLUMNS = [
+    'id',
+    'task_id',
+    'status',
+    'started_at',
+    'completed_at',
+    'agent_type',
+    'logs',
+    'output',
+    'error_message',
+    'metrics',
+    'attempt_number',
+    'celery_task_id',
+    'created_at',
+    'updated_at',
+]
+
+DATETIME_COLUMNS = ('started_at', 'completed_at', 'created_at', 'updated_at')
+
+
+def get_archive_root():
+    """Return the archive directory as a Path."""
+    return Path(settings.TASK_EXECUTION_ARCHIVE_DIR)
+
+
+def partition_path(organization_id, moment):
+    """
+    Return the directory of a partition, relative to the archive root.
+
+    Args:
+        organization_id: Primary key of the Organization.
+        moment: Datetime whose month selects the partition.
+    """
+    moment = timezone.localtime(moment)
+    return Path(f'organization={organization_id}') / f'month={moment:%Y-%m}'
+
+
+def staged_path(relative_path):
+    """Return the staged name of an archive file, relative to the archive root."""
+    relative_path = Path(relative_path)
+    return relative_path.parent / f'.{relative_path.name}.staged'
+
+
+def write_archive_file(relative_dir, rows):
+    """
+    Stage rows as a compressed columnar file.
+
+    The file name is derived from the first row (its creation time and
+    id), so writing the same batch again replaces the file. The file is
+    written under a temporary name and renamed to its staged name, so
+    neither readers nor ``promote_archive_files`` see partial files.
+
+    Args:
+        relative_dir: Partition directory relative to the archive root.
+        rows: Non-empty list of dicts with the keys in COLUMNS, in
+            (created_at, id) order.
+
+    Returns:
+        str: Final path of the file, relative to the archive root.
+    """
+    root = get_archive_root()
+    directory = root / relative_dir
+    directory.mkdir(parents=True, exist_ok=True)
+
+    first = rows[0]
+    name = f'part-{first["created_at"]:%Y%m%dT%H%M%S%f}-{uuid.UUID(str(first["id"])).hex}.json.gz'
+    relative_path = Path(relative_dir) / name
+    payload = {
+        'format': ARCHIVE_FORMAT,
+        'row_count': len(rows),
+        'columns': {column: [row[column] for row in rows] for column in COLUMNS},
+    }
+
+    temporary = directory / f'.{name}.tmp'
+    with gzip.open(temporary, 'wt', encoding='utf-8', compresslevel=6) as handle:
+        json.dump(payload, handle, cls=DjangoJSONEncoder, separators=(',', ':'))
+    os.replace(temporary, root / staged_path(relative_path))
+    return relative_path.as_posix()
+
+
+def promote_archive_files(relative_paths):
+    """
+    Rename staged archive files to their final name.
+
+    Args:
+        relative_paths: Final paths relative to the archive root.
+    """
+    root = get_archive_root()
+    for relative_path in relative_paths:
+        try:
+            os.replace(root / staged_path(relative_path), root / relative_path)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning(f'Could not promote archive file {relative_path}: {exc}')
+
+
+def remove_staged_files(relative_paths):
+    """
+    Delete staged archive files, ignoring the ones that do not exist.
+
+    Args:
+        relative_paths: Final paths relative to the archive root.
+    """
+    root = get_archive_root()
+    for relative_path in relative_paths:
+        try:
+            (root / staged_path(relative_path)).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning(f'Could not remove staged archive file {relative_path}: {exc}')
+
+
+@lru_cache(maxsize=8)
+def load_archive_file(relative_path):
+    """
+    Load the columns of an archive file (cached per process).
+
+    Args:
+        relative_path: Path relative to the archive root.
+
+    Returns:
+        dict: Mapping of column name to list of values.
+
+    Raises:
+        ValueError: If the path escapes the archive root or the format is unknown.
+    """
+    root = get_archive_root().resolve()
+    path = (root / relative_path).resolve()
+    if root not in path.parents:
+        raise ValueError(f'Caminho de arquivo invalido: {relative_path}')
+
+    if not path.exists():
+        # The batch committed but its files were not renamed yet
+        promote_archive_files([relative_path])
+
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        payload = json.load(handle)
+    if payload.get('format') != ARCHIVE_FORMAT:
+        raise ValueError(f'Formato de arquivo desconhecido: {payload.get("format")}')
+    return payload['columns']
+
+
+def read_archived_execution(archived):
+    """
+    Rehydrate an archived execution.
+
+    Args:
+        archived: The ArchivedTaskExecution stub.
+
+    Returns:
+        TaskExecution: An unsaved instance with the archived values.
+    """
+    columns = load_archive_file(archived.archive_path)
+    values = {column: columns[column][archived.row_index] for column in COLUMNS}
+    if str(values['id']) != str(archived.pk):
+        raise ValueError(f'Arquivo {archived.archive_path} nao contem a execucao {archived.pk}')
+
+    for column in DATETIME_COLUMNS:
+        if values[column]:
+            values[column] = parse_datetime(values[column])
+    values['id'] = uuid.UUID(str(values['id']))
+    values['task_id'] = archived.task_id
+    return TaskExecution(**values)
+
+
+def load_execution_rows(ids):
+    """
+    Load the archivable values of executions, logs included.
+
+    Args:
+        ids: Primary keys of the executions.
+
+    Returns:
+        list: Dicts with the keys in COLUMNS plus organization and task data.
+    """
+    rows = list(
+        TaskExecution.objects.filter(pk__in=ids).order_by('created_at', 'id').values(
+            *COLUMNS,
+            'task__title',
+            'task__problem__organization_id',
+        )
+    )
+
+    chunks = defaultdict(list)
+    for execution_id, content in TaskExecutionLogChunk.objects.filter(
+        execution_id__in=ids
+    ).order_by('execution_id', 'sequence').values_list('execution_id', 'content'):
+        chunks[execution_id].append(content)
+
+    for row in rows:
+        row['logs'] = row['logs'] + ''.join(chunks.get(row['id'], ()))
+    return rows
+
+
+class ExecutionArchiveJob(ExecutionRetentionJob):
+    """
+    Moves terminal executions older than the archive window to cold files.
+    """
+
+    job = 'archive_executions'
+
+    def retention_days(self, organization):
+        """Return the number of days executions stay in the hot table."""
+        return settings.TASK_EXECUTION_ARCHIVE_AFTER_DAYS
+
+    _staged = ()
+
+    def process_batch(self, organization, ids):
+        """
+        Archive one batch of executions and remove them from the hot table.
+
+        The files are staged and promoted once the batch transaction
+        commits (see the module docstring).
+
+        Args:
+            organization: The Organization being processed.
+            ids: Primary keys of the executions in the batch.
+        """
+        rows = load_execution_rows(ids)
+
+        partitions = defaultdict(list)
+        for row in rows:
+            partitions[partition_path(organization.pk, row['created_at'])].append(row)
+
+        stubs = []
+        written = self._staged = []
+        for relative_dir, partition_rows in partitions.items():
+            archive_path = write_archive_file(relative_dir, partition_rows)
+            written.append(archive_path)
+            for row_index, row in enumerate(partition_rows):
+                stubs.append(ArchivedTaskExecution(
+                    id=row['id'],
+                    task_id=row['task_id'],
+                    organization=organization,
+                    task_title=row['task__title'],
+                    status=row['status'],
+                    agent_type=row['agent_type'],
+                    attempt_number=row['attempt_number'],
+                    started_at=row['started_at'],
+                    completed_at=row['completed_at'],
+                    execution_created_at=row['created_at'],
+                    archive_path=archive_path,
+                    row_index=row_index,
+                ))
+
+        ArchivedTaskExecution.objects.bulk_create(stubs)
+        delete_executions(ids)
+        transaction.on_commit(lambda: promote_archive_files(written))
+        logger.debug(
+            f'Archived {len(stubs)} execution(s) of organization {organization.pk} '
+            f'into {len(partitions)} file(s)'
+        )
+
+    def rollback_batch(self, organization, ids):
+        """Remove the staged files of a batch whose transaction rolled back."""
+        remove_staged_files(self._staged)
+        self._staged = ()
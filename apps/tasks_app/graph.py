@@ -0,0 +1,376 @@
+"""
+Dependency graph engine for tasks.
+
+This module loads the dependency edges of a problem from the
+``tasks_task_dependencies`` M2M table in a single query and keeps them in
+an in-memory adjacency structure. Cycle detection, same-problem checks and
+topological ordering are answered in O(V+E) without further queries.
+
+Edge direction follows the M2M table: ``from_task`` depends on ``to_task``,
+so ``to_task`` must run before ``from_task``.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+
+
+class DependencyGraph:
+    """
+    In-memory dependency graph for the tasks of a single problem.
+
+    Attributes:
+        problem_id: ID of the problem the graph belongs to
+        nodes: Mapping of task ID to its ``order_index``
+        titles: Mapping of task ID to its title (used in error messages)
+        dependencies: Mapping of task ID to the set of task IDs it depends on
+        dependents: Mapping of task ID to the set of task IDs depending on it
+        foreign_edges: Edges pointing to tasks from a different problem
+    """
+
+    def __init__(self, problem_id, nodes=None, edges=(), titles=None, foreign_edges=()):
+        self.problem_id = problem_id
+        self.nodes = dict(nodes or {})
+        self.titles = dict(titles or {})
+        self.dependencies = defaultdict(set)
+        self.dependents = defaultdict(set)
+        self.foreign_edges = list(foreign_edges)
+        for task_id, dependency_id in edges:
+            self.add_edge(task_id, dependency_id)
+
+    @classmethod
+    def for_problem(cls, problem):
+        """
+        Load the dependency graph of a problem.
+
+        Issues one query for the tasks and one query for the whole edge
+        list, regardless of the number of tasks.
+
+        Args:
+            problem: The Problem instance (or its primary key).
+
+        Returns:
+            DependencyGraph: The loaded graph.
+        """
+        from apps.tasks_app.models import Task
+
+        problem_id = getattr(problem, 'pk', problem)
+
+        nodes = {}
+        titles = {}
+        for task_id, order_index, title in Task.objects.filter(
+            problem_id=problem_id
+        ).values_list('id', 'order_index', 'title'):
+            nodes[task_id] = order_index
+            titles[task_id] = title
+
+        edges = []
+        foreign_edges = []
+        through = Task.dependencies.through
+        for task_id, dependency_id, dependency_problem_id in through.objects.filter(
+            from_task__problem_id=problem_id
+        ).values_list('from_task_id', 'to_task_id', 'to_task__problem_id'):
+            if dependency_problem_id == problem_id:
+                edges.append((task_id, dependency_id))
+            else:
+                foreign_edges.append((task_id, dependency_id))
+
+        return cls(
+            problem_id,
+            nodes=nodes,
+            edges=edges,
+            titles=titles,
+            foreign_edges=foreign_edges,
+        )
+
+    def add_edge(self, task_id, dependency_id):
+        """
+        Register that ``task_id`` depends on ``dependency_id``.
+
+        Args:
+            task_id: ID of the dependent task.
+            dependency_id: ID of the task it depends on.
+        """
+        self.nodes.setdefault(task_id, 0)
+        self.nodes.setdefault(dependency_id, 0)
+        self.dependencies[task_id].add(dependency_id)
+        self.dependents[dependency_id].add(task_id)
+
+    def remove_edge(self, task_id, dependency_id):
+        """Remove the edge ``task_id -> dependency_id`` if present."""
+        self.dependencies[task_id].discard(dependency_id)
+        self.dependents[dependency_id].discard(task_id)
+
+    def has_path(self, source_id, target_id):
+        """
+        Check whether ``target_id`` is reachable from ``source_id``.
+
+        Follows dependency edges iteratively, so deep chains do not hit
+        Python's recursion limit.
+
+        Args:
+            source_id: Task ID to start from.
+            target_id: Task ID to look for.
+
+        Returns:
+            bool: True if ``source_id`` (transitively) depends on ``target_id``.
+        """
+        if source_id == target_id:
+            return True
+
+        visited = {source_id}
+        stack = [source_id]
+        while stack:
+            current = stack.pop()
+            for dependency_id in self.dependencies.get(current, ()):
+                if dependency_id == target_id:
+                    return True
+                if dependency_id not in visited:
+                    visited.add(dependency_id)
+                    stack.append(dependency_id)
+        return False
+
+    def would_create_cycle(self, task_id, dependency_id):
+        """
+        Check if adding ``task_id -> dependency_id`` would create a cycle.
+
+        Args:
+            task_id: ID of the dependent task.
+            dependency_id: ID of the proposed dependency.
+
+        Returns:
+            bool: True if the new edge closes a cycle.
+        """
+        return self.has_path(dependency_id, task_id)
+
+    def topological_order(self):
+        """
+        Compute a topological order of the tasks (Kahn's algorithm).
+
+        Dependencies always come before their dependents; ties are broken
+        by ``order_index`` so the result is stable.
+
+        Returns:
+            list: Task IDs in execution order.
+
+        Raises:
+            ValueError: If the graph contains a cycle.
+        """
+        order = []
+        for wave in self.waves():
+            order.extend(wave)
+        return order
+
+    def waves(self):
+        """
+        Group the tasks into topological levels.
+
+        Every task in a wave depends only on tasks from previous waves, so
+        all tasks of a wave can run concurrently.
+
+        Returns:
+            list: List of waves, each a list of task IDs sorted by ``order_index``.
+
+        Raises:
+            ValueError: If the graph contains a cycle.
+        """
+        in_degree = {
+            task_id: len(self.dependencies.get(task_id, ()))
+            for task_id in self.nodes
+        }
+        current = [task_id for task_id, degree in in_degree.items() if degree == 0]
+        waves = []
+        visited = 0
+
+        while current:
+            current.sort(key=self._sort_key)
+            waves.append(current)
+            visited += len(current)
+            following = []
+            for task_id in current:
+                for dependent_id in self.dependents.get(task_id, ()):
+                    in_degree[dependent_id] -= 1
+                    if in_degree[dependent_id] == 0:
+                        following.append(dependent_id)
+            current = following
+
+        if visited != len(self.nodes):
+            raise ValueError('O grafo de dependencias contem um ciclo.')
+        return waves
+
+    def find_cycle(self):
+        """
+        Find one dependency cycle in the graph.
+
+        Returns:
+            list or None: Task IDs forming the cycle (first element repeated
+            at the end), or None if the graph is acyclic.
+        """
+        white, gray, black = 0, 1, 2
+        color = dict.fromkeys(self.nodes, white)
+
+        for root in sorted(self.nodes, key=self._sort_key):
+            if color[root] != white:
+                continue
+            path = [root]
+            iterators = [iter(self.dependencies.get(root, ()))]
+            color[root] = gray
+            while iterators:
+                dependency_id = next(iterators[-1], None)
+                if dependency_id is None:
+                    color[path.pop()] = black
+                    iterators.pop()
+                    continue
+                if color.get(dependency_id, white) == gray:
+                    start = path.index(dependency_id)
+                    return path[start:] + [dependency_id]
+                if color.get(dependency_id, white) == white:
+                    color[dependency_id] = gray
+                    path.append(dependency_id)
+                    iterators.append(iter(self.dependencies.get(dependency_id, ())))
+        return None
+
+    def has_cycle(self):
+        """Check if the graph contains any dependency cycle."""
+        return self.find_cycle() is not None
+
+    def dependents_of(self, task_id):
+        """
+        Return the tasks that (transitively) depend on ``task_id``.
+
+        Follows the reverse edges iteratively in a single pass.
+
+        Args:
+            task_id: Task ID to start from.
+
+        Returns:
+            set: IDs of the dependent tasks (``task_id`` itself only if it
+            is part of a cycle).
+        """
+        visited = set()
+        stack = [task_id]
+        while stack:
+            for dependent_id in self.dependents.get(stack.pop(), ()):
+                if dependent_id not in visited:
+                    visited.add(dependent_id)
+                    stack.append(dependent_id)
+        return visited
+
+    def validate_task(self, task_id):
+        """
+        Validate the current dependencies of a single task.
+
+        The tasks depending on ``task_id`` are collected in one traversal;
+        a dependency among them closes a cycle.
+
+        Args:
+            task_id: ID of the task to validate.
+
+        Raises:
+            ValidationError: If the task depends on itself, on a task from a
+                different problem or participates in a cycle.
+        """
+        for source_id, dependency_id in self.foreign_edges:
+            if source_id == task_id:
+                raise ValidationError({
+                    'dependencies': (
+                        f'A dependencia "{self._title(dependency_id)}" '
+                        f'pertence a um problema diferente.'
+                    )
+                })
+
+        dependencies = self.dependencies.get(task_id, ())
+        if task_id in dependencies:
+            raise ValidationError({
+                'dependencies': 'Uma tarefa nao pode depender de si mesma.'
+            })
+        if not dependencies:
+            return
+
+        dependents = self.dependents_of(task_id)
+        for dependency_id in sorted(dependencies, key=self._sort_key):
+            if dependency_id in dependents:
+                raise ValidationError({
+                    'dependencies': (
+                        f'Dependencia circular detectada com a tarefa '
+                        f'"{self._title(dependency_id)}".'
+                    )
+                })
+
+    def validate_edges(self, edges, task_problems=None):
+        """
+        Validate a batch of proposed dependency edges at once.
+
+        The edges are applied to a copy of the graph one after another, so
+        a batch that only forms a cycle in combination is also rejected.
+
+        Args:
+            edges: Iterable of ``(task_id, dependency_id)`` tuples.
+            task_problems: Mapping of task ID to problem ID for tasks that
+                are not part of this graph. Tasks found in neither are
+                rejected as nonexistent.
+
+        Returns:
+            DependencyGraph: A new graph including the proposed edges.
+
+        Raises:
+            ValidationError: With one message per rejected edge.
+        """
+        task_problems = task_problems or {}
+        graph = self.copy()
+        errors = []
+
+        for task_id, dependency_id in edges:
+            if task_id == dependency_id:
+                errors.append('Uma tarefa nao pode depender de si mesma.')
+                continue
+
+            outside = [node_id for node_id in (task_id, dependency_id) if node_id not in self.nodes]
+            missing = [node_id for node_id in outside if node_id not in task_problems]
+            if missing:
+                errors.append(f'A tarefa "{missing[0]}" nao existe.')
+                continue
+            if any(task_problems[node_id] != self.problem_id for node_id in outside):
+                errors.append(
+                    f'A dependencia "{self._title(dependency_id)}" '
+                    f'pertence a um problema diferente.'
+                )
+                continue
+
+            if graph.would_create_cycle(task_id, dependency_id):
+                errors.append(
+                    f'Dependencia circular detectada com a tarefa '
+                    f'"{self._title(dependency_id)}".'
+                )
+                continue
+
+            graph.add_edge(task_id, dependency_id)
+
+        if errors:
+            raise ValidationError({'dependencies': errors})
+        return graph
+
+    def copy(self):
+        """Return an independent copy of this graph."""
+        graph = DependencyGraph(
+            self.problem_id,
+            nodes=self.nodes,
+            titles=self.titles,
+            foreign_edges=self.foreign_edges,
+        )
+        for task_id, dependency_ids in self.dependencies.items():
+            for dependency_id in dependency_ids:
+                graph.add_edge(task_id, dependency_id)
+        return graph
+
+    def _sort_key(self, task_id):
+        return (self.nodes.get(task_id, 0), str(task_id))
+
+    def _title(self, task_id):
+        return self.titles.get(task_id, str(task_id))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        edge_count = sum(len(deps) for deps in self.dependencies.values())
+        return f'<DependencyGraph problem={self.problem_id} nodes={len(self.nodes)} edges={edge_count}>'
@@ -0,0 +1,292 @@
+"""
+Heartbeats of running task executions and the reaper of lost ones.
+
+A worker killed by the hard time limit or the OOM killer never gets to
+mark its execution as finished, so the execution stays ``running`` and its
+task ``in_progress``, blocking every dependent task. While an execution
+runs, its worker process refreshes the execution's score (a Unix time) in
+a single Redis sorted set. Each process beats for all of its executions
+with one ZADD per ``TASK_HEARTBEAT_INTERVAL``, whatever the pool
+concurrency.
+
+The reaper reads the members whose score is older than
+``TASK_HEARTBEAT_TIMEOUT`` with ZRANGEBYSCORE, so a sweep costs the
+number of stale executions and not the number of running ones. Stale
+executions are marked ``timeout`` with one bulk transition per batch and
+their tasks either go back to ``pending`` with a ``retry_after`` backoff
+(a new attempt is dispatched by the scheduler) or fail once
+``TASK_EXECUTION_MAX_ATTEMPTS`` is reached.
+
+Running executions with no heartbeat at all (the worker was lost right
+after starting the execution, or the sorted set was lost with a Redis
+restart) are found by a less frequent orphan scan.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.redis_client import get_redis
+from apps.tasks_app.models import Task, TaskExecution
+
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = 'tasks:executions:heartbeats'
+ORPHAN_SCAN_KEY = 'tasks:executions:orphan-scan'
+ORPHAN_CANDIDATES_KEY = 'tasks:executions:orphan-candidates'
+
+
+class HeartbeatEmitter:
+    """
+    Beats for every execution running in the current process.
+
+    A daemon thread, started on first use (and again in forked children),
+    refreshes the scores of all registered executions with one ZADD per
+    interval. Redis errors are logged and never interrupt the executions.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._executions = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add(self, execution_id):
+        """Register an execution and beat for it right away."""
+        execution_id = str(execution_id)
+        with self._lock:
+            self._executions.add(execution_id)
+            self._ensure_thread()
+        self._beat([execution_id])
+
+    def discard(self, execution_id):
+        """Stop beating for an execution and remove its heartbeat."""
+        execution_id = str(execution_id)
+        with self._lock:
+            self._executions.discard(execution_id)
+        try:
+            get_redis().zrem(HEARTBEAT_KEY, execution_id)
+        except Exception as exc:
+            logger.warning(f'Could not clear heartbeat of execution {execution_id}: {exc}')
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='execution-heartbeat', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval or settings.TASK_HEARTBEAT_INTERVAL)
+            with self._lock:
+                execution_ids = list(self._executions)
+            if execution_ids:
+                self._beat(execution_ids)
+
+    def _beat(self, execution_ids):
+        now = time.time()
+        try:
+            get_redis().zadd(HEARTBEAT_KEY, {execution_id: now for execution_id in execution_ids})
+        except Exception as exc:
+            logger.warning(f'Could not write heartbeat of {len(execution_ids)} execution(s): {exc}')
+
+
+_emitter = HeartbeatEmitter()
+
+
+@contextmanager
+def execution_heartbeat(execution_id):
+    """
+    Keep the heartbeat of an execution alive while the block runs.
+
+    Args:
+        execution_id: Primary key of the TaskExecution.
+    """
+    _emitter.add(execution_id)
+    try:
+        yield
+    finally:
+        _emitter.discard(execution_id)
+
+
+def stale_execution_ids(limit=None, timeout=None):
+    """
+    Return the executions whose last heartbeat is older than the timeout.
+
+    Args:
+        limit: Maximum number of ids (defaults to TASK_HEARTBEAT_REAPER_BATCH_SIZE).
+        timeout: Seconds without heartbeat (defaults to TASK_HEARTBEAT_TIMEOUT).
+
+    Returns:
+        list: Execution ids (str), oldest heartbeat first.
+    """
+    limit = limit or settings.TASK_HEARTBEAT_REAPER_BATCH_SIZE
+    cutoff = time.time() - (timeout or settings.TASK_HEARTBEAT_TIMEOUT)
+    members = get_redis().zrangebyscore(HEARTBEAT_KEY, '-inf', cutoff, start=0, num=limit)
+    return [member.decode() for member in members]
+
+
+def orphaned_execution_ids(timeout=None):
+    """
+    Return running executions that have had no heartbeat for two scans.
+
+    Only executions started more than the heartbeat timeout ago are
+    checked. An execution must be missing from the sorted set in two
+    consecutive scans, so executions whose heartbeat was lost with a Redis
+    restart get one interval to beat again.
+
+    Returns:
+        list: Execution ids (str).
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout or settings.TASK_HEARTBEAT_TIMEOUT)
+    running = [
+        str(pk) for pk in TaskExecution.objects.filter(
+            status='running', started_at__lt=cutoff
+        ).values_list('pk', flat=True)
+    ]
+    redis = get_redis()
+    batch_size = settings.TASK_HEARTBEAT_REAPER_BATCH_SIZE
+    missing = []
+    for start in range(0, len(running), batch_size):
+        batch = running[start:start + batch_size]
+        scores = redis.zmscore(HEARTBEAT_KEY, batch)
+        missing.extend(pk for pk, score in zip(batch, scores) if score is None)
+
+    previous = set(cache.get(ORPHAN_CANDIDATES_KEY) or ())
+    cache.set(ORPHAN_CANDIDATES_KEY, missing, timeout=settings.TASK_HEARTBEAT_ORPHAN_SCAN_INTERVAL * 3)
+    return [pk for pk in missing if pk in previous]
+
+
+def retry_delay(attempt_number):
+    """Return the backoff in seconds before retrying after the given attempt."""
+    return settings.TASK_EXECUTION_RETRY_BACKOFF * (2 ** max(0, attempt_number - 1))
+
+
+def reap_executions(execution_ids, requeue=None):
+    """
+    Time out the given executions and roll back or fail their tasks.
+
+    Executions that are no longer pending/running are skipped; their
+    heartbeats are cleared anyway.
+
+    Args:
+        execution_ids: Primary keys of the executions.
+        requeue: Retry the tasks with backoff while attempts remain
+            (defaults to TASK_EXECUTION_REQUEUE_ON_TIMEOUT).
+
+    Returns:
+        dict: Number of executions ``timed_out`` and of tasks ``requeued``
+        and ``failed``.
+    """
+    from apps.tasks_app.tasks import schedule_problem_tasks
+
+    if requeue is None:
+        requeue = settings.TASK_EXECUTION_REQUEUE_ON_TIMEOUT
+    summary = {'timed_out': 0, 'requeued': 0, 'failed': 0}
+    if not execution_ids:
+        return summary
+
+    now = timezone.now()
+    with transaction.atomic():
+        timed_out = TaskExecution.objects.filter(pk__in=execution_ids).bulk_transition('timeout').updated
+        summary['timed_out'] = len(timed_out)
+
+        retries, exhausted, problems = {}, [], set()
+        rows = TaskExecution.objects.filter(pk__in=timed_out).values_list(
+            'task_id', 'attempt_number', 'task__problem_id'
+        )
+        for task_id, attempt_number, problem_id in rows:
+            problems.add(str(problem_id))
+            if requeue and attempt_number < settings.TASK_EXECUTION_MAX_ATTEMPTS:
+                retries.setdefault(retry_delay(attempt_number), []).append((task_id, str(problem_id)))
+            else:
+                exhausted.append(task_id)
+
+        # One UPDATE per backoff value (i.e. per attempt number)
+        for delay, tasks in retries.items():
+            rolled_back = Task.objects.filter(pk__in=[task_id for task_id, _ in tasks]).bulk_transition(
+                'rollback', retry_after=now + timedelta(seconds=delay)
+            ).updated
+            summary['requeued'] += len(rolled_back)
+            for problem_id in {problem_id for _, problem_id in tasks}:
+                transaction.on_commit(partial(
+                    schedule_problem_tasks.apply_async, args=[problem_id], countdown=delay
+                ))
+        if exhausted:
+            summary['failed'] = len(Task.objects.filter(pk__in=exhausted).bulk_transition(
+                'fail', error_message='Execucao interrompida: worker sem sinal de vida'
+            ).updated)
+
+        # The freed slots can be used by other tasks right away
+        for problem_id in problems:
+            transaction.on_commit(partial(schedule_problem_tasks.delay, problem_id))
+
+    get_redis().zrem(HEARTBEAT_KEY, *[str(pk) for pk in execution_ids])
+    if summary['timed_out']:
+        logger.warning(
+            f"Reaped {summary['timed_out']} execution(s) without heartbeat: "
+            f"{summary['requeued']} task(s) requeued, {summary['failed']} failed"
+        )
+    return summary
+
+
+def reap_stale_executions(requeue=None, orphans=None):
+    """
+    Reap every execution whose heartbeat is stale, in batches.
+
+    Args:
+        requeue: See reap_executions.
+        orphans: Also run the orphan scan (by default at most once per
+            TASK_HEARTBEAT_ORPHAN_SCAN_INTERVAL).
+
+    Returns:
+        dict: Totals of reap_executions.
+    """
+    totals = {'timed_out': 0, 'requeued': 0, 'failed': 0}
+    batch_size = settings.TASK_HEARTBEAT_REAPER_BATCH_SIZE
+
+    def add(summary):
+        for key, value in summary.items():
+            totals[key] += value
+
+    while True:
+        execution_ids = stale_execution_ids(limit=batch_size)
+        add(reap_executions(execution_ids, requeue=requeue))
+        if len(execution_ids) < batch_size:
+            break
+
+    if orphans is None:
+        orphans = cache.add(ORPHAN_SCAN_KEY, 1, timeout=settings.TASK_HEARTBEAT_ORPHAN_SCAN_INTERVAL)
+    if orphans:
+        add(reap_executions(orphaned_execution_ids(), requeue=requeue))
+    return totals
+
+
+def heartbeat_stats(timeout=None):
+    """
+    Return counters of the heartbeat sorted set.
+
+    Returns:
+        dict: ``tracked`` executions, ``stale`` ones and the age in seconds
+        of the oldest heartbeat (None if empty).
+    """
+    redis = get_redis()
+    now = time.time()
+    cutoff = now - (timeout or settings.TASK_HEARTBEAT_TIMEOUT)
+    oldest = redis.zrange(HEARTBEAT_KEY, 0, 0, withscores=True)
+    return {
+        'tracked': redis.zcard(HEARTBEAT_KEY),
+        'stale': redis.zcount(HEARTBEAT_KEY, '-inf', cutoff),
+        'oldest_age': now - oldest[0][1] if oldest else None,
+    }
@@ -0,0 +1,293 @@
+"""
+Append-only log storage for task executions.
+
+``TaskExecution.append_log`` used to rewrite the whole ``logs`` column on
+every line. Log lines are now buffered in memory per execution and written
+as TaskExecutionLogChunk rows, one row per flush. A buffer is flushed when
+it exceeds ``TASK_LOG_FLUSH_BYTES``, when its oldest line is older than
+``TASK_LOG_FLUSH_INTERVAL`` seconds, on every terminal transition of the
+execution and at process exit.
+
+The time budget is also enforced while no line is appended (an execution
+waiting on a long LLM call or test run): a daemon thread per process
+flushes the due buffers every half interval, so live viewers get the
+lines within about 1.5 intervals.
+
+A buffer that cannot be written is dropped with its lines instead of being
+retried forever: at once on an IntegrityError (typically the execution was
+deleted), or after ``MAX_FLUSH_FAILURES`` consecutive failures otherwise.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Max
+
+
+logger = logging.getLogger(__name__)
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+_flusher = None
+_flusher_pid = None
+
+# Consecutive failed flushes after which a buffer is dropped
+MAX_FLUSH_FAILURES = 5
+
+
+class ExecutionLogBuffer:
+    """
+    In-memory buffer of log lines for a single execution.
+
+    Attributes:
+        execution_id: Primary key of the TaskExecution
+        max_bytes: Flush once the buffered text reaches this size
+        max_interval: Flush once the oldest buffered line is this old (seconds)
+        failures: Consecutive failed flushes
+    """
+
+    def __init__(self, execution_id, max_bytes=None, max_interval=None):
+        self.execution_id = execution_id
+        self.max_bytes = max_bytes or settings.TASK_LOG_FLUSH_BYTES
+        self.max_interval = (
+            max_interval if max_interval is not None else settings.TASK_LOG_FLUSH_INTERVAL
+        )
+        self._lines = []
+        self._size = 0
+        self._first_line_at = None
+        self._next_sequence = None
+        self._lock = threading.Lock()
+        self.failures = 0
+
+    def append(self, line):
+        """
+        Buffer a log line, flushing if the size or time budget is exceeded.
+
+        Args:
+            line: The formatted log line (including the trailing newline).
+        """
+        with self._lock:
+            if not self._lines:
+                self._first_line_at = time.monotonic()
+            self._lines.append(line)
+            self._size += len(line)
+            if self._should_flush():
+                self._flush()
+
+    def flush(self):
+        """
+        Write the buffered lines as a new chunk.
+
+        Returns:
+            int or None: Sequence of the written chunk, or None if empty.
+        """
+        with self._lock:
+            return self._flush()
+
+    def flush_if_due(self):
+        """
+        Write the buffered lines if the oldest one reached the time budget.
+
+        Returns:
+            int or None: Sequence of the written chunk, or None if not due.
+        """
+        with self._lock:
+            if self._lines and self._should_flush():
+                return self._flush()
+            return None
+
+    @property
+    def pending_size(self):
+        """Number of buffered characters not yet written."""
+        return self._size
+
+    def _should_flush(self):
+        if self._size >= self.max_bytes:
+            return True
+        return time.monotonic() - self._first_line_at >= self.max_interval
+
+    def _flush(self):
+        if not self._lines:
+            return None
+
+        from apps.tasks_app.models import TaskExecutionLogChunk
+
+        content = ''.join(self._lines)
+        try:
+            for attempt in range(2):
+                if self._next_sequence is None or attempt:
+                    self._next_sequence = _last_sequence(self.execution_id) + 1
+                try:
+                    with transaction.atomic():
+                        TaskExecutionLogChunk.objects.create(
+                            execution_id=self.execution_id,
+                            sequence=self._next_sequence,
+                            content=content,
+                        )
+                    break
+                except IntegrityError:
+                    # Another writer took this sequence; reload and retry once
+                    if attempt:
+                        raise
+        except Exception:
+            self.failures += 1
+            raise
+
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        self.failures = 0
+        self._lines = []
+        self._size = 0
+        self._first_line_at = None
+        _on_chunk_written(self.execution_id, sequence, content)
+        return sequence
+
+
+def _last_sequence(execution_id):
+    """Return the highest stored chunk sequence of an execution (0 if none)."""
+    from apps.tasks_app.models import TaskExecutionLogChunk
+
+    return TaskExecutionLogChunk.objects.filter(
+        execution_id=execution_id
+    ).aggregate(last=Max('sequence'))['last'] or 0
+
+
+def _on_chunk_written(execution_id, sequence, content):
+    """Publish a stored chunk to live viewers."""
+    from apps.tasks_app.streaming import publish_execution_event
+
+    publish_execution_event(execution_id, 'log', {'sequence': sequence, 'content': content})
+
+
+def get_log_buffer(execution_id):
+    """
+    Return the process-wide log buffer of an execution.
+
+    Args:
+        execution_id: Primary key of the TaskExecution.
+
+    Returns:
+        ExecutionLogBuffer: The buffer, created on first use.
+    """
+    with _buffers_lock:
+        buffer = _buffers.get(execution_id)
+        if buffer is None:
+            buffer = _buffers[execution_id] = ExecutionLogBuffer(execution_id)
+            _ensure_flusher()
+        return buffer
+
+
+def _ensure_flusher():
+    # Called with _buffers_lock held; threads do not survive a fork
+    global _flusher, _flusher_pid
+    if _flusher_pid == os.getpid() and _flusher is not None and _flusher.is_alive():
+        return
+    _flusher_pid = os.getpid()
+    _flusher = threading.Thread(target=_run_flusher, name='execution-log-flusher', daemon=True)
+    _flusher.start()
+
+
+def _run_flusher():
+    while True:
+        time.sleep(max(0.5, settings.TASK_LOG_FLUSH_INTERVAL / 2))
+        if flush_due():
+            # This thread holds its own database connection
+            close_old_connections()
+
+
+def flush_due():
+    """
+    Flush the buffers whose oldest line reached the time budget.
+
+    Returns:
+        int: Number of written chunks.
+    """
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    flushed = 0
+    for buffer in buffers:
+        try:
+            if buffer.flush_if_due() is not None:
+                flushed += 1
+        except Exception as exc:
+            logger.exception(
+                f'Failed to flush logs of execution {buffer.execution_id} '
+                f'(attempt {buffer.failures})'
+            )
+            if isinstance(exc, IntegrityError) or buffer.failures >= MAX_FLUSH_FAILURES:
+                _discard_buffer(buffer)
+    return flushed
+
+
+def _discard_buffer(buffer):
+    """Stop tracking a buffer that cannot be written, losing its lines."""
+    with _buffers_lock:
+        if _buffers.get(buffer.execution_id) is buffer:
+            del _buffers[buffer.execution_id]
+    logger.error(
+        f'Dropped {buffer.pending_size} buffered log character(s) of execution '
+        f'{buffer.execution_id}'
+    )
+
+
+def flush_execution_logs(execution_id):
+    """
+    Flush and release the buffer of an execution, if any.
+
+    Args:
+        execution_id: Primary key of the TaskExecution.
+    """
+    with _buffers_lock:
+        buffer = _buffers.pop(execution_id, None)
+    if buffer is not None:
+        buffer.flush()
+
+
+def flush_all():
+    """Flush every buffer of this process."""
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+        _buffers.clear()
+    for buffer in buffers:
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception(f'Failed to flush logs of execution {buffer.execution_id}')
+
+
+atexit.register(flush_all)
+
+
+def iter_log_chunks(execution_id, after_sequence=0, batch_size=500):
+    """
+    Stream the stored log chunks of an execution in order.
+
+    Chunks are read in keyset-paginated batches, so memory use is bounded
+    by ``batch_size`` chunks regardless of the log size.
+
+    Args:
+        execution_id: Primary key of the TaskExecution.
+        after_sequence: Only return chunks with a greater sequence.
+        batch_size: Number of chunks fetched per query.
+
+    Yields:
+        tuple: ``(sequence, content)`` pairs.
+    """
+    from apps.tasks_app.models import TaskExecutionLogChunk
+
+    last = after_sequence
+    while True:
+        batch = list(
+            TaskExecutionLogChunk.objects.filter(
+                execution_id=execution_id,
+                sequence__gt=last,
+            ).order_by('sequence').values_list('sequence', 'content')[:batch_size]
+        )
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1][0]
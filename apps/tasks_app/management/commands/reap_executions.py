@@ -0,0 +1,58 @@
+"""
+Management command para encerrar execucoes sem sinal de vida.
+
+Sem opcoes, marca como 'timeout' as execucoes cujo heartbeat esta
+atrasado ha mais de TASK_HEARTBEAT_TIMEOUT segundos (ex.: worker morto
+pelo limite de tempo ou por falta de memoria) e devolve suas tarefas para
+a fila com backoff, ou as marca como falhas apos
+TASK_EXECUTION_MAX_ATTEMPTS tentativas. Com --stats, apenas mostra os
+contadores dos heartbeats.
+
+Usage:
+    python manage.py reap_executions
+    python manage.py reap_executions --no-requeue
+    python manage.py reap_executions --orphans
+    python manage.py reap_executions --stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.tasks_app.heartbeat import heartbeat_stats, reap_stale_executions
+
+
+class Command(BaseCommand):
+    help = 'Encerra as execucoes cujo worker parou de enviar heartbeats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-requeue',
+            action='store_true',
+            help='Marca as tarefas como falhas em vez de agendar nova tentativa',
+        )
+        parser.add_argument(
+            '--orphans',
+            action='store_true',
+            help='Tambem procura execucoes em andamento sem nenhum heartbeat',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Mostra os contadores dos heartbeats sem encerrar execucoes',
+        )
+
+    def handle(self, *args, **options):
+        if not options['stats']:
+            summary = reap_stale_executions(
+                requeue=False if options['no_requeue'] else None,
+                orphans=options['orphans'] or None,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{summary["timed_out"]} execucao(oes) encerrada(s): '
+                f'{summary["requeued"]} tarefa(s) reagendada(s), {summary["failed"]} falha(s).'
+            ))
+
+        stats = heartbeat_stats()
+        age = stats['oldest_age']
+        self.stdout.write(f'Execucoes com heartbeat: {stats["tracked"]}')
+        self.stdout.write(f'Heartbeats atrasados: {stats["stale"]}')
+        self.stdout.write(f'Heartbeat mais antigo: {f"{age:.1f}s" if age is not None else "-"}')
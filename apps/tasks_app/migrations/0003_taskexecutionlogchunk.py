@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks_app", "0002_taskexecution"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="taskexecution",
+            name="logs",
+            field=models.TextField(
+                blank=True,
+                default="",
+                help_text="Logs legados da execucao (novos logs ficam em TaskExecutionLogChunk)",
+                verbose_name="logs",
+            ),
+        ),
+        migrations.CreateModel(
+            name="TaskExecutionLogChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sequence",
+                    models.PositiveIntegerField(
+                        help_text="Posicao do bloco dentro dos logs da execucao",
+                        verbose_name="sequencia",
+                    ),
+                ),
+                (
+                    "content",
+                    models.TextField(
+                        help_text="Linhas de log do bloco", verbose_name="conteudo"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Data e hora em que o bloco foi gravado",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "execution",
+                    models.ForeignKey(
+                        help_text="Execucao a qual estes logs pertencem",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="log_chunks",
+                        to="tasks_app.taskexecution",
+                        verbose_name="execucao",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bloco de Log de Execucao",
+                "verbose_name_plural": "Blocos de Log de Execucao",
+                "db_table": "tasks_execution_log_chunk",
+                "ordering": ["execution", "sequence"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("execution", "sequence"),
+                        name="unique_log_chunk_sequence_per_execution",
+                    )
+                ],
+            },
+        ),
+    ]
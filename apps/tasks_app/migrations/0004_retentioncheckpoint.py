@@ -0,0 +1,133 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0002_organization_execution_retention_days"),
+        ("tasks_app", "0003_taskexecutionlogchunk"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RetentionCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="Data e hora de criacao do registro",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        help_text="Data e hora da ultima atualizacao do registro",
+                        verbose_name="atualizado em",
+                    ),
+                ),
+                (
+                    "job",
+                    models.CharField(
+                        help_text="Nome do job de retencao",
+                        max_length=100,
+                        verbose_name="job",
+                    ),
+                ),
+                (
+                    "cutoff",
+                    models.DateTimeField(
+                        help_text="Execucoes criadas antes desta data sao elegiveis",
+                        verbose_name="data de corte",
+                    ),
+                ),
+                (
+                    "cursor_created_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data de criacao da ultima execucao processada",
+                        null=True,
+                        verbose_name="cursor (criado em)",
+                    ),
+                ),
+                (
+                    "cursor_id",
+                    models.UUIDField(
+                        blank=True,
+                        help_text="ID da ultima execucao processada",
+                        null=True,
+                        verbose_name="cursor (ID)",
+                    ),
+                ),
+                (
+                    "rows_reclaimed",
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        help_text="Execucoes removidas na execucao atual ou na ultima",
+                        verbose_name="linhas removidas",
+                    ),
+                ),
+                (
+                    "bytes_reclaimed",
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        help_text="Tamanho aproximado de texto removido",
+                        verbose_name="bytes liberados",
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        help_text="Inicio da execucao atual ou da ultima",
+                        verbose_name="iniciado em",
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Fim da ultima execucao (vazio enquanto em andamento)",
+                        null=True,
+                        verbose_name="concluido em",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="retention_checkpoints",
+                        to="organizations.organization",
+                        verbose_name="organizacao",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Checkpoint de Retencao",
+                "verbose_name_plural": "Checkpoints de Retencao",
+                "db_table": "tasks_retention_checkpoint",
+                "ordering": ["-started_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("job", "organization"),
+                        name="unique_retention_checkpoint_per_job",
+                    )
+                ],
+            },
+        ),
+    ]
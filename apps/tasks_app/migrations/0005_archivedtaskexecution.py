@@ -0,0 +1,170 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0002_organization_execution_retention_days"),
+        ("tasks_app", "0004_retentioncheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTaskExecution",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="Data e hora de criacao do registro",
+                        verbose_name="criado em",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        help_text="Data e hora da ultima atualizacao do registro",
+                        verbose_name="atualizado em",
+                    ),
+                ),
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                (
+                    "task_title",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Titulo da tarefa no momento do arquivamento",
+                        max_length=500,
+                        verbose_name="titulo da tarefa",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pendente"),
+                            ("running", "Executando"),
+                            ("completed", "Concluido"),
+                            ("failed", "Falhou"),
+                            ("cancelled", "Cancelado"),
+                            ("timeout", "Tempo Esgotado"),
+                        ],
+                        help_text="Status final da execucao",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "agent_type",
+                    models.CharField(
+                        choices=[
+                            ("code_writer", "Code Writer Agent"),
+                            ("test_runner", "Test Runner Agent"),
+                            ("business_analyst", "Business Analyst Agent"),
+                            ("tech_architect", "Tech Architect Agent"),
+                            ("task_planner", "Task Planner Agent"),
+                            ("unknown", "Desconhecido"),
+                        ],
+                        default="unknown",
+                        help_text="Tipo de agente que executou a tarefa",
+                        max_length=50,
+                        verbose_name="tipo de agente",
+                    ),
+                ),
+                (
+                    "attempt_number",
+                    models.PositiveIntegerField(
+                        default=1,
+                        help_text="Numero da tentativa (para retries)",
+                        verbose_name="numero da tentativa",
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data e hora de inicio da execucao",
+                        null=True,
+                        verbose_name="iniciado em",
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Data e hora de conclusao da execucao",
+                        null=True,
+                        verbose_name="concluido em",
+                    ),
+                ),
+                (
+                    "execution_created_at",
+                    models.DateTimeField(
+                        help_text="Data de criacao do registro original da execucao",
+                        verbose_name="execucao criada em",
+                    ),
+                ),
+                (
+                    "archive_path",
+                    models.CharField(
+                        help_text="Arquivo do arquivo morto, relativo ao diretorio de arquivamento",
+                        max_length=500,
+                        verbose_name="arquivo",
+                    ),
+                ),
+                (
+                    "row_index",
+                    models.PositiveIntegerField(
+                        help_text="Posicao da linha dentro do arquivo",
+                        verbose_name="posicao no arquivo",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_task_executions",
+                        to="organizations.organization",
+                        verbose_name="organizacao",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Tarefa que foi executada",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_executions",
+                        to="tasks_app.task",
+                        verbose_name="tarefa",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Execucao Arquivada",
+                "verbose_name_plural": "Execucoes Arquivadas",
+                "db_table": "tasks_execution_archive",
+                "ordering": ["-execution_created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["organization", "execution_created_at"],
+                        name="tasks_execu_organiz_f3c974_idx",
+                    ),
+                    models.Index(
+                        fields=["task", "execution_created_at"],
+                        name="tasks_execu_task_id_503457_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks_app", "0005_archivedtaskexecution"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="retry_after",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="A tarefa nao e agendada antes desta data (nova tentativa apos falha do worker)",
+                null=True,
+                verbose_name="tentar novamente apos",
+            ),
+        ),
+    ]
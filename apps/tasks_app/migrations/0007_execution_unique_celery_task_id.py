@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks_app", "0006_task_retry_after"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="taskexecution",
+            name="tasks_execu_celery__09ca5a_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="taskexecution",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("celery_task_id", ""), _negated=True),
+                fields=("celery_task_id",),
+                name="unique_execution_celery_task_id",
+            ),
+        ),
+    ]
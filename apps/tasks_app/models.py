@@ -6,14 +6,89 @@ generated from technical specifications. Tasks can have dependencies on
 other tasks and go through a workflow of states.
 """
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models.functions import Now
 
+from apps.common.deferred import SummaryQuerySet
 from apps.common.models import TimestampedModel
 from apps.problems.models import Problem
 from apps.documents.models import TechSpecDocument
+from apps.events.outbox import save_transition
+from apps.tasks_app.graph import DependencyGraph
+from apps.tasks_app.transitions import BulkTransitionQuerySetMixin
+
+
+class TaskQuerySet(BulkTransitionQuerySetMixin, SummaryQuerySet):
+    """Custom QuerySet for Task with scheduling and bulk transition helpers."""
+
+    # Lower rank runs first
+    PRIORITY_RANK = {
+        'critical': 0,
+        'high': 1,
+        'medium': 2,
+        'low': 3,
+    }
+
+    def with_priority_rank(self):
+        """Annotate each task with a numeric ``priority_rank`` (0 = critical)."""
+        return self.annotate(
+            priority_rank=Case(
+                *[
+                    When(priority=priority, then=Value(rank))
+                    for priority, rank in self.PRIORITY_RANK.items()
+                ],
+                default=Value(len(self.PRIORITY_RANK)),
+                output_field=IntegerField(),
+            )
+        )
+
+    def with_blocking_flag(self):
+        """
+        Annotate each task with ``has_blocking_dependencies``.
+
+        Uses a correlated EXISTS subquery over the dependencies M2M table,
+        so the flag is computed by the database in the same query.
+        """
+        through = self.model.dependencies.through
+        blocking = through.objects.filter(
+            from_task_id=OuterRef('pk'),
+        ).exclude(to_task__status='completed')
+        return self.annotate(has_blocking_dependencies=Exists(blocking))
+
+    def runnable(self):
+        """
+        Return pending/selected tasks whose dependencies are all completed.
+
+        Tasks rolled back by the execution reaper are held until their
+        ``retry_after`` time. Ordered by priority (critical first) and then
+        by ``order_index``.
+        """
+        return self.filter(
+            status__in=['pending', 'selected']
+        ).filter(
+            Q(retry_after__isnull=True) | Q(retry_after__lte=Now())
+        ).with_blocking_flag().filter(
+            has_blocking_dependencies=False
+        ).with_priority_rank().order_by('priority_rank', 'order_index', 'created_at')
+
+    def runnable_for(self, problem):
+        """
+        Return the tasks of a problem that can start right now.
+
+        Executes a single SQL query (NOT EXISTS over the dependencies table),
+        so schedulers can poll it cheaply.
+
+        Args:
+            problem: The Problem instance (or its primary key).
+
+        Returns:
+            QuerySet: Runnable tasks ordered by priority and order_index.
+        """
+        return self.filter(problem=problem).runnable()
 
 
 class Task(TimestampedModel):
@@ -44,8 +119,12 @@ class Task(TimestampedModel):
         error_message: Error message if task failed
         branch_name: Git branch name for this task's changes
         commit_sha: Git commit SHA for this task's changes
+        retry_after: Not scheduled before this time (after a lost execution)
     """
 
+    # Large columns deferred by summary() projections
+    HEAVY_FIELDS = ('description', 'spec', 'implementation', 'test_results')
+
     # Status workflow choices
     STATUS_CHOICES = [
         ('pending', 'Pendente'),
@@ -57,6 +136,49 @@ class Task(TimestampedModel):
         ('skipped', 'Pulado'),
     ]
 
+    # Bulk transitions (see apps.tasks_app.transitions)
+    TRANSITIONS = {
+        'select': {'from': ['pending'], 'to': 'selected'},
+        'start': {
+            'from': ['pending', 'selected'],
+            'to': 'in_progress',
+            'timestamps': ['started_at'],
+        },
+        'fail': {
+            'from': ['pending', 'selected', 'in_progress', 'testing'],
+            'to': 'failed',
+            'timestamps': ['completed_at'],
+        },
+        'skip': {'from': ['pending', 'selected'], 'to': 'skipped'},
+        # Execution lost (see apps.tasks_app.heartbeat); runs again later
+        'rollback': {
+            'from': ['in_progress', 'testing'],
+            'to': 'pending',
+            'set': {'started_at': None},
+        },
+        'mark_pending': {
+            'from': ['selected', 'completed', 'failed', 'skipped'],
+            'to': 'pending',
+        },
+        # Unlike the per-row reset() this excludes running tasks, whose
+        # worker would keep writing to a task it no longer owns; roll
+        # them back (or fail them) first
+        'reset': {
+            'from': ['pending', 'selected', 'completed', 'failed', 'skipped'],
+            'to': 'pending',
+            'set': {
+                'started_at': None,
+                'completed_at': None,
+                'error_message': '',
+                'commit_sha': '',
+                'actual_hours': None,
+                'implementation': {},
+                'test_results': [],
+                'retry_after': None,
+            },
+        },
+    }
+
     # Priority choices
     PRIORITY_CHOICES = [
         ('low', 'Baixa'),
@@ -194,6 +316,12 @@ class Task(TimestampedModel):
         default='',
         help_text='SHA do commit Git com as alteracoes'
     )
+    retry_after = models.DateTimeField(
+        'tentar novamente apos',
+        null=True,
+        blank=True,
+        help_text='A tarefa nao e agendada antes desta data (nova tentativa apos falha do worker)'
+    )
     estimated_hours = models.DecimalField(
         'horas estimadas',
         max_digits=5,
@@ -211,6 +339,8 @@ class Task(TimestampedModel):
         help_text='Tempo real gasto em horas'
     )
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Tarefa'
         verbose_name_plural = 'Tarefas'
@@ -248,6 +378,9 @@ class Task(TimestampedModel):
         - Circular dependencies
         - Dependencies from different problems
 
+        The whole dependency graph of the problem is loaded at once, so the
+        number of queries does not grow with the number of tasks.
+
         Raises:
             ValidationError: If any validation fails.
         """
@@ -255,55 +388,43 @@ class Task(TimestampedModel):
             # New task, can't have dependencies yet
             return
 
-        # Get all dependencies
-        dependencies = self.dependencies.all()
-
-        for dep in dependencies:
-            # Check for self-reference
-            if dep.pk == self.pk:
-                raise ValidationError({
-                    'dependencies': 'Uma tarefa nao pode depender de si mesma.'
-                })
-
-            # Check for different problem
-            if dep.problem_id != self.problem_id:
-                raise ValidationError({
-                    'dependencies': f'A dependencia "{dep.title}" pertence a um problema diferente.'
-                })
+        graph = DependencyGraph.for_problem(self.problem_id)
+        graph.validate_task(self.pk)
 
-            # Check for circular dependencies
-            if self._has_circular_dependency(dep):
-                raise ValidationError({
-                    'dependencies': f'Dependencia circular detectada com a tarefa "{dep.title}".'
-                })
-
-    def _has_circular_dependency(self, dependency, visited=None):
+    @classmethod
+    def validate_dependency_batch(cls, problem, edges):
         """
-        Check if adding a dependency would create a circular reference.
+        Validate a batch of proposed dependencies for a problem.
+
+        Intended for planners that create many dependencies at once: the
+        existing graph is loaded once and every proposed edge is checked
+        against it and against the edges earlier in the batch.
 
         Args:
-            dependency: The task to check for circular dependency.
-            visited: Set of already visited task IDs.
+            problem: The Problem instance.
+            edges: Iterable of ``(task_id, dependency_id)`` tuples.
 
         Returns:
-            bool: True if circular dependency exists.
-        """
-        if visited is None:
-            visited = set()
-
-        if dependency.pk in visited:
-            return False
+            DependencyGraph: The graph including the proposed edges.
 
-        visited.add(dependency.pk)
-
-        # Check if dependency points back to this task
-        for dep_dep in dependency.dependencies.all():
-            if dep_dep.pk == self.pk:
-                return True
-            if self._has_circular_dependency(dep_dep, visited):
-                return True
-
-        return False
+        Raises:
+            ValidationError: If any proposed edge is invalid.
+        """
+        edges = list(edges)
+        graph = DependencyGraph.for_problem(problem)
+
+        unknown_ids = {
+            task_id for edge in edges for task_id in edge
+        } - set(graph.nodes)
+        task_problems = {}
+        if unknown_ids:
+            for task_id, problem_id, title in cls.objects.filter(
+                pk__in=unknown_ids
+            ).values_list('id', 'problem_id', 'title'):
+                task_problems[task_id] = problem_id
+                graph.titles[task_id] = title
+
+        return graph.validate_edges(edges, task_problems=task_problems)
 
     def can_execute(self):
         """
@@ -354,7 +475,7 @@ class Task(TimestampedModel):
 
         self.status = 'in_progress'
         self.started_at = timezone.now()
-        self.save(update_fields=['status', 'started_at', 'updated_at'])
+        save_transition(self, ['status', 'started_at', 'updated_at'])
         return True
 
     def mark_testing(self):
@@ -363,7 +484,7 @@ class Task(TimestampedModel):
             raise ValidationError('Somente tarefas em progresso podem entrar em teste.')
 
         self.status = 'testing'
-        self.save(update_fields=['status', 'updated_at'])
+        save_transition(self, ['status', 'updated_at'])
         return True
 
     def mark_completed(self, commit_sha=''):
@@ -386,9 +507,9 @@ class Task(TimestampedModel):
             duration = self.completed_at - self.started_at
             self.actual_hours = round(duration.total_seconds() / 3600, 2)
 
-        self.save(update_fields=[
+        save_transition(self, [
             'status', 'completed_at', 'commit_sha', 'actual_hours', 'updated_at'
-        ])
+        ], commit_sha=self.commit_sha)
         return True
 
     def mark_failed(self, error_message):
@@ -401,7 +522,10 @@ class Task(TimestampedModel):
         self.status = 'failed'
         self.error_message = error_message
         self.completed_at = timezone.now()
-        self.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        save_transition(
+            self, ['status', 'error_message', 'completed_at', 'updated_at'],
+            error_message=error_message,
+        )
         return True
 
     def skip(self, reason=''):
@@ -414,7 +538,7 @@ class Task(TimestampedModel):
         self.status = 'skipped'
         if reason:
             self.error_message = f'Pulada: {reason}'
-        self.save(update_fields=['status', 'error_message', 'updated_at'])
+        save_transition(self, ['status', 'error_message', 'updated_at'])
         return True
 
     def select(self):
@@ -423,7 +547,7 @@ class Task(TimestampedModel):
             raise ValidationError('Somente tarefas pendentes podem ser selecionadas.')
 
         self.status = 'selected'
-        self.save(update_fields=['status', 'updated_at'])
+        save_transition(self, ['status', 'updated_at'])
         return True
 
     def reset(self):
@@ -436,7 +560,8 @@ class Task(TimestampedModel):
         self.actual_hours = None
         self.implementation = {}
         self.test_results = []
-        self.save()
+        self.retry_after = None
+        save_transition(self, None)
         return True
 
     @property
@@ -478,6 +603,10 @@ class Task(TimestampedModel):
         return (max_index or 0) + 1
 
 
+class TaskExecutionQuerySet(BulkTransitionQuerySetMixin, SummaryQuerySet):
+    """Custom QuerySet for TaskExecution with bulk transition helpers."""
+
+
 class TaskExecution(TimestampedModel):
     """
     TaskExecution model for logging task execution attempts.
@@ -502,6 +631,12 @@ class TaskExecution(TimestampedModel):
         celery_task_id: ID of the Celery task handling this execution
     """
 
+    # Large columns deferred by summary() projections
+    HEAVY_FIELDS = ('logs', 'output', 'metrics')
+
+    # Aggregate name of domain events (see apps.events.outbox)
+    OUTBOX_AGGREGATE = 'execution'
+
     # Execution status choices
     STATUS_CHOICES = [
         ('pending', 'Pendente'),
@@ -512,6 +647,26 @@ class TaskExecution(TimestampedModel):
         ('timeout', 'Tempo Esgotado'),
     ]
 
+    # Bulk transitions (see apps.tasks_app.transitions)
+    TRANSITIONS = {
+        'cancel': {
+            'from': ['pending', 'running'],
+            'to': 'cancelled',
+            'timestamps': ['completed_at'],
+        },
+        'fail': {
+            'from': ['pending', 'running'],
+            'to': 'failed',
+            'timestamps': ['completed_at'],
+        },
+        'timeout': {
+            'from': ['pending', 'running'],
+            'to': 'timeout',
+            'timestamps': ['completed_at'],
+            'set': {'error_message': 'Execucao excedeu o tempo limite'},
+        },
+    }
+
     # Agent type choices
     AGENT_TYPE_CHOICES = [
         ('code_writer', 'Code Writer Agent'),
@@ -565,7 +720,7 @@ class TaskExecution(TimestampedModel):
         'logs',
         blank=True,
         default='',
-        help_text='Logs detalhados da execucao'
+        help_text='Logs legados da execucao (novos logs ficam em TaskExecutionLogChunk)'
     )
     output = models.TextField(
         'saida',
@@ -598,6 +753,8 @@ class TaskExecution(TimestampedModel):
         help_text='ID da tarefa Celery que esta executando'
     )
 
+    objects = TaskExecutionQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Execucao de Tarefa'
         verbose_name_plural = 'Execucoes de Tarefas'
@@ -607,7 +764,14 @@ class TaskExecution(TimestampedModel):
             models.Index(fields=['task', 'status']),
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['agent_type', 'status']),
-            models.Index(fields=['celery_task_id']),
+        ]
+        constraints = [
+            # One execution per Celery task, so redeliveries cannot create more
+            models.UniqueConstraint(
+                fields=['celery_task_id'],
+                condition=~models.Q(celery_task_id=''),
+                name='unique_execution_celery_task_id'
+            )
         ]
 
     def __str__(self):
@@ -620,12 +784,15 @@ class TaskExecution(TimestampedModel):
         Returns:
             bool: True if transition was successful.
         """
-        if self.status != 'pending':
-            raise ValidationError('Somente execucoes pendentes podem ser iniciadas.')
-
-        self.status = 'running'
-        self.started_at = timezone.now()
-        self.save(update_fields=['status', 'started_at', 'updated_at'])
+        with transaction.atomic():
+            # Only one delivery of the job can start it
+            if self._lock_status() != 'pending':
+                raise ValidationError('Somente execucoes pendentes podem ser iniciadas.')
+
+            self.status = 'running'
+            self.started_at = timezone.now()
+            save_transition(self, ['status', 'started_at', 'updated_at'])
+        self._publish_status()
         return True
 
     def complete(self, output=''):
@@ -634,15 +801,22 @@ class TaskExecution(TimestampedModel):
 
         Args:
             output: Optional output from the execution.
-        """
-        if self.status != 'running':
-            raise ValidationError('Somente execucoes em andamento podem ser concluidas.')
 
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        if output:
-            self.output = output
-        self.save(update_fields=['status', 'completed_at', 'output', 'updated_at'])
+        Raises:
+            ValidationError: If the execution is no longer running (e.g. the
+                reaper timed it out while its worker was unresponsive).
+        """
+        self.flush_logs()
+        with transaction.atomic():
+            if self._lock_status() != 'running':
+                raise ValidationError('Somente execucoes em andamento podem ser concluidas.')
+
+            self.status = 'completed'
+            self.completed_at = timezone.now()
+            if output:
+                self.output = output
+            save_transition(self, ['status', 'completed_at', 'output', 'updated_at'])
+        self._publish_status()
         return True
 
     def fail(self, error_message):
@@ -651,42 +825,105 @@ class TaskExecution(TimestampedModel):
 
         Args:
             error_message: Description of what went wrong.
+
+        Raises:
+            ValidationError: If the execution is no longer running (e.g. the
+                reaper timed it out while its worker was unresponsive).
         """
-        self.status = 'failed'
-        self.error_message = error_message
-        self.completed_at = timezone.now()
-        self.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        self.flush_logs()
+        with transaction.atomic():
+            if self._lock_status() != 'running':
+                raise ValidationError('Somente execucoes em andamento podem falhar.')
+
+            self.status = 'failed'
+            self.error_message = error_message
+            self.completed_at = timezone.now()
+            save_transition(
+                self, ['status', 'error_message', 'completed_at', 'updated_at'],
+                error_message=error_message,
+            )
+        self._publish_status()
         return True
 
+    def _lock_status(self):
+        """
+        Lock the row and reload its status (call inside a transaction).
+
+        The in-memory status of a long-running worker may be stale, so
+        transitions are checked against the locked row instead.
+        """
+        self.status = type(self).objects.select_for_update().values_list(
+            'status', flat=True
+        ).get(pk=self.pk)
+        return self.status
+
     def cancel(self):
         """Mark this execution as cancelled."""
         if self.status not in ['pending', 'running']:
             raise ValidationError('Somente execucoes pendentes ou em andamento podem ser canceladas.')
 
+        self.flush_logs()
         self.status = 'cancelled'
         self.completed_at = timezone.now()
-        self.save(update_fields=['status', 'completed_at', 'updated_at'])
+        save_transition(self, ['status', 'completed_at', 'updated_at'])
+        self._publish_status()
         return True
 
     def mark_timeout(self):
         """Mark this execution as timed out."""
+        self.flush_logs()
         self.status = 'timeout'
         self.error_message = 'Execucao excedeu o tempo limite'
         self.completed_at = timezone.now()
-        self.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        save_transition(self, ['status', 'error_message', 'completed_at', 'updated_at'])
+        self._publish_status()
         return True
 
+    def _publish_status(self):
+        """Notify live viewers about the current status."""
+        from apps.tasks_app.streaming import publish_execution_event
+
+        publish_execution_event(self.pk, 'status', {
+            'status': self.status,
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'error_message': self.error_message,
+        })
+
     def append_log(self, message):
         """
         Append a message to the execution logs.
 
+        Lines are buffered in memory and written as append-only chunks to
+        TaskExecutionLogChunk, flushed by size or age and on every terminal
+        transition, so the ``logs`` column is never rewritten.
+
         Args:
             message: Log message to append.
         """
+        from apps.tasks_app.logstore import get_log_buffer
+
         timestamp = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
         log_line = f'[{timestamp}] {message}\n'
-        self.logs += log_line
-        self.save(update_fields=['logs', 'updated_at'])
+        get_log_buffer(self.pk).append(log_line)
+
+    def flush_logs(self):
+        """Write any buffered log lines of this execution to the database."""
+        from apps.tasks_app.logstore import flush_execution_logs
+
+        flush_execution_logs(self.pk)
+
+    def read_logs(self):
+        """
+        Assemble the full execution logs.
+
+        Returns:
+            str: The legacy ``logs`` column followed by all stored chunks.
+        """
+        from apps.tasks_app.logstore import iter_log_chunks
+
+        self.flush_logs()
+        return self.logs + ''.join(content for _, content in iter_log_chunks(self.pk))
 
     @property
     def duration_seconds(self):
@@ -710,25 +947,355 @@ class TaskExecution(TimestampedModel):
         """Check if this execution is in a terminal state."""
         return self.status in ['completed', 'failed', 'cancelled', 'timeout']
 
+    @classmethod
+    def next_attempt_numbers(cls, task_ids):
+        """
+        Return the next attempt number of each task.
+
+        Uses the highest attempt number of the live and archived
+        executions, so numbers are not reused after retention removes
+        older rows. Callers must hold the row locks of the tasks (see
+        lock_tasks), otherwise concurrent calls get the same numbers.
+
+        Args:
+            task_ids: Primary keys of the tasks.
+
+        Returns:
+            dict: Task primary key to attempt number.
+        """
+        attempts = {task_id: 0 for task_id in task_ids}
+        for model in (cls, ArchivedTaskExecution):
+            rows = model.objects.filter(task_id__in=task_ids).order_by().values('task_id').annotate(
+                last=models.Max('attempt_number')
+            ).values_list('task_id', 'last')
+            for task_id, last in rows:
+                attempts[task_id] = max(attempts[task_id], last or 0)
+        return {task_id: last + 1 for task_id, last in attempts.items()}
+
+    @staticmethod
+    def lock_tasks(task_ids):
+        """Lock the rows of the given tasks, in primary key order."""
+        return list(
+            Task.objects.select_for_update().filter(pk__in=task_ids).order_by('pk').values_list(
+                'pk', flat=True
+            )
+        )
+
     @classmethod
     def create_for_task(cls, task, agent_type='unknown', celery_task_id=''):
         """
         Create a new execution record for a task.
 
+        The task row is locked while the attempt number is allocated. If an
+        execution already has the given Celery task ID it is returned
+        instead of creating a new one, so retried calls are idempotent.
+
         Args:
             task: The Task instance to create execution for.
             agent_type: Type of agent performing the execution.
             celery_task_id: Optional Celery task ID.
 
         Returns:
-            TaskExecution: The created execution instance.
+            TaskExecution: The created (or existing) execution instance.
         """
-        # Calculate attempt number based on previous executions
-        attempt_number = task.executions.count() + 1
+        with transaction.atomic():
+            cls.lock_tasks([task.pk])
+            if celery_task_id:
+                existing = cls.objects.filter(celery_task_id=celery_task_id).first()
+                if existing is not None:
+                    return existing
+
+            return cls.objects.create(
+                task=task,
+                agent_type=agent_type,
+                celery_task_id=celery_task_id,
+                attempt_number=cls.next_attempt_numbers([task.pk])[task.pk]
+            )
 
-        return cls.objects.create(
-            task=task,
-            agent_type=agent_type,
-            celery_task_id=celery_task_id,
-            attempt_number=attempt_number
-        )
+    @classmethod
+    def create_for_tasks(cls, task_ids, agent_type='unknown'):
+        """
+        Create one execution per task with a single INSERT.
+
+        The task rows are locked, attempt numbers are computed with one
+        aggregate query per table and each execution gets a fresh Celery
+        task ID.
+
+        Args:
+            task_ids: Primary keys of the tasks.
+            agent_type: Type of agent performing the executions.
+
+        Returns:
+            list: The created TaskExecution instances, in ``task_ids`` order.
+        """
+        with transaction.atomic():
+            cls.lock_tasks(task_ids)
+            attempts = cls.next_attempt_numbers(task_ids)
+            return cls.objects.bulk_create([
+                cls(
+                    task_id=task_id,
+                    agent_type=agent_type,
+                    celery_task_id=str(uuid.uuid4()),
+                    attempt_number=attempts[task_id],
+                )
+                for task_id in task_ids
+            ])
+
+
+class TaskExecutionLogChunk(models.Model):
+    """
+    Append-only chunk of TaskExecution logs.
+
+    Log lines are buffered by the writer and stored in batches, one row per
+    flush, keyed by (execution, sequence). Rows are never updated, so a
+    chatty execution writes each byte exactly once.
+
+    Attributes:
+        execution: The execution these log lines belong to
+        sequence: Position of the chunk within the execution (starts at 1)
+        content: The buffered log lines
+        created_at: When the chunk was written
+    """
+
+    execution = models.ForeignKey(
+        TaskExecution,
+        on_delete=models.CASCADE,
+        related_name='log_chunks',
+        verbose_name='execucao',
+        help_text='Execucao a qual estes logs pertencem'
+    )
+    sequence = models.PositiveIntegerField(
+        'sequencia',
+        help_text='Posicao do bloco dentro dos logs da execucao'
+    )
+    content = models.TextField(
+        'conteudo',
+        help_text='Linhas de log do bloco'
+    )
+    created_at = models.DateTimeField(
+        'criado em',
+        auto_now_add=True,
+        help_text='Data e hora em que o bloco foi gravado'
+    )
+
+    class Meta:
+        verbose_name = 'Bloco de Log de Execucao'
+        verbose_name_plural = 'Blocos de Log de Execucao'
+        ordering = ['execution', 'sequence']
+        db_table = 'tasks_execution_log_chunk'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['execution', 'sequence'],
+                name='unique_log_chunk_sequence_per_execution'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.execution_id} #{self.sequence}'
+
+
+class RetentionCheckpoint(TimestampedModel):
+    """
+    Progress of a retention job for one organization.
+
+    Retention jobs process executions in keyset order of
+    (created_at, id) and store the last processed key after every batch,
+    so a killed run resumes where it stopped instead of rescanning.
+
+    Attributes:
+        job: Name of the retention job
+        organization: The organization being processed
+        cutoff: Executions created before this moment are eligible
+        cursor_created_at: created_at of the last processed execution
+        cursor_id: ID of the last processed execution
+        rows_reclaimed: Executions removed by the current/last run
+        bytes_reclaimed: Approximate text size removed by the current/last run
+        started_at: When the current/last run started
+        finished_at: When the last run finished (None while in progress)
+    """
+
+    job = models.CharField(
+        'job',
+        max_length=100,
+        help_text='Nome do job de retencao'
+    )
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='retention_checkpoints',
+        verbose_name='organizacao'
+    )
+    cutoff = models.DateTimeField(
+        'data de corte',
+        help_text='Execucoes criadas antes desta data sao elegiveis'
+    )
+    cursor_created_at = models.DateTimeField(
+        'cursor (criado em)',
+        null=True,
+        blank=True,
+        help_text='Data de criacao da ultima execucao processada'
+    )
+    cursor_id = models.UUIDField(
+        'cursor (ID)',
+        null=True,
+        blank=True,
+        help_text='ID da ultima execucao processada'
+    )
+    rows_reclaimed = models.PositiveBigIntegerField(
+        'linhas removidas',
+        default=0,
+        help_text='Execucoes removidas na execucao atual ou na ultima'
+    )
+    bytes_reclaimed = models.PositiveBigIntegerField(
+        'bytes liberados',
+        default=0,
+        help_text='Tamanho aproximado de texto removido'
+    )
+    started_at = models.DateTimeField(
+        'iniciado em',
+        help_text='Inicio da execucao atual ou da ultima'
+    )
+    finished_at = models.DateTimeField(
+        'concluido em',
+        null=True,
+        blank=True,
+        help_text='Fim da ultima execucao (vazio enquanto em andamento)'
+    )
+
+    class Meta:
+        verbose_name = 'Checkpoint de Retencao'
+        verbose_name_plural = 'Checkpoints de Retencao'
+        ordering = ['-started_at']
+        db_table = 'tasks_retention_checkpoint'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job', 'organization'],
+                name='unique_retention_checkpoint_per_job'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.job} - {self.organization_id}'
+
+    @property
+    def is_running(self):
+        """Check if the run tracked by this checkpoint did not finish."""
+        return self.finished_at is None
+
+
+class ArchivedTaskExecution(TimestampedModel):
+    """
+    Lookup stub of a TaskExecution moved to the cold archive.
+
+    The full row (logs, output, metrics) lives in a compressed columnar
+    file under TASK_EXECUTION_ARCHIVE_DIR; this small row keeps what is
+    needed to list and find it. ``rehydrate()`` reads it back on demand.
+
+    Attributes:
+        id: Same UUID as the original TaskExecution
+        task: The task that was executed (kept while the task exists)
+        organization: Organization owning the execution
+        task_title: Title of the task at archive time
+        status: Final status of the execution
+        agent_type: Type of agent that performed the execution
+        attempt_number: Which attempt this was
+        started_at: When the execution started
+        completed_at: When the execution finished
+        execution_created_at: When the original execution row was created
+        archive_path: File holding the row, relative to the archive directory
+        row_index: Position of the row inside the file
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        editable=False
+    )
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_executions',
+        verbose_name='tarefa',
+        help_text='Tarefa que foi executada'
+    )
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='archived_task_executions',
+        verbose_name='organizacao'
+    )
+    task_title = models.CharField(
+        'titulo da tarefa',
+        max_length=500,
+        blank=True,
+        default='',
+        help_text='Titulo da tarefa no momento do arquivamento'
+    )
+    status = models.CharField(
+        'status',
+        max_length=20,
+        choices=TaskExecution.STATUS_CHOICES,
+        help_text='Status final da execucao'
+    )
+    agent_type = models.CharField(
+        'tipo de agente',
+        max_length=50,
+        choices=TaskExecution.AGENT_TYPE_CHOICES,
+        default='unknown',
+        help_text='Tipo de agente que executou a tarefa'
+    )
+    attempt_number = models.PositiveIntegerField(
+        'numero da tentativa',
+        default=1,
+        help_text='Numero da tentativa (para retries)'
+    )
+    started_at = models.DateTimeField(
+        'iniciado em',
+        null=True,
+        blank=True,
+        help_text='Data e hora de inicio da execucao'
+    )
+    completed_at = models.DateTimeField(
+        'concluido em',
+        null=True,
+        blank=True,
+        help_text='Data e hora de conclusao da execucao'
+    )
+    execution_created_at = models.DateTimeField(
+        'execucao criada em',
+        help_text='Data de criacao do registro original da execucao'
+    )
+    archive_path = models.CharField(
+        'arquivo',
+        max_length=500,
+        help_text='Arquivo do arquivo morto, relativo ao diretorio de arquivamento'
+    )
+    row_index = models.PositiveIntegerField(
+        'posicao no arquivo',
+        help_text='Posicao da linha dentro do arquivo'
+    )
+
+    class Meta:
+        verbose_name = 'Execucao Arquivada'
+        verbose_name_plural = 'Execucoes Arquivadas'
+        ordering = ['-execution_created_at']
+        db_table = 'tasks_execution_archive'
+        indexes = [
+            models.Index(fields=['organization', 'execution_created_at']),
+            models.Index(fields=['task', 'execution_created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.task_title} - Exec #{self.attempt_number} - {self.get_status_display()} (arquivada)'
+
+    def rehydrate(self):
+        """
+        Read the full execution back from the archive.
+
+        Returns:
+            TaskExecution: An unsaved instance with all archived fields.
+        """
+        from apps.tasks_app.archive import read_archived_execution
+
+        return read_archived_execution(self)
@@ -0,0 +1,326 @@
+"""
+Critical path and ETA planning for problems.
+
+This module computes, for each problem, the critical path through the task
+dependency DAG, the slack of every task and a live ETA. Durations come from
+``estimated_hours`` corrected by the historical actual/estimated ratio of
+the organization per ``task_type``.
+
+Results are cached in two layers:
+
+- the graph snapshot (topological order, dependencies, durations) only
+  changes when tasks, estimates or dependencies change;
+- the plan (ETA, remaining work) is dropped on every task status change
+  and recomputed from the cached snapshot plus a single status query.
+
+The per-organization ratios feed the durations of every snapshot of the
+organization, so they are dropped together with those snapshots whenever
+a task enters or leaves the 'completed' status.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Avg, F, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from apps.problems.models import Problem
+from apps.tasks_app.graph import DependencyGraph
+from apps.tasks_app.models import Task
+
+
+logger = logging.getLogger(__name__)
+
+GRAPH_CACHE_KEY = 'tasks:plan:graph:{problem_id}'
+PLAN_CACHE_KEY = 'tasks:plan:{problem_id}'
+RATIOS_CACHE_KEY = 'tasks:plan:ratios:{organization_id}'
+
+# Ratios are clamped to avoid a single outlier distorting every estimate
+MIN_RATIO = 0.1
+MAX_RATIO = 10.0
+
+DONE_STATUSES = ['completed', 'skipped']
+ACTIVE_STATUSES = ['in_progress', 'testing']
+
+
+def get_type_ratios(organization_id):
+    """
+    Return the historical actual/estimated hours ratio per task type.
+
+    Args:
+        organization_id: Primary key of the Organization.
+
+    Returns:
+        dict: Mapping of ``task_type`` to ratio (missing types mean 1.0).
+    """
+    key = RATIOS_CACHE_KEY.format(organization_id=organization_id)
+    ratios = cache.get(key)
+    if ratios is not None:
+        return ratios
+
+    rows = Task.objects.filter(
+        problem__organization_id=organization_id,
+        status='completed',
+        estimated_hours__gt=0,
+        actual_hours__isnull=False,
+    ).values('task_type').annotate(
+        ratio=Avg(
+            Cast(F('actual_hours'), FloatField()) / Cast(F('estimated_hours'), FloatField())
+        )
+    )
+    ratios = {
+        row['task_type']: min(max(row['ratio'], MIN_RATIO), MAX_RATIO)
+        for row in rows
+        if row['ratio'] is not None
+    }
+    cache.set(key, ratios, settings.TASK_PLANNING_RATIOS_CACHE_TIMEOUT)
+    return ratios
+
+
+def build_graph_snapshot(problem):
+    """
+    Build the cacheable structural part of a problem plan.
+
+    Args:
+        problem: The Problem instance.
+
+    Returns:
+        dict: ``order`` (task IDs in topological order), ``dependencies``
+        (task ID to list of dependency IDs) and ``durations`` (task ID to
+        adjusted duration in hours). IDs are strings.
+
+    Raises:
+        ValidationError: If the dependencies of the problem form a cycle.
+    """
+    graph = DependencyGraph.for_problem(problem)
+    try:
+        order = graph.topological_order()
+    except ValueError as exc:
+        logger.warning(f'Cannot plan problem {problem.pk}: {exc}')
+        raise ValidationError(
+            'As dependencias das tarefas formam um ciclo; nao e possivel planejar o problema.'
+        ) from exc
+
+    ratios = get_type_ratios(problem.organization_id)
+    default_hours = float(settings.TASK_PLANNING_DEFAULT_HOURS)
+
+    durations = {}
+    for task_id, estimated_hours, task_type in Task.objects.filter(
+        problem=problem
+    ).values_list('id', 'estimated_hours', 'task_type'):
+        hours = float(estimated_hours) if estimated_hours is not None else default_hours
+        durations[str(task_id)] = hours * ratios.get(task_type, 1.0)
+
+    return {
+        'order': [str(task_id) for task_id in order],
+        'dependencies': {
+            str(task_id): [str(dependency_id) for dependency_id in dependency_ids]
+            for task_id, dependency_ids in graph.dependencies.items()
+            if dependency_ids
+        },
+        'durations': durations,
+    }
+
+
+def get_graph_snapshot(problem):
+    """Return the cached graph snapshot of a problem, building it if needed."""
+    key = GRAPH_CACHE_KEY.format(problem_id=problem.pk)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_graph_snapshot(problem)
+        cache.set(key, snapshot, settings.TASK_PLANNING_CACHE_TIMEOUT)
+    return snapshot
+
+
+def _forward_pass(order, dependencies, durations):
+    """Compute earliest start/finish for every task."""
+    earliest_start = {}
+    earliest_finish = {}
+    for task_id in order:
+        start = max(
+            (earliest_finish[dep_id] for dep_id in dependencies.get(task_id, ())),
+            default=0.0,
+        )
+        earliest_start[task_id] = start
+        earliest_finish[task_id] = start + durations.get(task_id, 0.0)
+    return earliest_start, earliest_finish
+
+
+def compute_critical_path(order, dependencies, durations):
+    """
+    Compute the critical path of a DAG.
+
+    Args:
+        order: Task IDs in topological order.
+        dependencies: Mapping of task ID to its dependency IDs.
+        durations: Mapping of task ID to duration in hours.
+
+    Returns:
+        dict: ``length`` (hours), ``path`` (task IDs, first to last) and
+        ``tasks`` (per task ``earliest_start``, ``earliest_finish``,
+        ``latest_start``, ``latest_finish`` and ``slack``).
+    """
+    earliest_start, earliest_finish = _forward_pass(order, dependencies, durations)
+    length = max(earliest_finish.values(), default=0.0)
+
+    dependents = {}
+    for task_id, dependency_ids in dependencies.items():
+        for dependency_id in dependency_ids:
+            dependents.setdefault(dependency_id, []).append(task_id)
+
+    latest_start = {}
+    latest_finish = {}
+    for task_id in reversed(order):
+        finish = min(
+            (latest_start[child_id] for child_id in dependents.get(task_id, ())),
+            default=length,
+        )
+        latest_finish[task_id] = finish
+        latest_start[task_id] = finish - durations.get(task_id, 0.0)
+
+    path = []
+    if order:
+        current = max(order, key=lambda task_id: earliest_finish[task_id])
+        while current is not None:
+            path.append(current)
+            current = max(
+                dependencies.get(current, ()),
+                key=lambda task_id: earliest_finish[task_id],
+                default=None,
+            )
+        path.reverse()
+
+    tasks = {
+        task_id: {
+            'earliest_start': round(earliest_start[task_id], 2),
+            'earliest_finish': round(earliest_finish[task_id], 2),
+            'latest_start': round(latest_start[task_id], 2),
+            'latest_finish': round(latest_finish[task_id], 2),
+            'slack': round(max(latest_start[task_id] - earliest_start[task_id], 0.0), 2),
+        }
+        for task_id in order
+    }
+    return {'length': round(length, 2), 'path': path, 'tasks': tasks}
+
+
+def compute_problem_plan(problem, snapshot=None, now=None):
+    """
+    Compute the critical path, slack and live ETA of a problem.
+
+    Args:
+        problem: The Problem instance.
+        snapshot: Optional graph snapshot (see ``build_graph_snapshot``).
+        now: Optional reference time (defaults to ``timezone.now()``).
+
+    Returns:
+        dict: The plan, safe to store in the cache.
+    """
+    snapshot = snapshot or get_graph_snapshot(problem)
+    now = now or timezone.now()
+    durations = snapshot['durations']
+
+    remaining = {}
+    done = 0
+    for task_id, status, started_at in Task.objects.filter(
+        problem=problem
+    ).values_list('id', 'status', 'started_at'):
+        task_id = str(task_id)
+        duration = durations.get(task_id, 0.0)
+        if status in DONE_STATUSES:
+            remaining[task_id] = 0.0
+            done += 1
+        elif status in ACTIVE_STATUSES and started_at:
+            elapsed = (now - started_at).total_seconds() / 3600
+            remaining[task_id] = max(duration - elapsed, 0.0)
+        else:
+            remaining[task_id] = duration
+
+    full = compute_critical_path(snapshot['order'], snapshot['dependencies'], durations)
+    live = compute_critical_path(snapshot['order'], snapshot['dependencies'], remaining)
+
+    total_hours = sum(durations.values())
+    remaining_hours = sum(remaining.values())
+    progress = 100 if not total_hours else round(
+        100 * (total_hours - remaining_hours) / total_hours
+    )
+
+    return {
+        'problem_id': str(problem.pk),
+        'computed_at': now.isoformat(),
+        'critical_path': full['path'],
+        'critical_path_hours': full['length'],
+        'remaining_critical_path': live['path'],
+        'remaining_hours': round(remaining_hours, 2),
+        'eta': (now + timedelta(hours=live['length'])).isoformat(),
+        'tasks_done': done,
+        'tasks_total': len(snapshot['order']),
+        'progress_percentage': progress,
+        'tasks': {
+            task_id: {
+                **values,
+                'duration_hours': round(durations.get(task_id, 0.0), 2),
+                'remaining_hours': round(remaining.get(task_id, 0.0), 2),
+            }
+            for task_id, values in full['tasks'].items()
+        },
+    }
+
+
+def get_problem_plan(problem):
+    """
+    Return the cached plan of a problem, computing it if needed.
+
+    Args:
+        problem: The Problem instance.
+
+    Returns:
+        dict: The plan (see ``compute_problem_plan``).
+    """
+    key = PLAN_CACHE_KEY.format(problem_id=problem.pk)
+    plan = cache.get(key)
+    if plan is None:
+        plan = compute_problem_plan(problem)
+        cache.set(key, plan, settings.TASK_PLANNING_CACHE_TIMEOUT)
+    return plan
+
+
+def invalidate_problem_plan(problem_id, structure=False):
+    """
+    Drop the cached plan of a problem.
+
+    Args:
+        problem_id: Primary key of the Problem.
+        structure: Also drop the graph snapshot (tasks, estimates or
+            dependencies changed, not only a status).
+    """
+    keys = [PLAN_CACHE_KEY.format(problem_id=problem_id)]
+    if structure:
+        keys.append(GRAPH_CACHE_KEY.format(problem_id=problem_id))
+    cache.delete_many(keys)
+
+
+def invalidate_type_ratios(problem_ids):
+    """
+    Drop the cached ratios of the organizations owning some problems.
+
+    The graph snapshots of every problem of those organizations are
+    dropped too, since their durations were computed from the ratios.
+
+    Args:
+        problem_ids: Primary keys of Problems whose tasks completed (or
+            stopped being completed).
+    """
+    rows = Problem.objects.filter(
+        organization__problems__pk__in=list(problem_ids)
+    ).values_list('pk', 'organization_id').distinct()
+
+    keys = set()
+    for problem_id, organization_id in rows:
+        keys.add(RATIOS_CACHE_KEY.format(organization_id=organization_id))
+        keys.add(GRAPH_CACHE_KEY.format(problem_id=problem_id))
+        keys.add(PLAN_CACHE_KEY.format(problem_id=problem_id))
+    if keys:
+        cache.delete_many(list(keys))
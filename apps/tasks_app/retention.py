@@ -0,0 +1,232 @@
+"""
+Retention of finished task executions.
+
+Terminal TaskExecution rows older than the retention window of their
+organization are removed in keyset-paginated batches of bounded size,
+each in its own short transaction. After every batch the position is
+stored in a RetentionCheckpoint, so a killed run resumes where it stopped.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+
+from apps.organizations.models import Organization
+from apps.tasks_app.models import RetentionCheckpoint, TaskExecution, TaskExecutionLogChunk
+
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ['completed', 'failed', 'cancelled', 'timeout']
+
+LOCK_KEY = 'tasks:retention:lock:{job}'
+
+
+class ExecutionRetentionJob:
+    """
+    Removes terminal executions older than each organization's window.
+
+    Attributes:
+        job: Name used for checkpoints and the run lock
+        batch_size: Maximum number of executions removed per transaction
+        pause: Seconds to sleep between batches (eases replication lag)
+    """
+
+    job = 'delete_executions'
+
+    def __init__(self, batch_size=None, pause=None):
+        self.batch_size = batch_size or settings.TASK_EXECUTION_RETENTION_BATCH_SIZE
+        self.pause = pause if pause is not None else settings.TASK_EXECUTION_RETENTION_PAUSE
+
+    def retention_days(self, organization):
+        """Return the retention window (days) of an organization."""
+        return organization.execution_retention_days or settings.TASK_EXECUTION_RETENTION_DAYS
+
+    def run(self, organizations=None):
+        """
+        Run the job for the given organizations (all by default).
+
+        Only one run per job is active at a time; a concurrent call
+        returns immediately.
+
+        Args:
+            organizations: Optional iterable of Organization instances.
+
+        Returns:
+            dict: ``rows`` and ``bytes`` reclaimed in total and per
+            organization (``organizations``), or ``skipped`` if another run
+            holds the lock.
+        """
+        lock_key = LOCK_KEY.format(job=self.job)
+        if not cache.add(lock_key, timezone.now().isoformat(), settings.TASK_EXECUTION_RETENTION_LOCK_TIMEOUT):
+            logger.info(f'Retention job {self.job} already running, skipping')
+            return {'skipped': True}
+
+        report = {'rows': 0, 'bytes': 0, 'organizations': {}}
+        try:
+            if organizations is None:
+                organizations = Organization.objects.all()
+            for organization in organizations:
+                checkpoint = self.process_organization(organization)
+                report['rows'] += checkpoint.rows_reclaimed
+                report['bytes'] += checkpoint.bytes_reclaimed
+                report['organizations'][str(organization.pk)] = {
+                    'rows': checkpoint.rows_reclaimed,
+                    'bytes': checkpoint.bytes_reclaimed,
+                }
+        finally:
+            cache.delete(lock_key)
+
+        logger.info(
+            f"Retention job {self.job} reclaimed {report['rows']} execution(s), "
+            f"~{report['bytes']} bytes"
+        )
+        return report
+
+    def get_checkpoint(self, organization):
+        """
+        Return the checkpoint to continue from, starting a new run if needed.
+
+        An unfinished checkpoint is resumed with its original cutoff; a
+        finished one is reset for a new run.
+        """
+        now = timezone.now()
+        cutoff = now - timedelta(days=self.retention_days(organization))
+        checkpoint, created = RetentionCheckpoint.objects.get_or_create(
+            job=self.job,
+            organization=organization,
+            defaults={'cutoff': cutoff, 'started_at': now},
+        )
+        if not created and not checkpoint.is_running:
+            checkpoint.cutoff = cutoff
+            checkpoint.cursor_created_at = None
+            checkpoint.cursor_id = None
+            checkpoint.rows_reclaimed = 0
+            checkpoint.bytes_reclaimed = 0
+            checkpoint.started_at = now
+            checkpoint.finished_at = None
+            checkpoint.save()
+        elif not created:
+            logger.info(
+                f'Resuming retention job {self.job} for organization {organization.pk} '
+                f'after {checkpoint.rows_reclaimed} row(s)'
+            )
+        return checkpoint
+
+    def eligible(self, organization, checkpoint):
+        """Return the eligible executions after the checkpoint cursor."""
+        queryset = TaskExecution.objects.filter(
+            task__problem__organization=organization,
+            status__in=TERMINAL_STATUSES,
+            created_at__lt=checkpoint.cutoff,
+        )
+        if checkpoint.cursor_created_at is not None:
+            queryset = queryset.filter(
+                Q(created_at__gt=checkpoint.cursor_created_at)
+                | Q(created_at=checkpoint.cursor_created_at, id__gt=checkpoint.cursor_id)
+            )
+        return queryset.order_by('created_at', 'id')
+
+    def process_organization(self, organization):
+        """
+        Process all eligible executions of an organization.
+
+        Returns:
+            RetentionCheckpoint: The finished checkpoint with the totals.
+        """
+        checkpoint = self.get_checkpoint(organization)
+
+        while True:
+            batch = list(
+                self.eligible(organization, checkpoint).values_list(
+                    'id', 'created_at'
+                )[:self.batch_size]
+            )
+            if not batch:
+                break
+
+            ids = [execution_id for execution_id, _ in batch]
+            size = measure_executions(ids)
+            try:
+                with transaction.atomic():
+                    self.process_batch(organization, ids)
+                    checkpoint.cursor_id, checkpoint.cursor_created_at = batch[-1]
+                    checkpoint.rows_reclaimed += len(ids)
+                    checkpoint.bytes_reclaimed += size
+                    checkpoint.save(update_fields=[
+                        'cursor_id', 'cursor_created_at', 'rows_reclaimed',
+                        'bytes_reclaimed', 'updated_at',
+                    ])
+            except Exception:
+                self.rollback_batch(organization, ids)
+                raise
+
+            if len(batch) < self.batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        checkpoint.finished_at = timezone.now()
+        checkpoint.save(update_fields=['finished_at', 'updated_at'])
+        return checkpoint
+
+    def process_batch(self, organization, ids):
+        """
+        Remove one batch of executions (runs inside a transaction).
+
+        Args:
+            organization: The Organization being processed.
+            ids: Primary keys of the executions in the batch.
+        """
+        delete_executions(ids)
+
+    def rollback_batch(self, organization, ids):
+        """
+        Undo the side effects of a batch whose transaction rolled back.
+
+        Args:
+            organization: The Organization being processed.
+            ids: Primary keys of the executions in the batch.
+        """
+
+
+def measure_executions(ids):
+    """
+    Return the approximate text size of executions and their log chunks.
+
+    Args:
+        ids: Primary keys of the executions.
+
+    Returns:
+        int: Sum of the lengths of logs, output, error messages and chunks.
+    """
+    rows = TaskExecution.objects.filter(pk__in=ids).aggregate(
+        size=Coalesce(
+            Sum(Length('logs') + Length('output') + Length('error_message')), 0
+        )
+    )
+    chunks = TaskExecutionLogChunk.objects.filter(execution_id__in=ids).aggregate(
+        size=Coalesce(Sum(Length('content')), 0)
+    )
+    return rows['size'] + chunks['size']
+
+
+def delete_executions(ids):
+    """
+    Delete executions and their log chunks without loading their content.
+
+    Args:
+        ids: Primary keys of the executions.
+
+    Returns:
+        int: Number of executions deleted.
+    """
+    TaskExecutionLogChunk.objects.filter(execution_id__in=ids).delete()
+    deleted, _ = TaskExecution.objects.filter(pk__in=ids).only('pk').delete()
+    return deleted
@@ -0,0 +1,309 @@
+"""
+Parallel DAG scheduler for task execution.
+
+The scheduler takes a problem in ``executing`` status and dispatches every
+task whose dependencies are completed as its own Celery job, respecting a
+per-problem and a per-organization concurrency cap. Each completion
+triggers a new scheduling round, so dependents are released as soon as
+their last dependency finishes and the total run time follows the
+critical path of the dependency graph instead of the sum of all tasks.
+Jobs are published to the queue of their agent type with the broker
+priority of the task or problem, whichever is more urgent (see
+apps.common.routing).
+
+A task runs at most once at a time. Its pending or running execution
+holds the dispatch lease of the task, which is checked with the task row
+locked. The lease ends when the execution finishes. It also ends when
+the heartbeat reaper times out a lost running execution (see
+apps.tasks_app.heartbeat), or after ``TASK_DISPATCH_LEASE_SECONDS`` for
+an execution whose job never started.
+
+Nothing is dispatched while ``TASK_EXECUTION_RUNNER`` is not configured:
+the tasks stay pending instead of failing one by one.
+"""
+import logging
+import uuid
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.common.routing import agent_route
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+from apps.tasks_app.graph import DependencyGraph
+from apps.tasks_app.models import Task, TaskExecution
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_task_runner():
+    """
+    Return the callable configured in ``TASK_EXECUTION_RUNNER``.
+
+    Raises:
+        ImproperlyConfigured: If no runner is configured or it cannot be imported.
+    """
+    if not settings.TASK_EXECUTION_RUNNER:
+        raise ImproperlyConfigured(
+            'Nenhum executor de tarefas configurado (TASK_EXECUTION_RUNNER).'
+        )
+    try:
+        return import_string(settings.TASK_EXECUTION_RUNNER)
+    except ImportError as exc:
+        raise ImproperlyConfigured(
+            f'Executor de tarefas invalido (TASK_EXECUTION_RUNNER): {exc}'
+        ) from exc
+
+
+class TaskScheduler:
+    """
+    Dispatches runnable tasks of a problem with bounded concurrency.
+
+    Attributes:
+        problem: The Problem whose tasks are scheduled
+        max_per_problem: Maximum concurrent tasks for the problem
+        max_per_organization: Maximum concurrent tasks for the organization
+        agent_type: Agent type recorded on created executions
+    """
+
+    ACTIVE_STATUSES = ('in_progress', 'testing')
+
+    def __init__(self, problem, max_per_problem=None, max_per_organization=None,
+                 agent_type='code_writer'):
+        self.problem = problem
+        self.max_per_problem = (
+            max_per_problem
+            if max_per_problem is not None
+            else settings.TASK_SCHEDULER_MAX_CONCURRENCY_PER_PROBLEM
+        )
+        self.max_per_organization = (
+            max_per_organization
+            if max_per_organization is not None
+            else settings.TASK_SCHEDULER_MAX_CONCURRENCY_PER_ORGANIZATION
+        )
+        self.agent_type = agent_type
+
+    def plan(self):
+        """
+        Compute the topological waves of the problem.
+
+        Returns:
+            list: List of waves, each a list of task IDs that can run
+            concurrently once the previous waves are done.
+        """
+        return DependencyGraph.for_problem(self.problem).waves()
+
+    def available_slots(self):
+        """
+        Number of tasks that can still be started without exceeding a cap.
+
+        Returns:
+            int: Free slots (0 if either cap is reached).
+        """
+        problem_active = Task.objects.filter(
+            problem=self.problem,
+            status__in=self.ACTIVE_STATUSES,
+        ).count()
+        organization_active = Task.objects.filter(
+            problem__organization_id=self.problem.organization_id,
+            status__in=self.ACTIVE_STATUSES,
+        ).count()
+        return max(0, min(
+            self.max_per_problem - problem_active,
+            self.max_per_organization - organization_active,
+        ))
+
+    def dispatch_ready(self):
+        """
+        Start every runnable task that fits in the concurrency caps.
+
+        Scheduling rounds are serialized per organization by locking the
+        organization row, so concurrent completions cannot overshoot the
+        caps. Celery jobs are only published after the transaction commits.
+
+        Returns:
+            list: The TaskExecution instances that were dispatched.
+        """
+        if self.problem.status != 'executing':
+            logger.debug(
+                f"Problem '{self.problem.title}' (id={self.problem.pk}) is not "
+                f"executing, nothing to schedule"
+            )
+            return []
+        try:
+            get_task_runner()
+        except ImproperlyConfigured as exc:
+            # Dispatching would only fail every task; leave them pending
+            logger.error(f"Not scheduling problem '{self.problem.title}' (id={self.problem.pk}): {exc}")
+            return []
+
+        dispatched = []
+        with transaction.atomic():
+            Organization.objects.select_for_update().only('pk').get(
+                pk=self.problem.organization_id
+            )
+
+            slots = self.available_slots()
+            if slots == 0:
+                return []
+
+            # Tasks reset while an execution is still active keep waiting for
+            # it; they are excluded before the limit so they cannot hold the
+            # free slots back from lower priority tasks
+            priorities = dict(
+                Task.objects.runnable_for(self.problem).exclude(
+                    Exists(active_leases().filter(task_id=OuterRef('pk')))
+                ).values_list('pk', 'priority')[:slots]
+            )
+            # Expired leases are released; the recheck covers tasks leased
+            # by dispatch_task since the query
+            leased, expired = split_leases(priorities)
+            release_expired_leases(expired)
+            runnable = [task_id for task_id in priorities if task_id not in leased]
+            if not runnable:
+                return []
+
+            # One UPDATE for all tasks, one INSERT for all executions
+            started = set(Task.objects.filter(pk__in=runnable).bulk_transition('start').updated)
+            dispatched = TaskExecution.create_for_tasks(
+                [task_id for task_id in runnable if task_id in started],
+                agent_type=self.agent_type,
+            )
+            for execution in dispatched:
+                route = agent_route(
+                    execution.agent_type, priorities[execution.task_id], self.problem.priority
+                )
+                transaction.on_commit(partial(_enqueue_execution, execution, route))
+
+        if dispatched:
+            logger.info(
+                f"Dispatched {len(dispatched)} task(s) for problem "
+                f"'{self.problem.title}' (id={self.problem.pk})"
+            )
+        return dispatched
+
+
+def lease_cutoff():
+    """Return the creation time before which a pending execution no longer holds a lease."""
+    return timezone.now() - timedelta(seconds=settings.TASK_DISPATCH_LEASE_SECONDS)
+
+
+def active_leases():
+    """Return the executions currently holding the dispatch lease of their task."""
+    return TaskExecution.objects.filter(
+        Q(status='running') | Q(status='pending', created_at__gte=lease_cutoff())
+    )
+
+
+def split_leases(task_ids):
+    """
+    Find the dispatch leases of the given tasks with one query.
+
+    Args:
+        task_ids: Primary keys of the tasks.
+
+    Returns:
+        tuple: The set of task IDs holding a lease, and the IDs of the
+        pending executions whose lease expired.
+    """
+    cutoff = lease_cutoff()
+    leased, expired = set(), []
+    rows = TaskExecution.objects.filter(
+        task_id__in=list(task_ids), status__in=['pending', 'running']
+    ).values_list('pk', 'task_id', 'status', 'created_at')
+    for execution_id, task_id, status, created_at in rows:
+        if status == 'pending' and created_at < cutoff:
+            expired.append(execution_id)
+        else:
+            leased.add(task_id)
+    return leased, expired
+
+
+def release_expired_leases(execution_ids):
+    """Cancel pending executions whose lease expired, so their job cannot run late."""
+    if execution_ids:
+        TaskExecution.objects.filter(pk__in=execution_ids).bulk_transition('cancel')
+        logger.warning(f'Cancelled {len(execution_ids)} execution(s) whose job never started')
+
+
+def dispatch_task(task, agent_type='code_writer', celery_task_id=None):
+    """
+    Dispatch a single task unless it already holds a dispatch lease.
+
+    Idempotent: concurrent calls for the same task create one execution,
+    and calls repeated with the same ``celery_task_id`` return the
+    execution created by the first one.
+
+    Args:
+        task: The Task instance (or its primary key).
+        agent_type: Agent type recorded on the execution.
+        celery_task_id: Optional Celery task ID of the job (generated if
+            omitted).
+
+    Returns:
+        tuple: (TaskExecution, created). If the task already holds a
+        lease, the execution holding it and False.
+
+    Raises:
+        ValidationError: If the task is neither pending nor selected.
+        ImproperlyConfigured: If no task runner is configured.
+    """
+    get_task_runner()
+    task_id = getattr(task, 'pk', task)
+    celery_task_id = celery_task_id or str(uuid.uuid4())
+    with transaction.atomic():
+        task = Task.objects.select_for_update().select_related('problem').get(pk=task_id)
+        existing = TaskExecution.objects.filter(celery_task_id=celery_task_id).first()
+        if existing is not None:
+            return existing, False
+
+        leased, expired = split_leases([task.pk])
+        if leased:
+            execution = task.executions.filter(status__in=['pending', 'running']).exclude(
+                pk__in=expired
+            ).order_by('-attempt_number').first()
+            logger.info(f'Task {task.pk} already has execution {execution.pk}, not dispatching')
+            return execution, False
+        release_expired_leases(expired)
+
+        if not Task.objects.filter(pk=task.pk).bulk_transition('start').updated:
+            raise ValidationError('Somente tarefas pendentes ou selecionadas podem ser iniciadas.')
+        execution = TaskExecution.create_for_task(task, agent_type, celery_task_id)
+        route = agent_route(agent_type, task.priority, task.problem.priority)
+        transaction.on_commit(partial(_enqueue_execution, execution, route))
+
+    logger.info(f"Dispatched task '{task.title}' (id={task.pk}), attempt {execution.attempt_number}")
+    return execution, True
+
+
+def _enqueue_execution(execution, route):
+    """Publish the Celery job that runs an execution to its agent queue."""
+    from apps.tasks_app.tasks import execute_task
+
+    execute_task.apply_async(
+        args=[str(execution.pk)],
+        task_id=execution.celery_task_id,
+        **route,
+    )
+
+
+def schedule_problem(problem):
+    """
+    Run a scheduling round for a problem.
+
+    Args:
+        problem: The Problem instance (or its primary key).
+
+    Returns:
+        list: The TaskExecution instances that were dispatched.
+    """
+    if not isinstance(problem, Problem):
+        problem = Problem.objects.get(pk=problem)
+    return TaskScheduler(problem).dispatch_ready()
@@ -0,0 +1,132 @@
+"""
+Signal handlers for the Tasks app.
+
+This module reacts to model events that affect task scheduling.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.notifications.dispatch import notify_tasks_transitioned
+from apps.problems.models import Problem
+from apps.tasks_app.models import Task, TaskExecution
+from apps.tasks_app.planning import invalidate_problem_plan, invalidate_type_ratios
+from apps.tasks_app.transitions import bulk_transition_applied
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Problem)
+def problem_execution_started(sender, instance, created, **kwargs):
+    """
+    Start scheduling tasks when a Problem enters the 'executing' status.
+
+    Args:
+        sender: The model class (Problem)
+        instance: The Problem instance that was saved
+        created: Boolean indicating if this is a new instance
+        **kwargs: Additional keyword arguments from the signal
+    """
+    if instance.status != 'executing' or not instance.has_changed('status'):
+        return
+
+    from apps.tasks_app.tasks import schedule_problem_tasks
+
+    problem_id = str(instance.pk)
+    logger.info(f"Problem '{instance.title}' (id={problem_id}) started executing")
+    transaction.on_commit(lambda: schedule_problem_tasks.delay(problem_id))
+
+
+@receiver(post_save, sender=Task)
+def task_post_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalidate the cached plan of the task's problem.
+
+    Saves that only touch the status (and timestamps) keep the cached
+    graph snapshot; anything else also drops the snapshot. A task entering
+    or leaving 'completed' also drops the historical ratios of its
+    organization.
+
+    Args:
+        sender: The model class (Task)
+        instance: The Task instance that was saved
+        created: Boolean indicating if this is a new instance
+        update_fields: Fields passed to save(), if any
+        **kwargs: Additional keyword arguments from the signal
+    """
+    status_fields = {
+        'status', 'started_at', 'completed_at', 'updated_at',
+        'error_message', 'commit_sha', 'actual_hours',
+    }
+    structure = created or update_fields is None or not set(update_fields) <= status_fields
+    invalidate_problem_plan(instance.problem_id, structure=structure)
+
+    if 'completed' in (instance.status, instance.old_value('status')) and (
+        instance.has_changed('status') or instance.has_changed('actual_hours')
+    ):
+        invalidate_type_ratios([instance.problem_id])
+
+
+@receiver(post_delete, sender=Task)
+def task_post_delete(sender, instance, **kwargs):
+    """Invalidate the cached plan when a task is deleted."""
+    invalidate_problem_plan(instance.problem_id, structure=True)
+
+
+@receiver(m2m_changed, sender=Task.dependencies.through)
+def task_dependencies_changed(sender, instance, action, **kwargs):
+    """Invalidate the cached plan when task dependencies change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_problem_plan(instance.problem_id, structure=True)
+
+
+@receiver(bulk_transition_applied, sender=Task)
+def tasks_transitioned(sender, transition, result, actor=None, **kwargs):
+    """
+    Invalidate the cached plans (and ratios) of transitioned tasks' problems.
+
+    Transitions applied by a user (admin bulk actions) are also notified,
+    once per problem; automated ones (scheduler, heartbeat reaper) are
+    not, their outcome reaches users through the Problem status.
+    """
+    tasks_by_problem = {}
+    for task_id, problem_id in Task.objects.filter(pk__in=result.updated).values_list('pk', 'problem_id'):
+        tasks_by_problem.setdefault(problem_id, []).append(task_id)
+    for problem_id in tasks_by_problem:
+        invalidate_problem_plan(problem_id, structure=False)
+
+    completed = result.fields.get('status') == 'completed' or any(
+        result.previous.get(pk) == 'completed' for pk in result.updated
+    )
+    if tasks_by_problem and completed:
+        invalidate_type_ratios(tasks_by_problem)
+
+    if actor is not None:
+        new_status = result.fields['status']
+        label = dict(Task.STATUS_CHOICES)[new_status]
+        for problem in Problem.objects.filter(pk__in=tasks_by_problem):
+            task_ids = tasks_by_problem[problem.pk]
+            notify_tasks_transitioned(
+                problem, transition, task_ids, new_status,
+                f'{len(task_ids)} tarefa(s) alterada(s) para {label}', actor=actor,
+            )
+
+
+@receiver(bulk_transition_applied, sender=TaskExecution)
+def executions_transitioned(sender, result, **kwargs):
+    """Flush buffered logs and notify live viewers of transitioned executions."""
+    from apps.tasks_app.logstore import flush_execution_logs
+    from apps.tasks_app.streaming import publish_execution_event
+
+    payload = {
+        field: result.fields[field]
+        for field in ('status', 'completed_at', 'error_message')
+        if field in result.fields
+    }
+    for execution_id in result.updated:
+        flush_execution_logs(execution_id)
+        publish_execution_event(execution_id, 'status', payload)
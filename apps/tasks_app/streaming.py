@@ -0,0 +1,281 @@
+"""
+Live event streaming for task executions.
+
+Writers publish new log chunks and status transitions of a TaskExecution
+to a Redis pub/sub channel. In each ASGI process, ExecutionEventHub keeps
+a single Redis subscription per execution and fans the events out to
+every connected viewer, so the number of viewers does not multiply the
+load on Redis or on the database.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from apps.common.redis_client import get_async_redis, get_redis
+
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled', 'timeout')
+
+# Seconds between keep-alive comments sent to idle connections
+KEEPALIVE_INTERVAL = 15
+
+
+def execution_channel(execution_id):
+    """Return the Redis pub/sub channel of an execution."""
+    return f'tasks:execution:{execution_id}:events'
+
+
+def publish_execution_event(execution_id, event, data):
+    """
+    Publish an execution event once the current transaction commits.
+
+    Publishing is best-effort: a Redis failure is logged and never breaks
+    the caller, viewers catch up from the database on reconnect.
+
+    Args:
+        execution_id: Primary key of the TaskExecution.
+        event: Event name ('log' or 'status').
+        data: JSON-serializable payload.
+    """
+    message = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+    def publish():
+        try:
+            get_redis().publish(execution_channel(execution_id), message)
+        except Exception as exc:
+            logger.warning(f'Failed to publish {event} event for execution {execution_id}: {exc}')
+
+    transaction.on_commit(publish)
+
+
+def format_sse(event, data, event_id=None):
+    """
+    Format a server-sent event.
+
+    Args:
+        event: Event name.
+        data: JSON-serializable payload.
+        event_id: Optional event ID (used by clients to resume).
+
+    Returns:
+        str: The encoded event, terminated by a blank line.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class ExecutionEventHub:
+    """
+    Fans out Redis pub/sub events to the viewers of each execution.
+
+    One reader task per execution holds the only Redis subscription of the
+    process for that execution; it is started by the first viewer and
+    stopped when the last viewer disconnects.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._readers = {}
+        self._ready = {}
+        self._redis = None
+
+    def subscribe(self, execution_id):
+        """
+        Register a viewer and return its event queue.
+
+        Args:
+            execution_id: Primary key of the TaskExecution.
+
+        Returns:
+            asyncio.Queue: Queue receiving ``{'event', 'data'}`` dicts.
+        """
+        key = str(execution_id)
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(key, set()).add(queue)
+        if key not in self._readers:
+            self._ready[key] = asyncio.Event()
+            self._readers[key] = asyncio.create_task(self._read(key))
+        return queue
+
+    async def wait_ready(self, execution_id, timeout=5):
+        """
+        Wait until the Redis subscription of an execution is active.
+
+        Returns:
+            bool: True if the subscription is active, False on timeout.
+        """
+        ready = self._ready.get(str(execution_id))
+        if ready is None:
+            return False
+        try:
+            await asyncio.wait_for(ready.wait(), timeout=timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def unsubscribe(self, execution_id, queue):
+        """Remove a viewer, stopping the reader after the last one leaves."""
+        key = str(execution_id)
+        subscribers = self._subscribers.get(key, set())
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(key, None)
+            self._ready.pop(key, None)
+            reader = self._readers.pop(key, None)
+            if reader is not None:
+                reader.cancel()
+
+    async def _read(self, key):
+        if self._redis is None:
+            self._redis = get_async_redis()
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(execution_channel(key))
+            if key in self._ready:
+                self._ready[key].set()
+            async for message in pubsub.listen():
+                if message.get('type') != 'message':
+                    continue
+                try:
+                    payload = json.loads(message['data'])
+                except (TypeError, ValueError):
+                    continue
+                for queue in list(self._subscribers.get(key, ())):
+                    queue.put_nowait(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f'Event subscription for execution {key} failed: {exc}')
+            for queue in list(self._subscribers.get(key, ())):
+                queue.put_nowait({'event': 'error', 'data': {'message': 'subscription lost'}})
+        finally:
+            # A failed reader must not block the next viewer from starting one
+            if self._readers.get(key) is asyncio.current_task():
+                self._readers.pop(key, None)
+                self._ready.pop(key, None)
+            try:
+                await pubsub.unsubscribe()
+                await pubsub.aclose()
+            except (RedisError, OSError) as exc:
+                logger.warning(f'Failed to close event subscription for execution {key}: {exc}')
+
+
+_hub = None
+
+
+def get_event_hub():
+    """Return the event hub of the current process."""
+    global _hub
+    if _hub is None:
+        _hub = ExecutionEventHub()
+    return _hub
+
+
+def _load_status(execution_id):
+    from apps.tasks_app.models import TaskExecution
+
+    return TaskExecution.objects.filter(pk=execution_id).values_list(
+        'status', flat=True
+    ).first()
+
+
+def _load_legacy_logs(execution_id):
+    from apps.tasks_app.models import TaskExecution
+
+    return TaskExecution.objects.filter(pk=execution_id).values_list(
+        'logs', flat=True
+    ).first() or ''
+
+
+def _load_chunks(execution_id, after_sequence, limit):
+    from apps.tasks_app.logstore import iter_log_chunks
+
+    chunks = []
+    for chunk in iter_log_chunks(execution_id, after_sequence=after_sequence, batch_size=limit):
+        chunks.append(chunk)
+        if len(chunks) >= limit:
+            break
+    return chunks
+
+
+async def stream_execution_events(execution, offset=0, replay_batch=200):
+    """
+    Stream the log lines and status transitions of an execution as SSE.
+
+    The live subscription is active before stored chunks after ``offset``
+    are replayed and the current status is read, so nothing is lost
+    between replay and live events; duplicates are dropped by sequence.
+    The stream ends after a terminal status.
+
+    A stream starting from the beginning first replays the legacy ``logs``
+    column (written before log chunks existed) as a log event with sequence
+    0 and no event ID, so it is never skipped on resume.
+
+    Args:
+        execution: The TaskExecution instance.
+        offset: Last chunk sequence already seen by the client.
+        replay_batch: Number of chunks loaded per replay query.
+
+    Yields:
+        str: Encoded server-sent events.
+    """
+    hub = get_event_hub()
+    queue = hub.subscribe(execution.pk)
+    last_sequence = offset
+    try:
+        if not await hub.wait_ready(execution.pk):
+            logger.warning(f'Live events unavailable for execution {execution.pk}')
+
+        if not offset:
+            legacy_logs = await sync_to_async(_load_legacy_logs)(execution.pk)
+            if legacy_logs:
+                yield format_sse('log', {'sequence': 0, 'content': legacy_logs})
+
+        while True:
+            chunks = await sync_to_async(_load_chunks)(execution.pk, last_sequence, replay_batch)
+            for sequence, content in chunks:
+                last_sequence = sequence
+                yield format_sse('log', {'sequence': sequence, 'content': content}, sequence)
+            if len(chunks) < replay_batch:
+                break
+
+        status = await sync_to_async(_load_status)(execution.pk)
+        yield format_sse('status', {'status': status})
+        if status in TERMINAL_STATUSES:
+            return
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+
+            event = payload.get('event')
+            data = payload.get('data') or {}
+            if event == 'log':
+                sequence = data.get('sequence', 0)
+                if sequence <= last_sequence:
+                    continue
+                last_sequence = sequence
+                yield format_sse('log', data, sequence)
+            elif event == 'status':
+                yield format_sse('status', data)
+                if data.get('status') in TERMINAL_STATUSES:
+                    return
+            elif event == 'error':
+                yield format_sse('error', data)
+                return
+    finally:
+        hub.unsubscribe(execution.pk, queue)
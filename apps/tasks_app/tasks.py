@@ -0,0 +1,176 @@
+"""
+Celery tasks for the tasks_app.
+
+This module contains the background jobs that execute tasks and keep the
+scheduler moving.
+"""
+import logging
+
+from celery import shared_task
+from django.core.exceptions import ValidationError
+
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+from apps.tasks_app.archive import ExecutionArchiveJob
+from apps.tasks_app.heartbeat import execution_heartbeat, reap_stale_executions
+from apps.tasks_app.models import TaskExecution
+from apps.tasks_app.retention import ExecutionRetentionJob
+from apps.tasks_app.scheduler import get_task_runner, schedule_problem
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, ignore_result=True)
+def execute_task(self, execution_id):
+    """
+    Run a single task execution and release its dependents.
+
+    Args:
+        execution_id: Primary key of the TaskExecution to run.
+    """
+    try:
+        execution = TaskExecution.objects.select_related(
+            'task', 'task__problem'
+        ).get(pk=execution_id)
+    except TaskExecution.DoesNotExist:
+        logger.warning(f'TaskExecution {execution_id} not found, skipping')
+        return
+
+    # Jobs are published with the execution's celery_task_id; any other
+    # message for this execution is a duplicate dispatch
+    if self.request.id and execution.celery_task_id and self.request.id != execution.celery_task_id:
+        logger.warning(
+            f'TaskExecution {execution_id} belongs to job {execution.celery_task_id}, '
+            f'skipping duplicate job {self.request.id}'
+        )
+        return
+
+    if execution.status != 'pending':
+        logger.info(
+            f'TaskExecution {execution_id} is {execution.status}, skipping redelivery'
+        )
+        return
+
+    # A configuration error is not a failure of the task: raise it before
+    # the execution starts, so the task stays pending
+    runner = get_task_runner()
+
+    task = execution.task
+    try:
+        execution.start()
+    except ValidationError:
+        # Another delivery of the same job started it first
+        logger.info(f'TaskExecution {execution_id} was already started, skipping redelivery')
+        return
+
+    # A worker lost between start() and the first heartbeat is found by the
+    # reaper's orphan scan
+    with execution_heartbeat(execution.pk):
+        try:
+            output = runner(execution)
+        except Exception as exc:
+            logger.exception(f"Task '{task.title}' (id={task.pk}) failed")
+            if _finish_execution(execution, 'fail', str(exc)):
+                task.mark_failed(str(exc))
+        else:
+            if _finish_execution(execution, 'complete', output or ''):
+                task.mark_completed()
+        finally:
+            schedule_problem_tasks.delay(str(task.problem_id))
+
+
+def _finish_execution(execution, transition, result):
+    """
+    Apply the final transition (``complete`` or ``fail``) of a running execution.
+
+    The reaper may have timed the execution out (and requeued or failed its
+    task) while this worker was unresponsive; the task then belongs to the
+    reaper's decision and must not be touched.
+
+    Returns:
+        bool: False if the execution was no longer running.
+    """
+    try:
+        getattr(execution, transition)(result)
+    except ValidationError:
+        logger.warning(
+            f'TaskExecution {execution.pk} is {execution.status}, '
+            f'discarding the result of its worker'
+        )
+        return False
+    return True
+
+
+@shared_task(ignore_result=True)
+def schedule_problem_tasks(problem_id):
+    """
+    Dispatch the runnable tasks of a problem.
+
+    Args:
+        problem_id: Primary key of the Problem.
+    """
+    try:
+        schedule_problem(problem_id)
+    except Problem.DoesNotExist:
+        logger.warning(f'Problem {problem_id} not found, skipping scheduling')
+
+
+@shared_task(ignore_result=True)
+def schedule_executing_problems():
+    """
+    Run a scheduling round for every problem in ``executing`` status.
+
+    Safety net for missed completion events; completions normally trigger
+    scheduling directly.
+    """
+    for problem in Problem.objects.filter(status='executing').select_related('organization'):
+        schedule_problem(problem)
+
+
+@shared_task(ignore_result=True)
+def reap_stuck_executions():
+    """
+    Time out executions whose worker stopped sending heartbeats.
+
+    Scheduled periodically by CELERY_BEAT_SCHEDULE. Their tasks are
+    requeued with backoff or failed (see apps.tasks_app.heartbeat).
+    """
+    reap_stale_executions()
+
+
+@shared_task
+def cleanup_old_task_executions(organization_id=None):
+    """
+    Remove terminal executions older than the retention window.
+
+    Scheduled daily by CELERY_BEAT_SCHEDULE. Safe to kill: the next run
+    resumes from the stored checkpoint.
+
+    Args:
+        organization_id: Optional Organization primary key to limit the run.
+
+    Returns:
+        dict: Rows and bytes reclaimed (see ExecutionRetentionJob.run).
+    """
+    organizations = None
+    if organization_id:
+        organizations = Organization.objects.filter(pk=organization_id)
+    return ExecutionRetentionJob().run(organizations=organizations)
+
+
+@shared_task
+def archive_old_task_executions(organization_id=None):
+    """
+    Move terminal executions older than the archive window to cold files.
+
+    Args:
+        organization_id: Optional Organization primary key to limit the run.
+
+    Returns:
+        dict: Rows and bytes moved (see ExecutionRetentionJob.run).
+    """
+    organizations = None
+    if organization_id:
+        organizations = Organization.objects.filter(pk=organization_id)
+    return ExecutionArchiveJob().run(organizations=organizations)
@@ -1,3 +1,1388 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.events.models import OutboxEvent
+from apps.organizations.models import Organization
+from apps.problems.models import Problem
+from apps.tasks_app import heartbeat, logstore
+from apps.tasks_app.archive import ExecutionArchiveJob, load_archive_file, staged_path
+from apps.tasks_app.graph import DependencyGraph
+from apps.tasks_app.models import (
+    ArchivedTaskExecution,
+    RetentionCheckpoint,
+    Task,
+    TaskExecution,
+    TaskExecutionLogChunk,
+)
+from apps.tasks_app.planning import (
+    RATIOS_CACHE_KEY,
+    build_graph_snapshot,
+    get_problem_plan,
+    get_type_ratios,
+)
+from apps.tasks_app.retention import LOCK_KEY, ExecutionRetentionJob
+from apps.tasks_app.scheduler import TaskScheduler, dispatch_task
+from apps.tasks_app.streaming import (
+    ExecutionEventHub,
+    publish_execution_event,
+    stream_execution_events,
+)
+from apps.tasks_app.tasks import execute_task
+from apps.tasks_app.transitions import (
+    OUTCOME_INVALID_STATE,
+    OUTCOME_UPDATED,
+    bulk_transition_applied,
+)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+RUNNER = 'apps.tasks_app.tests.echo_runner'
+
+
+def create_problem(slug='acme', organization=None, **fields):
+    organization = organization or Organization.objects.create(name=slug.title(), slug=slug)
+    return Problem.objects.create(organization=organization, title='Problema', description='Descricao', **fields)
+
+
+def echo_runner(execution):
+    return f'executada: {execution.task.title}'
+
+
+def failing_runner(execution):
+    raise RuntimeError('agente falhou')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DependencyGraphTests(TestCase):
+    """Cycle detection and wave planning of the in-memory graph."""
+
+    def graph(self, edges, nodes=None):
+        nodes = nodes or {node: index for index, node in enumerate('abcdef')}
+        return DependencyGraph('problem', nodes=nodes, edges=edges)
+
+    def test_waves_group_independent_tasks(self):
+        # b and c depend on a; d depends on both
+        graph = self.graph([('b', 'a'), ('c', 'a'), ('d', 'b'), ('d', 'c')], {'a': 0, 'b': 2, 'c': 1, 'd': 3})
+
+        self.assertEqual(graph.waves(), [['a'], ['c', 'b'], ['d']])
+        self.assertEqual(graph.topological_order(), ['a', 'c', 'b', 'd'])
+        self.assertFalse(graph.has_cycle())
+
+    def test_find_cycle_returns_closed_path(self):
+        graph = self.graph([('a', 'b'), ('b', 'c'), ('c', 'a'), ('d', 'a')])
+
+        cycle = graph.find_cycle()
+
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assertEqual(set(cycle), {'a', 'b', 'c'})
+        with self.assertRaises(ValueError):
+            graph.waves()
+
+    def test_would_create_cycle(self):
+        graph = self.graph([('b', 'a'), ('c', 'b')])
+
+        self.assertTrue(graph.would_create_cycle('a', 'c'))
+        self.assertFalse(graph.would_create_cycle('c', 'a'))
+
+    def test_validate_edges_rejects_combined_cycle(self):
+        graph = self.graph([])
+
+        # Each edge is valid alone; together they close a cycle
+        with self.assertRaises(ValidationError) as context:
+            graph.validate_edges([('a', 'b'), ('b', 'c'), ('c', 'a'), ('d', 'd')])
+
+        messages = context.exception.message_dict['dependencies']
+        self.assertEqual(len(messages), 2)
+        self.assertFalse(graph.has_path('a', 'b'))
+
+    def test_validate_edges_rejects_other_problem(self):
+        graph = self.graph([])
+
+        with self.assertRaises(ValidationError):
+            graph.validate_edges([('a', 'z')], task_problems={'z': 'other'})
+
+    def test_validate_task_walks_the_dependents_once(self):
+        graph = self.graph([('b', 'a'), ('c', 'b'), ('c', 'd'), ('e', 'c'), ('a', 'e')])
+
+        with (
+            mock.patch.object(DependencyGraph, 'has_path', side_effect=AssertionError),
+            mock.patch.object(DependencyGraph, 'dependents_of', wraps=graph.dependents_of) as dependents_of,
+            self.assertRaises(ValidationError) as context,
+        ):
+            graph.validate_task('c')
+
+        dependents_of.assert_called_once_with('c')
+        self.assertIn('"b"', context.exception.message_dict['dependencies'][0])
+
+    def test_validate_task_accepts_acyclic_dependencies(self):
+        graph = self.graph([('b', 'a'), ('c', 'b'), ('c', 'a'), ('d', 'c')])
+
+        for task_id in 'abcd':
+            graph.validate_task(task_id)
+
+    def test_validate_task_rejects_self_dependency(self):
+        graph = self.graph([('a', 'a')])
+
+        with self.assertRaises(ValidationError):
+            graph.validate_task('a')
+
+    def test_validate_edges_rejects_unknown_tasks(self):
+        graph = self.graph([])
+
+        with self.assertRaises(ValidationError) as context:
+            graph.validate_edges([('a', 'z')])
+
+        self.assertEqual(context.exception.message_dict['dependencies'], ['A tarefa "z" nao existe.'])
+
+    def test_validate_edges_accepts_tasks_of_the_same_problem(self):
+        graph = self.graph([])
+
+        updated = graph.validate_edges([('z', 'a'), ('b', 'z')], task_problems={'z': 'problem'})
+
+        self.assertTrue(updated.has_path('b', 'a'))
+        self.assertFalse(graph.has_path('b', 'a'))
+
+    def test_deep_chain_does_not_recurse(self):
+        size = 5000
+        nodes = {index: index for index in range(size)}
+        graph = DependencyGraph('problem', nodes=nodes, edges=[(index + 1, index) for index in range(size - 1)])
+
+        self.assertTrue(graph.has_path(size - 1, 0))
+        self.assertIsNone(graph.find_cycle())
+        self.assertEqual(len(graph.waves()), size)
+
+    def test_for_problem_loads_graph_in_two_queries(self):
+        problem = create_problem()
+        first = Task.objects.create(problem=problem, title='Primeira', order_index=0)
+        second = Task.objects.create(problem=problem, title='Segunda', order_index=1)
+        second.dependencies.add(first)
+
+        with self.assertNumQueries(2):
+            graph = DependencyGraph.for_problem(problem)
+
+        self.assertEqual(graph.waves(), [[first.pk], [second.pk]])
+
+    def test_dependency_batch_rejects_deleted_tasks(self):
+        problem = create_problem()
+        task = Task.objects.create(problem=problem, title='Tarefa')
+
+        with self.assertRaises(ValidationError):
+            Task.validate_dependency_batch(problem, [(task.pk, uuid.uuid4())])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RunnableTasksTests(TestCase):
+    """The ready queue of a problem."""
+
+    def setUp(self):
+        self.problem = create_problem()
+
+    def create_task(self, title, **fields):
+        return Task.objects.create(problem=self.problem, title=title, **fields)
+
+    def test_tasks_wait_for_their_dependencies(self):
+        first = self.create_task('Primeira')
+        second = self.create_task('Segunda')
+        second.dependencies.add(first)
+
+        self.assertEqual(list(Task.objects.runnable_for(self.problem)), [first])
+
+        Task.objects.filter(pk=first.pk).update(status='completed')
+        self.assertEqual(list(Task.objects.runnable_for(self.problem)), [second])
+
+    def test_orders_by_priority_then_order_index(self):
+        low = self.create_task('Baixa', priority='low', order_index=0)
+        later = self.create_task('Critica depois', priority='critical', order_index=2)
+        first = self.create_task('Critica antes', priority='critical', order_index=1)
+        selected = self.create_task('Selecionada', priority='high', status='selected')
+        self.create_task('Em progresso', status='in_progress')
+
+        with self.assertNumQueries(1):
+            runnable = list(Task.objects.runnable_for(self.problem))
+
+        self.assertEqual(runnable, [first, later, selected, low])
+
+    def test_rolled_back_tasks_wait_for_retry_after(self):
+        held = self.create_task('Em espera', retry_after=timezone.now() + timedelta(minutes=5))
+        due = self.create_task('Liberada', retry_after=timezone.now() - timedelta(seconds=1))
+
+        runnable = list(Task.objects.runnable_for(self.problem))
+
+        self.assertIn(due, runnable)
+        self.assertNotIn(held, runnable)
+
+    def test_excludes_other_problems(self):
+        other = Task.objects.create(problem=create_problem('other'), title='Outra')
+
+        self.assertNotIn(other, Task.objects.runnable_for(self.problem))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_EXECUTION_RUNNER=RUNNER)
+class SchedulerTests(TestCase):
+    """Concurrency caps and dispatch leases of the DAG scheduler."""
+
+    def setUp(self):
+        self.problem = create_problem(status='executing')
+
+    def create_tasks(self, count, problem=None, **fields):
+        return [
+            Task.objects.create(problem=problem or self.problem, title=f'Tarefa {index}', order_index=index, **fields)
+            for index in range(count)
+        ]
+
+    def dispatched_task_ids(self, **options):
+        return [execution.task_id for execution in TaskScheduler(self.problem, **options).dispatch_ready()]
+
+    def test_problem_cap(self):
+        tasks = self.create_tasks(5)
+
+        self.assertEqual(self.dispatched_task_ids(max_per_problem=2), [tasks[0].pk, tasks[1].pk])
+        # Both slots are taken until a task finishes
+        self.assertEqual(self.dispatched_task_ids(max_per_problem=2), [])
+
+        Task.objects.filter(pk=tasks[0].pk).update(status='completed')
+        self.assertEqual(self.dispatched_task_ids(max_per_problem=2), [tasks[2].pk])
+        self.assertEqual(Task.objects.filter(status='in_progress').count(), 2)
+
+    def test_organization_cap_counts_other_problems(self):
+        other = create_problem(organization=self.problem.organization, status='executing')
+        self.create_tasks(2, problem=other, status='in_progress')
+        tasks = self.create_tasks(3)
+
+        self.assertEqual(self.dispatched_task_ids(max_per_organization=3), [tasks[0].pk])
+
+    def test_dependents_wait_for_their_dependencies(self):
+        first, second = self.create_tasks(2)
+        second.dependencies.add(first)
+
+        self.assertEqual(self.dispatched_task_ids(), [first.pk])
+        self.assertEqual(self.dispatched_task_ids(), [])
+
+    def test_leased_tasks_do_not_hold_free_slots(self):
+        leased = self.create_tasks(2, priority='critical')
+        for task in leased:
+            # Reset while the execution of the previous attempt still runs
+            TaskExecution.objects.create(task=task, status='running', attempt_number=1)
+        waiting = Task.objects.create(problem=self.problem, title='Baixa', priority='low')
+
+        self.assertEqual(self.dispatched_task_ids(max_per_problem=1), [waiting.pk])
+        self.assertFalse(TaskExecution.objects.filter(task__in=leased, status='pending').exists())
+
+    def test_expired_lease_is_released(self):
+        task = self.create_tasks(1)[0]
+        lost = TaskExecution.objects.create(task=task, status='pending', attempt_number=1)
+        TaskExecution.objects.filter(pk=lost.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(self.dispatched_task_ids(), [task.pk])
+
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, 'cancelled')
+        self.assertEqual(task.executions.get(status='pending').attempt_number, 2)
+
+    def test_jobs_are_published_after_commit(self):
+        task = self.create_tasks(1, priority='critical')[0]
+
+        with (
+            mock.patch('apps.events.tasks.relay_outbox_events.delay'),
+            mock.patch('apps.tasks_app.tasks.execute_task.apply_async') as apply_async,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            executions = TaskScheduler(self.problem).dispatch_ready()
+            apply_async.assert_not_called()
+
+        execution = executions[0]
+        self.assertEqual(execution.task_id, task.pk)
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['args'], [str(execution.pk)])
+        self.assertEqual(apply_async.call_args.kwargs['task_id'], execution.celery_task_id)
+
+    def test_only_executing_problems_are_scheduled(self):
+        self.create_tasks(1)
+        Problem.objects.filter(pk=self.problem.pk).update(status='task_selection')
+        self.problem.refresh_from_db()
+
+        self.assertEqual(self.dispatched_task_ids(), [])
+
+    @override_settings(TASK_EXECUTION_RUNNER='')
+    def test_missing_runner_leaves_tasks_pending(self):
+        task = self.create_tasks(1)[0]
+
+        self.assertEqual(self.dispatched_task_ids(), [])
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+        self.assertFalse(task.executions.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_EXECUTION_RUNNER=RUNNER, TASK_DISPATCH_LEASE_SECONDS=3600)
+class DispatchTaskTests(TestCase):
+    """dispatch_task creates one execution per lease and per Celery job id."""
+
+    def setUp(self):
+        self.problem = create_problem(status='executing')
+        self.task = Task.objects.create(problem=self.problem, title='Tarefa')
+        self.enterContext(mock.patch('apps.events.tasks.relay_outbox_events.delay'))
+        self.enterContext(mock.patch('apps.tasks_app.streaming.get_redis'))
+        self.apply_async = self.enterContext(mock.patch('apps.tasks_app.tasks.execute_task.apply_async'))
+
+    def dispatch(self, task=None, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return dispatch_task(task or self.task, **kwargs)
+
+    def test_dispatch_starts_the_task_and_publishes_one_job(self):
+        execution, created = self.dispatch(celery_task_id='job-1')
+
+        self.assertTrue(created)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'in_progress')
+        self.assertEqual((execution.status, execution.celery_task_id), ('pending', 'job-1'))
+        self.apply_async.assert_called_once()
+        self.assertEqual(self.apply_async.call_args.kwargs['task_id'], 'job-1')
+
+    def test_repeated_job_id_returns_the_first_execution(self):
+        first, _ = self.dispatch(celery_task_id='job-1')
+
+        again, created = self.dispatch(self.task.pk, celery_task_id='job-1')
+
+        self.assertFalse(created)
+        self.assertEqual(again, first)
+        self.assertEqual(self.task.executions.count(), 1)
+        self.apply_async.assert_called_once()
+
+    def test_task_holding_a_lease_is_not_dispatched_again(self):
+        first, _ = self.dispatch()
+
+        second, created = self.dispatch()
+
+        self.assertFalse(created)
+        self.assertEqual(second, first)
+        self.assertEqual(self.task.executions.count(), 1)
+
+    def test_running_execution_holds_the_lease_after_a_reset(self):
+        running = TaskExecution.objects.create(task=self.task, status='running', attempt_number=1)
+
+        execution, created = self.dispatch()
+
+        self.assertEqual((execution, created), (running, False))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'pending')
+
+    def test_expired_lease_is_released_and_the_task_dispatched(self):
+        lost = TaskExecution.objects.create(task=self.task, status='pending', attempt_number=1)
+        TaskExecution.objects.filter(pk=lost.pk).update(created_at=timezone.now() - timedelta(hours=2))
+
+        execution, created = self.dispatch()
+
+        self.assertTrue(created)
+        self.assertEqual(execution.attempt_number, 2)
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, 'cancelled')
+
+    def test_only_pending_or_selected_tasks_are_dispatched(self):
+        Task.objects.filter(pk=self.task.pk).update(status='completed')
+
+        with self.assertRaises(ValidationError):
+            self.dispatch()
+        self.assertFalse(self.task.executions.exists())
+
+    @override_settings(TASK_EXECUTION_RUNNER='')
+    def test_missing_runner(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.dispatch()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'pending')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_EXECUTION_RUNNER=RUNNER)
+class ExecuteTaskTests(TestCase):
+    """The Celery job running an execution, including redeliveries."""
+
+    def setUp(self):
+        problem = create_problem(status='executing')
+        self.task = Task.objects.create(problem=problem, title='Tarefa', status='in_progress')
+        self.execution = TaskExecution.objects.create(
+            task=self.task, status='pending', attempt_number=1, celery_task_id='job-1'
+        )
+        self.enterContext(mock.patch(
+            'apps.tasks_app.tasks.execution_heartbeat', side_effect=lambda execution_id: nullcontext()
+        ))
+        self.schedule = self.enterContext(mock.patch('apps.tasks_app.tasks.schedule_problem_tasks.delay'))
+
+    def run_job(self, task_id='job-1'):
+        execute_task.apply(args=[str(self.execution.pk)], task_id=task_id)
+        self.execution.refresh_from_db()
+        self.task.refresh_from_db()
+
+    def test_completes_the_task_and_schedules_the_problem(self):
+        self.run_job()
+
+        self.assertEqual(self.execution.status, 'completed')
+        self.assertEqual(self.execution.output, 'executada: Tarefa')
+        self.assertEqual(self.task.status, 'completed')
+        self.schedule.assert_called_once_with(str(self.task.problem_id))
+
+    @override_settings(TASK_EXECUTION_RUNNER='apps.tasks_app.tests.failing_runner')
+    def test_runner_error_fails_the_task(self):
+        self.run_job()
+
+        self.assertEqual(self.execution.status, 'failed')
+        self.assertEqual(self.task.status, 'failed')
+        self.assertEqual(self.task.error_message, 'agente falhou')
+
+    def test_redelivered_job_is_skipped(self):
+        self.run_job()
+        self.schedule.reset_mock()
+
+        with mock.patch(RUNNER) as runner:
+            self.run_job()
+
+        runner.assert_not_called()
+        self.schedule.assert_not_called()
+        self.assertEqual(self.execution.status, 'completed')
+
+    def test_duplicate_job_is_skipped(self):
+        self.run_job(task_id='job-2')
+
+        self.assertEqual(self.execution.status, 'pending')
+        self.assertEqual(self.task.status, 'in_progress')
+
+    @override_settings(TASK_EXECUTION_RUNNER='')
+    def test_missing_runner_is_not_a_task_failure(self):
+        result = execute_task.apply(args=[str(self.execution.pk)], task_id='job-1')
+
+        self.assertIsInstance(result.result, ImproperlyConfigured)
+        self.execution.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual(self.execution.status, 'pending')
+        self.assertEqual(self.task.status, 'in_progress')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkTransitionTests(TestCase):
+    """Guards of the declared TRANSITIONS."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        self.enterContext(mock.patch('apps.events.tasks.relay_outbox_events.delay'))
+
+    def test_only_rows_in_source_statuses_are_updated(self):
+        pending = Task.objects.create(problem=self.problem, title='Pendente')
+        completed = Task.objects.create(problem=self.problem, title='Concluida', status='completed')
+
+        result = Task.objects.filter(problem=self.problem).bulk_transition('start')
+
+        self.assertEqual(result.outcomes, {pending.pk: OUTCOME_UPDATED, completed.pk: OUTCOME_INVALID_STATE})
+        pending.refresh_from_db()
+        completed.refresh_from_db()
+        self.assertEqual(pending.status, 'in_progress')
+        self.assertIsNotNone(pending.started_at)
+        self.assertEqual(completed.status, 'completed')
+
+    def test_events_and_signal_only_for_updated_rows(self):
+        pending = Task.objects.create(problem=self.problem, title='Pendente')
+        Task.objects.create(problem=self.problem, title='Pulada', status='skipped')
+        received = []
+
+        def receiver(sender, transition, result, **kwargs):
+            received.append((sender, transition, result.updated))
+
+        bulk_transition_applied.connect(receiver)
+        self.addCleanup(bulk_transition_applied.disconnect, receiver)
+        OutboxEvent.objects.all().delete()
+
+        Task.objects.filter(problem=self.problem).bulk_transition('fail', error_message='falhou')
+
+        self.assertEqual(received, [(Task, 'fail', [pending.pk])])
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.aggregate_id, str(pending.pk))
+        self.assertEqual(event.payload['to'], 'failed')
+
+    def test_rollback_clears_start_and_timeout_keeps_finished_executions(self):
+        task = Task.objects.create(problem=self.problem, title='Tarefa', status='in_progress', started_at=timezone.now())
+        running = TaskExecution.objects.create(task=task, status='running', attempt_number=1)
+        finished = TaskExecution.objects.create(task=task, status='completed', attempt_number=2)
+
+        result = TaskExecution.objects.filter(task=task).bulk_transition('timeout')
+        Task.objects.filter(pk=task.pk).bulk_transition('rollback')
+
+        self.assertEqual(result.updated, [running.pk])
+        running.refresh_from_db()
+        finished.refresh_from_db()
+        task.refresh_from_db()
+        self.assertEqual((running.status, finished.status), ('timeout', 'completed'))
+        self.assertEqual(task.status, 'pending')
+        self.assertIsNone(task.started_at)
+
+    def test_unknown_transition(self):
+        with self.assertRaises(ValueError):
+            Task.objects.all().bulk_transition('approve')
+
+    def test_reset_skips_running_tasks(self):
+        running = Task.objects.create(problem=self.problem, title='Rodando', status='in_progress')
+        failed = Task.objects.create(
+            problem=self.problem, title='Falhou', status='failed', error_message='erro', commit_sha='abc'
+        )
+
+        result = Task.objects.filter(problem=self.problem).bulk_transition('reset')
+
+        self.assertEqual(result.outcomes, {running.pk: OUTCOME_INVALID_STATE, failed.pk: OUTCOME_UPDATED})
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.error_message, failed.commit_sha), ('pending', '', ''))
+
+    def test_transitions_by_a_user_are_notified_per_problem(self):
+        user = get_user_model().objects.create_user('operador')
+        other = create_problem('other')
+        first = Task.objects.create(problem=self.problem, title='A')
+        second = Task.objects.create(problem=self.problem, title='B')
+        Task.objects.create(problem=other, title='C', status='completed')
+
+        with (
+            mock.patch('apps.notifications.tasks.fan_out_notification_event.delay') as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            Task.objects.all().bulk_transition('skip', actor=user)
+
+        [(event,), _] = delay.call_args
+        self.assertEqual(event['type'], 'tasks.bulk_transitioned')
+        self.assertEqual(event['problem_id'], str(self.problem.pk))
+        self.assertEqual(set(event['task_ids']), {str(first.pk), str(second.pk)})
+        self.assertEqual((event['new_status'], event['actor_id']), ('skipped', user.pk))
+        self.assertEqual(event['message'], '2 tarefa(s) alterada(s) para Pulado')
+
+    def test_automated_transitions_are_not_notified(self):
+        Task.objects.create(problem=self.problem, title='A')
+
+        with (
+            mock.patch('apps.notifications.tasks.fan_out_notification_event.delay') as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            Task.objects.all().bulk_transition('start')
+
+        delay.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExecutionFinishTests(TestCase):
+    """Final transitions are checked against the stored status."""
+
+    def setUp(self):
+        task = Task.objects.create(problem=create_problem(), title='Tarefa')
+        self.execution = TaskExecution.objects.create(task=task, status='running')
+
+    def test_reaped_execution_cannot_be_finished_by_its_worker(self):
+        # The worker still holds the instance loaded while running
+        TaskExecution.objects.filter(pk=self.execution.pk).bulk_transition('timeout')
+
+        with self.assertRaises(ValidationError):
+            self.execution.fail('erro tardio')
+        with self.assertRaises(ValidationError):
+            self.execution.complete('saida tardia')
+
+        self.execution.refresh_from_db()
+        self.assertEqual(self.execution.status, 'timeout')
+
+    def test_running_execution_fails(self):
+        self.execution.fail('erro')
+
+        self.execution.refresh_from_db()
+        self.assertEqual(self.execution.status, 'failed')
+        self.assertEqual(self.execution.error_message, 'erro')
+
+
+class FakeSortedSets:
+    """In-memory stand-in for the Redis sorted set commands used by the reaper."""
+
+    def __init__(self):
+        self.sets = {}
+
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.sets.get(key, {}).pop(member, None)
+
+    def ordered(self, key):
+        return sorted(self.sets.get(key, {}).items(), key=lambda item: item[1])
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = [member.encode() for member, score in self.ordered(key) if score <= high]
+        return members[start:start + num if num else None]
+
+    def zmscore(self, key, members):
+        return [self.sets.get(key, {}).get(member) for member in members]
+
+    def zrange(self, key, start, end, withscores=False):
+        return [(member.encode(), score) for member, score in self.ordered(key)][start:end + 1]
+
+    def zcard(self, key):
+        return len(self.sets.get(key, {}))
+
+    def zcount(self, key, low, high):
+        return sum(1 for score in self.sets.get(key, {}).values() if score <= high)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    TASK_HEARTBEAT_TIMEOUT=120,
+    TASK_EXECUTION_MAX_ATTEMPTS=3,
+    TASK_EXECUTION_RETRY_BACKOFF=60,
+    TASK_EXECUTION_REQUEUE_ON_TIMEOUT=True,
+)
+class HeartbeatReaperTests(TestCase):
+    """Executions without heartbeat are timed out and their tasks retried or failed."""
+
+    def setUp(self):
+        self.redis = FakeSortedSets()
+        self.enterContext(mock.patch('apps.tasks_app.heartbeat.get_redis', return_value=self.redis))
+        self.enterContext(mock.patch('apps.tasks_app.streaming.get_redis'))
+        self.enterContext(mock.patch('apps.events.tasks.relay_outbox_events.delay'))
+        self.schedule = self.enterContext(mock.patch('apps.tasks_app.tasks.schedule_problem_tasks'))
+        self.problem = create_problem()
+        cache.clear()
+
+    def start_execution(self, attempt_number=1, minutes_ago=10):
+        task = Task.objects.create(problem=self.problem, title=f'Tarefa {attempt_number}', status='in_progress')
+        return TaskExecution.objects.create(
+            task=task,
+            status='running',
+            attempt_number=attempt_number,
+            started_at=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def beat(self, execution, seconds_ago=0):
+        self.redis.zadd(heartbeat.HEARTBEAT_KEY, {str(execution.pk): time.time() - seconds_ago})
+
+    def test_emitter_beats_while_the_block_runs(self):
+        emitter = heartbeat.HeartbeatEmitter(interval=3600)
+
+        emitter.add('execucao')
+        self.assertEqual(self.redis.zcard(heartbeat.HEARTBEAT_KEY), 1)
+        emitter.discard('execucao')
+
+        self.assertEqual(self.redis.zcard(heartbeat.HEARTBEAT_KEY), 0)
+
+    def test_emitter_survives_redis_errors(self):
+        self.redis.zadd = mock.Mock(side_effect=ConnectionError('redis fora'))
+        emitter = heartbeat.HeartbeatEmitter(interval=3600)
+
+        with self.assertLogs('apps.tasks_app.heartbeat', 'WARNING'):
+            emitter.add('execucao')
+
+    def test_stale_ids_are_the_oldest_beyond_the_timeout(self):
+        old, older, recent = self.start_execution(), self.start_execution(2), self.start_execution(3)
+        self.beat(old, seconds_ago=200)
+        self.beat(older, seconds_ago=300)
+        self.beat(recent, seconds_ago=10)
+
+        self.assertEqual(heartbeat.stale_execution_ids(), [str(older.pk), str(old.pk)])
+        self.assertEqual(heartbeat.stale_execution_ids(limit=1), [str(older.pk)])
+
+    def test_reaped_execution_is_retried_with_backoff(self):
+        execution = self.start_execution(attempt_number=2)
+        self.beat(execution, seconds_ago=300)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = heartbeat.reap_stale_executions(orphans=False)
+
+        self.assertEqual(summary, {'timed_out': 1, 'requeued': 1, 'failed': 0})
+        execution.refresh_from_db()
+        task = execution.task
+        task.refresh_from_db()
+        self.assertEqual((execution.status, task.status), ('timeout', 'pending'))
+        self.assertAlmostEqual(
+            (task.retry_after - timezone.now()).total_seconds(), heartbeat.retry_delay(2), delta=5
+        )
+        self.schedule.apply_async.assert_called_once_with(args=[str(self.problem.pk)], countdown=120)
+        self.schedule.delay.assert_called_once_with(str(self.problem.pk))
+        self.assertEqual(self.redis.zcard(heartbeat.HEARTBEAT_KEY), 0)
+
+    def test_last_attempt_fails_the_task(self):
+        execution = self.start_execution(attempt_number=3)
+
+        summary = heartbeat.reap_executions([execution.pk])
+
+        self.assertEqual(summary, {'timed_out': 1, 'requeued': 0, 'failed': 1})
+        execution.task.refresh_from_db()
+        self.assertEqual(execution.task.status, 'failed')
+        self.assertIn('sem sinal de vida', execution.task.error_message)
+
+    def test_finished_executions_are_not_reaped(self):
+        execution = self.start_execution()
+        TaskExecution.objects.filter(pk=execution.pk).update(status='completed')
+        self.beat(execution, seconds_ago=300)
+
+        summary = heartbeat.reap_stale_executions(orphans=False)
+
+        self.assertEqual(summary['timed_out'], 0)
+        self.assertEqual(self.redis.zcard(heartbeat.HEARTBEAT_KEY), 0)
+
+    @override_settings(TASK_HEARTBEAT_REAPER_BATCH_SIZE=2)
+    def test_stale_executions_are_reaped_in_batches(self):
+        for attempt_number in range(1, 6):
+            self.beat(self.start_execution(attempt_number=1), seconds_ago=300 + attempt_number)
+
+        summary = heartbeat.reap_stale_executions(orphans=False)
+
+        self.assertEqual(summary['timed_out'], 5)
+        self.assertFalse(TaskExecution.objects.filter(status='running').exists())
+
+    def test_orphans_are_reaped_after_two_scans_without_heartbeat(self):
+        orphan = self.start_execution()
+        beating = self.start_execution(2)
+        self.beat(beating)
+        self.start_execution(3, minutes_ago=0)
+
+        self.assertEqual(heartbeat.orphaned_execution_ids(), [])
+        self.assertEqual(heartbeat.orphaned_execution_ids(), [str(orphan.pk)])
+
+    def test_orphan_that_beats_again_is_spared(self):
+        execution = self.start_execution()
+        heartbeat.orphaned_execution_ids()
+
+        self.beat(execution)
+
+        self.assertEqual(heartbeat.orphaned_execution_ids(), [])
+
+    def test_orphan_scan_runs_once_per_interval(self):
+        with mock.patch('apps.tasks_app.heartbeat.orphaned_execution_ids', return_value=[]) as scan:
+            heartbeat.reap_stale_executions()
+            heartbeat.reap_stale_executions()
+
+        scan.assert_called_once_with()
+
+    def test_stats(self):
+        self.assertEqual(heartbeat.heartbeat_stats(), {'tracked': 0, 'stale': 0, 'oldest_age': None})
+
+        self.beat(self.start_execution(), seconds_ago=300)
+        self.beat(self.start_execution(2), seconds_ago=10)
+
+        stats = heartbeat.heartbeat_stats()
+        self.assertEqual((stats['tracked'], stats['stale']), (2, 1))
+        self.assertAlmostEqual(stats['oldest_age'], 300, delta=5)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_PLANNING_DEFAULT_HOURS=1.0)
+class PlanningTests(TestCase):
+    """Critical path, historical ratios and the plan endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        self.problem = create_problem()
+        self.ratios_key = RATIOS_CACHE_KEY.format(organization_id=self.problem.organization_id)
+
+    def create_task(self, title, hours, **fields):
+        return Task.objects.create(problem=self.problem, title=title, estimated_hours=hours, **fields)
+
+    def test_critical_path_and_slack(self):
+        first = self.create_task('A', 2)
+        short = self.create_task('B', 1)
+        last = self.create_task('C', 3)
+        last.dependencies.add(first, short)
+
+        plan = get_problem_plan(self.problem)
+
+        self.assertEqual(plan['critical_path'], [str(first.pk), str(last.pk)])
+        self.assertEqual(plan['critical_path_hours'], 5.0)
+        self.assertEqual(plan['tasks'][str(short.pk)]['slack'], 1.0)
+        self.assertEqual(plan['tasks'][str(first.pk)]['slack'], 0.0)
+
+    def test_ratios_scale_durations(self):
+        self.create_task('Feita', 2, status='completed', actual_hours=4)
+        pending = self.create_task('Pendente', 3)
+
+        snapshot = build_graph_snapshot(self.problem)
+
+        self.assertEqual(snapshot['durations'][str(pending.pk)], 6.0)
+
+    def test_completing_a_task_drops_cached_ratios(self):
+        self.create_task('Feita', 2, status='completed', actual_hours=4)
+        task = self.create_task(
+            'Em progresso', 2, status='in_progress', started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertEqual(get_type_ratios(self.problem.organization_id), {'feature': 2.0})
+        get_problem_plan(self.problem)
+
+        task.mark_completed()
+
+        self.assertIsNone(cache.get(self.ratios_key))
+        self.assertEqual(get_type_ratios(self.problem.organization_id), {'feature': 1.5})
+        self.assertEqual(get_problem_plan(self.problem)['tasks_done'], 2)
+
+    def test_status_change_outside_completed_keeps_ratios(self):
+        task = self.create_task('Pendente', 2)
+        get_type_ratios(self.problem.organization_id)
+
+        Task.objects.filter(pk=task.pk).bulk_transition('select')
+        task.refresh_from_db()
+        task.start_execution()
+
+        self.assertEqual(cache.get(self.ratios_key), {})
+
+    def test_bulk_reset_of_completed_tasks_drops_cached_ratios(self):
+        task = self.create_task('Feita', 2, status='completed', actual_hours=4)
+        get_type_ratios(self.problem.organization_id)
+
+        Task.objects.filter(pk=task.pk).bulk_transition('reset')
+
+        self.assertIsNone(cache.get(self.ratios_key))
+        self.assertEqual(get_type_ratios(self.problem.organization_id), {})
+
+    def test_cycle_raises_validation_error(self):
+        first = self.create_task('A', 1)
+        second = self.create_task('B', 1)
+        first.dependencies.add(second)
+        second.dependencies.add(first)
+
+        with self.assertRaises(ValidationError):
+            get_problem_plan(self.problem)
+
+    def test_plan_view(self):
+        task = self.create_task('A', 2)
+        user = get_user_model().objects.create_user('operador', password='senha', is_staff=True)
+        self.client.force_login(user)
+        url = reverse('tasks_app:problem_plan', args=[self.problem.pk])
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['critical_path'], [str(task.pk)])
+
+        other = self.create_task('B', 1)
+        task.dependencies.add(other)
+        other.dependencies.add(task)
+        self.assertEqual(self.client.get(url).status_code, 409)
+
+    def test_plan_view_requires_membership(self):
+        user = get_user_model().objects.create_user('visitante', password='senha')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('tasks_app:problem_plan', args=[self.problem.pk]))
+
+        self.assertEqual(response.status_code, 403)
+
+
+class LogBufferMixin:
+    """Isolates the process-wide log buffers and skips live publishing."""
+
+    def setUp(self):
+        super().setUp()
+        problem = create_problem()
+        task = Task.objects.create(problem=problem, title='Tarefa')
+        self.execution = TaskExecution.objects.create(task=task, attempt_number=1)
+        self.enterContext(mock.patch.dict(logstore._buffers, clear=True))
+        self.enterContext(mock.patch.multiple(logstore, _flusher=None, _flusher_pid=None))
+        self.thread = self.enterContext(mock.patch('apps.tasks_app.logstore.threading.Thread'))
+        self.published = self.enterContext(mock.patch('apps.tasks_app.logstore._on_chunk_written'))
+
+    def chunks(self):
+        return list(
+            TaskExecutionLogChunk.objects.filter(execution=self.execution)
+            .order_by('sequence').values_list('sequence', 'content')
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_LOG_FLUSH_BYTES=1024, TASK_LOG_FLUSH_INTERVAL=60)
+class LogStoreTests(LogBufferMixin, TestCase):
+    """Buffered, append-only execution logs."""
+
+    def test_lines_are_buffered_until_flushed(self):
+        self.execution.append_log('primeira')
+        self.execution.append_log('segunda')
+        self.assertEqual(self.chunks(), [])
+
+        self.execution.flush_logs()
+
+        [(sequence, content)] = self.chunks()
+        self.assertEqual(sequence, 1)
+        self.assertIn('primeira', content)
+        self.assertIn('segunda', content)
+        self.assertNotIn(self.execution.pk, logstore._buffers)
+        self.published.assert_called_once_with(self.execution.pk, 1, content)
+
+    def test_size_budget_flushes_on_append(self):
+        buffer = logstore.ExecutionLogBuffer(self.execution.pk, max_bytes=10)
+
+        buffer.append('curta\n')
+        buffer.append('mais uma linha\n')
+        buffer.append('fim\n')
+
+        self.assertEqual(self.chunks(), [(1, 'curta\nmais uma linha\n')])
+        self.assertEqual(buffer.pending_size, 4)
+
+    def test_flush_due_writes_only_expired_buffers(self):
+        expired = logstore.get_log_buffer(self.execution.pk)
+        expired.append('linha\n')
+        expired.max_interval = 0
+        other = TaskExecution.objects.create(task=self.execution.task, attempt_number=2)
+        other.append_log('recente')
+
+        self.assertEqual(logstore.flush_due(), 1)
+        self.assertEqual(self.chunks(), [(1, 'linha\n')])
+        self.assertFalse(TaskExecutionLogChunk.objects.filter(execution=other).exists())
+
+    def test_sequence_conflict_reloads_the_sequence(self):
+        buffer = logstore.ExecutionLogBuffer(self.execution.pk)
+        buffer.append('primeira\n')
+        buffer.flush()
+        # Another process wrote the sequence this buffer expects next
+        TaskExecutionLogChunk.objects.create(execution=self.execution, sequence=2, content='outra\n')
+
+        buffer.append('segunda\n')
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual([sequence for sequence, _ in self.chunks()], [1, 2, 3])
+
+    def test_transient_failures_are_retried_then_dropped(self):
+        buffer = logstore.get_log_buffer(self.execution.pk)
+        buffer.append('linha\n')
+        buffer.max_interval = 0
+
+        with mock.patch.object(
+            TaskExecutionLogChunk.objects, 'create', side_effect=OperationalError('database is locked')
+        ):
+            for _ in range(logstore.MAX_FLUSH_FAILURES - 1):
+                logstore.flush_due()
+            self.assertIs(logstore._buffers.get(self.execution.pk), buffer)
+
+            logstore.flush_due()
+
+        self.assertNotIn(self.execution.pk, logstore._buffers)
+
+    def test_success_resets_the_failure_count(self):
+        buffer = logstore.get_log_buffer(self.execution.pk)
+        buffer.append('linha\n')
+        buffer.max_interval = 0
+        with mock.patch.object(
+            TaskExecutionLogChunk.objects, 'create', side_effect=OperationalError('database is locked')
+        ):
+            logstore.flush_due()
+        self.assertEqual(buffer.failures, 1)
+
+        logstore.flush_due()
+
+        self.assertEqual(buffer.failures, 0)
+        self.assertEqual(self.chunks(), [(1, 'linha\n')])
+
+    def test_flusher_thread_flushes_due_buffers(self):
+        class Stop(Exception):
+            pass
+
+        with (
+            mock.patch('apps.tasks_app.logstore.time.sleep', side_effect=[None, None, Stop]),
+            mock.patch('apps.tasks_app.logstore.flush_due', side_effect=[0, 2]) as flush_due,
+            mock.patch('apps.tasks_app.logstore.close_old_connections') as close_old_connections,
+            self.assertRaises(Stop),
+        ):
+            logstore._run_flusher()
+
+        self.assertEqual(flush_due.call_count, 2)
+        close_old_connections.assert_called_once_with()
+
+    def test_flusher_is_started_once_per_process(self):
+        logstore.get_log_buffer(self.execution.pk)
+        logstore.get_log_buffer(uuid.uuid4())
+        self.thread.assert_called_once()
+        self.thread.return_value.start.assert_called_once_with()
+
+        # Threads do not survive a fork
+        logstore._flusher_pid = -1
+        logstore.get_log_buffer(uuid.uuid4())
+
+        self.assertEqual(self.thread.call_count, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LogStoreDeletedExecutionTests(LogBufferMixin, TransactionTestCase):
+    """Buffers of deleted executions are dropped instead of retried forever."""
+
+    def test_integrity_error_drops_the_buffer(self):
+        buffer = logstore.ExecutionLogBuffer(self.execution.pk, max_interval=60)
+        logstore._buffers[self.execution.pk] = buffer
+        buffer.append('linha\n')
+        buffer.max_interval = 0
+        self.execution.delete()
+
+        with self.assertLogs('apps.tasks_app.logstore', 'ERROR') as logs:
+            self.assertEqual(logstore.flush_due(), 0)
+
+        self.assertNotIn(self.execution.pk, logstore._buffers)
+        self.assertIn('Dropped 6 buffered log character(s)', logs.output[-1])
+        self.assertEqual(logstore.flush_due(), 0)
+
+
+class FakeHub:
+    """Event hub handing out a single queue filled by the test."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.unsubscribed = False
+
+    def subscribe(self, execution_id):
+        return self.queue
+
+    async def wait_ready(self, execution_id, timeout=5):
+        return True
+
+    def unsubscribe(self, execution_id, queue):
+        self.unsubscribed = True
+
+
+class FakePubSub:
+    """Async Redis pub/sub yielding preset messages."""
+
+    def __init__(self, messages, fail_close=False):
+        self.messages = messages
+        self.fail_close = fail_close
+        self.channels = []
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+
+    async def unsubscribe(self):
+        if self.fail_close:
+            raise ConnectionError('conexao perdida')
+
+    async def aclose(self):
+        pass
+
+
+def parse_sse(events):
+    parsed = []
+    for event in events:
+        fields = dict(line.split(': ', 1) for line in event.strip().splitlines() if ': ' in line)
+        parsed.append((fields.get('event'), fields.get('id'), json.loads(fields.get('data', 'null'))))
+    return parsed
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StreamingTests(TestCase):
+    """Replay and live delivery of execution events (SSE)."""
+
+    def setUp(self):
+        task = Task.objects.create(problem=create_problem(), title='Tarefa')
+        self.execution = TaskExecution.objects.create(task=task, attempt_number=1, status='running')
+        self.hub = FakeHub()
+        self.enterContext(mock.patch('apps.tasks_app.streaming.get_event_hub', return_value=self.hub))
+
+    def add_chunks(self, *sequences):
+        for sequence in sequences:
+            TaskExecutionLogChunk.objects.create(
+                execution=self.execution, sequence=sequence, content=f'linha {sequence}\n'
+            )
+
+    async def collect(self, offset=0, limit=None):
+        events = []
+        stream = stream_execution_events(self.execution, offset=offset, replay_batch=2)
+        async for event in stream:
+            events.append(event)
+            if limit and len(events) == limit:
+                await stream.aclose()
+                break
+        return events
+
+    async def test_replays_chunks_and_ends_on_terminal_status(self):
+        await sync_to_async(self.add_chunks)(1, 2, 3)
+        await TaskExecution.objects.filter(pk=self.execution.pk).aupdate(status='completed')
+
+        events = parse_sse(await self.collect(offset=1))
+
+        self.assertEqual(events, [
+            ('log', '2', {'sequence': 2, 'content': 'linha 2\n'}),
+            ('log', '3', {'sequence': 3, 'content': 'linha 3\n'}),
+            ('status', None, {'status': 'completed'}),
+        ])
+        self.assertTrue(self.hub.unsubscribed)
+
+    async def test_replays_legacy_logs_from_the_start_only(self):
+        await TaskExecution.objects.filter(pk=self.execution.pk).aupdate(
+            status='failed', logs='antigo\n'
+        )
+        await sync_to_async(self.add_chunks)(1)
+
+        events = parse_sse(await self.collect())
+        resumed = parse_sse(await self.collect(offset=1))
+
+        self.assertEqual(events[0], ('log', None, {'sequence': 0, 'content': 'antigo\n'}))
+        self.assertEqual([event for event, _, _ in events], ['log', 'log', 'status'])
+        self.assertEqual(resumed, [('status', None, {'status': 'failed'})])
+
+    async def test_live_events_skip_replayed_sequences(self):
+        await sync_to_async(self.add_chunks)(1)
+        for payload in (
+            {'event': 'log', 'data': {'sequence': 1, 'content': 'linha 1\n'}},
+            {'event': 'log', 'data': {'sequence': 2, 'content': 'linha 2\n'}},
+            {'event': 'status', 'data': {'status': 'completed'}},
+        ):
+            self.hub.queue.put_nowait(payload)
+
+        events = parse_sse(await self.collect())
+
+        self.assertEqual([(event, event_id) for event, event_id, _ in events], [
+            ('log', '1'), ('status', None), ('log', '2'), ('status', None),
+        ])
+        self.assertEqual(events[-1][2], {'status': 'completed'})
+
+    async def test_idle_stream_sends_keep_alives(self):
+        with mock.patch('apps.tasks_app.streaming.KEEPALIVE_INTERVAL', 0.01):
+            events = await self.collect(limit=2)
+
+        self.assertEqual(events[-1], ': keep-alive\n\n')
+        self.assertTrue(self.hub.unsubscribed)
+
+    def test_publish_waits_for_commit(self):
+        redis = self.enterContext(mock.patch('apps.tasks_app.streaming.get_redis')).return_value
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            publish_execution_event(self.execution.pk, 'status', {'status': 'running'})
+        redis.publish.assert_not_called()
+
+        callbacks[0]()
+
+        channel, message = redis.publish.call_args.args
+        self.assertEqual(channel, f'tasks:execution:{self.execution.pk}:events')
+        self.assertEqual(json.loads(message), {'event': 'status', 'data': {'status': 'running'}})
+
+
+class ExecutionEventHubTests(TestCase):
+    """One Redis subscription per execution fanned out to every viewer."""
+
+    def hub_with(self, pubsub):
+        hub = ExecutionEventHub()
+        hub._redis = mock.Mock(pubsub=mock.Mock(return_value=pubsub))
+        return hub
+
+    async def test_messages_reach_every_viewer(self):
+        pubsub = FakePubSub([
+            {'type': 'subscribe', 'data': 1},
+            {'type': 'message', 'data': 'invalido'},
+            {'type': 'message', 'data': json.dumps({'event': 'status', 'data': {'status': 'running'}})},
+        ])
+        hub = self.hub_with(pubsub)
+
+        first = hub.subscribe('exec')
+        second = hub.subscribe('exec')
+        self.assertTrue(await hub.wait_ready('exec'))
+        await asyncio.sleep(0)
+
+        expected = {'event': 'status', 'data': {'status': 'running'}}
+        self.assertEqual(first.get_nowait(), expected)
+        self.assertEqual(second.get_nowait(), expected)
+        self.assertEqual(pubsub.channels, ['tasks:execution:exec:events'])
+
+    async def test_close_errors_are_logged(self):
+        hub = self.hub_with(FakePubSub([], fail_close=True))
+
+        with self.assertLogs('apps.tasks_app.streaming', 'WARNING') as logs:
+            hub.subscribe('exec')
+            await hub.wait_ready('exec')
+            await asyncio.sleep(0)
+
+        self.assertIn('conexao perdida', logs.output[0])
+        self.assertNotIn('exec', hub._readers)
+
+    async def test_last_viewer_stops_the_reader(self):
+        hub = self.hub_with(FakePubSub([]))
+        hub._redis.pubsub.return_value.listen = lambda: self.forever()
+
+        queue = hub.subscribe('exec')
+        await hub.wait_ready('exec')
+        reader = hub._readers['exec']
+        hub.unsubscribe('exec', queue)
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+
+        self.assertEqual(hub._subscribers, {})
+
+    async def forever(self):
+        await asyncio.Event().wait()
+        yield
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_EXECUTION_RETENTION_DAYS=30)
+class RetentionJobTests(TestCase):
+    """Batched retention resumes from its checkpoint."""
+
+    def setUp(self):
+        self.problem = create_problem()
+        self.organization = self.problem.organization
+        task = Task.objects.create(problem=self.problem, title='Tarefa')
+        old = timezone.now() - timedelta(days=60)
+        self.old = []
+        for index in range(5):
+            execution = TaskExecution.objects.create(task=task, status='completed', attempt_number=index + 1)
+            TaskExecutionLogChunk.objects.create(execution=execution, sequence=1, content='linha\n')
+            self.old.append(execution.pk)
+        TaskExecution.objects.filter(pk__in=self.old).update(created_at=old)
+        self.running = TaskExecution.objects.create(task=task, status='running', attempt_number=6)
+        TaskExecution.objects.filter(pk=self.running.pk).update(created_at=old)
+        self.recent = TaskExecution.objects.create(task=task, status='failed', attempt_number=7)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        job = ExecutionRetentionJob(batch_size=2, pause=0)
+        original = ExecutionRetentionJob.process_batch
+        calls = []
+
+        def crash_on_second_batch(self, organization, ids):
+            calls.append(list(ids))
+            if len(calls) == 2:
+                raise RuntimeError('worker killed')
+            return original(self, organization, ids)
+
+        with (
+            mock.patch.object(ExecutionRetentionJob, 'process_batch', crash_on_second_batch),
+            self.assertRaises(RuntimeError),
+        ):
+            job.run([self.organization])
+
+        checkpoint = RetentionCheckpoint.objects.get(job=job.job, organization=self.organization)
+        self.assertEqual(checkpoint.rows_reclaimed, 2)
+        self.assertIsNone(checkpoint.finished_at)
+        cutoff = checkpoint.cutoff
+
+        report = job.run([self.organization])
+
+        checkpoint.refresh_from_db()
+        self.assertEqual(report['rows'], 5)
+        self.assertEqual(checkpoint.cutoff, cutoff)
+        self.assertIsNotNone(checkpoint.finished_at)
+        self.assertFalse(TaskExecution.objects.filter(pk__in=self.old).exists())
+        self.assertFalse(TaskExecutionLogChunk.objects.filter(execution_id__in=self.old).exists())
+        self.assertEqual(TaskExecution.objects.filter(pk__in=[self.running.pk, self.recent.pk]).count(), 2)
+
+    def test_finished_checkpoint_starts_a_new_run(self):
+        job = ExecutionRetentionJob(batch_size=10, pause=0)
+        job.run([self.organization])
+
+        report = job.run([self.organization])
+
+        self.assertEqual(report['rows'], 0)
+
+    def test_concurrent_run_is_skipped(self):
+        job = ExecutionRetentionJob(pause=0)
+        cache.add(LOCK_KEY.format(job=job.job), 'other run')
+        self.addCleanup(cache.clear)
+
+        self.assertEqual(job.run([self.organization]), {'skipped': True})
+        self.assertTrue(TaskExecution.objects.filter(pk__in=self.old).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TASK_EXECUTION_ARCHIVE_AFTER_DAYS=30)
+class ArchiveJobTests(TestCase):
+    """Cold archive of old executions and their rehydration."""
+
+    def setUp(self):
+        self.root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(TASK_EXECUTION_ARCHIVE_DIR=self.root))
+        load_archive_file.cache_clear()
+        self.addCleanup(load_archive_file.cache_clear)
+
+        self.problem = create_problem()
+        self.organization = self.problem.organization
+        task = Task.objects.create(problem=self.problem, title='Tarefa')
+        self.old = []
+        for index in range(3):
+            execution = TaskExecution.objects.create(
+                task=task, status='completed', attempt_number=index + 1,
+                logs='legado\n', output=f'saida {index}',
+            )
+            TaskExecutionLogChunk.objects.create(execution=execution, sequence=1, content='linha\n')
+            self.old.append(execution.pk)
+        TaskExecution.objects.filter(pk__in=self.old).update(
+            created_at=timezone.now() - timedelta(days=60)
+        )
+        self.recent = TaskExecution.objects.create(task=task, status='completed', attempt_number=4)
+
+    def archive_files(self):
+        return sorted(path.name for path in Path(self.root).rglob('*') if path.is_file())
+
+    def test_archives_and_rehydrates_old_executions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = ExecutionArchiveJob(pause=0).run([self.organization])
+
+        self.assertEqual(report['rows'], 3)
+        self.assertEqual(TaskExecution.objects.filter(pk__in=self.old).count(), 0)
+        self.assertTrue(TaskExecution.objects.filter(pk=self.recent.pk).exists())
+        [name] = self.archive_files()
+        self.assertTrue(name.startswith('part-'))
+
+        archived = ArchivedTaskExecution.objects.get(pk=self.old[1])
+        execution = archived.rehydrate()
+        self.assertEqual(execution.pk, self.old[1])
+        self.assertEqual(execution.output, 'saida 1')
+        self.assertEqual(execution.logs, 'legado\nlinha\n')
+        self.assertEqual(execution.task_id, archived.task_id)
+        self.assertIsNotNone(execution.created_at.tzinfo)
+
+    def test_files_are_staged_until_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            ExecutionArchiveJob(pause=0).run([self.organization])
+
+        [name] = self.archive_files()
+        self.assertTrue(name.endswith('.staged'))
+
+        for callback in callbacks:
+            callback()
+
+        [name] = self.archive_files()
+        self.assertFalse(name.startswith('.'))
+
+    def test_committed_but_unpromoted_file_is_promoted_on_read(self):
+        # Crash between the commit and the rename: on_commit never ran
+        ExecutionArchiveJob(pause=0).run([self.organization])
+
+        archived = ArchivedTaskExecution.objects.get(pk=self.old[0])
+
+        self.assertEqual(archived.rehydrate().output, 'saida 0')
+        self.assertTrue((Path(self.root) / archived.archive_path).exists())
+        self.assertFalse((Path(self.root) / staged_path(archived.archive_path)).exists())
+
+    def test_rollback_after_the_batch_removes_staged_files(self):
+        original = RetentionCheckpoint.save
+
+        def fail_on_cursor(checkpoint, *args, **kwargs):
+            if 'cursor_id' in (kwargs.get('update_fields') or ()):
+                raise RuntimeError('checkpoint perdido')
+            return original(checkpoint, *args, **kwargs)
+
+        with (
+            mock.patch.object(RetentionCheckpoint, 'save', fail_on_cursor),
+            self.captureOnCommitCallbacks(execute=True),
+            self.assertRaises(RuntimeError),
+        ):
+            ExecutionArchiveJob(pause=0).run([self.organization])
+
+        self.assertEqual(self.archive_files(), [])
+        self.assertEqual(TaskExecution.objects.filter(pk__in=self.old).count(), 3)
+        self.assertFalse(ArchivedTaskExecution.objects.exists())
+
+    def test_rejects_paths_outside_the_archive(self):
+        archived = ArchivedTaskExecution(
+            id=self.old[0], task_id=self.recent.task_id, organization=self.organization,
+            archive_path='../fora.json.gz', row_index=0,
+        )
+
+        with self.assertRaises(ValueError):
+            archived.rehydrate()
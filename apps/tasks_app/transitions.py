@@ -0,0 +1,150 @@
+"""
+Bulk state transitions for tasks and executions.
+
+Models declare their transitions in ``TRANSITIONS``: the allowed source
+statuses, the target status, the timestamps set to the current time and
+any other field values. ``queryset.bulk_transition(name)`` locks the
+selected rows, applies the transition to every eligible row with a
+single ``UPDATE ... WHERE status IN (...)`` and returns the outcome of
+each row. Instead of per-row ``save()`` signals, one consolidated
+``bulk_transition_applied`` signal is sent per call, which also serves
+as the audit event; the domain events of the updated rows are written to
+the outbox in the same transaction.
+
+``pre_save`` and ``post_save`` are not sent for the updated rows, and
+``save()`` overrides do not run. Code reacting to saves of a model with
+transitions must also receive ``bulk_transition_applied``, as the plan
+cache and live status events (apps.tasks_app.signals), the search index
+(apps.search.signals) and the notifications of bulk task actions do.
+"""
+import copy
+import logging
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from apps.events.outbox import record_bulk_transition
+
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_UPDATED = 'updated'
+OUTCOME_INVALID_STATE = 'invalid_state'
+OUTCOME_MISSING = 'missing'
+
+# Sent once per bulk transition that updated at least one row, with the
+# arguments ``transition`` (name), ``result`` (TransitionResult) and
+# ``actor`` (User or None)
+bulk_transition_applied = Signal()
+
+
+class TransitionResult:
+    """
+    Outcome of a bulk transition.
+
+    Attributes:
+        model: The model class
+        transition: Name of the transition
+        outcomes: Mapping of primary key to OUTCOME_* value
+        previous: Mapping of primary key to the status before the call
+        fields: Field values written to the updated rows
+    """
+
+    def __init__(self, model, transition, outcomes, previous, fields):
+        self.model = model
+        self.transition = transition
+        self.outcomes = outcomes
+        self.previous = previous
+        self.fields = fields
+
+    @property
+    def updated(self):
+        """Primary keys of the rows that were transitioned."""
+        return [pk for pk, outcome in self.outcomes.items() if outcome == OUTCOME_UPDATED]
+
+    @property
+    def skipped(self):
+        """Primary keys of the rows left unchanged."""
+        return [pk for pk, outcome in self.outcomes.items() if outcome != OUTCOME_UPDATED]
+
+    def __repr__(self):
+        return (
+            f'<TransitionResult {self.model.__name__}.{self.transition}: '
+            f'{len(self.updated)} updated, {len(self.skipped)} skipped>'
+        )
+
+
+def apply_bulk_transition(queryset, name, actor=None, **values):
+    """
+    Apply a declared transition to every row of a queryset.
+
+    Args:
+        queryset: Rows to transition.
+        name: Key of the model's ``TRANSITIONS``.
+        actor: Optional User performing the transition (audit only).
+        **values: Field values overriding the transition defaults
+            (e.g. ``error_message``).
+
+    Returns:
+        TransitionResult: Per-row outcomes.
+
+    Raises:
+        ValueError: If the model does not declare the transition.
+    """
+    model = queryset.model
+    try:
+        transition = model.TRANSITIONS[name]
+    except (AttributeError, KeyError):
+        raise ValueError(f'{model.__name__} has no transition {name!r}')
+
+    sources = transition['from']
+    now = timezone.now()
+    fields = {'status': transition['to'], 'updated_at': now}
+    fields.update({field: now for field in transition.get('timestamps', ())})
+    fields.update(copy.deepcopy(transition.get('set', {})))
+    fields.update(values)
+
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    with transaction.atomic():
+        # Lock in primary key order so concurrent calls cannot deadlock
+        previous = dict(
+            model.objects.filter(pk__in=ids).select_for_update().order_by('pk').values_list(
+                'pk', 'status'
+            )
+        )
+        eligible = [pk for pk, status in previous.items() if status in sources]
+        if eligible:
+            model.objects.filter(pk__in=eligible, status__in=sources).update(**fields)
+
+        outcomes = {}
+        for pk in ids:
+            if pk not in previous:
+                outcomes[pk] = OUTCOME_MISSING
+            elif previous[pk] in sources:
+                outcomes[pk] = OUTCOME_UPDATED
+            else:
+                outcomes[pk] = OUTCOME_INVALID_STATE
+        result = TransitionResult(model, name, outcomes, previous, fields)
+
+        if eligible:
+            record_bulk_transition(result)
+            logger.info(
+                f'{model.__name__} transition {name!r}: {len(eligible)} row(s) updated, '
+                f'{len(ids) - len(eligible)} skipped (actor={getattr(actor, "pk", None)})'
+            )
+            bulk_transition_applied.send(sender=model, transition=name, result=result, actor=actor)
+    return result
+
+
+class BulkTransitionQuerySetMixin:
+    """Adds ``bulk_transition()`` to the QuerySet of a model with TRANSITIONS."""
+
+    def bulk_transition(self, name, actor=None, **values):
+        """
+        Apply a declared transition to the rows of this queryset.
+
+        See apply_bulk_transition.
+        """
+        return apply_bulk_transition(self, name, actor=actor, **values)
+
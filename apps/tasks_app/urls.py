@@ -0,0 +1,21 @@
+"""
+URL configuration for the Tasks app.
+"""
+from django.urls import path
+
+from apps.tasks_app import views
+
+app_name = 'tasks_app'
+
+urlpatterns = [
+    path(
+        'executions/<uuid:pk>/events/',
+        views.execution_events,
+        name='execution_events',
+    ),
+    path(
+        'problems/<uuid:pk>/plan/',
+        views.problem_plan,
+        name='problem_plan',
+    ),
+]
@@ -1,3 +1,63 @@
-from django.shortcuts import render
+"""
+Views for the Tasks app.
+"""
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 
-# Create your views here.
+from apps.problems.models import Problem
+from apps.tasks_app.models import TaskExecution
+from apps.tasks_app.planning import get_problem_plan
+from apps.tasks_app.streaming import stream_execution_events
+
+
+async def execution_events(request, pk):
+    """
+    Stream live logs and status transitions of an execution (SSE).
+
+    Clients resume from the last received chunk through the standard
+    ``Last-Event-ID`` header or an explicit ``?offset=`` parameter.
+    Requires an ASGI server (see config/asgi.py).
+    """
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_staff:
+        return HttpResponseForbidden('Acesso restrito a operadores.')
+
+    try:
+        execution = await TaskExecution.objects.only('pk', 'status').aget(pk=pk)
+    except TaskExecution.DoesNotExist:
+        raise Http404('Execucao nao encontrada.')
+
+    offset = request.headers.get('Last-Event-ID') or request.GET.get('offset') or 0
+    try:
+        offset = max(int(offset), 0)
+    except (TypeError, ValueError):
+        offset = 0
+
+    response = StreamingHttpResponse(
+        stream_execution_events(execution, offset=offset),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def problem_plan(request, pk):
+    """
+    Return the critical path, slack and ETA of a problem (JSON).
+
+    Responds with 409 when the task dependencies form a cycle.
+    """
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden('Autenticacao necessaria.')
+
+    problem = get_object_or_404(Problem.objects.select_related('organization'), pk=pk)
+    if not request.user.is_staff and not problem.organization.is_member(request.user):
+        return HttpResponseForbidden('Acesso restrito aos membros da organizacao.')
+
+    try:
+        plan = get_problem_plan(problem)
+    except ValidationError as exc:
+        return JsonResponse({'error': exc.messages[0]}, status=409)
+    return JsonResponse(plan)
@@ -34,6 +34,10 @@ INSTALLED_APPS = [
     'apps.documents',
     'apps.tasks_app',
     'apps.chat',
+    'apps.search',
+    'apps.notifications',
+    'apps.events',
+    'apps.agents',
 ]
 
 MIDDLEWARE = [
@@ -206,10 +210,87 @@ CELERY_RESULT_EXPIRES = 3600  # Results expire after 1 hour
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
 
+# Celery queues and routing (see apps.common.routing). Agent work is routed
+# at publish time to agent.<agent_type> or, when critical, to 'critical'.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'apps.tasks_app.tasks.execute_task': {'queue': 'agent.unknown'},
+    'apps.tasks_app.tasks.schedule_problem_tasks': {'queue': 'interactive'},
+    'apps.tasks_app.tasks.schedule_executing_problems': {'queue': 'interactive'},
+    'apps.tasks_app.tasks.reap_stuck_executions': {'queue': 'interactive'},
+    'apps.tasks_app.tasks.cleanup_old_task_executions': {'queue': 'maintenance'},
+    'apps.tasks_app.tasks.archive_old_task_executions': {'queue': 'maintenance'},
+    'apps.problems.tasks.run_workflow_stage_part': {'queue': 'agent.unknown'},
+    'apps.problems.tasks.*': {'queue': 'interactive'},
+    'apps.notifications.tasks.*': {'queue': 'interactive'},
+    'apps.events.tasks.purge_published_outbox_events': {'queue': 'maintenance'},
+    'apps.events.tasks.*': {'queue': 'interactive'},
+    'apps.documents.tasks.*': {'queue': 'maintenance'},
+}
+# Broker message priorities per Problem/Task priority. The Redis transport
+# consumes lower values first, in the steps listed in priority_steps.
+CELERY_PRIORITY_LEVELS = {
+    'critical': 0,
+    'high': 3,
+    'medium': 6,
+    'low': 9,
+}
+CELERY_TASK_DEFAULT_PRIORITY = CELERY_PRIORITY_LEVELS['medium']
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': [0, 3, 6, 9],
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# Worker profiles, one per group of queues (python manage.py run_worker <profile>).
+# Time limits are in seconds and override CELERY_TASK_TIME_LIMIT per worker.
+CELERY_WORKER_PROFILES = {
+    'critical': {
+        'queues': ['critical'],
+        'concurrency': 2,
+        'prefetch_multiplier': 1,
+        'time_limit': 2 * 60 * 60,
+        'soft_time_limit': 2 * 60 * 60 - 300,
+    },
+    'interactive': {
+        'queues': ['interactive'],
+        'concurrency': 8,
+        'prefetch_multiplier': 4,
+        'time_limit': 2 * 60,
+        'soft_time_limit': 90,
+    },
+    'code_writer': {
+        'queues': ['agent.code_writer'],
+        'concurrency': 4,
+        'prefetch_multiplier': 1,
+        'time_limit': 2 * 60 * 60,
+        'soft_time_limit': 2 * 60 * 60 - 300,
+        'max_tasks_per_child': 50,
+    },
+    'test_runner': {
+        'queues': ['agent.test_runner'],
+        'concurrency': 4,
+        'prefetch_multiplier': 1,
+        'time_limit': 60 * 60,
+        'soft_time_limit': 55 * 60,
+        'max_tasks_per_child': 50,
+    },
+    'planning': {
+        'queues': ['agent.task_planner', 'agent.business_analyst', 'agent.tech_architect'],
+        'concurrency': 4,
+        'prefetch_multiplier': 1,
+        'time_limit': 30 * 60,
+        'soft_time_limit': 25 * 60,
+    },
+    'default': {
+        'queues': ['default', 'agent.unknown', 'maintenance'],
+        'concurrency': 2,
+        'prefetch_multiplier': 1,
+        'time_limit': 6 * 60 * 60,  # Retention and archive runs
+        'soft_time_limit': 6 * 60 * 60 - 300,
+    },
+}
+
 # Celery Beat schedule for periodic tasks
-# Note: The cleanup_old_task_executions task will be created in Task 4
-# when the tasks_app is implemented. Until then, this schedule is configured
-# but the task will fail until it's implemented.
 CELERY_BEAT_SCHEDULE = {
     'cleanup-old-tasks': {
         'task': 'apps.tasks_app.tasks.cleanup_old_task_executions',
@@ -218,4 +299,290 @@ CELERY_BEAT_SCHEDULE = {
             'expires': 3600,  # Task expires after 1 hour if not executed
         },
     },
+    'archive-old-task-executions': {
+        'task': 'apps.tasks_app.tasks.archive_old_task_executions',
+        'schedule': 86400.0,  # Run daily
+        'options': {
+            'expires': 3600,
+        },
+    },
+    'schedule-executing-problems': {
+        'task': 'apps.tasks_app.tasks.schedule_executing_problems',
+        'schedule': 30.0,  # Safety net; completions trigger scheduling directly
+        'options': {
+            'expires': 30,
+        },
+    },
+    'reap-stuck-executions': {
+        'task': 'apps.tasks_app.tasks.reap_stuck_executions',
+        'schedule': 30.0,
+        'options': {
+            'expires': 30,
+        },
+    },
+    'resume-stalled-workflows': {
+        'task': 'apps.problems.tasks.resume_stalled_workflows',
+        'schedule': 300.0,  # Every 5 minutes
+        'options': {
+            'expires': 300,
+        },
+    },
+    'relay-outbox-events': {
+        'task': 'apps.events.tasks.relay_outbox_events',
+        'schedule': 10.0,  # Safety net; commits wake the relay directly
+        'options': {
+            'expires': 10,
+        },
+    },
+    'purge-published-outbox-events': {
+        'task': 'apps.events.tasks.purge_published_outbox_events',
+        'schedule': 3600.0,  # Run hourly
+        'options': {
+            'expires': 600,
+        },
+    },
+}
+
+# ============================================================================
+# Task Scheduler Configuration
+# ============================================================================
+# Maximum number of tasks running at the same time for a single problem
+TASK_SCHEDULER_MAX_CONCURRENCY_PER_PROBLEM = int(
+    os.environ.get('TASK_SCHEDULER_MAX_CONCURRENCY_PER_PROBLEM', 4)
+)
+# Maximum number of tasks running at the same time across an organization
+TASK_SCHEDULER_MAX_CONCURRENCY_PER_ORGANIZATION = int(
+    os.environ.get('TASK_SCHEDULER_MAX_CONCURRENCY_PER_ORGANIZATION', 16)
+)
+# A pending execution stops holding the dispatch lease of its task after this
+# many seconds (its job was lost); longer than the worst expected queue wait
+TASK_DISPATCH_LEASE_SECONDS = int(os.environ.get('TASK_DISPATCH_LEASE_SECONDS', 6 * 60 * 60))
+# Dotted path to the callable that performs a TaskExecution.
+# The callable receives the TaskExecution and returns its output (str).
+# apps.agents.runners.run_task runs it with the code writer agent.
+TASK_EXECUTION_RUNNER = os.environ.get('TASK_EXECUTION_RUNNER', '')
+
+# ============================================================================
+# Task Execution Heartbeats (see apps.tasks_app.heartbeat)
+# ============================================================================
+# Seconds between heartbeats of a running execution
+TASK_HEARTBEAT_INTERVAL = 15
+# Executions without heartbeat for this long are timed out by the reaper
+TASK_HEARTBEAT_TIMEOUT = int(os.environ.get('TASK_HEARTBEAT_TIMEOUT', 120))
+# Executions reaped per transaction
+TASK_HEARTBEAT_REAPER_BATCH_SIZE = 500
+# Seconds between scans for running executions with no heartbeat at all
+TASK_HEARTBEAT_ORPHAN_SCAN_INTERVAL = 5 * 60
+# Retry the task of a timed out execution (otherwise the task fails)
+TASK_EXECUTION_REQUEUE_ON_TIMEOUT = (
+    os.environ.get('TASK_EXECUTION_REQUEUE_ON_TIMEOUT', 'True').lower() == 'true'
+)
+# Attempts per task, including the first one
+TASK_EXECUTION_MAX_ATTEMPTS = int(os.environ.get('TASK_EXECUTION_MAX_ATTEMPTS', 3))
+# Seconds before the first retry, doubled after each further attempt
+TASK_EXECUTION_RETRY_BACKOFF = 60
+
+# ============================================================================
+# Task Planning Configuration
+# ============================================================================
+# Duration assumed for tasks without estimated_hours
+TASK_PLANNING_DEFAULT_HOURS = 1.0
+# Cached plans are also invalidated on task changes; this is only an upper bound
+TASK_PLANNING_CACHE_TIMEOUT = 60 * 60  # 1 hour
+# Historical actual/estimated ratios per task type
+TASK_PLANNING_RATIOS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# ============================================================================
+# Task Execution Logs
+# ============================================================================
+# Buffered log lines are written as a new chunk once they reach this size...
+TASK_LOG_FLUSH_BYTES = 64 * 1024  # 64 KB
+# ...or once the oldest buffered line is older than this (seconds)
+TASK_LOG_FLUSH_INTERVAL = 2.0
+
+# ============================================================================
+# Task Execution Retention
+# ============================================================================
+# Terminal executions older than this are removed (per-organization override:
+# Organization.execution_retention_days)
+TASK_EXECUTION_RETENTION_DAYS = int(os.environ.get('TASK_EXECUTION_RETENTION_DAYS', 90))
+# Executions removed per transaction
+TASK_EXECUTION_RETENTION_BATCH_SIZE = 500
+# Seconds to sleep between batches
+TASK_EXECUTION_RETENTION_PAUSE = 0.1
+# Upper bound for the run lock, in case a worker dies while holding it
+TASK_EXECUTION_RETENTION_LOCK_TIMEOUT = 6 * 60 * 60  # 6 hours
+
+# ============================================================================
+# Task Execution Archive
+# ============================================================================
+# Terminal executions older than this are moved to compressed files
+TASK_EXECUTION_ARCHIVE_AFTER_DAYS = int(os.environ.get('TASK_EXECUTION_ARCHIVE_AFTER_DAYS', 30))
+# Root directory of the archive (partitioned by organization and month)
+TASK_EXECUTION_ARCHIVE_DIR = os.environ.get(
+    'TASK_EXECUTION_ARCHIVE_DIR', str(BASE_DIR / 'backups' / 'executions')
+)
+
+# ============================================================================
+# Document Diff
+# ============================================================================
+# Time budget of a single version comparison, in seconds
+DOCUMENT_DIFF_TIMEOUT = 2.0
+# Above this total number of lines only the common prefix/suffix is aligned
+DOCUMENT_DIFF_MAX_LINES = 200000
+# Lifetime of cached diffs in Redis, in seconds
+DOCUMENT_DIFF_CACHE_TIMEOUT = 7 * 24 * 60 * 60  # 7 days
+# Diffs kept in the database fallback (least recently used are evicted)
+DOCUMENT_DIFF_CACHE_MAX_ENTRIES = 5000
+# Minimum interval between LRU timestamp updates of a database entry, in seconds
+DOCUMENT_DIFF_CACHE_TOUCH_INTERVAL = 60 * 60  # 1 hour
+
+# ============================================================================
+# Document Storage
+# ============================================================================
+# Store non-latest document versions as deltas against their parent
+DOCUMENT_DELTA_STORAGE = os.environ.get('DOCUMENT_DELTA_STORAGE', 'False').lower() == 'true'
+# A full snapshot is kept every N versions of a chain
+DOCUMENT_DELTA_SNAPSHOT_INTERVAL = 10
+# Keep a version in full unless its delta is at most this fraction of its size
+DOCUMENT_DELTA_MAX_RATIO = 0.5
+# Reconstructed texts kept in memory per process (LRU)
+DOCUMENT_DELTA_CACHE_SIZE = 64
+
+# ============================================================================
+# Document Statistics
+# ============================================================================
+# Reading speed used to estimate reading time
+DOCUMENT_READING_WORDS_PER_MINUTE = 200
+# Headings kept in the stored section outline
+DOCUMENT_OUTLINE_MAX_ITEMS = 50
+
+# ============================================================================
+# Search
+# ============================================================================
+# PostgreSQL text search configuration used for stemming
+SEARCH_TEXT_CONFIG = 'portuguese'
+# Indexed text is truncated to this many characters (tsvector limit is 1 MB)
+SEARCH_MAX_BODY_CHARS = 200000
+SEARCH_RESULTS_PER_PAGE = 20
+SEARCH_MAX_RESULTS = 100
+
+# ============================================================================
+# Deferred Loading
+# ============================================================================
+# Warn when a deferred field of summary() rows is fetched lazily this many
+# times for the same queryset (N+1 queries in a loop)
+DEFERRED_FIELD_WARNING_THRESHOLD = 2
+
+# ============================================================================
+# Notifications
+# ============================================================================
+# Events of a recipient arriving within this window are delivered together
+NOTIFICATION_COALESCE_SECONDS = int(os.environ.get('NOTIFICATION_COALESCE_SECONDS', 30))
+# Delivery channels: backend class and maximum deliveries per minute
+# (None for no limit). Channels serve either users or organization webhooks.
+NOTIFICATION_CHANNELS = {
+    'in_app': {
+        'backend': 'apps.notifications.channels.InAppChannel',
+        'rate_limit': None,
+    },
+    'email': {
+        'backend': 'apps.notifications.channels.EmailChannel',
+        'rate_limit': int(os.environ.get('NOTIFICATION_EMAIL_RATE_LIMIT', 60)),
+    },
+    'webhook': {
+        'backend': 'apps.notifications.channels.WebhookChannel',
+        'rate_limit': int(os.environ.get('NOTIFICATION_WEBHOOK_RATE_LIMIT', 300)),
+    },
+}
+# Failed deliveries are retried with exponential backoff: BACKOFF * 2^n
+# seconds, capped at BACKOFF_MAX
+NOTIFICATION_MAX_RETRIES = 6
+NOTIFICATION_RETRY_BACKOFF = 30
+NOTIFICATION_RETRY_BACKOFF_MAX = 60 * 60  # 1 hour
+# Timeout of webhook requests, in seconds
+NOTIFICATION_WEBHOOK_TIMEOUT = 10
+
+# ============================================================================
+# Domain Events (Outbox)
+# ============================================================================
+# Publisher used by the relay: RedisStreamPublisher (stream consumers) or
+# CeleryPublisher (domain_event signal in a worker)
+OUTBOX_PUBLISHER = os.environ.get('OUTBOX_PUBLISHER', 'apps.events.publishers.RedisStreamPublisher')
+# Redis stream receiving the events, trimmed to about this many entries
+OUTBOX_STREAM = 'compozy:events'
+OUTBOX_STREAM_MAXLEN = 100000
+# Events published per transaction, and batches per relay run
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_RELAY_MAX_BATCHES = 20
+# Log a warning when events wait longer than this before being published
+OUTBOX_LAG_WARNING_SECONDS = 30
+# Published events are deleted after this many hours
+OUTBOX_RETENTION_HOURS = 72
+
+# ============================================================================
+# Problem Workflow
+# ============================================================================
+# Dotted paths of the callables run for each automated status, called as
+# handler(problem, repository) (repository only for per-repository stages).
+# Statuses without a handler are advanced manually.
+# apps.agents.runners.generate_prd generates the PRD with the business analyst.
+PROBLEM_WORKFLOW_HANDLERS = {
+    'analyzing': os.environ.get('PROBLEM_WORKFLOW_ANALYZING_HANDLER', ''),
+    'prd_generation': os.environ.get('PROBLEM_WORKFLOW_PRD_HANDLER', ''),
+    'spec_generation': os.environ.get('PROBLEM_WORKFLOW_SPEC_HANDLER', ''),
+    'task_creation': os.environ.get('PROBLEM_WORKFLOW_TASKS_HANDLER', ''),
+}
+# Failed stage parts are retried BACKOFF * 2^n seconds later
+PROBLEM_WORKFLOW_MAX_RETRIES = 3
+PROBLEM_WORKFLOW_RETRY_BACKOFF = 60
+# Stages without progress for this long are resumed. Running parts report
+# no progress, so the window must exceed the time limit of the workers that
+# run them: None derives it from the longest time_limit of the worker
+# profiles consuming the stage queues (critical included) plus the margin.
+PROBLEM_WORKFLOW_STALL_SECONDS = None
+PROBLEM_WORKFLOW_STALL_MARGIN = 15 * 60
+
+# ============================================================================
+# Agent Gateway (see apps.agents)
+# ============================================================================
+# LLM providers. Clients are created once per worker process and keep their
+# connections open; base_url points the SDKs elsewhere (e.g. run_llm_stub).
+AGENT_GATEWAY_PROVIDERS = {
+    'anthropic': {
+        'backend': 'apps.agents.providers.AnthropicProvider',
+        'api_key': os.environ.get('ANTHROPIC_API_KEY', ''),
+        'base_url': os.environ.get('ANTHROPIC_BASE_URL') or None,
+        'model': os.environ.get('ANTHROPIC_MODEL', 'claude-sonnet-4-20250514'),
+    },
+    'openai': {
+        'backend': 'apps.agents.providers.OpenAIProvider',
+        'api_key': os.environ.get('OPENAI_API_KEY', ''),
+        'base_url': os.environ.get('OPENAI_BASE_URL') or None,
+        'model': os.environ.get('OPENAI_MODEL', 'gpt-4o'),
+    },
 }
+AGENT_GATEWAY_DEFAULT_PROVIDER = os.environ.get('AGENT_GATEWAY_DEFAULT_PROVIDER', 'anthropic')
+# Connection pool of each provider client, per worker process
+AGENT_GATEWAY_MAX_CONNECTIONS = 20
+AGENT_GATEWAY_MAX_KEEPALIVE_CONNECTIONS = 10
+AGENT_GATEWAY_KEEPALIVE_EXPIRY = 60
+# Timeouts in seconds (read covers the gaps between streamed chunks)
+AGENT_GATEWAY_CONNECT_TIMEOUT = 10
+AGENT_GATEWAY_READ_TIMEOUT = 120
+# Completion tokens requested when the caller does not set max_tokens
+AGENT_GATEWAY_MAX_TOKENS = 4096
+# Failed requests are retried after a random delay between 0 and
+# BACKOFF * 2^n seconds, capped at BACKOFF_MAX (full jitter)
+AGENT_GATEWAY_MAX_RETRIES = 4
+AGENT_GATEWAY_RETRY_BACKOFF = 1.0
+AGENT_GATEWAY_RETRY_BACKOFF_MAX = 30.0
+# Per-organization budgets (per-organization override: Organization.llm_*).
+# Requests may burst up to REQUEST_BURST; tokens up to one minute of budget.
+AGENT_GATEWAY_REQUESTS_PER_MINUTE = int(os.environ.get('AGENT_GATEWAY_REQUESTS_PER_MINUTE', 60))
+AGENT_GATEWAY_REQUEST_BURST = 5
+AGENT_GATEWAY_TOKENS_PER_MINUTE = int(os.environ.get('AGENT_GATEWAY_TOKENS_PER_MINUTE', 200000))
+# Longest wait for budget before a call fails with BudgetExceeded, in seconds
+AGENT_GATEWAY_MAX_BUDGET_WAIT = 120
+# Streamed chat messages are saved at most this often, in seconds
+AGENT_GATEWAY_CHAT_FLUSH_INTERVAL = 1.0
@@ -34,11 +34,14 @@ if os.environ.get('DATABASE_URL'):
         # dj-database-url not installed yet, will be in task 1.3
         pass
 
+# Redis connection used by the cache and by direct clients (pub/sub, streams)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')
+
 # Cache configuration (Redis for development)
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         },
@@ -51,8 +54,11 @@ CACHES = {
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
-# Email backend (console for development)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Email backend (console for development; point it at the local SMTP stub
+# of run_notification_stubs with EMAIL_BACKEND/EMAIL_HOST/EMAIL_PORT)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
 
 # Django Debug Toolbar - Disabled to avoid layout interference
 # Uncomment below to enable it when needed for debugging
@@ -72,5 +78,5 @@ LOGGING['loggers']['django']['level'] = 'DEBUG'
 LOGGING['loggers']['apps']['level'] = 'DEBUG'
 
 # Celery configuration for development
-CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'))
-CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'))
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', REDIS_URL)
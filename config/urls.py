@@ -22,6 +22,8 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('admin/', admin.site.urls),
+    path('tasks/', include('apps.tasks_app.urls')),
+    path('search/', include('apps.search.urls')),
 ]
 
 # Django Debug Toolbar URLs (only in development)